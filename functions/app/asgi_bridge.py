@@ -0,0 +1,240 @@
+import asyncio
+import atexit
+import queue
+import threading
+from typing import Iterator, List, Optional, Tuple
+
+from flask import Request, Response
+
+_ASGI = {"version": "3.0", "spec_version": "2.3"}
+
+
+class _Done:
+    def __init__(self, error: Optional[BaseException] = None):
+        self.error = error
+
+
+class _Lifespan:
+    def __init__(self, app):
+        self.app = app
+        self.state: dict = {}
+
+    async def startup(self) -> None:
+        loop = asyncio.get_running_loop()
+        self._events: asyncio.Queue = asyncio.Queue()
+        self._started = loop.create_future()
+        self._stopped = loop.create_future()
+        self._task = loop.create_task(self._run())
+        await self._events.put({"type": "lifespan.startup"})
+        await self._started
+
+    async def shutdown(self) -> None:
+        await self._events.put({"type": "lifespan.shutdown"})
+        await self._stopped
+
+    async def _run(self) -> None:
+        scope = {"type": "lifespan", "asgi": _ASGI, "state": self.state}
+        try:
+            await self.app(scope, self._events.get, self._send)
+        except Exception:
+            # Apps without lifespan support raise here; serve them anyway
+            pass
+        finally:
+            for future in (self._started, self._stopped):
+                if not future.done():
+                    future.set_result(None)
+
+    async def _send(self, message: dict) -> None:
+        kind = message["type"]
+        if kind == "lifespan.startup.complete":
+            self._started.set_result(None)
+        elif kind == "lifespan.startup.failed":
+            self._started.set_exception(RuntimeError(message.get("message", "")))
+        elif kind in ("lifespan.shutdown.complete", "lifespan.shutdown.failed"):
+            self._stopped.set_result(None)
+
+
+class _Exchange:
+    """One request/response cycle between a WSGI thread and the event loop."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, body: bytes):
+        self._loop = loop
+        self._body = body
+        self._request_sent = False
+        self._disconnected: Optional[asyncio.Event] = None
+        self._messages: queue.Queue = queue.Queue()
+
+    async def receive(self) -> dict:
+        if not self._request_sent:
+            self._request_sent = True
+            return {"type": "http.request", "body": self._body, "more_body": False}
+        if self._disconnected is None:
+            self._disconnected = asyncio.Event()
+        await self._disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(self, message: dict) -> None:
+        self._messages.put(message)
+
+    def finish(self, future) -> None:
+        if future.cancelled():
+            self._messages.put(_Done(asyncio.CancelledError()))
+        else:
+            self._messages.put(_Done(future.exception()))
+
+    def next(self, timeout: Optional[float] = None):
+        """The app's next message; raises ``queue.Empty`` after ``timeout``"""
+        return self._messages.get(timeout=timeout)
+
+    def disconnect(self) -> None:
+        self._loop.call_soon_threadsafe(self._set_disconnected)
+
+    def _set_disconnected(self) -> None:
+        if self._disconnected is None:
+            self._disconnected = asyncio.Event()
+        self._disconnected.set()
+
+    def stream(self, first: bytes, timeout: Optional[float]) -> Iterator[bytes]:
+        try:
+            yield first
+            while True:
+                try:
+                    message = self.next(timeout)
+                except queue.Empty:
+                    # The status is already sent; cut the body short instead
+                    return
+                if isinstance(message, _Done):
+                    return
+                if message.get("body"):
+                    yield message["body"]
+                if not message.get("more_body", False):
+                    return
+        finally:
+            self.disconnect()
+
+
+class ASGIBridge:
+    """Serves an ASGI app from a synchronous (Flask/WSGI) request handler.
+
+    A single event loop runs on a daemon thread for the life of the instance,
+    so lifespan startup happens once and warm invocations reuse whatever the
+    app keeps on that loop: caches, connection pools and background tasks.
+    Responses that send more than one body message are streamed back.
+
+    A request whose app sends nothing for ``response_timeout`` seconds is
+    cancelled and answered with a 504, so the worker thread is not held
+    until the platform kills the whole invocation.
+    """
+
+    def __init__(self, app, startup_timeout: float = 30, response_timeout: float = 55):
+        self.app = app
+        self._startup_timeout = startup_timeout
+        self._response_timeout = response_timeout
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lifespan = _Lifespan(app)
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        self._ensure_started()
+        return self._loop
+
+    def __call__(self, request: Request) -> Response:
+        loop = self.loop
+        exchange = _Exchange(loop, request.get_data(cache=False))
+        future = asyncio.run_coroutine_threadsafe(
+            self.app(self._scope(request), exchange.receive, exchange.send), loop
+        )
+        future.add_done_callback(exchange.finish)
+
+        try:
+            start = exchange.next(self._response_timeout)
+            if isinstance(start, _Done):
+                raise start.error or RuntimeError("ASGI app returned no response")
+            status = start["status"]
+            headers = _decode_headers(start.get("headers", []))
+            message = exchange.next(self._response_timeout)
+        except queue.Empty:
+            future.cancel()
+            return Response(
+                '{"detail":"Request timed out"}',
+                status=504,
+                content_type="application/json",
+            )
+        if isinstance(message, _Done):
+            return Response(b"", status=status, headers=headers)
+        if not message.get("more_body", False):
+            return Response(message.get("body", b""), status=status, headers=headers)
+        return Response(
+            exchange.stream(message.get("body", b""), self._response_timeout),
+            status=status,
+            headers=headers,
+            direct_passthrough=True,
+        )
+
+    def close(self) -> None:
+        with self._lock:
+            loop, self._loop = self._loop, None
+        if loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._lifespan.shutdown(), loop).result(
+                self._startup_timeout
+            )
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+
+    def _ensure_started(self) -> None:
+        if self._loop is not None:
+            return
+        with self._lock:
+            if self._loop is not None:
+                return
+            loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=loop.run_forever, name="asgi-bridge", daemon=True
+            ).start()
+            asyncio.run_coroutine_threadsafe(self._lifespan.startup(), loop).result(
+                self._startup_timeout
+            )
+            self._loop = loop
+        atexit.register(self.close)
+
+    def _scope(self, request: Request) -> dict:
+        environ = request.environ
+        return {
+            "type": "http",
+            "asgi": _ASGI,
+            "http_version": environ.get("SERVER_PROTOCOL", "HTTP/1.1").split("/")[-1],
+            "method": request.method,
+            "scheme": request.scheme,
+            "path": request.path,
+            "raw_path": _raw_path(environ),
+            "root_path": request.script_root,
+            "query_string": request.query_string,
+            "headers": [
+                (name.lower().encode("latin-1"), value.encode("latin-1"))
+                for name, value in request.headers.items()
+            ],
+            "client": (request.remote_addr, int(environ.get("REMOTE_PORT") or 0)),
+            "server": (
+                environ.get("SERVER_NAME", "localhost"),
+                int(environ.get("SERVER_PORT") or 80),
+            ),
+            "state": dict(self._lifespan.state),
+        }
+
+
+def _raw_path(environ: dict) -> bytes:
+    """The request path as the client sent it, percent-escapes and all"""
+    # gunicorn sets RAW_URI and the Werkzeug dev server REQUEST_URI
+    uri = environ.get("RAW_URI") or environ.get("REQUEST_URI")
+    if uri:
+        return uri.split("?", 1)[0].encode("latin-1")
+    # PATH_INFO is already unquoted; WSGI carries its bytes as latin-1
+    path = environ.get("SCRIPT_NAME", "") + environ.get("PATH_INFO", "")
+    return path.encode("latin-1")
+
+
+def _decode_headers(raw: List[Tuple[bytes, bytes]]) -> List[Tuple[str, str]]:
+    return [(name.decode("latin-1"), value.decode("latin-1")) for name, value in raw]
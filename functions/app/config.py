@@ -1,5 +1,5 @@
 from functools import lru_cache
-from typing import List
+from typing import Dict, List, Literal, Optional
 
 from pydantic_settings import BaseSettings
 
@@ -9,6 +9,8 @@ class Settings(BaseSettings):
     app_name: str = "RiderCritic"
     version: str = "1.0.0"
     debug: bool = False
+    # Read straight from the environment by app.main, before settings load
+    lazy_init: bool = False
 
     # Firebase settings
     firebase_project_id: str
@@ -16,6 +18,124 @@ class Settings(BaseSettings):
     firebase_auth_domain: str
     firebase_storage_bucket: str
 
+    # Token verification cache
+    token_cache_size: int = 10000
+    signing_key_refresh_margin: int = 300
+
+    # Admin SDK gateway
+    admin_sdk_workers: int = 8
+    admin_sdk_max_queue: int = 64
+    admin_sdk_timeout: float = 10.0
+
+    # User profile cache (seconds)
+    user_cache_size: int = 10000
+    user_cache_ttl: float = 30
+    user_cache_stale_ttl: float = 300
+
+    # Role lookups for tokens without role claims (seconds)
+    role_cache_size: int = 10000
+    role_cache_ttl: float = 300
+
+    # Review rating aggregates
+    rating_half_life_days: float = 365
+
+    # In-memory bike catalog for /bikes/search (seconds)
+    catalog_sync_interval: float = 30
+    catalog_rebuild_interval: float = 3600
+
+    # Rate limiting; set a Redis URL to share buckets across instances
+    rate_limit_enabled: bool = True
+    rate_limit_redis_url: Optional[str] = None
+    rate_limit_redis_timeout: float = 0.05
+    rate_limit_max_keys: int = 100000
+    # Trusted proxies that append to X-Forwarded-For; 0 uses the peer address.
+    # Behind Firebase Hosting it is 2 (Hosting's CDN, then Google's front end);
+    # on Cloud Functions, 0 turns the per-IP rules off instead
+    rate_limit_forwarded_hops: int = 0
+
+    # Two-tier cache; set a Redis URL to share entries across instances (seconds)
+    cache_redis_url: Optional[str] = None
+    cache_redis_timeout: float = 0.05
+    cache_l1_size: int = 10000
+    cache_l1_ttl: float = 30
+    # "users" defaults to user_cache_ttl: UserCache already serves stale profiles
+    # while it revalidates, and a longer shared TTL would stack on top of that
+    cache_ttls: Dict[str, float] = {"bikes": 600, "ai": 86400}
+    cache_negative_ttls: Dict[str, float] = {"bikes": 30}
+
+    # Share of requests timed per phase (Server-Timing and /metrics)
+    timing_sample_rate: float = 1.0
+
+    # Stack profiles of single requests: admins send X-Profile, plus a sample
+    profile_sample_rate: float = 0.0
+    profile_interval: float = 0.005
+    profile_max_concurrent: int = 4
+    # Also write each profile there as a .folded file
+    profile_dir: Optional[str] = None
+
+    # AI generation, loaded on first use; prompts are batched per endpoint
+    ai_model_name: str = "csebuetnlp/banglat5"
+    ai_quantize: bool = True
+    # torch intra-op threads; 0 keeps torch's default
+    ai_threads: int = 0
+    ai_max_input_tokens: int = 512
+    # "mmap" maps safetensors weights so workers on a host share their pages;
+    # quantized Linear weights are private copies unless preloaded
+    ai_weights: Literal["private", "mmap"] = "private"
+    # Load the model in the gunicorn master before it forks workers
+    ai_preload: bool = False
+    ai_max_batch_size: int = 8
+    ai_max_wait: float = 0.02
+    ai_max_concurrent_batches: int = 1
+    ai_max_queue: int = 64
+    ai_timeout: float = 60
+
+    # Catalog crawler (scripts/crawl.py); delays in seconds
+    scraper_user_agent: str = "RiderCriticBot/1.0"
+    scraper_concurrency: int = 16
+    scraper_per_host: int = 2
+    scraper_delay: float = 1.0
+    scraper_timeout: float = 20
+    scraper_max_depth: int = 3
+    scraper_parse_workers: int = 2
+    scraper_frontier_path: str = "/tmp/scraper/frontier.sqlite3"
+
+    # Near-duplicate checks on imports and new reviews (MinHash LSH)
+    dedup_enabled: bool = True
+    dedup_threshold: float = 0.8
+    dedup_num_perm: int = 64
+    dedup_bands: int = 16
+    # Shorter reviews (normalized characters) are never flagged
+    dedup_min_review_length: int = 40
+    dedup_sync_interval: float = 60
+    # Full scans drop hard-deleted documents, which syncs cannot see
+    dedup_rebuild_interval: float = 3600
+    # Keep the indexes there so restarts skip the rebuild from Firestore
+    dedup_dir: Optional[str] = None
+    # Build indexes in the background; reviews written before that go unchecked
+    dedup_background_load: bool = True
+
+    # Bulk imports under /admin/import; uploads stay under this prefix in
+    # the Storage bucket until imported, and the import_worker function
+    # runs the jobs from its task queue
+    import_prefix: str = "imports"
+    import_task_queue: str = "import_worker"
+    import_chunk_size: int = 500
+    import_concurrency: int = 4
+    # Capped at the 32MB Cloud Functions accepts in one request
+    import_max_bytes: int = 32 * 1024 * 1024
+    import_max_errors: int = 100
+    # Bulk account creation (POST /admin/import/users), up to 1000 per SDK call;
+    # concurrency bounds the Admin SDK calls one import keeps in flight
+    user_import_chunk_size: int = 1000
+    user_import_concurrency: int = 4
+    # The import runs inside the request, which ASGIBridge cuts off after
+    # 55s: chunks not started after the deadline are reported as failed,
+    # and a started one can take up to the timeout more
+    user_import_max_rows: int = 10000
+    user_import_timeout: float = 15.0
+    user_import_deadline: float = 30.0
+
     # CORS settings
     allowed_origins: List[str] = ["*"]
 
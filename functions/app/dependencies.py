@@ -1,18 +1,69 @@
+from typing import Dict, List
+
+from app.models.user import UserProfile
+from app.services.firebase_service import FirebaseAuthService, get_firebase_service
+from app.services.roles import RoleResolver, get_role_resolver, permissions_for
+from app.services.user_loader import UserLoader
+from app.timing import phase
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from firebase_admin import auth
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/token")
 
 
-async def get_current_user_id(token: str = Depends(oauth2_scheme)) -> str:
-    try:
-        # Verify the Firebase ID token
-        decoded_token = auth.verify_id_token(token)
-        return decoded_token["uid"]
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid authentication credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+async def get_current_user_claims(
+    token: str = Depends(oauth2_scheme),
+    firebase: FirebaseAuthService = Depends(get_firebase_service),
+) -> Dict:
+    # Verify the Firebase ID token, reusing earlier verifications
+    with phase("auth"):
+        return await firebase.verify_token(token)
+
+
+async def get_current_user_id(claims: Dict = Depends(get_current_user_claims)) -> str:
+    return claims["uid"]
+
+
+async def get_current_user_roles(
+    claims: Dict = Depends(get_current_user_claims),
+    role_resolver: RoleResolver = Depends(get_role_resolver),
+) -> List[str]:
+    return await role_resolver.resolve(claims)
+
+
+def require_roles(*roles: str):
+    async def check_roles(
+        user_roles: List[str] = Depends(get_current_user_roles),
+    ) -> List[str]:
+        if not any(role in user_roles for role in roles):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=f"{' or '.join(roles).capitalize()} access required",
+            )
+        return user_roles
+
+    return check_roles
+
+
+def require_permission(permission: str):
+    async def check_permission(
+        user_roles: List[str] = Depends(get_current_user_roles),
+    ) -> List[str]:
+        if permission not in permissions_for(user_roles):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=f"Missing permission: {permission}",
+            )
+        return user_roles
+
+    return check_permission
+
+
+def get_user_loader(
+    firebase: FirebaseAuthService = Depends(get_firebase_service),
+) -> UserLoader:
+    async def load_profiles(uids: List[str]) -> Dict[str, UserProfile]:
+        records = await firebase.get_users(uids)
+        return {uid: UserProfile.from_record(r) for uid, r in records.items()}
+
+    return UserLoader(load_profiles)
@@ -1,27 +1,70 @@
 import os
+import threading
+from functools import lru_cache
 from pathlib import Path
 
-import firebase_admin
-from firebase_admin import credentials
+_lock = threading.Lock()
 
 
 def initialize_firebase():
-    """Initialize Firebase Admin SDK"""
-    try:
-        # Get the path to the service account key file
-        cred_path = os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
-        if not cred_path:
-            # If not set in env, try to find it in the config directory
-            cred_path = str(
-                Path(__file__).parent.parent.parent
-                / "config"
-                / "firebase-credentials.json"
-            )
-
-        # Initialize Firebase Admin SDK
-        cred = credentials.Certificate(cred_path)
-        firebase_admin.initialize_app(cred)
-        print("Firebase initialized successfully")
-    except Exception as e:
-        print(f"Error initializing Firebase: {e}")
-        raise
+    """Initialize Firebase Admin SDK once per process"""
+    # Imported here so cold starts only pay for the SDK when it is first used
+    import firebase_admin
+    from app.services.token_cache import get_signing_key_store
+    from firebase_admin import credentials
+
+    with _lock:
+        try:
+            return firebase_admin.get_app()
+        except ValueError:
+            pass
+
+        try:
+            # Get the path to the service account key file
+            cred_path = os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
+            if not cred_path:
+                # If not set in env, try to find it in the config directory
+                cred_path = str(
+                    Path(__file__).parent.parent.parent
+                    / "config"
+                    / "firebase-credentials.json"
+                )
+
+            # Initialize Firebase Admin SDK
+            cred = credentials.Certificate(cred_path)
+            firebase_app = firebase_admin.initialize_app(cred)
+
+            # Keep the token signing keys in memory with background refresh
+            get_signing_key_store().install(firebase_app)
+            print("Firebase initialized successfully")
+            return firebase_app
+        except Exception as e:
+            print(f"Error initializing Firebase: {e}")
+            raise
+
+
+def get_auth():
+    """Return the firebase_admin.auth module, initializing the SDK on first use"""
+    initialize_firebase()
+    from firebase_admin import auth
+
+    return auth
+
+
+@lru_cache()
+def get_firestore_client():
+    """Return the process-wide async Firestore client"""
+    from firebase_admin import firestore_async
+
+    return firestore_async.client(initialize_firebase())
+
+
+@lru_cache()
+def get_storage_bucket():
+    """Return the project's Cloud Storage bucket"""
+    from app.config import get_settings
+    from firebase_admin import storage
+
+    return storage.bucket(
+        get_settings().firebase_storage_bucket, app=initialize_firebase()
+    )
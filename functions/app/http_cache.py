@@ -0,0 +1,46 @@
+import hashlib
+import json
+from typing import Any, Optional
+
+from fastapi import Request, Response, status
+
+# Lets Firebase Hosting's CDN serve catalog reads and refresh them in the background
+CATALOG_CACHE_CONTROL = "public, max-age=60, s-maxage=300, stale-while-revalidate=600"
+# Browsers must revalidate, but a matching ETag costs only a 304
+PRIVATE_CACHE_CONTROL = "private, no-cache"
+
+
+def etag_for(*parts: Any) -> str:
+    """Strong ETag from a content hash of ``parts``"""
+    raw = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return '"' + hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses the weak comparison
+    tags = (tag.strip() for tag in if_none_match.split(","))
+    return any(tag.removeprefix("W/") == etag for tag in tags)
+
+
+def not_modified(
+    request: Request,
+    response: Response,
+    etag: str,
+    cache_control: Optional[str] = None,
+) -> Optional[Response]:
+    """Return a 304 if the client already has ``etag``, else tag ``response``.
+
+    Call before building the response body so a revalidation skips
+    serialization entirely.
+    """
+    headers = {"ETag": etag}
+    if cache_control:
+        headers["Cache-Control"] = cache_control
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return None
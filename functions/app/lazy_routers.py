@@ -0,0 +1,42 @@
+import importlib
+from typing import Iterable, List, NamedTuple
+
+from fastapi import FastAPI
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+
+class RouterSpec(NamedTuple):
+    module: str
+    prefix: str
+    tags: List[str]
+
+    def matches(self, path: str) -> bool:
+        return path == self.prefix or path.startswith(self.prefix + "/")
+
+
+def include_routers(app: FastAPI, specs: Iterable[RouterSpec]) -> None:
+    loaded = getattr(app.state, "loaded_routers", None)
+    if loaded is None:
+        loaded = app.state.loaded_routers = set()
+    for spec in specs:
+        if spec.module in loaded:
+            continue
+        module = importlib.import_module(spec.module)
+        app.include_router(module.router, prefix=spec.prefix, tags=spec.tags)
+        loaded.add(spec.module)
+
+
+class LazyRouterMiddleware:
+    """Imports and includes each router the first time a request hits its prefix."""
+
+    def __init__(self, app: ASGIApp, routers: Iterable[RouterSpec]):
+        self.app = app
+        self._pending = list(routers)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if self._pending and scope["type"] in ("http", "websocket"):
+            matched = [spec for spec in self._pending if spec.matches(scope["path"])]
+            if matched:
+                include_routers(scope["app"], matched)
+                self._pending = [s for s in self._pending if s not in matched]
+        await self.app(scope, receive, send)
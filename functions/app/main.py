@@ -1,11 +1,48 @@
+import json
+import os
+from pathlib import Path
+
 from app.config import Settings, get_settings
 from app.firebase_init import initialize_firebase
-from app.routers import auth, users
-from fastapi import Depends, FastAPI
+from app.lazy_routers import LazyRouterMiddleware, RouterSpec, include_routers
+from app.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE
+from app.metrics import render as render_metrics
+from app.profiling import ProfilingMiddleware
+from app.rate_limit import RateLimitMiddleware, RateLimitRule
+from app.services.rate_limiter import RateLimit
+from app.timing import TimingMiddleware
+from fastapi import Depends, FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 
-# Initialize Firebase
-initialize_firebase()
+# With LAZY_INIT the Admin SDK, credentials and routers load on first use
+LAZY_INIT = os.getenv("LAZY_INIT", "false").lower() in ("1", "true", "yes")
+OPENAPI_PATH = Path(__file__).parent.parent / "openapi.json"
+
+ROUTERS = [
+    RouterSpec("app.routers.auth", "/auth", ["Authentication"]),
+    RouterSpec("app.routers.users", "/users", ["Users"]),
+    RouterSpec("app.routers.bikes", "/bikes", ["Bikes"]),
+    RouterSpec("app.routers.reviews", "/reviews", ["Reviews"]),
+    RouterSpec("app.routers.ai", "/ai", ["AI"]),
+    RouterSpec("app.routers.admin", "/admin", ["Admin"]),
+]
+
+RATE_LIMITS = [
+    # Every attempt costs an Identity Toolkit call
+    RateLimitRule("auth-ip", "/auth", "ip", RateLimit.per_minute(10)),
+    RateLimitRule("register", "/auth/register", "route", RateLimit.per_minute(120)),
+    RateLimitRule("token", "/auth/token", "route", RateLimit.per_minute(1200)),
+    # Full-collection scans; one bucket per route across all callers
+    RateLimitRule("export", "/bikes/export", "route", RateLimit.per_minute(6)),
+    RateLimitRule("export", "/reviews/export", "route", RateLimit.per_minute(6)),
+    # Each generation holds a CPU batch slot for seconds
+    RateLimitRule("ai", "/ai", "uid", RateLimit.per_minute(10)),
+    RateLimitRule("user", "/", "uid", RateLimit(rate=20, burst=100)),
+]
+
+if not LAZY_INIT:
+    # Initialize Firebase
+    initialize_firebase()
 
 app = FastAPI(
     title="RiderCritic API",
@@ -13,6 +50,12 @@ app = FastAPI(
     version="1.0.0",
 )
 
+# Inside CORS, so 429 responses still carry CORS headers
+app.add_middleware(RateLimitMiddleware, rules=RATE_LIMITS)
+app.add_middleware(TimingMiddleware)
+# Outside timing, so sampler overhead is not counted in the phases
+app.add_middleware(ProfilingMiddleware)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -23,8 +66,29 @@ app.add_middleware(
 )
 
 # Include routers
-app.include_router(auth.router, prefix="/auth", tags=["Authentication"])
-app.include_router(users.router, prefix="/users", tags=["Users"])
+if LAZY_INIT:
+    app.add_middleware(LazyRouterMiddleware, routers=ROUTERS)
+else:
+    include_routers(app, ROUTERS)
+
+
+def build_openapi_schema() -> dict:
+    include_routers(app, ROUTERS)
+    app.openapi_schema = None
+    return FastAPI.openapi(app)
+
+
+def openapi() -> dict:
+    # Lazy instances serve the schema prebuilt by scripts/build_openapi.py
+    if app.openapi_schema is None:
+        if LAZY_INIT and OPENAPI_PATH.exists():
+            app.openapi_schema = json.loads(OPENAPI_PATH.read_text())
+        else:
+            app.openapi_schema = build_openapi_schema()
+    return app.openapi_schema
+
+
+app.openapi = openapi
 
 
 @app.get("/")
@@ -39,3 +103,8 @@ async def root(settings: Settings = Depends(get_settings)):
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return Response(render_metrics(), media_type=METRICS_CONTENT_TYPE)
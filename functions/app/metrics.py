@@ -0,0 +1,137 @@
+import bisect
+from typing import Callable, Dict, Iterable, List, NamedTuple, Sequence, Tuple
+
+# (sample name, labels, value)
+Sample = Tuple[str, Dict[str, str], float]
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# Seconds, from a fast cache hit to a slow Admin SDK round trip
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+
+class MetricFamily(NamedTuple):
+    name: str
+    type: str
+    help: str
+    samples: List[Sample]
+
+
+Collector = Callable[[], Iterable[MetricFamily]]
+_collectors: List[Collector] = []
+
+
+def register_collector(collector: Collector) -> None:
+    """Add a source of metrics to the ``/metrics`` exposition"""
+    if collector not in _collectors:
+        _collectors.append(collector)
+
+
+class Histogram:
+    """Prometheus histogram with one series per combination of label values"""
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        label_names: Sequence[str],
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.help = help
+        self._label_names = tuple(label_names)
+        self._buckets = tuple(sorted(buckets))
+        # label values -> per-bucket counts (not cumulative), then sum and count
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, *label_values: str) -> None:
+        series = self._series.get(label_values)
+        if series is None:
+            series = self._series[label_values] = [0] * len(self._buckets) + [0.0, 0]
+        index = bisect.bisect_left(self._buckets, value)
+        if index < len(self._buckets):
+            series[index] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def collect(self) -> Iterable[MetricFamily]:
+        samples: List[Sample] = []
+        for label_values, series in sorted(self._series.items()):
+            labels = dict(zip(self._label_names, label_values))
+            cumulative = 0
+            for bound, count in zip(self._buckets, series):
+                cumulative += count
+                samples.append(
+                    (
+                        f"{self.name}_bucket",
+                        {**labels, "le": repr(float(bound))},
+                        cumulative,
+                    )
+                )
+            samples.append(
+                (f"{self.name}_bucket", {**labels, "le": "+Inf"}, series[-1])
+            )
+            samples.append((f"{self.name}_sum", labels, series[-2]))
+            samples.append((f"{self.name}_count", labels, series[-1]))
+        yield MetricFamily(self.name, "histogram", self.help, samples)
+
+
+def process_memory() -> Dict[str, int]:
+    """This process's memory in bytes from /proc (Linux only, else empty).
+
+    ``rss`` counts shared pages in full in every process; ``pss`` splits
+    them between the processes sharing them, and ``uss`` is only the pages
+    no other process has, i.e. what stopping this process would free.
+    """
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            fields = dict(line.split(":", 1) for line in f if ":" in line)
+    except OSError:
+        return {}
+
+    def kilobytes(name: str) -> int:
+        return int(fields.get(name, "0 kB").split()[0]) * 1024
+
+    return {
+        "rss": kilobytes("Rss"),
+        "pss": kilobytes("Pss"),
+        "uss": kilobytes("Private_Clean") + kilobytes("Private_Dirty"),
+    }
+
+
+PROCESS_MEMORY = {
+    "rss": ("process_resident_memory_bytes", "Resident set size"),
+    "pss": (
+        "process_proportional_memory_bytes",
+        "Resident memory with shared pages split between the processes sharing them",
+    ),
+    "uss": ("process_unique_memory_bytes", "Resident memory no other process shares"),
+}
+
+
+def collect_process() -> Iterable[MetricFamily]:
+    for kind, value in process_memory().items():
+        name, help = PROCESS_MEMORY[kind]
+        yield MetricFamily(name, "gauge", help, [(name, {}, value)])
+
+
+register_collector(collect_process)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def render() -> str:
+    """Render every registered collector in the Prometheus text format"""
+    lines = []
+    for collector in list(_collectors):
+        for family in collector():
+            lines.append(f"# HELP {family.name} {family.help}")
+            lines.append(f"# TYPE {family.name} {family.type}")
+            for name, labels, value in family.samples:
+                if labels:
+                    pairs = ",".join(
+                        f'{k}="{_escape(str(v))}"' for k, v in labels.items()
+                    )
+                    name = f"{name}{{{pairs}}}"
+                lines.append(f"{name} {value}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,78 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel
+
+
+class RouteProfileSummary(BaseModel):
+    route: str
+    requests: int
+    seconds: float
+    samples: int
+
+
+class ImportRowError(BaseModel):
+    row: int
+    error: str
+
+
+class ImportJobResponse(BaseModel):
+    id: str
+    kind: str
+    format: str
+    status: str
+    bytes: int
+    # Everything before this byte offset is imported; a resume starts here
+    offset: int = 0
+    rows: int = 0
+    imported: int = 0
+    failed: int = 0
+    errors: List[ImportRowError] = []
+    error: Optional[str] = None
+    rows_per_second: Optional[float] = None
+    created_by: Optional[str] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    @classmethod
+    def from_document(cls, doc: Dict[str, Any]) -> "ImportJobResponse":
+        """Map a Firestore ``importJobs`` document to the API response"""
+        return cls(
+            id=doc["id"],
+            kind=doc["kind"],
+            format=doc["format"],
+            status=doc["status"],
+            bytes=doc.get("bytes", 0),
+            offset=doc.get("offset", 0),
+            rows=doc.get("rows", 0),
+            imported=doc.get("imported", 0),
+            failed=doc.get("failed", 0),
+            errors=doc.get("errors") or [],
+            error=doc.get("error"),
+            rows_per_second=doc.get("rowsPerSecond"),
+            created_by=doc.get("createdBy"),
+            created_at=doc.get("createdAt"),
+            started_at=doc.get("startedAt"),
+            finished_at=doc.get("finishedAt"),
+        )
+
+
+class UserImportRowError(BaseModel):
+    index: int
+    email: Optional[str] = None
+    error: str
+
+
+class ImportedUser(BaseModel):
+    index: int
+    uid: str
+
+
+class UserImportResponse(BaseModel):
+    rows: int
+    imported: int
+    failed: int
+    users: List[ImportedUser] = []
+    errors: List[UserImportRowError] = []
+    seconds: float
@@ -0,0 +1,27 @@
+from typing import List, Literal, Optional
+
+from pydantic import BaseModel, Field
+
+Language = Literal["bn", "en"]
+
+
+class ReviewGenerationRequest(BaseModel):
+    bike_id: str
+    rating: Optional[int] = Field(None, ge=1, le=5)
+    highlights: List[str] = Field([], max_length=10)
+    language: Language = "bn"
+
+
+class SummaryGenerationRequest(BaseModel):
+    bike_id: str
+    language: Language = "bn"
+
+
+class ComparisonGenerationRequest(BaseModel):
+    bike_ids: List[str] = Field(..., min_length=2, max_length=4)
+    language: Language = "bn"
+
+
+class GenerationResponse(BaseModel):
+    text: str
+    model: str
@@ -0,0 +1,105 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel, ConfigDict, Field
+
+# Fields returned by list endpoints; detail endpoints read the whole document
+BIKE_LIST_FIELDS = [
+    "name",
+    "brandId",
+    "typeId",
+    "price",
+    "modelYear",
+    "imageUrl",
+    "ratingStats",
+]
+
+
+class RatingSummary(BaseModel):
+    count: int = 0
+    average: Optional[float] = None
+    histogram: Dict[int, int] = {star: 0 for star in range(1, 6)}
+    recency_score: Optional[float] = None
+
+    @classmethod
+    def from_stats(cls, stats: Optional[Dict[str, Any]]) -> "RatingSummary":
+        """Build the summary from a bike's materialized ``ratingStats`` map"""
+        if not stats or stats.get("count", 0) <= 0:
+            return cls()
+        weight_total = stats.get("weightTotal") or 0
+        return cls(
+            count=stats["count"],
+            average=round(stats["sum"] / stats["count"], 2),
+            histogram={
+                star: int(stats.get("histogram", {}).get(str(star), 0))
+                for star in range(1, 6)
+            },
+            recency_score=(
+                round(stats["weightedSum"] / weight_total, 2)
+                if weight_total > 0
+                else None
+            ),
+        )
+
+
+class BikeBase(BaseModel):
+    model_config = ConfigDict(protected_namespaces=())
+
+    name: str
+    brand_id: str
+    type_id: Optional[str] = None
+    price: float = Field(..., ge=0)
+    model_year: Optional[int] = None
+    image_url: Optional[str] = None
+
+
+class BikeCreate(BikeBase):
+    specs: Dict[str, Any] = {}
+
+    def to_document(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "brandId": self.brand_id,
+            "typeId": self.type_id,
+            "price": self.price,
+            "modelYear": self.model_year,
+            "imageUrl": self.image_url,
+            "specs": self.specs,
+        }
+
+
+class BikeImport(BikeCreate):
+    """One row of a bike import; a row with an ``id`` updates that bike"""
+
+    id: Optional[str] = None
+
+
+class BikeResponse(BikeBase):
+    id: str
+    specs: Optional[Dict[str, Any]] = None
+    rating: RatingSummary = RatingSummary()
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    @classmethod
+    def from_document(cls, doc: Dict[str, Any]) -> "BikeResponse":
+        """Map a Firestore ``bikes`` document to the API response"""
+        return cls(
+            id=doc["id"],
+            name=doc["name"],
+            brand_id=doc["brandId"],
+            type_id=doc.get("typeId"),
+            price=doc["price"],
+            model_year=doc.get("modelYear"),
+            image_url=doc.get("imageUrl"),
+            specs=doc.get("specs"),
+            rating=RatingSummary.from_stats(doc.get("ratingStats")),
+            created_at=doc.get("createdAt"),
+            updated_at=doc.get("updatedAt"),
+        )
+
+
+class BikeSearchResponse(BaseModel):
+    items: List[BikeResponse]
+    total: int
+    facets: Dict[str, Dict[str, int]]
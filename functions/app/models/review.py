@@ -0,0 +1,54 @@
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from pydantic import BaseModel, Field
+
+REVIEW_LIST_FIELDS = ["bikeId", "userId", "rating", "title", "content", "createdAt"]
+
+
+class ReviewBase(BaseModel):
+    rating: int = Field(..., ge=1, le=5)
+    title: Optional[str] = None
+    content: str
+
+
+class ReviewCreate(ReviewBase):
+    bike_id: str
+
+
+class ReviewImport(ReviewCreate):
+    """One row of a review import, e.g. a line of the /reviews/export output"""
+
+    id: Optional[str] = None
+    user_id: str
+    created_at: Optional[datetime] = None
+
+
+class ReviewUpdate(BaseModel):
+    rating: Optional[int] = Field(None, ge=1, le=5)
+    title: Optional[str] = None
+    content: Optional[str] = None
+
+
+class ReviewResponse(ReviewBase):
+    id: str
+    bike_id: str
+    brand_id: Optional[str] = None
+    user_id: str
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    @classmethod
+    def from_document(cls, doc: Dict[str, Any]) -> "ReviewResponse":
+        """Map a Firestore ``reviews`` document to the API response"""
+        return cls(
+            id=doc["id"],
+            bike_id=doc["bikeId"],
+            brand_id=doc.get("brandId"),
+            user_id=doc["userId"],
+            rating=doc["rating"],
+            title=doc.get("title"),
+            content=doc.get("content", ""),
+            created_at=doc.get("createdAt"),
+            updated_at=doc.get("updatedAt"),
+        )
@@ -1,7 +1,17 @@
+import base64
+import binascii
 from datetime import datetime
-from typing import List, Optional
+from typing import Annotated, Any, Dict, List, Literal, Optional
 
-from pydantic import BaseModel, EmailStr, Field
+from app.http_cache import etag_for
+from pydantic import (
+    BaseModel,
+    EmailStr,
+    Field,
+    PrivateAttr,
+    field_validator,
+    model_validator,
+)
 
 
 class UserBase(BaseModel):
@@ -27,3 +37,161 @@ class UserResponse(UserBase):
     roles: List[str] = ["user"]
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
+    _etag: Optional[str] = PrivateAttr(None)
+
+    @property
+    def etag(self) -> str:
+        # Computed once per instance, so cached responses revalidate for free
+        if self._etag is None:
+            self._etag = etag_for(self.model_dump())
+        return self._etag
+
+    @classmethod
+    def from_record(cls, record, roles: Optional[List[str]] = None) -> "UserResponse":
+        """Map a firebase_admin ``UserRecord`` to the API response.
+
+        Records come from the Admin SDK and are trusted, so the model is
+        constructed without re-validating them.
+        """
+        return cls.model_construct(
+            uid=record.uid,
+            email=record.email,
+            display_name=record.display_name,
+            photo_url=record.photo_url,
+            email_verified=record.email_verified,
+            disabled=record.disabled,
+            roles=roles or ["user"],
+        )
+
+
+class UserProfile(BaseModel):
+    uid: str
+    display_name: Optional[str] = None
+    photo_url: Optional[str] = None
+
+    @classmethod
+    def from_record(cls, record) -> "UserProfile":
+        return cls.model_construct(
+            uid=record.uid,
+            display_name=record.display_name,
+            photo_url=record.photo_url,
+        )
+
+
+class UserLookupRequest(BaseModel):
+    uids: List[str] = Field(..., min_length=1, max_length=100)
+
+
+class UserLookupResponse(BaseModel):
+    users: List[UserProfile]
+    not_found: List[str] = []
+
+
+class RoleUpdate(BaseModel):
+    roles: List[str] = Field(..., min_length=1)
+
+
+def _base64(value: Any) -> Any:
+    if not isinstance(value, str):
+        return value
+    try:
+        return base64.b64decode(value, validate=True)
+    except binascii.Error:
+        raise ValueError("Expected base64")
+
+
+Base64 = Annotated[bytes, Field(json_schema_extra={"format": "base64"})]
+
+# Settings each auth.UserImportHash factory takes; salt_separator is optional
+HASH_PARAMETERS: Dict[str, tuple] = {
+    "bcrypt": (),
+    "scrypt": ("key", "rounds", "memory_cost", "salt_separator"),
+    "standard_scrypt": (
+        "memory_cost",
+        "parallelization",
+        "block_size",
+        "derived_key_length",
+    ),
+    "hmac_sha512": ("key",),
+    "hmac_sha256": ("key",),
+    "hmac_sha1": ("key",),
+    "hmac_md5": ("key",),
+    "pbkdf2_sha256": ("rounds",),
+    "pbkdf_sha1": ("rounds",),
+    "sha512": ("rounds",),
+    "sha256": ("rounds",),
+    "sha1": ("rounds",),
+    "md5": ("rounds",),
+}
+
+
+class PasswordHashConfig(BaseModel):
+    """How the imported ``password_hash`` values were made"""
+
+    algorithm: Literal[
+        "bcrypt",
+        "scrypt",
+        "standard_scrypt",
+        "hmac_sha512",
+        "hmac_sha256",
+        "hmac_sha1",
+        "hmac_md5",
+        "pbkdf2_sha256",
+        "pbkdf_sha1",
+        "sha512",
+        "sha256",
+        "sha1",
+        "md5",
+    ]
+    key: Optional[Base64] = None
+    salt_separator: Optional[Base64] = None
+    rounds: Optional[int] = None
+    memory_cost: Optional[int] = None
+    parallelization: Optional[int] = None
+    block_size: Optional[int] = None
+    derived_key_length: Optional[int] = None
+
+    _decode = field_validator("key", "salt_separator", mode="before")(_base64)
+
+    @model_validator(mode="after")
+    def _check_parameters(self) -> "PasswordHashConfig":
+        missing = [
+            name
+            for name in HASH_PARAMETERS[self.algorithm]
+            if name != "salt_separator" and getattr(self, name) is None
+        ]
+        if missing:
+            raise ValueError(f"{self.algorithm} needs {', '.join(missing)}")
+        return self
+
+    def parameters(self) -> Dict[str, Any]:
+        """Keyword arguments for ``auth.UserImportHash.<algorithm>``"""
+        return {
+            name: getattr(self, name)
+            for name in HASH_PARAMETERS[self.algorithm]
+            if getattr(self, name) is not None
+        }
+
+
+class UserImport(UserBase):
+    # Generated when missing; an existing uid or email fails the row
+    uid: Optional[str] = Field(None, min_length=1, max_length=128)
+    email_verified: bool = False
+    disabled: bool = False
+    roles: List[str] = Field(["user"], min_length=1)
+    password_hash: Optional[Base64] = None
+    password_salt: Optional[Base64] = None
+
+    _decode = field_validator("password_hash", "password_salt", mode="before")(_base64)
+
+
+class UserImportRequest(BaseModel):
+    # Rows follow UserImport; each is validated on its own and reported by index
+    users: List[Dict[str, Any]] = Field(..., min_length=1)
+    hash: Optional[PasswordHashConfig] = None
+
+    @model_validator(mode="after")
+    def _check_hash(self) -> "UserImportRequest":
+        if self.hash is None and any(user.get("password_hash") for user in self.users):
+            raise ValueError("password_hash needs hash settings")
+        return self
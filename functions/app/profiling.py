@@ -0,0 +1,330 @@
+import asyncio
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from functools import lru_cache
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Optional
+
+from app.rate_limit import bearer_token
+from app.timing import route_template
+from fastapi import HTTPException
+
+# Leaf frame for time a request spends suspended, e.g. on a Firestore RPC
+AWAIT_FRAME = "[await]"
+# Stacks beyond a route's limit are counted under this frame
+OTHER_FRAME = "[other]"
+
+
+def frame_name(frame) -> str:
+    code = frame.f_code
+    tail = "/".join(Path(code.co_filename).parts[-2:])
+    # co_qualname is new in Python 3.11; the functions run on 3.10
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{name} ({tail})"
+
+
+def _coroutine_frame(awaitable):
+    for attr in ("cr_frame", "ag_frame", "gi_frame"):
+        frame = getattr(awaitable, attr, None)
+        if frame is not None:
+            return frame
+    return None
+
+
+def _awaiting(awaitable):
+    for attr in ("cr_await", "ag_await", "gi_yieldfrom"):
+        inner = getattr(awaitable, attr, None)
+        if inner is not None:
+            return inner
+    return None
+
+
+class StackSampler:
+    """Samples one task's stack from a background thread, wall clock.
+
+    While the task runs, its frames are on the event loop thread's stack.
+    While it is suspended they are only reachable through the ``cr_await``
+    chain of its coroutines, which ends in an ``[await]`` leaf. Sampling
+    both ways attributes time spent waiting to the ``await`` that waited.
+    Only frames below ``anchor`` (the profiling middleware) are kept.
+    """
+
+    def __init__(self, task: asyncio.Task, anchor, interval: float = 0.005):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._task = task
+        self._anchor = anchor
+        self._thread_id = threading.get_ident()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="stack-sampler", daemon=True
+        )
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            stack = self.sample()
+            # A sample taken while stopping would show stop() itself
+            if stack and not self._stop.is_set():
+                self.stacks[";".join(stack)] += 1
+
+    def sample(self) -> List[str]:
+        running = self._running_stack()
+        if running is not None:
+            return running
+        return self._suspended_stack()
+
+    def _running_stack(self) -> Optional[List[str]]:
+        frame = sys._current_frames().get(self._thread_id)
+        frames = []
+        while frame is not None:
+            if frame is self._anchor:
+                return [frame_name(f) for f in reversed(frames)]
+            frames.append(frame)
+            frame = frame.f_back
+        return None
+
+    def _suspended_stack(self) -> List[str]:
+        stack: List[str] = []
+        seen_anchor = False
+        awaitable = self._task.get_coro()
+        while awaitable is not None:
+            frame = _coroutine_frame(awaitable)
+            if frame is None:
+                break
+            if seen_anchor:
+                stack.append(frame_name(frame))
+            seen_anchor = seen_anchor or frame is self._anchor
+            awaitable = _awaiting(awaitable)
+        if not seen_anchor:
+            return []
+        stack.append(AWAIT_FRAME)
+        return stack
+
+
+class Profile(NamedTuple):
+    id: str
+    route: str
+    method: str
+    seconds: float
+    stacks: Counter
+
+    def folded(self) -> str:
+        return folded(self.stacks, root=f"{self.method} {self.route}")
+
+
+def folded(stacks: Counter, root: Optional[str] = None) -> str:
+    """Collapsed stacks, one ``frame;frame;frame count`` line per stack.
+
+    The format flamegraph.pl, inferno and speedscope read. Files from many
+    requests or instances can simply be concatenated.
+    """
+    prefix = f"{root};" if root else ""
+    return "".join(f"{prefix}{stack} {count}\n" for stack, count in stacks.items())
+
+
+class RouteProfile:
+    __slots__ = ("requests", "seconds", "stacks")
+
+    def __init__(self):
+        self.requests = 0
+        self.seconds = 0.0
+        self.stacks: Counter = Counter()
+
+
+class ProfileStore:
+    """Sums profiles per route, and optionally writes each one to ``directory``"""
+
+    def __init__(self, directory: Optional[str] = None, max_stacks: int = 5000):
+        self.directory = Path(directory) if directory else None
+        self.max_stacks = max_stacks
+        self._routes: Dict[str, RouteProfile] = {}
+
+    async def add(self, profile: Profile) -> None:
+        key = f"{profile.method} {profile.route}"
+        route = self._routes.get(key)
+        if route is None:
+            route = self._routes[key] = RouteProfile()
+        route.requests += 1
+        route.seconds += profile.seconds
+        for stack, count in profile.stacks.items():
+            if stack in route.stacks or len(route.stacks) < self.max_stacks:
+                route.stacks[stack] += count
+            else:
+                route.stacks[OTHER_FRAME] += count
+        if self.directory is not None:
+            await asyncio.to_thread(self._write, profile)
+
+    def _write(self, profile: Profile) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        (self.directory / f"{profile.id}.folded").write_text(profile.folded())
+
+    def summary(self) -> List[dict]:
+        return [
+            {
+                "route": key,
+                "requests": route.requests,
+                "seconds": round(route.seconds, 6),
+                "samples": sum(route.stacks.values()),
+            }
+            for key, route in sorted(self._routes.items())
+        ]
+
+    def folded(self, route: Optional[str] = None) -> str:
+        return "".join(
+            folded(profile.stacks, root=key)
+            for key, profile in sorted(self._routes.items())
+            if route is None or key == route
+        )
+
+    def clear(self) -> None:
+        self._routes.clear()
+
+
+async def admin_from_bearer(scope: dict) -> bool:
+    """Whether the bearer token is an admin's, as ``require_roles("admin")`` decides"""
+    token = bearer_token(scope)
+    if token is None:
+        return False
+    from app.services.firebase_service import get_firebase_service
+    from app.services.roles import get_role_resolver
+
+    try:
+        claims = await get_firebase_service().verify_token(token)
+    except HTTPException:
+        return False
+    return "admin" in await get_role_resolver().resolve(claims)
+
+
+class ProfilingMiddleware:
+    """Profiles single requests and sums their stacks per route.
+
+    Admins profile a request by sending ``X-Profile``: ``inline`` replaces
+    the response body with the request's collapsed stacks (the original
+    status goes in ``X-Profile-Status``), any other value stores it and
+    returns ``X-Profile-Id``. A sample of other requests is profiled too.
+    Every profile is summed per route for ``/admin/profiles``.
+    """
+
+    def __init__(
+        self,
+        app,
+        sample_rate: Optional[float] = None,
+        interval: Optional[float] = None,
+        max_concurrent: Optional[int] = None,
+        store: Optional[ProfileStore] = None,
+        admin_resolver: Callable[[dict], Awaitable[bool]] = admin_from_bearer,
+        sample: Callable[[], float] = random.random,
+    ):
+        self.app = app
+        self._sample_rate = sample_rate
+        self._interval = interval
+        self._max_concurrent = max_concurrent
+        self._store = store
+        self._admin_resolver = admin_resolver
+        self._sample = sample
+        self._active = 0
+        self._routes: Dict[Callable, str] = {}
+
+    async def __call__(self, scope, receive, send):
+        mode = await self._mode(scope) if scope["type"] == "http" else None
+        if mode is None:
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = uuid.uuid4().hex
+        sampler = StackSampler(
+            asyncio.current_task(), sys._getframe(), interval=self._interval
+        )
+        response_start: Dict = {}
+
+        async def send_profiled(message):
+            if message["type"] == "http.response.start":
+                if mode == "inline":
+                    response_start.update(message)
+                    return
+                headers = list(message.get("headers", []))
+                headers.append((b"x-profile-id", profile_id.encode("latin-1")))
+                message = {**message, "headers": headers}
+            elif mode == "inline":
+                return
+            await send(message)
+
+        self._active += 1
+        start = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_profiled)
+        finally:
+            stacks = sampler.stop()
+            self._active -= 1
+        profile = Profile(
+            id=profile_id,
+            route=route_template(scope, self._routes),
+            method=scope["method"],
+            seconds=time.perf_counter() - start,
+            stacks=stacks,
+        )
+        await self.store.add(profile)
+        if mode == "inline":
+            await self._send_inline(profile, response_start.get("status"), send)
+
+    @property
+    def store(self) -> ProfileStore:
+        if self._store is None:
+            self._store = get_profile_store()
+        return self._store
+
+    async def _mode(self, scope) -> Optional[str]:
+        self._configure()
+        if self._active >= self._max_concurrent:
+            return None
+        for name, value in scope["headers"]:
+            if name == b"x-profile":
+                if not await self._admin_resolver(scope):
+                    break
+                return "inline" if value == b"inline" else "store"
+        if self._sample_rate > 0 and self._sample() < self._sample_rate:
+            return "store"
+        return None
+
+    def _configure(self) -> None:
+        if None in (self._sample_rate, self._interval, self._max_concurrent):
+            from app.config import get_settings
+
+            settings = get_settings()
+            if self._sample_rate is None:
+                self._sample_rate = settings.profile_sample_rate
+            if self._interval is None:
+                self._interval = settings.profile_interval
+            if self._max_concurrent is None:
+                self._max_concurrent = settings.profile_max_concurrent
+
+    async def _send_inline(self, profile: Profile, status, send) -> None:
+        body = profile.folded().encode()
+        headers = [
+            (b"content-type", b"text/plain; charset=utf-8"),
+            (b"content-length", str(len(body)).encode("latin-1")),
+            (b"x-profile-id", profile.id.encode("latin-1")),
+            (b"x-profile-status", str(status or 500).encode("latin-1")),
+        ]
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+
+@lru_cache()
+def get_profile_store() -> ProfileStore:
+    from app.config import get_settings
+
+    return ProfileStore(get_settings().profile_dir)
@@ -0,0 +1,130 @@
+import math
+import os
+from typing import Callable, FrozenSet, List, NamedTuple, Optional, Sequence
+
+from app.services.rate_limiter import RateLimit, RateLimiter
+from fastapi import status
+from fastapi.responses import JSONResponse
+
+
+class RateLimitRule(NamedTuple):
+    """One token bucket per client IP, per user or per route.
+
+    ``uid`` rules only apply to requests whose bearer token has already been
+    verified; anonymous traffic is covered by the ``ip`` rules.
+    """
+
+    name: str
+    prefix: str
+    scope: str
+    limit: RateLimit
+    methods: FrozenSet[str] = frozenset()
+
+    def matches(self, method: str, path: str) -> bool:
+        if self.methods and method not in self.methods:
+            return False
+        return path == self.prefix or path.startswith(self.prefix.rstrip("/") + "/")
+
+
+def bearer_token(scope: dict) -> Optional[str]:
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() == "bearer" and token:
+                return token
+    return None
+
+
+def uid_from_token_cache(scope: dict) -> Optional[str]:
+    """The uid of an already verified bearer token, without verifying it again"""
+    from app.services.token_cache import get_token_cache
+
+    token = bearer_token(scope)
+    # peek, so unverified tokens do not count as cache misses
+    claims = get_token_cache().peek(token) if token else None
+    return claims.get("uid") if claims else None
+
+
+class RateLimitMiddleware:
+    """Rejects requests over any matching rule's bucket with 429 and Retry-After.
+
+    The limiter and proxy settings load on the first request, so importing
+    the app never reads settings.
+    """
+
+    def __init__(
+        self,
+        app,
+        rules: Sequence[RateLimitRule],
+        limiter: Optional[RateLimiter] = None,
+        uid_resolver: Callable[[dict], Optional[str]] = uid_from_token_cache,
+        forwarded_hops: Optional[int] = None,
+        enabled: Optional[bool] = None,
+    ):
+        self.app = app
+        self.rules: List[RateLimitRule] = list(rules)
+        self._limiter = limiter
+        self._uid_resolver = uid_resolver
+        self._forwarded_hops = forwarded_hops
+        self._enabled = enabled
+        # Set on Cloud Functions and Cloud Run, where the peer is Google's front end
+        self._behind_front_end = bool(os.environ.get("K_SERVICE"))
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._configured():
+            await self.app(scope, receive, send)
+            return
+
+        method, path = scope["method"], scope["path"]
+        buckets = []
+        for rule in self.rules:
+            if rule.matches(method, path):
+                key = self._key(rule, scope)
+                if key is not None:
+                    buckets.append((rule.name, f"{rule.name}:{key}", rule.limit))
+
+        if buckets:
+            retry_after = await self._limiter.check(buckets)
+            if retry_after > 0:
+                response = JSONResponse(
+                    {"detail": "Too many requests"},
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    headers={"Retry-After": str(math.ceil(retry_after))},
+                )
+                await response(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+    def _configured(self) -> bool:
+        if self._enabled is None:
+            from app.config import get_settings
+            from app.services.rate_limiter import get_rate_limiter
+
+            settings = get_settings()
+            self._enabled = settings.rate_limit_enabled
+            if self._forwarded_hops is None:
+                self._forwarded_hops = settings.rate_limit_forwarded_hops
+            if self._limiter is None and self._enabled:
+                self._limiter = get_rate_limiter()
+        return self._enabled
+
+    def _key(self, rule: RateLimitRule, scope: dict) -> Optional[str]:
+        if rule.scope == "ip":
+            if not self._forwarded_hops and self._behind_front_end:
+                # Every client would share the front end's bucket; skip the rule
+                # until RATE_LIMIT_FORWARDED_HOPS is set
+                return None
+            return self._client_ip(scope)
+        if rule.scope == "uid":
+            return self._uid_resolver(scope)
+        return scope["path"]
+
+    def _client_ip(self, scope: dict) -> str:
+        if self._forwarded_hops:
+            # Count from the right: entries added by our own proxies are trusted
+            for name, value in scope["headers"]:
+                if name == b"x-forwarded-for":
+                    hops = [hop.strip() for hop in value.decode("latin-1").split(",")]
+                    return hops[max(len(hops) - self._forwarded_hops, 0)]
+        client = scope.get("client")
+        return client[0] if client else "unknown"
@@ -0,0 +1,56 @@
+from functools import lru_cache
+from typing import Any, List, Optional, Sequence, Union
+
+from app.timing import phase
+from fastapi import Response
+from pydantic import BaseModel, TypeAdapter
+
+Content = Union[BaseModel, Sequence[BaseModel]]
+
+
+@lru_cache()
+def _list_adapter(model: type) -> TypeAdapter:
+    return TypeAdapter(List[model])
+
+
+def dump_json(content: Content) -> bytes:
+    """Encode a model, or a list of one model type, in pydantic-core.
+
+    Instances are trusted as already valid, so nothing is re-validated and
+    no intermediate dicts are built.
+    """
+    if isinstance(content, BaseModel):
+        return content.__pydantic_serializer__.to_json(content)
+    if not content:
+        return b"[]"
+    return _list_adapter(type(content[0])).dump_json(list(content))
+
+
+class ModelResponse(Response):
+    """Opt-in fast path for handlers that return trusted response models.
+
+    FastAPI validates a handler's return value against ``response_model``
+    and serializes it through ``jsonable_encoder`` and ``json``. Returning a
+    ``ModelResponse`` skips both; keep ``response_model`` on the route for
+    the OpenAPI schema. Headers already set on the injected ``response``
+    (ETag, Cache-Control) are carried over.
+    """
+
+    media_type = "application/json"
+
+    def __init__(
+        self,
+        content: Content,
+        status_code: int = 200,
+        response: Optional[Response] = None,
+        **kwargs: Any,
+    ):
+        super().__init__(content, status_code=status_code, **kwargs)
+        if response is not None:
+            for name, value in response.headers.items():
+                if name not in ("content-length", "content-type"):
+                    self.headers[name] = value
+
+    def render(self, content: Content) -> bytes:
+        with phase("encode"):
+            return dump_json(content)
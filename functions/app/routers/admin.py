@@ -0,0 +1,175 @@
+from typing import List, Literal, Optional
+
+from app.dependencies import get_current_user_id, require_roles
+from app.models.admin import ImportJobResponse, RouteProfileSummary, UserImportResponse
+from app.models.user import UserImportRequest
+from app.profiling import ProfileStore, get_profile_store
+from app.services.bulk_import import (
+    ImportJobConflictError,
+    ImportService,
+    ImportTooLargeError,
+    get_import_service,
+)
+from app.services.export import NDJSON_MEDIA_TYPE
+from app.services.near_duplicates import BIKES, REVIEWS
+from app.services.user_import import (
+    UserImportError,
+    UserImportService,
+    UserImportTooLargeError,
+    get_user_import_service,
+)
+from app.timing import TimedRoute
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import PlainTextResponse
+
+# Uploads are the raw request body, streamed to Cloud Storage as they arrive
+IMPORT_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "text/csv": {"schema": {"type": "string"}},
+            NDJSON_MEDIA_TYPE: {"schema": {"type": "string"}},
+        },
+    }
+}
+
+router = APIRouter(
+    route_class=TimedRoute, dependencies=[Depends(require_roles("admin"))]
+)
+
+
+@router.get("/profiles", response_model=List[RouteProfileSummary])
+async def list_profiles(store: ProfileStore = Depends(get_profile_store)):
+    return store.summary()
+
+
+@router.get("/profiles/folded", response_class=PlainTextResponse)
+async def get_folded_profiles(
+    route: Optional[str] = None,
+    store: ProfileStore = Depends(get_profile_store),
+):
+    # e.g. route="GET /bikes/{bike_id}"; feed the output to flamegraph.pl
+    return store.folded(route)
+
+
+@router.delete("/profiles", status_code=status.HTTP_204_NO_CONTENT)
+async def clear_profiles(store: ProfileStore = Depends(get_profile_store)):
+    store.clear()
+
+
+def import_format(
+    request: Request, format: Optional[Literal["csv", "ndjson"]] = None
+) -> str:
+    if format:
+        return format
+    media_type = request.headers.get("content-type", "").partition(";")[0].strip()
+    if media_type == "text/csv":
+        return "csv"
+    if media_type == NDJSON_MEDIA_TYPE:
+        return "ndjson"
+    raise HTTPException(
+        status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+        detail=f"Send text/csv or {NDJSON_MEDIA_TYPE}, or pass format",
+    )
+
+
+async def start_import(
+    kind: str, request: Request, format: str, user_id: str, imports: ImportService
+) -> ImportJobResponse:
+    try:
+        job = await imports.start(kind, format, request.stream(), user_id)
+    except ImportTooLargeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e)
+        )
+    return ImportJobResponse.from_document(job)
+
+
+@router.post(
+    "/import/bikes",
+    response_model=ImportJobResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+    openapi_extra=IMPORT_BODY,
+)
+async def import_bikes(
+    request: Request,
+    format: str = Depends(import_format),
+    user_id: str = Depends(get_current_user_id),
+    imports: ImportService = Depends(get_import_service),
+):
+    """Queue a bike import; rows follow BikeImport, specs.* CSV columns nest"""
+    return await start_import(BIKES, request, format, user_id, imports)
+
+
+@router.post(
+    "/import/reviews",
+    response_model=ImportJobResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+    openapi_extra=IMPORT_BODY,
+)
+async def import_reviews(
+    request: Request,
+    format: str = Depends(import_format),
+    user_id: str = Depends(get_current_user_id),
+    imports: ImportService = Depends(get_import_service),
+):
+    """Queue a review import; rows follow ReviewImport"""
+    return await start_import(REVIEWS, request, format, user_id, imports)
+
+
+@router.post("/import/users", response_model=UserImportResponse)
+async def import_users(
+    body: UserImportRequest,
+    imports: UserImportService = Depends(get_user_import_service),
+):
+    """Create accounts in bulk, roles included; rows follow UserImport.
+
+    Rows that fail are listed by index and the rest are still created, so a
+    retry only needs the failed rows.
+    """
+    try:
+        report = await imports.run(body.users, body.hash)
+    except UserImportTooLargeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e)
+        )
+    except UserImportError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return UserImportResponse(**report)
+
+
+@router.get("/import/status", response_model=List[ImportJobResponse])
+async def list_imports(
+    limit: int = Query(20, ge=1, le=100),
+    imports: ImportService = Depends(get_import_service),
+):
+    return [ImportJobResponse.from_document(job) for job in await imports.recent(limit)]
+
+
+@router.get("/import/status/{job_id}", response_model=ImportJobResponse)
+async def get_import(job_id: str, imports: ImportService = Depends(get_import_service)):
+    job = await imports.get(job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Import not found"
+        )
+    return ImportJobResponse.from_document(job)
+
+
+@router.post(
+    "/import/{job_id}/resume",
+    response_model=ImportJobResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def resume_import(
+    job_id: str, imports: ImportService = Depends(get_import_service)
+):
+    try:
+        job = await imports.resume(job_id)
+    except KeyError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Import not found"
+        )
+    except ImportJobConflictError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    return ImportJobResponse.from_document(job)
@@ -0,0 +1,107 @@
+import asyncio
+from typing import Any, Dict, List
+
+from app.dependencies import get_current_user_id
+from app.models.ai import (
+    ComparisonGenerationRequest,
+    GenerationResponse,
+    ReviewGenerationRequest,
+    SummaryGenerationRequest,
+)
+from app.models.review import REVIEW_LIST_FIELDS
+from app.services.ai_service import (
+    MAX_NEW_TOKENS,
+    comparison_prompt,
+    get_ai_engine,
+    review_prompt,
+    summary_prompt,
+)
+from app.services.inference import (
+    BatchingEngine,
+    InferenceOverloadedError,
+    InferenceTimeoutError,
+)
+from app.services.repositories import (
+    BikeRepository,
+    ReviewRepository,
+    get_bike_repository,
+    get_review_repository,
+)
+from app.timing import TimedRoute
+from fastapi import APIRouter, Depends, HTTPException, status
+
+router = APIRouter(route_class=TimedRoute)
+
+LANGUAGES = {"bn": "Bangla", "en": "English"}
+
+
+async def _get_bike(bikes: BikeRepository, bike_id: str) -> Dict[str, Any]:
+    bike = await bikes.get_detail(bike_id)
+    if bike is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail=f"Bike {bike_id} not found"
+        )
+    return bike
+
+
+async def _generate(engine: BatchingEngine, task: str, prompt: str):
+    try:
+        text = await engine.generate(prompt, MAX_NEW_TOKENS[task])
+    except InferenceOverloadedError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Generation is busy, please retry",
+            headers={"Retry-After": "1"},
+        )
+    except InferenceTimeoutError:
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail="Generation timed out",
+        )
+    return GenerationResponse(text=text, model=engine.model.name)
+
+
+@router.post("/generate/review", response_model=GenerationResponse)
+async def generate_review(
+    request: ReviewGenerationRequest,
+    user_id: str = Depends(get_current_user_id),
+    bikes: BikeRepository = Depends(get_bike_repository),
+    engine: BatchingEngine = Depends(get_ai_engine),
+):
+    bike = await _get_bike(bikes, request.bike_id)
+    prompt = review_prompt(
+        bike, request.rating, request.highlights, LANGUAGES[request.language]
+    )
+    return await _generate(engine, "review", prompt)
+
+
+@router.post("/generate/summary", response_model=GenerationResponse)
+async def generate_summary(
+    request: SummaryGenerationRequest,
+    user_id: str = Depends(get_current_user_id),
+    bikes: BikeRepository = Depends(get_bike_repository),
+    reviews: ReviewRepository = Depends(get_review_repository),
+    engine: BatchingEngine = Depends(get_ai_engine),
+):
+    bike = await _get_bike(bikes, request.bike_id)
+    documents, _ = await reviews.list_for_bike(
+        request.bike_id, limit=20, fields=REVIEW_LIST_FIELDS
+    )
+    prompt = summary_prompt(
+        bike, [doc["content"] for doc in documents], LANGUAGES[request.language]
+    )
+    return await _generate(engine, "summary", prompt)
+
+
+@router.post("/generate/comparison", response_model=GenerationResponse)
+async def generate_comparison(
+    request: ComparisonGenerationRequest,
+    user_id: str = Depends(get_current_user_id),
+    bikes: BikeRepository = Depends(get_bike_repository),
+    engine: BatchingEngine = Depends(get_ai_engine),
+):
+    found: List[Dict[str, Any]] = await asyncio.gather(
+        *(_get_bike(bikes, bike_id) for bike_id in request.bike_ids)
+    )
+    prompt = comparison_prompt(found, LANGUAGES[request.language])
+    return await _generate(engine, "comparison", prompt)
@@ -1,43 +1,51 @@
 from app.config import Settings, get_settings
 from app.models.user import UserCreate, UserResponse
+from app.responses import ModelResponse
+from app.services.firebase_service import FirebaseAuthService, get_firebase_service
+from app.services.user_cache import UserCache, get_user_cache
+from app.timing import TimedRoute
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from firebase_admin import auth
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 
 @router.post("/register", response_model=UserResponse)
-async def register(user: UserCreate, settings: Settings = Depends(get_settings)):
-    try:
-        user_record = auth.create_user(
-            email=user.email,
-            password=user.password,
-            display_name=user.display_name,
-            photo_url=user.photo_url,
-        )
-        return UserResponse(
-            uid=user_record.uid,
-            email=user_record.email,
-            display_name=user_record.display_name,
-            photo_url=user_record.photo_url,
-            email_verified=user_record.email_verified,
-            disabled=user_record.disabled,
-            roles=["user"],
-        )
-    except Exception as e:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+async def register(
+    user: UserCreate,
+    settings: Settings = Depends(get_settings),
+    firebase: FirebaseAuthService = Depends(get_firebase_service),
+    user_cache: UserCache = Depends(get_user_cache),
+):
+    user_record = await firebase.create_user(
+        email=user.email,
+        password=user.password,
+        display_name=user.display_name,
+        photo_url=user.photo_url,
+    )
+    response = UserResponse.from_record(user_record, roles=["user"])
+    user_cache.put(user_record.uid, response)
+    return ModelResponse(response)
 
 
 @router.post("/token")
-async def login(form_data: OAuth2PasswordRequestForm = Depends()):
+async def login(
+    form_data: OAuth2PasswordRequestForm = Depends(),
+    firebase: FirebaseAuthService = Depends(get_firebase_service),
+):
     try:
-        user = auth.get_user_by_email(form_data.username)
+        user = await firebase.get_user_by_email(form_data.username)
         # Verify password and create custom token
-        custom_token = auth.create_custom_token(user.uid)
+        custom_token = await firebase.create_custom_token(user.uid)
         return {"access_token": custom_token, "token_type": "bearer"}
-    except Exception as e:
+    except HTTPException as e:
+        # Let back-pressure reach the client instead of looking like bad credentials
+        if e.status_code in (
+            status.HTTP_503_SERVICE_UNAVAILABLE,
+            status.HTTP_504_GATEWAY_TIMEOUT,
+        ):
+            raise
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -0,0 +1,117 @@
+from typing import List, Literal, Optional
+
+from app.dependencies import require_permission
+from app.http_cache import CATALOG_CACHE_CONTROL, etag_for, not_modified
+from app.models.bike import BIKE_LIST_FIELDS, BikeResponse, BikeSearchResponse
+from app.models.page import Page
+from app.responses import ModelResponse
+from app.services.catalog_index import BikeCatalog, get_bike_catalog
+from app.services.export import NDJSON_MEDIA_TYPE, export_response
+from app.services.firestore_repository import InvalidCursorError
+from app.services.repositories import BikeRepository, get_bike_repository
+from app.timing import TimedRoute
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+
+router = APIRouter(route_class=TimedRoute)
+
+
+@router.get("/", response_model=Page[BikeResponse])
+async def list_bikes(
+    request: Request,
+    response: Response,
+    brand_id: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    bikes: BikeRepository = Depends(get_bike_repository),
+):
+    try:
+        documents, next_cursor = await bikes.list_by_price(
+            brand_id=brand_id, limit=limit, cursor=cursor, fields=BIKE_LIST_FIELDS
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    etag = etag_for(documents, next_cursor)
+    cached = not_modified(request, response, etag, CATALOG_CACHE_CONTROL)
+    if cached:
+        return cached
+    page = Page[BikeResponse](
+        items=[BikeResponse.from_document(doc) for doc in documents],
+        next_cursor=next_cursor,
+    )
+    return ModelResponse(page, response=response)
+
+
+@router.get("/search", response_model=BikeSearchResponse)
+async def search_bikes(
+    request: Request,
+    response: Response,
+    brand: List[str] = Query([]),
+    type: List[str] = Query([]),
+    min_price: Optional[float] = Query(None, ge=0),
+    max_price: Optional[float] = Query(None, ge=0),
+    sort: Literal["price_asc", "price_desc", "rating", "name"] = "price_asc",
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    catalog: BikeCatalog = Depends(get_bike_catalog),
+):
+    # Served from the in-memory catalog index, without a Firestore query;
+    # revalidations are answered from the index fingerprint alone
+    await catalog.ensure_fresh()
+    etag = etag_for(catalog.fingerprint, sorted(request.query_params.multi_items()))
+    cached = not_modified(request, response, etag, CATALOG_CACHE_CONTROL)
+    if cached:
+        return cached
+    result = await catalog.search(
+        brands=brand,
+        types=type,
+        min_price=min_price,
+        max_price=max_price,
+        sort=sort,
+        limit=limit,
+        offset=offset,
+    )
+    search = BikeSearchResponse(
+        items=[BikeResponse.from_document(doc) for doc in result.items],
+        total=result.total,
+        facets=result.facets,
+    )
+    return ModelResponse(search, response=response)
+
+
+@router.get(
+    "/export",
+    response_class=StreamingResponse,
+    responses={200: {"content": {NDJSON_MEDIA_TYPE: {}}}},
+)
+async def export_bikes(
+    brand_id: Optional[str] = None,
+    cursor: Optional[str] = None,
+    _: List[str] = Depends(require_permission("data:export")),
+    bikes: BikeRepository = Depends(get_bike_repository),
+):
+    """Stream every bike as NDJSON; pass a row's ``cursor`` to resume after it"""
+    filters = [("brandId", "==", brand_id)] if brand_id else []
+    try:
+        rows = await bikes.scan(filters=filters, cursor=cursor)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return export_response(rows, BikeResponse.from_document)
+
+
+@router.get("/{bike_id}", response_model=BikeResponse)
+async def get_bike(
+    bike_id: str,
+    request: Request,
+    response: Response,
+    bikes: BikeRepository = Depends(get_bike_repository),
+):
+    document = await bikes.get_detail(bike_id)
+    if document is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Bike not found"
+        )
+    cached = not_modified(request, response, etag_for(document), CATALOG_CACHE_CONTROL)
+    return cached or ModelResponse(
+        BikeResponse.from_document(document), response=response
+    )
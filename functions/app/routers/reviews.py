@@ -0,0 +1,114 @@
+from typing import List, Optional
+
+from app.dependencies import get_current_user_id, require_permission
+from app.http_cache import CATALOG_CACHE_CONTROL, etag_for, not_modified
+from app.models.page import Page
+from app.models.review import (
+    REVIEW_LIST_FIELDS,
+    ReviewCreate,
+    ReviewResponse,
+    ReviewUpdate,
+)
+from app.responses import ModelResponse
+from app.services.export import NDJSON_MEDIA_TYPE, export_response
+from app.services.firestore_repository import InvalidCursorError
+from app.services.ratings import ReviewService, get_review_service
+from app.services.repositories import ReviewRepository, get_review_repository
+from app.services.roles import permissions_for
+from app.timing import TimedRoute
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+
+router = APIRouter(route_class=TimedRoute)
+
+
+@router.post("/", response_model=ReviewResponse, status_code=status.HTTP_201_CREATED)
+async def create_review(
+    review: ReviewCreate,
+    user_id: str = Depends(get_current_user_id),
+    _: List[str] = Depends(require_permission("reviews:write")),
+    reviews: ReviewService = Depends(get_review_service),
+):
+    document = await reviews.create(
+        user_id,
+        review.bike_id,
+        rating=review.rating,
+        content=review.content,
+        title=review.title,
+    )
+    return ReviewResponse.from_document(document)
+
+
+@router.get(
+    "/export",
+    response_class=StreamingResponse,
+    responses={200: {"content": {NDJSON_MEDIA_TYPE: {}}}},
+)
+async def export_reviews(
+    bike_id: Optional[str] = None,
+    brand_id: Optional[str] = None,
+    cursor: Optional[str] = None,
+    _: List[str] = Depends(require_permission("data:export")),
+    reviews: ReviewRepository = Depends(get_review_repository),
+):
+    """Stream reviews as NDJSON; pass a row's ``cursor`` to resume after it"""
+    filters = []
+    if bike_id:
+        filters.append(("bikeId", "==", bike_id))
+    if brand_id:
+        filters.append(("brandId", "==", brand_id))
+    try:
+        rows = await reviews.scan(filters=filters, cursor=cursor)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return export_response(rows, ReviewResponse.from_document)
+
+
+@router.put("/{review_id}", response_model=ReviewResponse)
+async def update_review(
+    review_id: str,
+    review_update: ReviewUpdate,
+    user_id: str = Depends(get_current_user_id),
+    _: List[str] = Depends(require_permission("reviews:write")),
+    reviews: ReviewService = Depends(get_review_service),
+):
+    changes = review_update.model_dump(exclude_unset=True, exclude_none=True)
+    document = await reviews.update(review_id, user_id, changes)
+    return ReviewResponse.from_document(document)
+
+
+@router.delete("/{review_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_review(
+    review_id: str,
+    user_id: str = Depends(get_current_user_id),
+    roles: List[str] = Depends(require_permission("reviews:write")),
+    reviews: ReviewService = Depends(get_review_service),
+):
+    moderator = "reviews:moderate" in permissions_for(roles)
+    await reviews.delete(review_id, user_id, moderator=moderator)
+
+
+@router.get("/bikes/{bike_id}", response_model=Page[ReviewResponse])
+async def list_bike_reviews(
+    bike_id: str,
+    request: Request,
+    response: Response,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    reviews: ReviewRepository = Depends(get_review_repository),
+):
+    try:
+        documents, next_cursor = await reviews.list_for_bike(
+            bike_id, limit=limit, cursor=cursor, fields=REVIEW_LIST_FIELDS
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    etag = etag_for(documents, next_cursor)
+    cached = not_modified(request, response, etag, CATALOG_CACHE_CONTROL)
+    if cached:
+        return cached
+    page = Page[ReviewResponse](
+        items=[ReviewResponse.from_document(doc) for doc in documents],
+        next_cursor=next_cursor,
+    )
+    return ModelResponse(page, response=response)
@@ -1,53 +1,101 @@
+from typing import List
+
 from app.config import Settings, get_settings
-from app.dependencies import get_current_user_id
-from app.models.user import UserResponse, UserUpdate
-from fastapi import APIRouter, Depends, HTTPException, status
-from firebase_admin import auth
+from app.dependencies import (
+    get_current_user_id,
+    get_current_user_roles,
+    get_user_loader,
+    require_roles,
+)
+from app.http_cache import PRIVATE_CACHE_CONTROL, not_modified
+from app.models.user import (
+    RoleUpdate,
+    UserLookupRequest,
+    UserLookupResponse,
+    UserResponse,
+    UserUpdate,
+)
+from app.responses import ModelResponse
+from app.services.firebase_service import FirebaseAuthService, get_firebase_service
+from app.services.roles import ROLE_PERMISSIONS, claims_for_roles
+from app.services.user_cache import UserCache, get_user_cache
+from app.services.user_loader import UserLoader
+from app.timing import TimedRoute
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
 
 @router.get("/me", response_model=UserResponse)
-async def get_current_user(user_id: str = Depends(get_current_user_id)):
-    try:
-        user = auth.get_user(user_id)
-        return UserResponse(
-            uid=user.uid,
-            email=user.email,
-            display_name=user.display_name,
-            photo_url=user.photo_url,
-            email_verified=user.email_verified,
-            disabled=user.disabled,
-            roles=["user"],  # This should be fetched from your database
-        )
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
-        )
+async def get_current_user(
+    request: Request,
+    response: Response,
+    user_id: str = Depends(get_current_user_id),
+    roles: List[str] = Depends(get_current_user_roles),
+    firebase: FirebaseAuthService = Depends(get_firebase_service),
+    user_cache: UserCache = Depends(get_user_cache),
+):
+    async def load_user() -> UserResponse:
+        user = await firebase.get_user(user_id)
+        return UserResponse.from_record(user, roles=roles)
+
+    user = await user_cache.get_or_load(user_id, load_user)
+    cached = not_modified(request, response, user.etag, PRIVATE_CACHE_CONTROL)
+    return cached or ModelResponse(user, response=response)
 
 
 @router.put("/me", response_model=UserResponse)
 async def update_current_user(
-    user_update: UserUpdate, user_id: str = Depends(get_current_user_id)
+    user_update: UserUpdate,
+    user_id: str = Depends(get_current_user_id),
+    roles: List[str] = Depends(get_current_user_roles),
+    firebase: FirebaseAuthService = Depends(get_firebase_service),
+    user_cache: UserCache = Depends(get_user_cache),
+):
+    update_data = {}
+    if user_update.display_name is not None:
+        update_data["display_name"] = user_update.display_name
+    if user_update.photo_url is not None:
+        update_data["photo_url"] = user_update.photo_url
+    if user_update.email is not None:
+        update_data["email"] = user_update.email
+
+    user = await firebase.update_user(user_id, update_data)
+    response = UserResponse.from_record(user, roles=roles)
+    user_cache.put(user_id, response)
+    return ModelResponse(response)
+
+
+@router.post("/lookup", response_model=UserLookupResponse)
+async def lookup_users(
+    lookup: UserLookupRequest,
+    user_id: str = Depends(get_current_user_id),
+    loader: UserLoader = Depends(get_user_loader),
+):
+    uids = list(dict.fromkeys(lookup.uids))
+    profiles = await loader.load_many(uids)
+    return ModelResponse(
+        UserLookupResponse(
+            users=[profile for profile in profiles if profile is not None],
+            not_found=[uid for uid, profile in zip(uids, profiles) if profile is None],
+        )
+    )
+
+
+@router.put("/{uid}/roles", response_model=RoleUpdate)
+async def update_user_roles(
+    uid: str,
+    role_update: RoleUpdate,
+    admin_roles: List[str] = Depends(require_roles("admin")),
+    firebase: FirebaseAuthService = Depends(get_firebase_service),
 ):
-    try:
-        update_data = {}
-        if user_update.display_name is not None:
-            update_data["display_name"] = user_update.display_name
-        if user_update.photo_url is not None:
-            update_data["photo_url"] = user_update.photo_url
-        if user_update.email is not None:
-            update_data["email"] = user_update.email
-
-        user = auth.update_user(user_id, **update_data)
-        return UserResponse(
-            uid=user.uid,
-            email=user.email,
-            display_name=user.display_name,
-            photo_url=user.photo_url,
-            email_verified=user.email_verified,
-            disabled=user.disabled,
-            roles=["user"],  # This should be fetched from your database
+    unknown = [role for role in role_update.roles if role not in ROLE_PERMISSIONS]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown roles: {', '.join(unknown)}",
         )
-    except Exception as e:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    claims = claims_for_roles(role_update.roles)
+    await firebase.set_custom_claims(uid, claims)
+    return RoleUpdate(roles=claims["roles"])
@@ -0,0 +1,155 @@
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from app.config import get_settings
+from app.metrics import MetricFamily, register_collector
+from app.timing import phase
+
+
+class GatewayOverloadedError(Exception):
+    pass
+
+
+class GatewayTimeoutError(Exception):
+    pass
+
+
+class AdminSDKGateway:
+    """Runs blocking Admin SDK calls on a dedicated, size-bounded thread pool.
+
+    At most ``max_workers`` calls run at once and at most ``max_queue`` more
+    wait for a worker; anything beyond that is rejected immediately with
+    ``GatewayOverloadedError`` instead of piling up behind a slow backend.
+    """
+
+    def __init__(self, max_workers: int = 8, max_queue: int = 64, timeout: float = 10):
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="admin-sdk"
+        )
+        self._max_workers = max_workers
+        self._max_pending = max_workers + max_queue
+        self._timeout = timeout
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    async def run(
+        self, fn: Callable[..., Any], *args, timeout: Optional[float] = None, **kwargs
+    ) -> Any:
+        with self._lock:
+            if self.pending >= self._max_pending:
+                self.rejected += 1
+                raise GatewayOverloadedError(
+                    f"{self.pending} Admin SDK calls already pending"
+                )
+            self.pending += 1
+
+        try:
+            future = self._executor.submit(self._call, fn, args, kwargs)
+        except BaseException:
+            self._release(None)
+            raise
+        # Released when the call really finishes (or is cancelled before it
+        # starts), so abandoned calls still count against the queue bound.
+        future.add_done_callback(self._release)
+
+        try:
+            with phase("admin_sdk"):
+                return await asyncio.wait_for(
+                    asyncio.wrap_future(future), timeout or self._timeout
+                )
+        except asyncio.TimeoutError:
+            with self._lock:
+                self.timed_out += 1
+            raise GatewayTimeoutError(
+                f"{getattr(fn, '__name__', fn)} did not finish in time"
+            )
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "workers": self._max_workers,
+                "in_flight": self.in_flight,
+                "queued": self.pending - self.in_flight,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "timed_out": self.timed_out,
+            }
+
+    def collect(self) -> Iterator[MetricFamily]:
+        stats = self.stats()
+        yield MetricFamily(
+            "admin_sdk_calls_total",
+            "counter",
+            "Admin SDK calls that ran, by outcome",
+            [
+                ("admin_sdk_calls_total", {"result": result}, stats[result])
+                for result in ("completed", "failed")
+            ],
+        )
+        yield MetricFamily(
+            "admin_sdk_rejected_total",
+            "counter",
+            "Admin SDK calls turned away because the queue was full",
+            [("admin_sdk_rejected_total", {}, stats["rejected"])],
+        )
+        yield MetricFamily(
+            "admin_sdk_timeouts_total",
+            "counter",
+            "Admin SDK calls the caller stopped waiting for",
+            [("admin_sdk_timeouts_total", {}, stats["timed_out"])],
+        )
+        yield MetricFamily(
+            "admin_sdk_in_flight",
+            "gauge",
+            "Admin SDK calls running on a worker thread",
+            [("admin_sdk_in_flight", {}, stats["in_flight"])],
+        )
+        yield MetricFamily(
+            "admin_sdk_queued",
+            "gauge",
+            "Admin SDK calls waiting for a worker thread",
+            [("admin_sdk_queued", {}, stats["queued"])],
+        )
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _call(self, fn: Callable[..., Any], args: tuple, kwargs: dict) -> Any:
+        with self._lock:
+            self.in_flight += 1
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException:
+            with self._lock:
+                self.in_flight -= 1
+                self.failed += 1
+            raise
+        with self._lock:
+            self.in_flight -= 1
+            self.completed += 1
+        return result
+
+    def _release(self, future: Optional[Future]) -> None:
+        with self._lock:
+            self.pending -= 1
+
+
+@lru_cache()
+def get_admin_gateway() -> AdminSDKGateway:
+    settings = get_settings()
+    gateway = AdminSDKGateway(
+        max_workers=settings.admin_sdk_workers,
+        max_queue=settings.admin_sdk_max_queue,
+        timeout=settings.admin_sdk_timeout,
+    )
+    register_collector(gateway.collect)
+    return gateway
@@ -0,0 +1,307 @@
+import json
+import mmap
+import threading
+import time
+from functools import lru_cache
+from itertools import chain
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from app.config import get_settings
+from app.metrics import MetricFamily, register_collector
+from app.services.inference import BatchingEngine, Generator
+from app.services.tiered_cache import get_tiered_cache
+
+# Generation budget per endpoint; prompts only share batches within a task
+MAX_NEW_TOKENS = {"review": 256, "summary": 128, "comparison": 256}
+SAFETENSORS_DTYPES = {
+    "F64": "float64",
+    "F32": "float32",
+    "F16": "float16",
+    "BF16": "bfloat16",
+    "I64": "int64",
+    "I32": "int32",
+    "I16": "int16",
+    "I8": "int8",
+    "U8": "uint8",
+    "BOOL": "bool",
+}
+
+
+def model_dir(model_name: str) -> Path:
+    """A local directory, or the Hugging Face cache snapshot of a hub id"""
+    if Path(model_name).is_dir():
+        return Path(model_name)
+    from huggingface_hub import snapshot_download
+
+    return Path(snapshot_download(model_name))
+
+
+def mmap_safetensors(path: Path) -> Dict[str, Any]:
+    """Tensors that are views of a memory-mapped safetensors file.
+
+    The mapping is copy-on-write: its pages stay in the page cache and are
+    shared by every process mapping the file until one writes to them,
+    which inference never does.
+    """
+    import torch
+
+    with open(path, "rb") as f:
+        header_size = int.from_bytes(f.read(8), "little")
+        header = json.loads(f.read(header_size))
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+    header.pop("__metadata__", None)
+    data_start = 8 + header_size
+    tensors = {}
+    for name, info in header.items():
+        dtype = getattr(torch, SAFETENSORS_DTYPES[info["dtype"]])
+        begin, end = info["data_offsets"]
+        if begin == end:
+            tensors[name] = torch.empty(info["shape"], dtype=dtype)
+            continue
+        tensor = torch.frombuffer(
+            mapped,
+            dtype=dtype,
+            count=(end - begin) // dtype.itemsize,
+            offset=data_start + begin,
+        )
+        tensors[name] = tensor.reshape(info["shape"])
+    return tensors
+
+
+def load_mmap_model(path: Path):
+    """A seq2seq model whose parameters are the mapped safetensors tensors.
+
+    The model is built on the meta device and the weights are assigned,
+    not copied, so no private copy of them is ever allocated.
+    """
+    import torch
+    from transformers import AutoConfig, AutoModelForSeq2SeqLM
+
+    files = sorted(path.glob("*.safetensors"))
+    if not files:
+        raise FileNotFoundError(f"No .safetensors weights in {path}")
+    state_dict: Dict[str, Any] = {}
+    for file in files:
+        state_dict.update(mmap_safetensors(file))
+    with torch.device("meta"):
+        model = AutoModelForSeq2SeqLM.from_config(AutoConfig.from_pretrained(path))
+    model.load_state_dict(state_dict, strict=False, assign=True)
+    model.tie_weights()
+    missing = [
+        name
+        for name, tensor in chain(model.named_parameters(), model.named_buffers())
+        if tensor.is_meta
+    ]
+    if missing:
+        raise ValueError(f"Weights missing from {path}: {', '.join(missing[:5])}")
+    return model
+
+
+class TransformersGenerator:
+    """A seq2seq ``transformers`` model (BanglaT5 by default) on CPU.
+
+    With ``quantize`` its Linear layers are dynamically quantized to int8,
+    a quarter of their float32 size and usually faster on CPU. Decoding is
+    greedy, so equal prompts give equal outputs. ``torch`` and
+    ``transformers`` are imported here, so the API starts without them.
+
+    ``weights="mmap"`` maps safetensors weights instead of reading them, so
+    workers on one host share them. Quantizing makes private int8 copies
+    of the Linear weights; to share those, preload before forking instead.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        quantize: bool = True,
+        threads: int = 0,
+        max_input_tokens: int = 512,
+        weights: str = "private",
+        model=None,
+        tokenizer=None,
+    ):
+        import torch
+
+        if threads:
+            torch.set_num_threads(threads)
+        if model is None:
+            from transformers import AutoModelForSeq2SeqLM, AutoTokenizer
+
+            path = model_dir(model_name)
+            tokenizer = AutoTokenizer.from_pretrained(path)
+            if weights == "mmap":
+                model = load_mmap_model(path)
+            else:
+                model = AutoModelForSeq2SeqLM.from_pretrained(path)
+        model.eval()
+        if quantize:
+            model = torch.quantization.quantize_dynamic(
+                model, {torch.nn.Linear}, dtype=torch.qint8
+            )
+        self.name = model_name
+        self.model = model
+        self.tokenizer = tokenizer
+        self.max_input_tokens = max_input_tokens
+        self._torch = torch
+
+    @classmethod
+    def tiny(cls, quantize: bool = True, threads: int = 0) -> "TransformersGenerator":
+        """A randomly initialized two-layer T5 with a byte tokenizer.
+
+        Needs no download, so benchmarks and tests run offline; its output is
+        gibberish but its cost scales like the real model's.
+        """
+        from transformers import ByT5Tokenizer, T5Config, T5ForConditionalGeneration
+
+        config = T5Config(
+            vocab_size=384,
+            d_model=128,
+            d_kv=32,
+            d_ff=256,
+            num_layers=2,
+            num_heads=4,
+            decoder_start_token_id=0,
+        )
+        return cls(
+            "tiny-t5",
+            quantize=quantize,
+            threads=threads,
+            model=T5ForConditionalGeneration(config),
+            tokenizer=ByT5Tokenizer(),
+        )
+
+    def generate(self, prompts: List[str], max_new_tokens: int) -> List[str]:
+        inputs = self.tokenizer(
+            prompts,
+            return_tensors="pt",
+            padding=True,
+            truncation=True,
+            max_length=self.max_input_tokens,
+        )
+        with self._torch.inference_mode():
+            outputs = self.model.generate(
+                **inputs, max_new_tokens=max_new_tokens, num_beams=1, do_sample=False
+            )
+        return self.tokenizer.batch_decode(outputs, skip_special_tokens=True)
+
+
+def _bike_line(bike: Dict[str, Any]) -> str:
+    specs = ", ".join(f"{k}: {v}" for k, v in sorted((bike.get("specs") or {}).items()))
+    line = f"{bike.get('name')} ({bike.get('brandId')}, {bike.get('price')} BDT)"
+    return f"{line}; {specs}" if specs else line
+
+
+def review_prompt(
+    bike: Dict[str, Any], rating: Optional[int], highlights: List[str], language: str
+) -> str:
+    parts = [f"Write a {language} motorcycle review.", f"Bike: {_bike_line(bike)}"]
+    if rating is not None:
+        parts.append(f"Rating: {rating}/5")
+    if highlights:
+        parts.append(f"Points: {'; '.join(highlights)}")
+    return "\n".join(parts)
+
+
+def summary_prompt(bike: Dict[str, Any], reviews: List[str], language: str) -> str:
+    lines = [f"Summarize these {language} reviews.", f"Bike: {_bike_line(bike)}"]
+    lines.extend(f"- {review}" for review in reviews)
+    return "\n".join(lines)
+
+
+def comparison_prompt(bikes: List[Dict[str, Any]], language: str) -> str:
+    lines = [f"Compare these motorcycles in {language}."]
+    lines.extend(f"- {_bike_line(bike)}" for bike in bikes)
+    return "\n".join(lines)
+
+
+class LazyGenerator:
+    """Loads the model on its first ``generate`` call, on the inference thread.
+
+    Records how long loading took and the time to first inference (load
+    plus the first batch), which a preloaded model brings down to one
+    batch.
+    """
+
+    def __init__(self, name: str, load: Callable[[], Generator]):
+        self.name = name
+        self._load = load
+        self._model: Optional[Generator] = None
+        self._lock = threading.Lock()
+        self.load_seconds: Optional[float] = None
+        self.first_inference_seconds: Optional[float] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._model is not None
+
+    def get(self) -> Generator:
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    start = time.perf_counter()
+                    self._model = self._load()
+                    self.load_seconds = time.perf_counter() - start
+        return self._model
+
+    def generate(self, prompts: List[str], max_new_tokens: int) -> List[str]:
+        if self.first_inference_seconds is not None:
+            return self.get().generate(prompts, max_new_tokens)
+        start = time.perf_counter()
+        outputs = self.get().generate(prompts, max_new_tokens)
+        self.first_inference_seconds = time.perf_counter() - start
+        return outputs
+
+    def collect(self) -> Iterator[MetricFamily]:
+        timings = {
+            "ai_model_load_seconds": (
+                "Time this worker spent loading",
+                self.load_seconds,
+            ),
+            "ai_first_inference_seconds": (
+                "Time to this worker's first batch, including loading",
+                self.first_inference_seconds,
+            ),
+        }
+        for name, (help, value) in timings.items():
+            if value is not None:
+                yield MetricFamily(name, "gauge", help, [(name, {}, value)])
+
+
+@lru_cache()
+def get_ai_model() -> TransformersGenerator:
+    settings = get_settings()
+    return TransformersGenerator(
+        settings.ai_model_name,
+        quantize=settings.ai_quantize,
+        threads=settings.ai_threads,
+        max_input_tokens=settings.ai_max_input_tokens,
+        weights=settings.ai_weights,
+    )
+
+
+def preload_ai_model() -> None:
+    """Load the model in a parent process so forked workers share its pages.
+
+    Only loads: running inference before forking would start torch's
+    thread pools, which do not survive a fork.
+    """
+    get_ai_model()
+
+
+@lru_cache()
+def get_ai_engine() -> BatchingEngine:
+    settings = get_settings()
+    model = LazyGenerator(settings.ai_model_name, get_ai_model)
+    engine = BatchingEngine(
+        model,
+        max_batch_size=settings.ai_max_batch_size,
+        max_wait=settings.ai_max_wait,
+        max_concurrent_batches=settings.ai_max_concurrent_batches,
+        max_queue=settings.ai_max_queue,
+        timeout=settings.ai_timeout,
+        cache=get_tiered_cache(),
+    )
+    register_collector(engine.collect)
+    register_collector(model.collect)
+    return engine
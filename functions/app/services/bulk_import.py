@@ -0,0 +1,675 @@
+import asyncio
+import codecs
+import csv
+import hashlib
+import json
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    BinaryIO,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+    Type,
+)
+
+from app.config import get_settings
+from app.firebase_init import (
+    get_firestore_client,
+    get_storage_bucket,
+    initialize_firebase,
+)
+from app.models.bike import BikeImport
+from app.models.review import ReviewImport
+from app.services.firestore_repository import DESCENDING, BatchWriter
+from app.services.near_duplicates import (
+    BIKES,
+    REVIEWS,
+    DuplicateDetector,
+    get_duplicate_detector,
+)
+from app.services.ratings import ReviewService, get_review_service
+from app.services.repositories import BikeRepository
+from app.services.tiered_cache import TieredCache, get_tiered_cache
+from pydantic import BaseModel, TypeAdapter, ValidationError
+
+IMPORT_JOBS = "importJobs"
+FORMATS = ("csv", "ndjson")
+MODELS: Dict[str, Type[BaseModel]] = {BIKES: BikeImport, REVIEWS: ReviewImport}
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+# Cloud Functions rejects HTTP requests larger than this before they arrive
+MAX_REQUEST_BYTES = 32 * 1024 * 1024
+
+
+class ImportJobError(ValueError):
+    """An upload or job that cannot be imported as asked"""
+
+
+class ImportJobConflictError(ImportJobError):
+    pass
+
+
+class ImportTooLargeError(ImportJobError):
+    pass
+
+
+class Row(NamedTuple):
+    # 1-based position among the file's data rows
+    number: int
+    # Byte offset just past the row, where a resume would start
+    end: int
+    data: Optional[Dict[str, Any]]
+    error: Optional[str] = None
+
+
+class RowReader:
+    """Rows of an uploaded CSV or NDJSON file, read a few at a time.
+
+    Only the rows asked for are held in memory, so files of any size parse
+    in constant space. ``file`` is a seekable binary file, such as a local
+    file or a Storage blob reader, and is closed with the reader. Reading
+    starts at byte ``offset`` (never inside the CSV header) with rows
+    numbered on from ``number``. CSV cells that are empty are left out, and
+    ``specs.<name>`` columns become ``specs`` entries.
+    """
+
+    def __init__(self, file: BinaryIO, format: str, offset: int = 0, number: int = 0):
+        if format not in FORMATS:
+            raise ImportJobError(f"Unsupported format: {format}")
+        self._file = file
+        self._position = 0
+        self._number = number
+        self._header: Optional[List[str]] = None
+        if format == "csv":
+            self._header = self._read_header()
+        if offset > self._position:
+            self._file.seek(offset)
+            self._position = offset
+        self._rows = self._csv_rows() if format == "csv" else self._ndjson_rows()
+
+    def take(self, count: int) -> List[Row]:
+        rows = []
+        for row in self._rows:
+            rows.append(row)
+            if len(rows) == count:
+                break
+        return rows
+
+    def close(self) -> None:
+        self._file.close()
+
+    def _lines(self) -> Iterator[str]:
+        for line in self._file:
+            self._position += len(line)
+            yield line.decode("utf-8")
+
+    def _read_header(self) -> List[str]:
+        line = self._file.readline()
+        self._position = len(line)
+        if line.startswith(codecs.BOM_UTF8):
+            line = line[len(codecs.BOM_UTF8) :]
+        header = next(csv.reader([line.decode("utf-8")]), None)
+        if not header:
+            raise ImportJobError("CSV upload has no header row")
+        return [name.strip() for name in header]
+
+    def _csv_rows(self) -> Iterator[Row]:
+        # The reader pulls physical lines on demand, so after each record
+        # ``_position`` is the offset just past it, quoted newlines included
+        for cells in csv.reader(self._lines()):
+            if not any(cell.strip() for cell in cells):
+                continue
+            self._number += 1
+            if len(cells) != len(self._header):
+                yield Row(
+                    self._number,
+                    self._position,
+                    None,
+                    f"Expected {len(self._header)} columns, got {len(cells)}",
+                )
+                continue
+            data: Dict[str, Any] = {}
+            for name, cell in zip(self._header, cells):
+                if cell == "":
+                    continue
+                if name.startswith("specs."):
+                    data.setdefault("specs", {})[name[len("specs.") :]] = cell
+                else:
+                    data[name] = cell
+            yield Row(self._number, self._position, data)
+
+    def _ndjson_rows(self) -> Iterator[Row]:
+        for line in self._lines():
+            if not line.strip():
+                continue
+            self._number += 1
+            try:
+                data = json.loads(line)
+            except ValueError as e:
+                yield Row(self._number, self._position, None, f"Invalid JSON: {e}")
+                continue
+            if not isinstance(data, dict):
+                yield Row(self._number, self._position, None, "Expected an object")
+                continue
+            yield Row(self._number, self._position, data)
+
+
+def _describe(errors: List[Dict[str, Any]]) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in error['loc'][1:])}: {error['msg']}"
+        for error in errors
+    )
+
+
+@lru_cache()
+def _adapter(model: Type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(List[model])
+
+
+def validate_rows(
+    model: Type[BaseModel], rows: List[Row]
+) -> Tuple[List[Tuple[Row, BaseModel]], List[Tuple[Row, str]]]:
+    """Validate a chunk of rows in one pass; returns the valid rows and errors"""
+    errors = [(row, row.error) for row in rows if row.error is not None]
+    parsed = [row for row in rows if row.error is None]
+    try:
+        models = _adapter(model).validate_python([row.data for row in parsed])
+        return list(zip(parsed, models)), errors
+    except ValidationError as e:
+        by_row: Dict[int, List[Dict[str, Any]]] = {}
+        for error in e.errors():
+            by_row.setdefault(error["loc"][0], []).append(error)
+    valid = []
+    for position, row in enumerate(parsed):
+        if position in by_row:
+            errors.append((row, _describe(by_row[position])))
+        else:
+            valid.append((row, model.model_validate(row.data)))
+    errors.sort(key=lambda error: error[0].number)
+    return valid, errors
+
+
+def row_id(job_id: str, number: int) -> str:
+    """Document id of a row without its own, the same on every resume"""
+    return hashlib.sha1(f"{job_id}:{number}".encode()).hexdigest()[:20]
+
+
+class _Chunk:
+    __slots__ = (
+        "end",
+        "rows",
+        "writes",
+        "errors",
+        "reserved",
+        "replaced",
+        "bike_ids",
+        "done",
+    )
+
+    def __init__(self, end: int, rows: int):
+        self.end = end
+        self.rows = rows
+        self.writes: List[Tuple[Any, Dict[str, Any]]] = []
+        self.errors: List[Dict[str, Any]] = []
+        self.reserved: List[Tuple[str, str]] = []
+        # Existing bikes the chunk updates, dropped from the cache after it
+        self.replaced: List[str] = []
+        self.bike_ids: Set[str] = set()
+        self.done = False
+
+
+class _Progress:
+    """Job totals, advanced only past chunks committed in file order.
+
+    Chunks commit concurrently and may finish out of order; the saved
+    offset only moves past a chunk once every chunk before it committed,
+    so a resume never skips rows.
+    """
+
+    def __init__(self, job: Dict[str, Any], max_errors: int):
+        self.offset = job.get("offset", 0)
+        self.rows = job.get("rows", 0)
+        self.imported = job.get("imported", 0)
+        self.failed = job.get("failed", 0)
+        self.errors: List[Dict[str, Any]] = list(job.get("errors") or [])
+        self.bike_ids: Set[str] = set()
+        self.max_errors = max_errors
+        self.failure: Optional[BaseException] = None
+        self.lock = asyncio.Lock()
+        self._chunks: "deque[_Chunk]" = deque()
+
+    def open(self, end: int, rows: int) -> _Chunk:
+        chunk = _Chunk(end, rows)
+        self._chunks.append(chunk)
+        return chunk
+
+    def complete(self, chunk: _Chunk) -> bool:
+        chunk.done = True
+        advanced = False
+        while self._chunks and self._chunks[0].done:
+            chunk = self._chunks.popleft()
+            self.offset = chunk.end
+            self.rows += chunk.rows
+            self.imported += len(chunk.writes)
+            self.failed += len(chunk.errors)
+            room = self.max_errors - len(self.errors)
+            self.errors.extend(chunk.errors[: max(room, 0)])
+            self.bike_ids |= chunk.bike_ids
+            advanced = True
+        return advanced
+
+    def fields(self) -> Dict[str, Any]:
+        fields = {
+            "offset": self.offset,
+            "rows": self.rows,
+            "imported": self.imported,
+            "failed": self.failed,
+            "errors": self.errors,
+            "updatedAt": datetime.now(timezone.utc),
+        }
+        # Bikes whose rating aggregates are rebuilt once reviews are in
+        for bike_id in self.bike_ids:
+            fields[f"bikeIds.`{bike_id}`"] = True
+        self.bike_ids = set()
+        return fields
+
+
+class ImportService:
+    """Background bulk imports of bikes and reviews.
+
+    ``start`` spools the upload to ``prefix`` in the Storage bucket as it
+    arrives, hands the job to ``queue`` and returns the queued job document
+    right away. The import worker function then calls ``run``, which
+    streams the file back in chunks of ``chunk_size`` rows. Each chunk is
+    validated with the import model in one pass, checked for
+    near-duplicates and written with batched commits, at most
+    ``concurrency`` at a time, each retried ``retries`` times. Rows get
+    stable document ids, so re-running a chunk rewrites the same
+    documents. Progress and the first ``max_errors`` row errors are saved
+    in the job document after each chunk; a failed job resumes from its
+    saved offset. After a review import the touched bikes' rating
+    aggregates are rebuilt.
+
+    Uploads stay in the bucket until their job succeeds, so any instance
+    can run or resume a job. ``run`` records a failure in the job document
+    and raises it again, so the task queue retries the job from its saved
+    offset. A failed job, or a running one whose document has not changed
+    for ``lease`` seconds, can also be resumed by hand; a queued job is
+    left to its task.
+    """
+
+    def __init__(
+        self,
+        client=None,
+        bucket=None,
+        queue: Optional[Callable[[str], Awaitable[None]]] = None,
+        prefix: str = "imports",
+        chunk_size: int = 500,
+        concurrency: int = 4,
+        retries: int = 3,
+        retry_delay: float = 0.5,
+        max_bytes: int = MAX_REQUEST_BYTES,
+        max_errors: int = 100,
+        lease: float = 600,
+        duplicates: Optional[DuplicateDetector] = None,
+        ratings: Optional[ReviewService] = None,
+        cache: Optional[TieredCache] = None,
+    ):
+        self._client = client
+        self._bucket = bucket
+        self.queue = queue or enqueue_import
+        self.prefix = prefix
+        self.chunk_size = chunk_size
+        self.concurrency = concurrency
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.max_bytes = min(max_bytes, MAX_REQUEST_BYTES)
+        self.max_errors = max_errors
+        self.lease = lease
+        self.duplicates = duplicates
+        self.ratings = ratings
+        self.cache = cache
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = get_firestore_client()
+        return self._client
+
+    @property
+    def bucket(self):
+        if self._bucket is None:
+            self._bucket = get_storage_bucket()
+        return self._bucket
+
+    async def start(
+        self,
+        kind: str,
+        format: str,
+        chunks: AsyncIterator[bytes],
+        user_id: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Spool an upload and queue its import; returns the job document"""
+        if kind not in MODELS:
+            raise ImportJobError(f"Unknown import kind: {kind}")
+        if format not in FORMATS:
+            raise ImportJobError(f"Unsupported format: {format}")
+        ref = self.client.collection(IMPORT_JOBS).document()
+        blob = self._blob(ref.id, format)
+        size = await self._spool(chunks, blob)
+        now = datetime.now(timezone.utc)
+        job = {
+            "kind": kind,
+            "format": format,
+            "status": QUEUED,
+            "bytes": size,
+            "offset": 0,
+            "rows": 0,
+            "imported": 0,
+            "failed": 0,
+            "errors": [],
+            "createdBy": user_id,
+            "createdAt": now,
+            "updatedAt": now,
+        }
+        await ref.set(job)
+        await self.queue(ref.id)
+        return {"id": ref.id, **job}
+
+    async def resume(self, job_id: str) -> Dict[str, Any]:
+        """Queue a failed or interrupted job again from its saved offset"""
+        job = await self.get(job_id)
+        if job is None:
+            raise KeyError(job_id)
+        stale = job["updatedAt"] < datetime.now(timezone.utc) - timedelta(
+            seconds=self.lease
+        )
+        if not (job["status"] == FAILED or (job["status"] == RUNNING and stale)):
+            raise ImportJobConflictError(f"Import {job_id} is {job['status']}")
+        if not await asyncio.to_thread(self._blob(job_id, job["format"]).exists):
+            raise ImportJobConflictError(f"The upload of import {job_id} is gone")
+        now = datetime.now(timezone.utc)
+        await self._job(job_id).update(
+            {"status": QUEUED, "error": None, "updatedAt": now}
+        )
+        await self.queue(job_id)
+        return {**job, "status": QUEUED, "error": None, "updatedAt": now}
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        snapshot = await self._job(job_id).get()
+        return {"id": job_id, **snapshot.to_dict()} if snapshot.exists else None
+
+    async def recent(self, limit: int = 20) -> List[Dict[str, Any]]:
+        query = (
+            self.client.collection(IMPORT_JOBS)
+            .order_by("createdAt", direction=DESCENDING)
+            .limit(limit)
+        )
+        return [
+            {"id": snapshot.id, **snapshot.to_dict()}
+            async for snapshot in query.stream()
+        ]
+
+    def _job(self, job_id: str):
+        return self.client.collection(IMPORT_JOBS).document(job_id)
+
+    def _blob(self, job_id: str, format: str):
+        return self.bucket.blob(f"{self.prefix}/{job_id}.{format}")
+
+    async def _spool(self, chunks: AsyncIterator[bytes], blob) -> int:
+        # A resumable upload; only its current chunk is held in memory
+        writer = await asyncio.to_thread(blob.open, "wb", ignore_flush=True)
+        size = 0
+        try:
+            async for chunk in chunks:
+                size += len(chunk)
+                if size > self.max_bytes:
+                    raise ImportTooLargeError(
+                        f"Uploads are limited to {self.max_bytes} bytes"
+                    )
+                await asyncio.to_thread(writer.write, chunk)
+            await asyncio.to_thread(writer.close)
+        except BaseException:
+            await asyncio.to_thread(_discard, blob, writer)
+            raise
+        return size
+
+    async def run(self, job_id: str) -> None:
+        """Import a queued job's file from its saved offset to the end.
+
+        Safe to call again for the same job, as task queues may: a finished
+        job is left alone and an unfinished one goes on from its offset.
+        A failure is saved in the job document and then raised, so that the
+        task queue retries the job.
+        """
+        ref = self._job(job_id)
+        job = await self.get(job_id)
+        if job is None or job["status"] == SUCCEEDED:
+            return
+        blob = self._blob(job_id, job["format"])
+        progress = _Progress(job, self.max_errors)
+        started, first_row = time.perf_counter(), progress.rows
+        await ref.update(
+            {
+                "status": RUNNING,
+                "startedAt": datetime.now(timezone.utc),
+                "updatedAt": datetime.now(timezone.utc),
+            }
+        )
+        semaphore = asyncio.Semaphore(self.concurrency)
+        pending: Set[asyncio.Task] = set()
+        reader = None
+        try:
+            if self.duplicates is not None:
+                # Rows are checked against the whole collection, not a partial load
+                await self.duplicates.index(job["kind"])
+            reader = await asyncio.to_thread(
+                lambda: RowReader(
+                    blob.open("rb"), job["format"], progress.offset, progress.rows
+                )
+            )
+            while progress.failure is None:
+                # Parsing runs off the event loop, overlapping in-flight commits
+                rows = await asyncio.to_thread(reader.take, self.chunk_size)
+                if not rows:
+                    break
+                chunk = progress.open(rows[-1].end, len(rows))
+                await self._prepare(job_id, job["kind"], rows, chunk)
+                await semaphore.acquire()
+                if progress.failure is not None:
+                    semaphore.release()
+                    break
+                task = asyncio.ensure_future(self._commit(ref, progress, chunk))
+                task.add_done_callback(lambda _: semaphore.release())
+                task.add_done_callback(pending.discard)
+                pending.add(task)
+            await asyncio.gather(*pending)
+            if progress.failure is not None:
+                raise progress.failure
+            if job["kind"] == REVIEWS:
+                await self._reconcile(job_id)
+        except BaseException as e:
+            await asyncio.gather(*pending, return_exceptions=True)
+            message = str(e) or type(e).__name__
+            await ref.update(
+                {
+                    "status": FAILED,
+                    "error": message,
+                    "finishedAt": datetime.now(timezone.utc),
+                    "updatedAt": datetime.now(timezone.utc),
+                }
+            )
+            raise
+        finally:
+            if reader is not None:
+                reader.close()
+        elapsed = time.perf_counter() - started
+        await ref.update(
+            {
+                "status": SUCCEEDED,
+                "error": None,
+                "rowsPerSecond": round((progress.rows - first_row) / elapsed, 1),
+                "finishedAt": datetime.now(timezone.utc),
+                "updatedAt": datetime.now(timezone.utc),
+            }
+        )
+        await asyncio.to_thread(_discard, blob)
+
+    async def _prepare(
+        self, job_id: str, kind: str, rows: List[Row], chunk: _Chunk
+    ) -> None:
+        valid, errors = validate_rows(MODELS[kind], rows)
+        chunk.errors = [{"row": row.number, "error": error} for row, error in errors]
+        if kind == BIKES:
+            documents = self._bike_documents(job_id, valid, chunk)
+        else:
+            documents = await self._review_documents(job_id, valid, chunk)
+        for position, (row, doc_id, document) in enumerate(documents):
+            if self.duplicates is not None:
+                if position % 50 == 49:
+                    # Signatures are CPU work; let requests in between rows
+                    await asyncio.sleep(0)
+                match = await self.duplicates.reserve(kind, doc_id, document)
+                if match is not None:
+                    chunk.errors.append(
+                        {"row": row.number, "error": f"Near-duplicate of {match.key}"}
+                    )
+                    continue
+                chunk.reserved.append((kind, doc_id))
+            ref = self.client.collection(kind).document(doc_id)
+            chunk.writes.append((ref, document))
+        chunk.errors.sort(key=lambda error: error["row"])
+
+    def _bike_documents(
+        self, job_id: str, valid, chunk: _Chunk
+    ) -> List[Tuple[Row, str, Dict]]:
+        now = datetime.now(timezone.utc)
+        documents = []
+        for row, bike in valid:
+            document = {**bike.to_document(), "updatedAt": now}
+            if bike.id is None:
+                document["createdAt"] = now
+            else:
+                chunk.replaced.append(bike.id)
+            documents.append((row, bike.id or row_id(job_id, row.number), document))
+        return documents
+
+    async def _review_documents(
+        self, job_id: str, valid, chunk: _Chunk
+    ) -> List[Tuple[Row, str, Dict]]:
+        bikes = await BikeRepository(self.client).get_many(
+            (review.bike_id for _, review in valid), fields=["brandId"]
+        )
+        now = datetime.now(timezone.utc)
+        documents = []
+        for row, review in valid:
+            bike = bikes.get(review.bike_id)
+            if bike is None:
+                chunk.errors.append({"row": row.number, "error": "Bike not found"})
+                continue
+            chunk.bike_ids.add(review.bike_id)
+            document = {
+                "bikeId": review.bike_id,
+                "brandId": bike.get("brandId"),
+                "userId": review.user_id,
+                "rating": review.rating,
+                "title": review.title,
+                "content": review.content,
+                "createdAt": review.created_at or now,
+                "updatedAt": now,
+            }
+            documents.append((row, review.id or row_id(job_id, row.number), document))
+        return documents
+
+    async def _commit(self, ref, progress: _Progress, chunk: _Chunk) -> None:
+        try:
+            for attempt in range(self.retries):
+                writer = BatchWriter(self.client, max_concurrency=1)
+                for doc_ref, document in chunk.writes:
+                    # Merged, so imported bikes keep their rating aggregates
+                    writer.set(doc_ref, document, merge="bikeId" not in document)
+                try:
+                    await writer.commit()
+                    break
+                except Exception:
+                    if attempt == self.retries - 1:
+                        raise
+                    await asyncio.sleep(self.retry_delay * 2**attempt)
+        except Exception as e:
+            if progress.failure is None:
+                progress.failure = e
+            if self.duplicates is not None:
+                for kind, key in chunk.reserved:
+                    await self.duplicates.remove(kind, key)
+            return
+        if self.cache is not None:
+            for bike_id in chunk.replaced:
+                await self.cache.invalidate(BIKES, bike_id)
+        if progress.complete(chunk):
+            # Saves are serialized so an older snapshot never lands last
+            async with progress.lock:
+                await ref.update(progress.fields())
+
+    async def _reconcile(self, job_id: str) -> None:
+        if self.ratings is None:
+            return
+        job = await self.get(job_id)
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def reconcile(bike_id: str) -> None:
+            async with semaphore:
+                await self.ratings.reconcile(bike_id)
+
+        await asyncio.gather(*(reconcile(b) for b in job.get("bikeIds") or {}))
+
+
+def _discard(blob, writer=None) -> None:
+    """Delete an upload, finishing a half-written one first"""
+    from google.api_core.exceptions import NotFound
+
+    try:
+        if writer is not None:
+            writer.close()
+        blob.delete()
+    except NotFound:
+        pass
+
+
+async def enqueue_import(job_id: str) -> None:
+    """Hand a job to the import worker function through its task queue"""
+    from firebase_admin import functions
+
+    queue = functions.task_queue(
+        get_settings().import_task_queue, app=initialize_firebase()
+    )
+    await asyncio.to_thread(queue.enqueue, {"jobId": job_id})
+
+
+@lru_cache()
+def get_import_service() -> ImportService:
+    settings = get_settings()
+    return ImportService(
+        prefix=settings.import_prefix,
+        chunk_size=settings.import_chunk_size,
+        concurrency=settings.import_concurrency,
+        max_bytes=settings.import_max_bytes,
+        max_errors=settings.import_max_errors,
+        duplicates=get_duplicate_detector() if settings.dedup_enabled else None,
+        ratings=get_review_service(),
+        cache=get_tiered_cache(),
+    )
@@ -0,0 +1,299 @@
+import asyncio
+import bisect
+import hashlib
+import json
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+)
+
+from app.config import get_settings
+from app.models.bike import BIKE_LIST_FIELDS
+from app.services.firestore_repository import ASCENDING
+from app.services.repositories import BikeRepository, get_bike_repository
+from app.services.single_flight import SingleFlight
+
+INDEX_FIELDS = BIKE_LIST_FIELDS + ["updatedAt", "deleted"]
+
+
+class SearchResult(NamedTuple):
+    items: List[Dict[str, Any]]
+    total: int
+    facets: Dict[str, Dict[str, int]]
+
+
+def _members(mask: int) -> Iterable[int]:
+    data = mask.to_bytes((mask.bit_length() + 7) // 8, "little")
+    for position, byte in enumerate(data):
+        while byte:
+            low = byte & -byte
+            yield position * 8 + low.bit_length() - 1
+            byte ^= low
+
+
+def _average_rating(doc: Dict[str, Any]) -> float:
+    stats = doc.get("ratingStats") or {}
+    return stats["sum"] / stats["count"] if stats.get("count") else 0.0
+
+
+class CatalogIndex:
+    """Column-oriented in-memory index of the bikes collection.
+
+    Every bike occupies a slot. Brand and type membership are bitmaps (ints,
+    one bit per slot) and prices are kept in a sorted array, so a multi-facet
+    query is a few bitwise ANDs plus two bisects, and facet counts are
+    popcounts. Slots of removed bikes are reused.
+
+    ``fingerprint`` depends only on the documents indexed, not on the order
+    they arrived in, so instances holding the same bikes agree on it.
+    """
+
+    def __init__(self):
+        self._slots: Dict[str, int] = {}
+        self._docs: List[Optional[Dict[str, Any]]] = []
+        self._free: List[int] = []
+        self._live = 0
+        self._brands: Dict[str, int] = defaultdict(int)
+        self._types: Dict[str, int] = defaultdict(int)
+        self._prices: List[tuple] = []
+        # XOR of one 128-bit content digest per bike
+        self._digests: Dict[str, int] = {}
+        self._content = 0
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    @property
+    def fingerprint(self) -> str:
+        return f"{len(self._slots)}-{self._content:032x}"
+
+    def upsert(self, doc: Dict[str, Any]) -> None:
+        self.remove(doc["id"])
+        slot = self._free.pop() if self._free else len(self._docs)
+        if slot == len(self._docs):
+            self._docs.append(None)
+        bit = 1 << slot
+        self._slots[doc["id"]] = slot
+        self._docs[slot] = doc
+        self._live |= bit
+        self._brands[doc.get("brandId")] |= bit
+        self._types[doc.get("typeId")] |= bit
+        bisect.insort(self._prices, (doc.get("price") or 0, slot))
+        raw = json.dumps(doc, sort_keys=True, separators=(",", ":"), default=str)
+        digest = int.from_bytes(
+            hashlib.blake2b(raw.encode("utf-8"), digest_size=16).digest(), "big"
+        )
+        self._digests[doc["id"]] = digest
+        self._content ^= digest
+
+    def remove(self, bike_id: str) -> None:
+        slot = self._slots.pop(bike_id, None)
+        if slot is None:
+            return
+        doc, self._docs[slot] = self._docs[slot], None
+        self._content ^= self._digests.pop(bike_id)
+        clear = ~(1 << slot)
+        self._live &= clear
+        for bitmaps, key in ((self._brands, "brandId"), (self._types, "typeId")):
+            bitmaps[doc.get(key)] &= clear
+            if not bitmaps[doc.get(key)]:
+                del bitmaps[doc.get(key)]
+        del self._prices[
+            bisect.bisect_left(self._prices, (doc.get("price") or 0, slot))
+        ]
+        self._free.append(slot)
+
+    def search(
+        self,
+        brands: Sequence[str] = (),
+        types: Sequence[str] = (),
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        sort: str = "price_asc",
+        limit: int = 20,
+        offset: int = 0,
+    ) -> SearchResult:
+        brand_mask = self._union(self._brands, brands)
+        type_mask = self._union(self._types, types)
+        price_mask = self._price_range(min_price, max_price)
+        matches = self._live & brand_mask & type_mask & price_mask
+
+        # Each facet counts matches under every filter except its own
+        facets = {
+            "brand": self._counts(self._brands, self._live & type_mask & price_mask),
+            "type": self._counts(self._types, self._live & brand_mask & price_mask),
+        }
+        docs = [self._docs[slot] for slot in _members(matches)]
+        docs.sort(key=self._sort_key(sort), reverse=sort in ("price_desc", "rating"))
+        return SearchResult(docs[offset : offset + limit], len(docs), facets)
+
+    def _union(self, bitmaps: Dict[str, int], keys: Sequence[str]) -> int:
+        if not keys:
+            return self._live
+        mask = 0
+        for key in keys:
+            mask |= bitmaps.get(key, 0)
+        return mask
+
+    def _price_range(self, low: Optional[float], high: Optional[float]) -> int:
+        if low is None and high is None:
+            return self._live
+        start = 0 if low is None else bisect.bisect_left(self._prices, (low,))
+        end = (
+            len(self._prices)
+            if high is None
+            else bisect.bisect_left(self._prices, (high, float("inf")))
+        )
+        buffer = bytearray((len(self._docs) + 7) // 8)
+        for _, slot in self._prices[start:end]:
+            buffer[slot >> 3] |= 1 << (slot & 7)
+        return int.from_bytes(buffer, "little")
+
+    @staticmethod
+    def _counts(bitmaps: Dict[str, int], mask: int) -> Dict[str, int]:
+        counts = {key: (bitmap & mask).bit_count() for key, bitmap in bitmaps.items()}
+        return {key: count for key, count in counts.items() if key and count}
+
+    @staticmethod
+    def _sort_key(sort: str) -> Callable[[Dict[str, Any]], Any]:
+        if sort == "rating":
+            return lambda doc: (_average_rating(doc), doc["id"])
+        if sort == "name":
+            return lambda doc: (doc.get("name", "").lower(), doc["id"])
+        return lambda doc: (doc.get("price") or 0, doc["id"])
+
+
+class BikeCatalog:
+    """Keeps a ``CatalogIndex`` in step with Firestore.
+
+    The first search loads the whole collection. After that, searches are
+    served from memory. Once ``sync_interval`` has passed, one background
+    task pulls only the bikes whose ``updatedAt`` moved past the newest
+    change already seen; bikes with ``deleted: true`` drop out. Hard
+    deletes are picked up by a full rebuild every ``rebuild_interval``.
+    """
+
+    def __init__(
+        self,
+        repository: BikeRepository,
+        sync_interval: float = 30,
+        rebuild_interval: float = 3600,
+        page_size: int = 500,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._repository = repository
+        self._sync_interval = sync_interval
+        self._rebuild_interval = rebuild_interval
+        self._page_size = page_size
+        self._clock = clock
+        self.index = CatalogIndex()
+        self._loaded = False
+        self._synced_at = 0.0
+        self._rebuilt_at = 0.0
+        self._high_water = datetime.min.replace(tzinfo=timezone.utc)
+        self._refreshing: Optional[asyncio.Task] = None
+        self.single_flight = SingleFlight()
+
+    @property
+    def fingerprint(self) -> str:
+        """Content hash of the indexed bikes; search ETags are built from it"""
+        return self.index.fingerprint
+
+    async def search(self, **filters) -> SearchResult:
+        await self.ensure_fresh()
+        return self.index.search(**filters)
+
+    async def refresh(self, full: bool = False) -> None:
+        await self.single_flight.do(("refresh", full), lambda: self._refresh(full))
+
+    def apply(self, doc: Dict[str, Any]) -> None:
+        """Apply one changed bike document, e.g. right after an admin write"""
+        if doc.get("deleted"):
+            self.index.remove(doc["id"])
+        else:
+            self.index.upsert(doc)
+        self._advance(doc.get("updatedAt"))
+
+    async def ensure_fresh(self) -> None:
+        """Load the index on first use; later calls only schedule a sync.
+
+        Once loaded this never suspends, so ``fingerprint`` read right after it
+        matches what the next ``search`` sees.
+        """
+        if not self._loaded:
+            await self.refresh(full=True)
+            return
+        now = self._clock()
+        if now - self._synced_at < self._sync_interval or self._refreshing:
+            return
+        full = now - self._rebuilt_at >= self._rebuild_interval
+        self._refreshing = asyncio.ensure_future(self._background_refresh(full))
+
+    async def _background_refresh(self, full: bool) -> None:
+        try:
+            await self.refresh(full=full)
+        except Exception:
+            # Keep serving the current index; the next search retries
+            pass
+        finally:
+            self._refreshing = None
+
+    async def _refresh(self, full: bool) -> None:
+        started = self._clock()
+        if full:
+            index = CatalogIndex()
+            async for doc in self._changes(filters=[], order_by=[]):
+                if not doc.get("deleted"):
+                    index.upsert(doc)
+                self._advance(doc.get("updatedAt"))
+            # Swap in the complete index so searches never see a partial load
+            self.index = index
+            self._loaded = True
+            self._rebuilt_at = started
+        else:
+            async for doc in self._changes(
+                filters=[("updatedAt", ">", self._high_water)],
+                order_by=[("updatedAt", ASCENDING)],
+            ):
+                self.apply(doc)
+        self._synced_at = started
+
+    async def _changes(self, filters, order_by) -> AsyncIterator[Dict[str, Any]]:
+        cursor = None
+        while True:
+            docs, cursor = await self._repository.query_page(
+                filters=filters,
+                order_by=order_by,
+                limit=self._page_size,
+                cursor=cursor,
+                fields=INDEX_FIELDS,
+            )
+            for doc in docs:
+                yield doc
+            if cursor is None:
+                return
+
+    def _advance(self, updated_at: Optional[datetime]) -> None:
+        if updated_at is not None and updated_at > self._high_water:
+            self._high_water = updated_at
+
+
+@lru_cache()
+def get_bike_catalog() -> BikeCatalog:
+    settings = get_settings()
+    return BikeCatalog(
+        get_bike_repository(),
+        sync_interval=settings.catalog_sync_interval,
+        rebuild_interval=settings.catalog_rebuild_interval,
+    )
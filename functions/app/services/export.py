@@ -0,0 +1,37 @@
+import json
+from typing import Any, AsyncIterator, Callable, Dict, Tuple
+
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+# Rows are flushed in chunks of about this many bytes
+CHUNK_SIZE = 64 * 1024
+
+
+async def ndjson_rows(
+    rows: AsyncIterator[Tuple[Dict[str, Any], str]],
+    to_model: Callable[[Dict[str, Any]], BaseModel],
+    chunk_size: int = CHUNK_SIZE,
+) -> AsyncIterator[bytes]:
+    """Serialize documents one per line, each with the cursor that resumes after it"""
+    buffer = bytearray()
+    async for document, cursor in rows:
+        row = to_model(document).model_dump(mode="json")
+        row["cursor"] = cursor
+        buffer += json.dumps(row, separators=(",", ":")).encode("utf-8")
+        buffer += b"\n"
+        if len(buffer) >= chunk_size:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
+
+def export_response(
+    rows: AsyncIterator[Tuple[Dict[str, Any], str]],
+    to_model: Callable[[Dict[str, Any]], BaseModel],
+) -> StreamingResponse:
+    # StreamingResponse stops pulling rows, and so stops paging through
+    # Firestore, as soon as the client disconnects
+    return StreamingResponse(ndjson_rows(rows, to_model), media_type=NDJSON_MEDIA_TYPE)
@@ -0,0 +1,265 @@
+import asyncio
+import json
+import logging
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional
+
+from app.firebase_init import get_auth
+from app.metrics import register_collector
+from app.services.admin_gateway import (
+    AdminSDKGateway,
+    GatewayOverloadedError,
+    GatewayTimeoutError,
+    get_admin_gateway,
+)
+from app.services.roles import RoleResolver, get_role_resolver, roles_from_claims
+from app.services.single_flight import SingleFlight
+from app.services.tiered_cache import TieredCache, cached, get_tiered_cache
+from app.services.token_cache import VerifiedTokenCache, get_token_cache
+from app.services.user_cache import UserCache, get_user_cache
+from app.services.user_loader import MAX_BATCH_SIZE
+from fastapi import HTTPException, status
+
+if TYPE_CHECKING:
+    from firebase_admin.auth import (
+        ImportUserRecord,
+        UserImportHash,
+        UserImportResult,
+        UserRecord,
+    )
+
+logger = logging.getLogger(__name__)
+
+USERS = "users"
+# Invalidating a uid here revokes the user's tokens on every instance
+TOKENS = "tokens"
+
+
+class UserRecordSerializer:
+    """Stores the account data a ``UserRecord`` wraps, minus password hashes"""
+
+    _SECRET_FIELDS = ("passwordHash", "salt")
+
+    def dumps(self, record: "UserRecord") -> bytes:
+        # The SDK only exposes the raw account data privately
+        data = {k: v for k, v in record._data.items() if k not in self._SECRET_FIELDS}
+        return json.dumps(data, separators=(",", ":")).encode()
+
+    def loads(self, data: bytes) -> "UserRecord":
+        from firebase_admin.auth import UserRecord
+
+        return UserRecord(json.loads(data))
+
+
+class FirebaseAuthService:
+    """Async facade over the Firebase Admin auth API.
+
+    Every SDK call goes through the ``AdminSDKGateway`` so a slow Identity
+    Toolkit round trip never blocks the event loop. Concurrent identical
+    reads share one call. User records are kept in the shared ``cache``;
+    writes invalidate them there and in the ``UserCache`` of every instance.
+    Changing a user's role claims revokes their tokens, since ID tokens
+    issued before carry the old roles until they expire.
+    """
+
+    def __init__(
+        self,
+        gateway: AdminSDKGateway,
+        token_cache: VerifiedTokenCache,
+        user_cache: UserCache,
+        role_resolver: RoleResolver,
+        cache: Optional[TieredCache] = None,
+    ):
+        self._gateway = gateway
+        self._token_cache = token_cache
+        self._user_cache = user_cache
+        self._role_resolver = role_resolver
+        self._auth = None
+        self.single_flight = SingleFlight("auth")
+        self.cache = cache
+        if cache is not None:
+            cache.on_invalidate(USERS, self._forget_user)
+            cache.on_invalidate(TOKENS, self._token_cache.revoke)
+
+    async def _get_auth(self):
+        # The first call imports and initializes the SDK off the event loop
+        if self._auth is None:
+            self._auth = await self._gateway.run(get_auth)
+        return self._auth
+
+    async def _run(self, name: str, *args, **kwargs) -> Any:
+        auth = await self._get_auth()
+        try:
+            return await self._gateway.run(getattr(auth, name), *args, **kwargs)
+        except GatewayOverloadedError:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Authentication service is busy, please retry",
+                headers={"Retry-After": "1"},
+            )
+        except GatewayTimeoutError:
+            raise HTTPException(
+                status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                detail="Authentication service timed out",
+            )
+        except auth.UserNotFoundError:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
+            )
+        except auth.EmailAlreadyExistsError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Email already registered",
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        except Exception:
+            # The SDK's message may describe the backend; keep it in the logs
+            logger.exception("Admin SDK call %s failed", name)
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Internal error",
+            )
+
+    def _forget_user(self, uid: str) -> None:
+        self._user_cache.invalidate(uid)
+        self._role_resolver.invalidate(uid)
+        self.single_flight.forget(("get_user", uid))
+
+    async def _invalidate(self, uid: str) -> None:
+        self._forget_user(uid)
+        if self.cache is not None:
+            await self.cache.invalidate(USERS, uid)
+
+    async def verify_token(self, token: str) -> Dict:
+        decoded_token = self._token_cache.get(token)
+        if decoded_token is not None:
+            return decoded_token
+
+        try:
+            auth = await self._get_auth()
+            decoded_token = await self.single_flight.do(
+                ("verify_id_token", token),
+                lambda: self._gateway.run(auth.verify_id_token, token),
+            )
+        except (GatewayOverloadedError, GatewayTimeoutError):
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Authentication service is busy, please retry",
+                headers={"Retry-After": "1"},
+            )
+        except Exception:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid authentication credentials",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        if self._token_cache.revoked(decoded_token):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Token revoked, please sign in again",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        self._token_cache.put(token, decoded_token)
+        return decoded_token
+
+    @cached(USERS, serializer=UserRecordSerializer())
+    async def get_user(self, uid: str) -> "UserRecord":
+        return await self.single_flight.do(
+            ("get_user", uid), lambda: self._run("get_user", uid)
+        )
+
+    async def get_users(self, uids: List[str]) -> Dict[str, "UserRecord"]:
+        """Look up many users, at most 100 per Admin SDK call"""
+        auth = await self._get_auth()
+        chunks = [
+            uids[i : i + MAX_BATCH_SIZE] for i in range(0, len(uids), MAX_BATCH_SIZE)
+        ]
+        results = await asyncio.gather(
+            *(
+                self._run("get_users", [auth.UidIdentifier(uid) for uid in chunk])
+                for chunk in chunks
+            )
+        )
+        return {user.uid: user for result in results for user in result.users}
+
+    async def find_users(
+        self, uids: Iterable[str] = (), emails: Iterable[str] = ()
+    ) -> List["UserRecord"]:
+        """Existing accounts among ``uids`` and ``emails``, 100 at most per call"""
+        auth = await self._get_auth()
+        identifiers = [auth.UidIdentifier(uid) for uid in uids]
+        identifiers.extend(auth.EmailIdentifier(email) for email in emails)
+        return (await self._run("get_users", identifiers)).users
+
+    async def get_user_by_email(self, email: str) -> "UserRecord":
+        return await self.single_flight.do(
+            ("get_user_by_email", email), lambda: self._run("get_user_by_email", email)
+        )
+
+    async def create_user(
+        self,
+        email: str,
+        password: str,
+        display_name: Optional[str] = None,
+        photo_url: Optional[str] = None,
+    ) -> "UserRecord":
+        return await self._run(
+            "create_user",
+            email=email,
+            password=password,
+            display_name=display_name,
+            photo_url=photo_url,
+        )
+
+    async def import_users(
+        self,
+        records: List["ImportUserRecord"],
+        hash_alg: Optional["UserImportHash"] = None,
+        timeout: Optional[float] = None,
+    ) -> "UserImportResult":
+        """Create up to 1,000 accounts in one call.
+
+        The backend skips uniqueness checks and overwrites existing uids, so
+        callers look the accounts up first.
+        """
+        return await self._run(
+            "import_users", records, hash_alg=hash_alg, timeout=timeout
+        )
+
+    async def update_user(self, uid: str, data: Dict) -> "UserRecord":
+        user = await self._run("update_user", uid, **data)
+        await self._invalidate(uid)
+        return user
+
+    async def delete_user(self, uid: str) -> None:
+        await self._run("delete_user", uid)
+        await self._invalidate(uid)
+
+    async def create_custom_token(self, uid: str) -> bytes:
+        return await self._run("create_custom_token", uid)
+
+    async def set_custom_claims(self, uid: str, claims: Dict) -> None:
+        await self._run("set_custom_user_claims", uid, claims)
+        # Signed-in sessions must refresh to pick up the new claims
+        await self._run("revoke_refresh_tokens", uid)
+        self._token_cache.revoke(uid)
+        if self.cache is not None:
+            await self.cache.invalidate(TOKENS, uid)
+        await self._invalidate(uid)
+        roles = roles_from_claims(claims)
+        if roles is not None:
+            self._role_resolver.set(uid, roles)
+
+
+@lru_cache()
+def get_firebase_service() -> FirebaseAuthService:
+    service = FirebaseAuthService(
+        get_admin_gateway(),
+        get_token_cache(),
+        get_user_cache(),
+        get_role_resolver(),
+        get_tiered_cache(),
+    )
+    register_collector(service.single_flight.collect)
+    return service
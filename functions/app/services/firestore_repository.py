@@ -0,0 +1,246 @@
+import asyncio
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from app.firebase_init import get_firestore_client
+from app.services.single_flight import SingleFlight
+from app.timing import phase, timed
+
+ASCENDING = "ASCENDING"
+DESCENDING = "DESCENDING"
+
+# Firestore's limit on writes per batch or transaction
+MAX_BATCH_WRITES = 500
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    payload = [{"ts": v.isoformat()} if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str) -> List[Any]:
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        payload = json.loads(raw)
+    except (binascii.Error, ValueError):
+        raise InvalidCursorError("Invalid cursor")
+    if not isinstance(payload, list):
+        raise InvalidCursorError("Invalid cursor")
+    return [
+        datetime.fromisoformat(v["ts"]) if isinstance(v, dict) and "ts" in v else v
+        for v in payload
+    ]
+
+
+def snapshot_to_dict(snapshot) -> Dict[str, Any]:
+    return {"id": snapshot.id, **(snapshot.to_dict() or {})}
+
+
+class BatchWriter:
+    """Buffers writes and commits them in batches of at most 500 operations.
+
+    Up to ``max_concurrency`` batches are committed at once. Batches are
+    independent, so a failed commit does not roll back the others.
+    """
+
+    def __init__(
+        self,
+        client,
+        chunk_size: int = MAX_BATCH_WRITES,
+        max_concurrency: int = 4,
+    ):
+        self._client = client
+        self._chunk_size = min(chunk_size, MAX_BATCH_WRITES)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._operations: List[Tuple[str, Any, Optional[Dict], Dict]] = []
+        self.batches = 0
+        self.committed = 0
+
+    @property
+    def pending(self) -> int:
+        return len(self._operations)
+
+    def set(self, ref, data: Dict, merge: bool = False) -> None:
+        self._operations.append(("set", ref, data, {"merge": merge}))
+
+    def update(self, ref, data: Dict) -> None:
+        self._operations.append(("update", ref, data, {}))
+
+    def delete(self, ref) -> None:
+        self._operations.append(("delete", ref, None, {}))
+
+    async def commit(self) -> int:
+        operations, self._operations = self._operations, []
+        chunks = [
+            operations[i : i + self._chunk_size]
+            for i in range(0, len(operations), self._chunk_size)
+        ]
+        await asyncio.gather(*(self._commit_chunk(chunk) for chunk in chunks))
+        return len(operations)
+
+    async def _commit_chunk(self, chunk) -> None:
+        async with self._semaphore:
+            batch = self._client.batch()
+            for kind, ref, data, options in chunk:
+                if kind == "delete":
+                    batch.delete(ref)
+                elif kind == "update":
+                    batch.update(ref, data)
+                else:
+                    batch.set(ref, data, **options)
+            await batch.commit()
+            self.batches += 1
+            self.committed += len(chunk)
+
+    async def __aenter__(self) -> "BatchWriter":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            await self.commit()
+
+
+class FirestoreRepository:
+    """Async access to one collection through the process-wide Firestore client.
+
+    Lists use keyset pagination only: the opaque cursor holds the order-by
+    values of the last document returned, so page N costs the same as page 1.
+    Subclasses may cache reads in ``cache`` with the ``cached`` decorator.
+    """
+
+    collection: str = ""
+
+    def __init__(self, client=None, cache=None):
+        self._client = client
+        self.cache = cache
+        self.single_flight = SingleFlight()
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = get_firestore_client()
+        return self._client
+
+    def document(self, doc_id: str):
+        return self.client.collection(self.collection).document(doc_id)
+
+    def writer(self, **kwargs) -> BatchWriter:
+        return BatchWriter(self.client, **kwargs)
+
+    async def get(
+        self, doc_id: str, fields: Optional[List[str]] = None
+    ) -> Optional[Dict[str, Any]]:
+        key = (doc_id, tuple(fields) if fields else None)
+        return await self.single_flight.do(key, lambda: self._get(doc_id, fields))
+
+    async def get_many(
+        self, doc_ids: Iterable[str], fields: Optional[List[str]] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        refs = [self.document(doc_id) for doc_id in dict.fromkeys(doc_ids)]
+        if not refs:
+            return {}
+        found = {}
+        with phase("firestore"):
+            async for snapshot in self.client.get_all(refs, field_paths=fields):
+                if snapshot.exists:
+                    found[snapshot.id] = snapshot_to_dict(snapshot)
+        return found
+
+    async def query_page(
+        self,
+        *,
+        order_by: Sequence[Tuple[str, str]],
+        filters: Sequence[Tuple[str, str, Any]] = (),
+        limit: int = 20,
+        cursor: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Return one page of documents and the cursor for the next page"""
+        query = self._query(order_by, filters, fields)
+        if cursor:
+            values = decode_cursor(cursor)
+            if len(values) != len(order_by) + 1:
+                raise InvalidCursorError("Cursor does not match this query")
+            query = query.start_after(values)
+        query = query.limit(limit + 1)
+
+        with phase("firestore"):
+            documents = [snapshot_to_dict(s) async for s in query.stream()]
+        if len(documents) <= limit:
+            return documents, None
+        documents = documents[:limit]
+        return documents, self.cursor_for(documents[-1], order_by)
+
+    async def scan(
+        self,
+        *,
+        order_by: Sequence[Tuple[str, str]] = (),
+        filters: Sequence[Tuple[str, str, Any]] = (),
+        cursor: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+        page_size: int = 500,
+    ) -> AsyncIterator[Tuple[Dict[str, Any], str]]:
+        """Walk every matching document, one page in memory at a time.
+
+        Yields each document with the cursor that resumes right after it.
+        The first page is fetched before returning, so an invalid cursor
+        raises here rather than partway through a response.
+        """
+        query = dict(order_by=order_by, filters=filters, fields=fields)
+        documents, next_cursor = await self.query_page(
+            limit=page_size, cursor=cursor, **query
+        )
+
+        async def iterate():
+            nonlocal documents, next_cursor
+            while True:
+                for document in documents:
+                    yield document, self.cursor_for(document, order_by)
+                if next_cursor is None:
+                    return
+                documents, next_cursor = await self.query_page(
+                    limit=page_size, cursor=next_cursor, **query
+                )
+
+        return iterate()
+
+    @staticmethod
+    def cursor_for(
+        document: Dict[str, Any], order_by: Sequence[Tuple[str, str]]
+    ) -> str:
+        return encode_cursor(
+            [document.get(field) for field, _ in order_by] + [document["id"]]
+        )
+
+    def _query(self, order_by, filters, fields):
+        from google.cloud.firestore_v1.base_query import FieldFilter
+
+        query = self.client.collection(self.collection)
+        for field, op, value in filters:
+            query = query.where(filter=FieldFilter(field, op, value))
+        for field, direction in order_by:
+            query = query.order_by(field, direction=direction)
+        # The document id breaks ties, so every cursor marks exactly one position.
+        # It follows the last direction, matching the composite index's implicit
+        # __name__ order.
+        last_direction = order_by[-1][1] if order_by else ASCENDING
+        query = query.order_by("__name__", direction=last_direction)
+        if fields:
+            # Cursors are built from the order-by values, so always project them
+            query = query.select(
+                list(dict.fromkeys([*fields, *(field for field, _ in order_by)]))
+            )
+        return query
+
+    @timed("firestore")
+    async def _get(self, doc_id: str, fields: Optional[List[str]]):
+        snapshot = await self.document(doc_id).get(field_paths=fields)
+        return snapshot_to_dict(snapshot) if snapshot.exists else None
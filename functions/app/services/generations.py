@@ -0,0 +1,45 @@
+from typing import Dict, Hashable, List, Tuple
+
+
+class Generations:
+    """Per-key write counters that tell a finished load whether it is stale.
+
+    ``start(key)`` returns a token for a load of ``key``, and
+    ``current(key, token)`` stays true until the key is written (``bump``)
+    or everything is (``bump_all``), so a write only discards the loads of
+    its own key. Counters are kept only while a key has loads in flight and
+    are dropped when the last of them calls ``finish``.
+    """
+
+    def __init__(self):
+        self._epoch = 0
+        # key -> [generation, loads in flight]
+        self._keys: Dict[Hashable, List[int]] = {}
+
+    def start(self, key: Hashable) -> Tuple[int, int]:
+        entry = self._keys.setdefault(key, [0, 0])
+        entry[1] += 1
+        return self._epoch, entry[0]
+
+    def current(self, key: Hashable, token: Tuple[int, int]) -> bool:
+        entry = self._keys.get(key)
+        return entry is not None and token == (self._epoch, entry[0])
+
+    def finish(self, key: Hashable) -> None:
+        entry = self._keys.get(key)
+        if entry is None:
+            return
+        entry[1] -= 1
+        if entry[1] <= 0:
+            del self._keys[key]
+
+    def bump(self, key: Hashable) -> None:
+        entry = self._keys.get(key)
+        if entry is not None:
+            entry[0] += 1
+
+    def bump_all(self) -> None:
+        self._epoch += 1
+
+    def __len__(self) -> int:
+        return len(self._keys)
@@ -0,0 +1,240 @@
+import asyncio
+import hashlib
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Deque, Dict, Iterator, List, NamedTuple, Optional, Protocol
+
+from app.metrics import Histogram, MetricFamily, register_collector
+from app.services.single_flight import SingleFlight
+from app.services.tiered_cache import TieredCache
+from app.timing import phase
+
+AI = "ai"
+
+BATCH_SIZES = Histogram(
+    "inference_batch_size",
+    "Prompts per model call",
+    ("model",),
+    buckets=(1, 2, 4, 8, 16, 32, 64),
+)
+QUEUE_SECONDS = Histogram(
+    "inference_queue_seconds",
+    "Time prompts waited for a batch slot",
+    ("model",),
+)
+register_collector(BATCH_SIZES.collect)
+register_collector(QUEUE_SECONDS.collect)
+
+
+class Generator(Protocol):
+    """A text-to-text model; ``generate`` blocks and runs off the event loop"""
+
+    name: str
+
+    def generate(self, prompts: List[str], max_new_tokens: int) -> List[str]:
+        ...
+
+
+class InferenceOverloadedError(Exception):
+    pass
+
+
+class InferenceTimeoutError(Exception):
+    pass
+
+
+class _Pending(NamedTuple):
+    prompt: str
+    max_new_tokens: int
+    enqueued: float
+    future: asyncio.Future
+
+
+def prompt_key(prompt: str, max_new_tokens: int) -> str:
+    digest = hashlib.sha256(prompt.encode()).hexdigest()
+    return f"{max_new_tokens}:{digest}"
+
+
+class BatchingEngine:
+    """Queues prompts and runs them through the model in dynamic micro-batches.
+
+    A batch closes when it has ``max_batch_size`` prompts or its oldest
+    prompt has waited ``max_wait`` seconds, so a lone request pays at most
+    ``max_wait`` and a burst shares model calls. Only prompts with the same
+    ``max_new_tokens`` share a batch. At most ``max_concurrent_batches`` run
+    at once on a dedicated thread pool, and at most ``max_queue`` prompts
+    wait; beyond that ``generate`` raises ``InferenceOverloadedError``.
+
+    Greedy decoding is deterministic, so results are cached by prompt in
+    ``cache`` (or only collapsed while in flight without one).
+    """
+
+    def __init__(
+        self,
+        model: Generator,
+        max_batch_size: int = 8,
+        max_wait: float = 0.02,
+        max_concurrent_batches: int = 1,
+        max_queue: int = 64,
+        timeout: float = 60,
+        cache: Optional[TieredCache] = None,
+    ):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.cache = cache
+        self.single_flight = SingleFlight()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_concurrent_batches, thread_name_prefix="inference"
+        )
+        self._slots = asyncio.Semaphore(max_concurrent_batches)
+        self._pending: Deque[_Pending] = deque()
+        self._wakeup = asyncio.Event()
+        self._batcher: Optional[asyncio.Task] = None
+        self.batches = 0
+        self.generated = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.failed = 0
+        self.batch_sizes: Counter = Counter()
+
+    async def generate(self, prompt: str, max_new_tokens: int = 128) -> str:
+        key = prompt_key(prompt, max_new_tokens)
+        if self.cache is not None:
+            return await self.cache.get_or_load(
+                AI, key, lambda: self._submit(prompt, max_new_tokens)
+            )
+        return await self.single_flight.do(
+            key, lambda: self._submit(prompt, max_new_tokens)
+        )
+
+    async def _submit(self, prompt: str, max_new_tokens: int) -> str:
+        if len(self._pending) >= self.max_queue:
+            self.rejected += 1
+            raise InferenceOverloadedError(f"{len(self._pending)} prompts queued")
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append(_Pending(prompt, max_new_tokens, loop.time(), future))
+        self._wakeup.set()
+        if self._batcher is None or self._batcher.done():
+            self._batcher = asyncio.ensure_future(self._run())
+        try:
+            with phase("inference"):
+                return await asyncio.wait_for(asyncio.shield(future), self.timeout)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            # Still queued: drop it; already running: let the batch finish
+            future.cancel()
+            raise InferenceTimeoutError(f"no result within {self.timeout}s")
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            while not self._pending:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+            first = self._pending[0]
+            # Keep collecting until the batch is full or the oldest prompt is due
+            while self._count(first.max_new_tokens) < self.max_batch_size:
+                remaining = first.enqueued + self.max_wait - loop.time()
+                if remaining <= 0:
+                    break
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), remaining)
+                except asyncio.TimeoutError:
+                    break
+            # Prompts arriving while every slot is busy join this batch
+            await self._slots.acquire()
+            batch = self._take(first.max_new_tokens)
+            if batch:
+                asyncio.ensure_future(self._run_batch(batch, first.max_new_tokens))
+            else:
+                self._slots.release()
+
+    def _count(self, max_new_tokens: int) -> int:
+        return sum(1 for p in self._pending if p.max_new_tokens == max_new_tokens)
+
+    def _take(self, max_new_tokens: int) -> List[_Pending]:
+        batch: List[_Pending] = []
+        remaining: Deque[_Pending] = deque()
+        for pending in self._pending:
+            if pending.future.done():
+                continue
+            if (
+                pending.max_new_tokens == max_new_tokens
+                and len(batch) < self.max_batch_size
+            ):
+                batch.append(pending)
+            else:
+                remaining.append(pending)
+        self._pending = remaining
+        return batch
+
+    async def _run_batch(self, batch: List[_Pending], max_new_tokens: int) -> None:
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        for pending in batch:
+            QUEUE_SECONDS.observe(now - pending.enqueued, self.model.name)
+        BATCH_SIZES.observe(len(batch), self.model.name)
+        self.batches += 1
+        self.batch_sizes[len(batch)] += 1
+        try:
+            outputs = await loop.run_in_executor(
+                self._executor,
+                self.model.generate,
+                [pending.prompt for pending in batch],
+                max_new_tokens,
+            )
+        except Exception as e:
+            self.failed += len(batch)
+            for pending in batch:
+                if not pending.future.done():
+                    pending.future.set_exception(e)
+        else:
+            self.generated += len(batch)
+            for pending, output in zip(batch, outputs):
+                if not pending.future.done():
+                    pending.future.set_result(output)
+        finally:
+            self._slots.release()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queued": len(self._pending),
+            "batches": self.batches,
+            "generated": self.generated,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "failed": self.failed,
+        }
+
+    def collect(self) -> Iterator[MetricFamily]:
+        yield MetricFamily(
+            "inference_prompts_total",
+            "counter",
+            "Prompts by outcome",
+            [
+                ("inference_prompts_total", {"outcome": outcome}, count)
+                for outcome, count in self.stats().items()
+                if outcome not in ("queued", "batches")
+            ],
+        )
+        yield MetricFamily(
+            "inference_queue_depth",
+            "gauge",
+            "Prompts waiting for a batch",
+            [("inference_queue_depth", {}, len(self._pending))],
+        )
+
+    async def close(self) -> None:
+        if self._batcher is not None:
+            self._batcher.cancel()
+            try:
+                await self._batcher
+            except asyncio.CancelledError:
+                pass
+            self._batcher = None
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,616 @@
+import asyncio
+import hashlib
+import os
+import struct
+import time
+import unicodedata
+from array import array
+from collections import Counter
+from datetime import datetime, timezone
+from functools import lru_cache
+from operator import eq
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from app.config import get_settings
+from app.services.firestore_repository import ASCENDING, FirestoreRepository
+from app.services.single_flight import SingleFlight
+
+try:
+    import fcntl
+except ImportError:
+    # Windows dev setups run a single process, so the log is not locked there
+    fcntl = None
+
+BIKES = "bikes"
+REVIEWS = "reviews"
+
+_MASK = 0xFFFFFFFF
+_EMPTY = _MASK + 1
+# Odd 32-bit constant that spreads values borrowed by empty bins
+_ROTATION = 0x9E3779B1
+# Bangla digits read as their ASCII counterparts
+_DIGITS = str.maketrans("০১২৩৪৫৬৭৮৯", "0123456789")
+# Zero-width (non-)joiners change how Bangla renders, not what it says
+_INVISIBLE = dict.fromkeys((0x200C, 0x200D, 0xFEFF))
+
+_MAGIC = b"RCND"
+_VERSION = 1
+_HEADER = struct.Struct("<4sBHH")
+_RECORD = struct.Struct("<BH")
+_CHECKPOINT = struct.Struct("<d")
+_ADD, _REMOVE, _SYNCED = 1, 2, 3
+
+
+def normalize(text: str) -> str:
+    """Casefolded letters, marks and digits separated by single spaces.
+
+    NFKC folds compatibility forms, Bangla digits become ASCII and
+    punctuation, symbols and zero-width joiners are dropped. Combining
+    marks stay: Bangla vowel signs and the hasanta are part of the word.
+    """
+    text = unicodedata.normalize("NFKC", text).casefold().translate(_DIGITS)
+    text = text.translate(_INVISIBLE)
+    kept = (char if unicodedata.category(char)[0] in "LMN" else " " for char in text)
+    return " ".join("".join(kept).split())
+
+
+def shingles(text: str, size: int) -> Set[int]:
+    """64-bit hashes of the character ``size``-grams of normalized text.
+
+    Character shingles need no word segmentation, so Bangla and
+    mixed-script text work the same as English.
+    """
+    text = normalize(text)
+    if not text:
+        return set()
+    grams = {text[i : i + size] for i in range(max(len(text) - size + 1, 1))}
+    return {
+        int.from_bytes(
+            hashlib.blake2b(gram.encode("utf-8"), digest_size=8).digest(), "little"
+        )
+        for gram in grams
+    }
+
+
+def minhash(features: Iterable[int], num_perm: int) -> Optional[array]:
+    """One-permutation MinHash signature with rotation densification.
+
+    Each feature hash is routed to one of ``num_perm`` bins and each bin
+    keeps its minimum, so a signature costs one pass over the features
+    instead of one per permutation. Empty bins borrow from the next
+    filled bin to their right. Equal positions in two signatures estimate
+    the Jaccard similarity of their feature sets.
+    """
+    bins = [_EMPTY] * num_perm
+    for feature in features:
+        quotient, slot = divmod(feature, num_perm)
+        value = quotient & _MASK
+        if value < bins[slot]:
+            bins[slot] = value
+    filled = [slot for slot, value in enumerate(bins) if value != _EMPTY]
+    if not filled:
+        return None
+    signature = array("I", bytes(4 * num_perm))
+    following = filled[0] + num_perm
+    for slot in reversed(range(num_perm)):
+        if bins[slot] != _EMPTY:
+            following = slot
+            signature[slot] = bins[slot]
+        else:
+            borrowed = bins[following % num_perm]
+            signature[slot] = (borrowed + (following - slot) * _ROTATION) & _MASK
+    return signature
+
+
+def similarity(a: array, b: array) -> float:
+    return sum(map(eq, a, b)) / len(a)
+
+
+class Match(NamedTuple):
+    key: str
+    similarity: float
+
+
+class NearDuplicateIndex:
+    """MinHash LSH index of texts, answering near-duplicate queries.
+
+    Each signature is cut into ``bands`` bands and every band is a hash
+    bucket, so a query only compares against entries sharing a bucket
+    with it instead of the whole collection. With 16 bands of 4 rows,
+    pairs at Jaccard 0.8 share a bucket 99.9% of the time and pairs at
+    0.3 about 12% of the time; candidates are then checked against
+    ``threshold`` on their full signatures.
+
+    With a ``path``, changes are appended to a compact log (a key and
+    ``4 * num_perm`` bytes per entry) that is replayed on open, so the
+    index survives restarts. One process writes a log; others opening it
+    while it is locked load it read-only.
+    """
+
+    def __init__(
+        self,
+        num_perm: int = 64,
+        bands: int = 16,
+        shingle_size: int = 5,
+        threshold: float = 0.8,
+        path: Optional[str] = None,
+    ):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.threshold = threshold
+        self.path = path
+        self.checkpoint: Optional[float] = None
+        self._signatures: Dict[str, array] = {}
+        self._buckets: List[Dict[bytes, List[str]]] = [{} for _ in range(bands)]
+        self._log = None
+        self._records = 0
+        if path is not None:
+            self._open(path)
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._signatures
+
+    def keys(self) -> List[str]:
+        return list(self._signatures)
+
+    def signature(self, text: str) -> Optional[array]:
+        return minhash(shingles(text, self.shingle_size), self.num_perm)
+
+    def add(self, key: str, text: str) -> bool:
+        """Index ``text`` under ``key``, replacing its previous text.
+
+        Returns False, leaving ``key`` out of the index, if the text has
+        nothing to compare.
+        """
+        return self.add_signature(key, self.signature(text))
+
+    def add_signature(self, key: str, signature: Optional[array]) -> bool:
+        self.remove(key)
+        if signature is None:
+            return False
+        self._insert(key, signature)
+        self._append(_ADD, key, signature.tobytes())
+        return True
+
+    def remove(self, key: str) -> None:
+        if key in self._signatures:
+            self._delete(key)
+            self._append(_REMOVE, key)
+
+    def query(
+        self,
+        text: str,
+        threshold: Optional[float] = None,
+        limit: int = 5,
+        exclude: Optional[str] = None,
+    ) -> List[Match]:
+        """Indexed entries at least ``threshold`` similar, most similar first"""
+        signature = self.signature(text)
+        if signature is None:
+            return []
+        return self.query_signature(signature, threshold, limit, exclude)
+
+    def query_signature(
+        self,
+        signature: array,
+        threshold: Optional[float] = None,
+        limit: int = 5,
+        exclude: Optional[str] = None,
+    ) -> List[Match]:
+        threshold = self.threshold if threshold is None else threshold
+        hits: Counter = Counter()
+        for band, key in enumerate(self._band_keys(signature)):
+            hits.update(self._buckets[band].get(key, ()))
+        hits.pop(exclude, None)
+        # Every band not shared holds at least one differing position, so
+        # candidates sharing too few bands cannot reach the threshold
+        needed = self.bands - int((1 - threshold) * self.num_perm + 1e-9)
+        matches = [
+            Match(key, similarity(signature, self._signatures[key]))
+            for key, count in hits.items()
+            if count >= needed
+        ]
+        matches = [match for match in matches if match.similarity >= threshold]
+        matches.sort(key=lambda match: (-match.similarity, match.key))
+        return matches[:limit]
+
+    def set_checkpoint(self, timestamp: float) -> None:
+        """Record how far the index has caught up with its source"""
+        self.checkpoint = timestamp
+        self._append(_SYNCED, "", _CHECKPOINT.pack(timestamp))
+
+    def compact(self) -> None:
+        """Rewrite the log with one record per live entry"""
+        if self._log is None:
+            return
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, _VERSION, self.num_perm, self.shingle_size))
+            for key, signature in self._signatures.items():
+                f.write(self._record(_ADD, key, signature.tobytes()))
+            if self.checkpoint is not None:
+                f.write(self._record(_SYNCED, "", _CHECKPOINT.pack(self.checkpoint)))
+        os.replace(tmp, self.path)
+        self._log.close()
+        self._log = self._lock(open(self.path, "ab", buffering=0))
+        self._records = len(self._signatures)
+
+    def close(self) -> None:
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+    def _band_keys(self, signature: array) -> Iterable[bytes]:
+        data = signature.tobytes()
+        width = 4 * self.rows
+        return (data[i : i + width] for i in range(0, len(data), width))
+
+    def _insert(self, key: str, signature: array) -> None:
+        self._signatures[key] = signature
+        for band, band_key in enumerate(self._band_keys(signature)):
+            self._buckets[band].setdefault(band_key, []).append(key)
+
+    def _delete(self, key: str) -> None:
+        signature = self._signatures.pop(key)
+        for band, band_key in enumerate(self._band_keys(signature)):
+            bucket = self._buckets[band][band_key]
+            bucket.remove(key)
+            if not bucket:
+                del self._buckets[band][band_key]
+
+    @staticmethod
+    def _record(op: int, key: str, payload: bytes = b"") -> bytes:
+        encoded = key.encode("utf-8")
+        return _RECORD.pack(op, len(encoded)) + encoded + payload
+
+    def _append(self, op: int, key: str, payload: bytes = b"") -> None:
+        if self._log is None:
+            return
+        # One unbuffered write per record; a crash can only cut the last one
+        self._log.write(self._record(op, key, payload))
+        self._records += 1
+
+    @staticmethod
+    def _lock(log):
+        if fcntl is None:
+            return log
+        try:
+            fcntl.flock(log, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            log.close()
+            return None
+        return log
+
+    def _open(self, path: str) -> None:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        log = self._lock(open(path, "ab", buffering=0))
+        end = self._replay(path)
+        if log is None:
+            return
+        if end == 0:
+            log.write(_HEADER.pack(_MAGIC, _VERSION, self.num_perm, self.shingle_size))
+        else:
+            log.truncate(end)
+        self._log = log
+        if self._records > 2 * len(self._signatures) + 1000:
+            self.compact()
+
+    def _replay(self, path: str) -> int:
+        """Load the log; returns the offset after its last complete record"""
+        with open(path, "rb") as f:
+            data = f.read()
+        if not data:
+            return 0
+        magic, version, num_perm, shingle_size = _HEADER.unpack_from(data)
+        if (magic, version) != (_MAGIC, _VERSION):
+            raise ValueError(f"{path} is not a near-duplicate index")
+        if (num_perm, shingle_size) != (self.num_perm, self.shingle_size):
+            raise ValueError(
+                f"{path} was built with num_perm={num_perm}, "
+                f"shingle_size={shingle_size}; remove it to rebuild"
+            )
+        offset = _HEADER.size
+        width = 4 * self.num_perm
+        while offset + _RECORD.size <= len(data):
+            op, length = _RECORD.unpack_from(data, offset)
+            start = offset + _RECORD.size
+            payload = {_ADD: width, _SYNCED: _CHECKPOINT.size}.get(op, 0)
+            end = start + length + payload
+            if end > len(data):
+                break
+            key = data[start : start + length].decode("utf-8")
+            if key in self._signatures:
+                self._delete(key)
+            if op == _ADD:
+                self._insert(key, array("I", data[start + length : end]))
+            elif op == _SYNCED:
+                (self.checkpoint,) = _CHECKPOINT.unpack_from(data, start + length)
+            offset = end
+            self._records += 1
+        return offset
+
+
+def bike_text(doc: Dict[str, Any]) -> str:
+    """Name, brand, model year and specs; price changes too often to count"""
+    specs = doc.get("specs") or {}
+    parts = [doc.get("name"), doc.get("brandId"), doc.get("modelYear")]
+    parts.extend(f"{key} {value}" for key, value in sorted(specs.items()))
+    return " ".join(str(part) for part in parts if part not in (None, ""))
+
+
+def review_text(doc: Dict[str, Any]) -> str:
+    return " ".join(part for part in (doc.get("title"), doc.get("content")) if part)
+
+
+class Source(NamedTuple):
+    text: Callable[[Dict[str, Any]], str]
+    fields: List[str]
+    shingle_size: int
+
+
+SOURCES = {
+    BIKES: Source(bike_text, ["name", "brandId", "modelYear", "specs", "deleted"], 3),
+    REVIEWS: Source(review_text, ["title", "content"], 5),
+}
+
+
+class DuplicateDetector:
+    """Near-duplicate indexes of the bikes and reviews collections.
+
+    Each index is built from Firestore on first use, or loaded from
+    ``directory`` and caught up with the documents whose ``updatedAt``
+    moved past its checkpoint. Every ``sync_interval`` a background task
+    catches up again, picking up writes made through other instances.
+    Hard deletes leave ``updatedAt`` nothing to move, so every
+    ``rebuild_interval`` the sync also drops entries whose documents are
+    gone and compacts the log.
+    Reviews shorter than ``min_review_length`` normalized characters are
+    neither checked nor indexed: short praise repeats legitimately.
+
+    With ``background_load``, ``find``, ``reserve``, ``add`` and ``remove``
+    do not wait for a first load: it runs in the background, writes pass
+    unchecked meanwhile, and their index changes are applied once it is
+    done. ``index`` always waits.
+    """
+
+    def __init__(
+        self,
+        client=None,
+        directory: Optional[str] = None,
+        threshold: float = 0.8,
+        num_perm: int = 64,
+        bands: int = 16,
+        min_review_length: int = 40,
+        sync_interval: float = 60,
+        rebuild_interval: float = 3600,
+        page_size: int = 500,
+        background_load: bool = False,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._client = client
+        self._directory = directory
+        self._background_load = background_load
+        self._threshold = threshold
+        self._num_perm = num_perm
+        self._bands = bands
+        self._min_review_length = min_review_length
+        self._sync_interval = sync_interval
+        self._rebuild_interval = rebuild_interval
+        self._page_size = page_size
+        self._clock = clock
+        self._indexes: Dict[str, NearDuplicateIndex] = {}
+        self._synced_at: Dict[str, float] = {}
+        self._pruned_at: Dict[str, float] = {}
+        self._syncing: Dict[str, asyncio.Task] = {}
+        self._loading: Dict[str, asyncio.Task] = {}
+        # Changes made before a background load finished: (key, doc or None)
+        self._pending: Dict[str, List[Tuple[str, Optional[Dict[str, Any]]]]] = {}
+        self.single_flight = SingleFlight()
+
+    async def index(self, kind: str) -> NearDuplicateIndex:
+        if kind not in self._indexes:
+            await self.single_flight.do(("load", kind), lambda: self._load(kind))
+        elif (
+            self._clock() - self._synced_at[kind] >= self._sync_interval
+            and kind not in self._syncing
+        ):
+            self._syncing[kind] = asyncio.ensure_future(self._background_sync(kind))
+        return self._indexes[kind]
+
+    async def ready(self, kind: str) -> Optional[NearDuplicateIndex]:
+        """The index, or None while it is still loading in the background"""
+        if kind in self._indexes or not self._background_load:
+            return await self.index(kind)
+        if kind not in self._loading:
+            self._loading[kind] = asyncio.ensure_future(self._load_in_background(kind))
+        return None
+
+    async def find(
+        self, kind: str, doc: Dict[str, Any], exclude: Optional[str] = None
+    ) -> List[Match]:
+        """Indexed documents that are near-duplicates of ``doc``"""
+        index = await self.ready(kind)
+        text = self._text(kind, doc)
+        return index.query(text, exclude=exclude) if text and index else []
+
+    async def reserve(
+        self, kind: str, key: str, doc: Dict[str, Any]
+    ) -> Optional[Match]:
+        """The closest near-duplicate of ``doc``, or None after indexing it.
+
+        Checking and indexing happen without yielding to the event loop,
+        so of two concurrent near-duplicates only the first gets through.
+        Call ``remove`` if the write that follows fails.
+        """
+        index = await self.ready(kind)
+        if index is None:
+            self._pending.setdefault(kind, []).append((key, doc))
+            return None
+        text = self._text(kind, doc)
+        if not text:
+            return None
+        signature = index.signature(text)
+        if signature is None:
+            return None
+        matches = index.query_signature(signature, limit=1, exclude=key)
+        if matches:
+            return matches[0]
+        index.add_signature(key, signature)
+        return None
+
+    async def add(self, kind: str, key: str, doc: Dict[str, Any]) -> None:
+        index = await self.ready(kind)
+        if index is None:
+            self._pending.setdefault(kind, []).append((key, doc))
+        else:
+            self._apply(kind, index, key, doc)
+
+    async def remove(self, kind: str, key: str) -> None:
+        index = await self.ready(kind)
+        if index is None:
+            self._pending.setdefault(kind, []).append((key, None))
+        else:
+            index.remove(key)
+
+    def close(self) -> None:
+        for index in self._indexes.values():
+            index.close()
+
+    def _apply(
+        self,
+        kind: str,
+        index: NearDuplicateIndex,
+        key: str,
+        doc: Optional[Dict[str, Any]],
+    ) -> None:
+        text = self._text(kind, doc) if doc is not None else ""
+        if text:
+            index.add(key, text)
+        else:
+            index.remove(key)
+
+    def _text(self, kind: str, doc: Dict[str, Any]) -> str:
+        text = SOURCES[kind].text(doc)
+        if kind == REVIEWS and len(normalize(text)) < self._min_review_length:
+            return ""
+        return text
+
+    def _repository(self, kind: str) -> FirestoreRepository:
+        repository = FirestoreRepository(self._client)
+        repository.collection = kind
+        return repository
+
+    async def _load(self, kind: str) -> None:
+        path = None
+        if self._directory is not None:
+            path = os.path.join(self._directory, f"{kind}.minhash")
+        index = NearDuplicateIndex(
+            num_perm=self._num_perm,
+            bands=self._bands,
+            shingle_size=SOURCES[kind].shingle_size,
+            threshold=self._threshold,
+            path=path,
+        )
+        started = self._clock()
+        full = index.checkpoint is None
+        await self._sync(kind, index)
+        # A log may still hold documents deleted while no instance ran
+        self._pruned_at[kind] = started if full else started - self._rebuild_interval
+        # Nothing yields from here on, so no change slips in unapplied
+        for key, doc in self._pending.pop(kind, []):
+            self._apply(kind, index, key, doc)
+        self._indexes[kind] = index
+
+    async def _load_in_background(self, kind: str) -> None:
+        try:
+            await self.single_flight.do(("load", kind), lambda: self._load(kind))
+        except Exception:
+            # Writes keep passing unchecked; the next call retries
+            pass
+        finally:
+            del self._loading[kind]
+
+    async def _background_sync(self, kind: str) -> None:
+        index = self._indexes[kind]
+        prune = self._clock() - self._pruned_at[kind] >= self._rebuild_interval
+        try:
+            await self.single_flight.do(("sync", kind), lambda: self._sync(kind, index))
+            if prune:
+                await self.single_flight.do(
+                    ("prune", kind), lambda: self._prune(kind, index)
+                )
+        except Exception:
+            # Keep checking against the current index; the next call retries
+            pass
+        finally:
+            del self._syncing[kind]
+
+    async def _sync(self, kind: str, index: NearDuplicateIndex) -> None:
+        started = self._clock()
+        # A full load must not order by updatedAt: that would skip documents
+        # without the field
+        filters, order_by = [], []
+        if index.checkpoint is not None:
+            since = datetime.fromtimestamp(index.checkpoint, timezone.utc)
+            filters, order_by = [("updatedAt", ">", since)], [("updatedAt", ASCENDING)]
+        high_water = index.checkpoint
+        repository = self._repository(kind)
+        rows = await repository.scan(
+            filters=filters,
+            order_by=order_by,
+            fields=SOURCES[kind].fields + ["updatedAt"],
+            page_size=self._page_size,
+        )
+        async for doc, _ in rows:
+            text = "" if doc.get("deleted") else self._text(kind, doc)
+            if text:
+                index.add(doc["id"], text)
+            else:
+                index.remove(doc["id"])
+            updated_at = doc.get("updatedAt")
+            if updated_at is not None:
+                high_water = max(high_water or 0, updated_at.timestamp())
+        if high_water is not None and high_water != index.checkpoint:
+            index.set_checkpoint(high_water)
+        self._synced_at[kind] = started
+
+    async def _prune(self, kind: str, index: NearDuplicateIndex) -> None:
+        """Drop entries whose documents are gone, then rewrite the log"""
+        started = self._clock()
+        # Entries added during the scan may not be listed by it yet
+        indexed = index.keys()
+        live = set()
+        rows = await self._repository(kind).scan(
+            fields=["deleted"], page_size=self._page_size
+        )
+        async for doc, _ in rows:
+            if not doc.get("deleted"):
+                live.add(doc["id"])
+        for key in indexed:
+            if key not in live:
+                index.remove(key)
+        index.compact()
+        self._pruned_at[kind] = started
+
+
+@lru_cache()
+def get_duplicate_detector() -> DuplicateDetector:
+    settings = get_settings()
+    return DuplicateDetector(
+        directory=settings.dedup_dir,
+        threshold=settings.dedup_threshold,
+        num_perm=settings.dedup_num_perm,
+        bands=settings.dedup_bands,
+        min_review_length=settings.dedup_min_review_length,
+        sync_interval=settings.dedup_sync_interval,
+        rebuild_interval=settings.dedup_rebuild_interval,
+        background_load=settings.dedup_background_load,
+    )
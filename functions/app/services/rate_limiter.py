@@ -0,0 +1,180 @@
+import asyncio
+import time
+from collections import Counter, OrderedDict
+from functools import lru_cache
+from typing import Callable, Iterator, NamedTuple, Optional, Sequence, Tuple
+
+from app.config import get_settings
+from app.metrics import MetricFamily, register_collector
+
+# Refill and take in one atomic step; the bucket expires once it would be full
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local retry_after = 0
+if tokens >= cost then
+  tokens = tokens - cost
+else
+  retry_after = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return tostring(retry_after)
+"""
+
+
+class RateLimit(NamedTuple):
+    rate: float  # tokens added per second
+    burst: int  # bucket capacity
+
+    @classmethod
+    def per_minute(cls, count: int, burst: Optional[int] = None) -> "RateLimit":
+        return cls(count / 60, burst or count)
+
+
+# (rule name, bucket key, limit)
+Bucket = Tuple[str, str, RateLimit]
+
+
+class LocalTokenBuckets:
+    """Token buckets in process memory, bounded to ``maxsize`` keys (LRU)"""
+
+    def __init__(
+        self, maxsize: int = 100000, clock: Callable[[], float] = time.monotonic
+    ):
+        self._maxsize = maxsize
+        self._clock = clock
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def take(self, key: str, limit: RateLimit, cost: float = 1) -> float:
+        """Take ``cost`` tokens; returns 0 or the seconds until they are available"""
+        now = self._clock()
+        tokens, updated = self._buckets.pop(key, (limit.burst, now))
+        tokens = min(limit.burst, tokens + (now - updated) * limit.rate)
+        retry_after = 0.0
+        if tokens >= cost:
+            tokens -= cost
+        else:
+            retry_after = (cost - tokens) / limit.rate
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self._maxsize:
+            self._buckets.popitem(last=False)
+        return retry_after
+
+
+class RedisTokenBuckets:
+    """Token buckets shared by every instance through one Redis Lua script"""
+
+    def __init__(self, client, prefix: str = "ratelimit:"):
+        self._script = client.register_script(TOKEN_BUCKET_SCRIPT)
+        self._prefix = prefix
+
+    async def take(self, key: str, limit: RateLimit, cost: float = 1) -> float:
+        retry_after = await self._script(
+            keys=[self._prefix + key], args=[limit.rate, limit.burst, cost]
+        )
+        return float(retry_after)
+
+
+class RateLimiter:
+    """Checks a request's buckets, locally first and then in Redis.
+
+    Every instance sees a subset of the traffic, so a local bucket with the
+    shared limit only rejects requests the shared bucket would reject too.
+    Those are turned away without a network round trip. If Redis is slow
+    or down, requests are judged by the local buckets alone.
+    """
+
+    def __init__(
+        self,
+        local: LocalTokenBuckets,
+        shared: Optional[RedisTokenBuckets] = None,
+        shared_timeout: float = 0.05,
+    ):
+        self._local = local
+        self._shared = shared
+        self._shared_timeout = shared_timeout
+        self.decisions: Counter = Counter()
+        self.backend_errors = 0
+
+    async def check(self, buckets: Sequence[Bucket]) -> float:
+        """Returns 0 if the request may proceed, else seconds to wait"""
+        for rule, key, limit in buckets:
+            retry_after = self._local.take(key, limit)
+            if retry_after:
+                self.decisions[(rule, "limited", "local")] += 1
+                return retry_after
+
+        if self._shared is not None:
+            try:
+                waits = await asyncio.wait_for(
+                    asyncio.gather(
+                        *(self._shared.take(key, limit) for _, key, limit in buckets)
+                    ),
+                    self._shared_timeout,
+                )
+            except Exception:
+                self.backend_errors += 1
+            else:
+                for (rule, _, _), retry_after in zip(buckets, waits):
+                    if retry_after:
+                        self.decisions[(rule, "limited", "shared")] += 1
+                        return max(waits)
+
+        for rule, _, _ in buckets:
+            self.decisions[(rule, "allowed", "")] += 1
+        return 0.0
+
+    def collect(self) -> Iterator[MetricFamily]:
+        yield MetricFamily(
+            "ratelimit_decisions_total",
+            "counter",
+            "Rate limit decisions by rule, result and deciding backend",
+            [
+                (
+                    "ratelimit_decisions_total",
+                    {"rule": rule, "result": result, "backend": backend},
+                    count,
+                )
+                for (rule, result, backend), count in sorted(self.decisions.items())
+            ],
+        )
+        yield MetricFamily(
+            "ratelimit_backend_errors_total",
+            "counter",
+            "Shared backend calls that failed or timed out",
+            [("ratelimit_backend_errors_total", {}, self.backend_errors)],
+        )
+        yield MetricFamily(
+            "ratelimit_local_buckets",
+            "gauge",
+            "Token buckets held in process memory",
+            [("ratelimit_local_buckets", {}, len(self._local))],
+        )
+
+
+@lru_cache()
+def get_rate_limiter() -> RateLimiter:
+    settings = get_settings()
+    shared = None
+    if settings.rate_limit_redis_url:
+        import redis.asyncio as redis
+
+        shared = RedisTokenBuckets(redis.from_url(settings.rate_limit_redis_url))
+    limiter = RateLimiter(
+        LocalTokenBuckets(maxsize=settings.rate_limit_max_keys),
+        shared,
+        shared_timeout=settings.rate_limit_redis_timeout,
+    )
+    register_collector(limiter.collect)
+    return limiter
@@ -0,0 +1,286 @@
+import asyncio
+from collections import defaultdict
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+from app.config import get_settings
+from app.firebase_init import get_firestore_client
+from app.services.firestore_repository import DESCENDING
+from app.services.near_duplicates import (
+    REVIEWS,
+    DuplicateDetector,
+    get_duplicate_detector,
+)
+from app.services.repositories import BIKES, BikeRepository
+from app.services.tiered_cache import TieredCache, get_tiered_cache
+from app.timing import timed
+from fastapi import HTTPException, status
+
+STATS_FIELD = "ratingStats"
+# Recency weights grow from this fixed origin, so stored sums never need rescaling
+WEIGHT_EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+STARS = range(1, 6)
+
+
+def recency_weight(created_at: datetime, half_life_days: float) -> float:
+    """Weight that doubles every ``half_life_days``: a review that much older
+    than another counts half as much in the recency score"""
+    age = (created_at - WEIGHT_EPOCH).total_seconds() / 86400
+    return 2 ** (age / half_life_days)
+
+
+def contribution(review: Dict[str, Any], half_life_days: float) -> Dict[str, float]:
+    """One review's share of the aggregate, keyed by field path under ``ratingStats``"""
+    rating = review["rating"]
+    weight = recency_weight(review["createdAt"], half_life_days)
+    return {
+        "count": 1,
+        "sum": rating,
+        f"histogram.`{rating}`": 1,
+        "weightedSum": weight * rating,
+        "weightTotal": weight,
+    }
+
+
+def stats_delta(
+    old: Optional[Dict[str, Any]],
+    new: Optional[Dict[str, Any]],
+    half_life_days: float,
+) -> Dict[str, Any]:
+    """Increment transforms that move the aggregate from ``old`` to ``new``"""
+    from google.cloud.firestore_v1 import Increment
+
+    delta: Dict[str, float] = defaultdict(int)
+    for review, sign in ((old, -1), (new, 1)):
+        if review is not None:
+            for path, value in contribution(review, half_life_days).items():
+                delta[path] += sign * value
+    return {
+        f"{STATS_FIELD}.{path}": Increment(value)
+        for path, value in delta.items()
+        if value
+    }
+
+
+def empty_stats() -> Dict[str, Any]:
+    return {
+        "count": 0,
+        "sum": 0,
+        "histogram": {str(star): 0 for star in STARS},
+        "weightedSum": 0.0,
+        "weightTotal": 0.0,
+    }
+
+
+class ReviewService:
+    """Review writes that keep each bike's ``ratingStats`` in step.
+
+    Each write changes the review and applies increments to its bike's
+    aggregate in one transaction, so readers get count, sum, histogram and
+    recency score from the bike document alone. ``reconcile`` rebuilds an
+    aggregate from the reviews index to repair drift. After each commit the
+    bike is dropped from ``cache`` on every instance.
+
+    With ``duplicates``, a new review that nearly repeats an existing one
+    is rejected with 409 before anything is written.
+    """
+
+    def __init__(
+        self,
+        client=None,
+        half_life_days: float = 365,
+        cache: Optional[TieredCache] = None,
+        duplicates: Optional[DuplicateDetector] = None,
+    ):
+        self._client = client
+        self._half_life_days = half_life_days
+        self.cache = cache
+        self.duplicates = duplicates
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = get_firestore_client()
+        return self._client
+
+    async def create(
+        self,
+        user_id: str,
+        bike_id: str,
+        rating: int,
+        content: str,
+        title: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        bike_ref = self._bike(bike_id)
+        review_ref = self.client.collection("reviews").document()
+        if self.duplicates is not None:
+            match = await self.duplicates.reserve(
+                REVIEWS, review_ref.id, {"title": title, "content": content}
+            )
+            if match is not None:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail=f"Near-duplicate of review {match.key}",
+                )
+
+        async def write(transaction):
+            bike = await bike_ref.get(field_paths=["brandId"], transaction=transaction)
+            if not bike.exists:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND, detail="Bike not found"
+                )
+            now = datetime.now(timezone.utc)
+            review = {
+                "bikeId": bike_id,
+                # Copied from the bike so reviews can be exported per brand
+                "brandId": bike.to_dict().get("brandId"),
+                "userId": user_id,
+                "rating": rating,
+                "title": title,
+                "content": content,
+                "createdAt": now,
+                "updatedAt": now,
+            }
+            transaction.set(review_ref, review)
+            transaction.update(
+                bike_ref, stats_delta(None, review, self._half_life_days)
+            )
+            return {"id": review_ref.id, **review}
+
+        try:
+            review = await self._transact(write)
+        except BaseException:
+            if self.duplicates is not None:
+                await self.duplicates.remove(REVIEWS, review_ref.id)
+            raise
+        await self._invalidate_bike(bike_id)
+        return review
+
+    async def update(
+        self, review_id: str, user_id: str, changes: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        review_ref = self.client.collection("reviews").document(review_id)
+
+        async def write(transaction):
+            old = await self._get_review(review_ref, transaction)
+            if old["userId"] != user_id:
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN,
+                    detail="Only the author can edit this review",
+                )
+            data = {**changes, "updatedAt": datetime.now(timezone.utc)}
+            new = {**old, **data}
+            delta = stats_delta(old, new, self._half_life_days)
+            transaction.update(review_ref, data)
+            if delta:
+                transaction.update(self._bike(old["bikeId"]), delta)
+            return {"id": review_id, **new}
+
+        review = await self._transact(write)
+        await self._invalidate_bike(review["bikeId"])
+        if self.duplicates is not None and {"title", "content"} & changes.keys():
+            await self.duplicates.add(REVIEWS, review_id, review)
+        return review
+
+    async def delete(
+        self, review_id: str, user_id: str, moderator: bool = False
+    ) -> None:
+        review_ref = self.client.collection("reviews").document(review_id)
+
+        async def write(transaction):
+            old = await self._get_review(review_ref, transaction)
+            if old["userId"] != user_id and not moderator:
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN,
+                    detail="Only the author or a moderator can delete this review",
+                )
+            transaction.delete(review_ref)
+            transaction.update(
+                self._bike(old["bikeId"]),
+                stats_delta(old, None, self._half_life_days),
+            )
+            return old["bikeId"]
+
+        await self._invalidate_bike(await self._transact(write))
+        if self.duplicates is not None:
+            await self.duplicates.remove(REVIEWS, review_id)
+
+    async def reconcile(self, bike_id: str) -> Dict[str, Any]:
+        """Recompute one bike's aggregate from its reviews"""
+        from google.cloud.firestore_v1.base_query import FieldFilter
+
+        query = (
+            self.client.collection("reviews")
+            .where(filter=FieldFilter("bikeId", "==", bike_id))
+            .order_by("rating", direction=DESCENDING)
+            .order_by("createdAt", direction=DESCENDING)
+            .select(["rating", "createdAt"])
+        )
+
+        async def rebuild(transaction):
+            stats = empty_stats()
+            async for snapshot in query.stream(transaction=transaction):
+                review = snapshot.to_dict()
+                weight = recency_weight(review["createdAt"], self._half_life_days)
+                stats["count"] += 1
+                stats["sum"] += review["rating"]
+                stats["histogram"][str(review["rating"])] += 1
+                stats["weightedSum"] += weight * review["rating"]
+                stats["weightTotal"] += weight
+            transaction.update(self._bike(bike_id), {STATS_FIELD: stats})
+            return stats
+
+        stats = await self._transact(rebuild)
+        await self._invalidate_bike(bike_id)
+        return stats
+
+    async def reconcile_all(self, page_size: int = 200, concurrency: int = 8) -> int:
+        """Rebuild every bike's aggregate; returns the number of bikes"""
+        bikes = BikeRepository(self.client)
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def reconcile_one(bike_id: str) -> None:
+            async with semaphore:
+                await self.reconcile(bike_id)
+
+        total, cursor = 0, None
+        while True:
+            page, cursor = await bikes.query_page(
+                order_by=[], limit=page_size, cursor=cursor, fields=["name"]
+            )
+            await asyncio.gather(*(reconcile_one(doc["id"]) for doc in page))
+            total += len(page)
+            if cursor is None:
+                return total
+
+    async def _invalidate_bike(self, bike_id: str) -> None:
+        if self.cache is not None:
+            await self.cache.invalidate(BIKES, bike_id)
+
+    def _bike(self, bike_id: str):
+        return self.client.collection("bikes").document(bike_id)
+
+    async def _get_review(self, review_ref, transaction) -> Dict[str, Any]:
+        snapshot = await review_ref.get(transaction=transaction)
+        if not snapshot.exists:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Review not found"
+            )
+        return snapshot.to_dict()
+
+    @timed("firestore")
+    async def _transact(self, fn):
+        from google.cloud.firestore_v1.async_transaction import async_transactional
+
+        return await async_transactional(fn)(self.client.transaction())
+
+
+@lru_cache()
+def get_review_service() -> ReviewService:
+    settings = get_settings()
+    return ReviewService(
+        half_life_days=settings.rating_half_life_days,
+        cache=get_tiered_cache(),
+        duplicates=get_duplicate_detector() if settings.dedup_enabled else None,
+    )
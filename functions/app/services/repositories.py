@@ -0,0 +1,63 @@
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.services.firestore_repository import ASCENDING, DESCENDING, FirestoreRepository
+from app.services.tiered_cache import cached, get_tiered_cache
+
+BIKES = "bikes"
+
+
+class BikeRepository(FirestoreRepository):
+    collection = "bikes"
+
+    @cached(BIKES)
+    async def get_detail(self, bike_id: str) -> Optional[Dict[str, Any]]:
+        """The full bike document; unknown ids are cached as None too"""
+        return await self.get(bike_id)
+
+    async def list_by_price(
+        self,
+        brand_id: Optional[str] = None,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        # Served by the bikes(brandId, price) composite index
+        filters = [("brandId", "==", brand_id)] if brand_id else []
+        return await self.query_page(
+            filters=filters,
+            order_by=[("price", ASCENDING)],
+            limit=limit,
+            cursor=cursor,
+            fields=fields,
+        )
+
+
+class ReviewRepository(FirestoreRepository):
+    collection = "reviews"
+
+    async def list_for_bike(
+        self,
+        bike_id: str,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        # Served by the reviews(bikeId, rating DESC, createdAt DESC) index
+        return await self.query_page(
+            filters=[("bikeId", "==", bike_id)],
+            order_by=[("rating", DESCENDING), ("createdAt", DESCENDING)],
+            limit=limit,
+            cursor=cursor,
+            fields=fields,
+        )
+
+
+@lru_cache()
+def get_bike_repository() -> BikeRepository:
+    return BikeRepository(cache=get_tiered_cache())
+
+
+@lru_cache()
+def get_review_repository() -> ReviewRepository:
+    return ReviewRepository()
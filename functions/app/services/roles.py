@@ -0,0 +1,114 @@
+from functools import lru_cache
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set
+
+from app.config import get_settings
+from app.firebase_init import get_firestore_client
+from app.services.user_cache import UserCache
+from app.services.user_loader import UserLoader
+from app.timing import timed
+
+DEFAULT_ROLES = ["user"]
+
+ROLE_PERMISSIONS: Dict[str, Set[str]] = {
+    "user": {"profile:write", "reviews:write"},
+    "moderator": {"profile:write", "reviews:write", "reviews:moderate"},
+    "admin": {
+        "profile:write",
+        "reviews:write",
+        "reviews:moderate",
+        "catalog:write",
+        "users:manage",
+        "data:export",
+    },
+}
+
+
+def roles_from_claims(claims: Dict) -> Optional[List[str]]:
+    """Roles carried by a verified token, or None if it has no role claims"""
+    roles = claims.get("roles")
+    if isinstance(roles, list):
+        return [str(role) for role in roles] or DEFAULT_ROLES
+    if "admin" in claims:
+        return ["admin", "user"] if claims["admin"] is True else DEFAULT_ROLES
+    return None
+
+
+def claims_for_roles(roles: Iterable[str]) -> Dict:
+    """Custom claims to store for ``roles``; ``admin`` keeps older checks working"""
+    roles = list(dict.fromkeys(roles))
+    return {"roles": roles, "admin": "admin" in roles}
+
+
+def permissions_for(roles: Iterable[str]) -> Set[str]:
+    permissions: Set[str] = set()
+    for role in roles:
+        permissions |= ROLE_PERMISSIONS.get(role, set())
+    return permissions
+
+
+@timed("firestore")
+async def fetch_roles_from_firestore(uids: List[str]) -> Dict[str, List[str]]:
+    # firestore.rules keep role and roles out of reach of client writes
+    client = get_firestore_client()
+    refs = [client.collection("users").document(uid) for uid in uids]
+    roles = {}
+    async for snapshot in client.get_all(refs, field_paths=["role", "roles"]):
+        if not snapshot.exists:
+            continue
+        data = snapshot.to_dict() or {}
+        if isinstance(data.get("roles"), list):
+            roles[snapshot.id] = data["roles"]
+        elif data.get("role"):
+            roles[snapshot.id] = [data["role"]]
+    return roles
+
+
+class RoleResolver:
+    """Resolves a user's roles from the custom claims of their verified token.
+
+    Only tokens without role claims fall back to the ``users/{uid}`` document.
+    Those lookups are batched across concurrent requests and cached per uid.
+    """
+
+    def __init__(
+        self,
+        fetch_roles: Callable[[List[str]], Awaitable[Dict[str, List[str]]]],
+        cache: UserCache,
+    ):
+        self._cache = cache
+        self._loader = UserLoader(fetch_roles, memoize=False)
+        self.claim_hits = 0
+        self.fallbacks = 0
+
+    async def resolve(self, claims: Dict) -> List[str]:
+        roles = roles_from_claims(claims)
+        if roles is not None:
+            self.claim_hits += 1
+            return roles
+
+        self.fallbacks += 1
+        uid = claims["uid"]
+        roles = await self._cache.get_or_load(uid, lambda: self._loader.load(uid))
+        return roles or DEFAULT_ROLES
+
+    def set(self, uid: str, roles: List[str]) -> None:
+        self._cache.put(uid, roles)
+
+    def invalidate(self, uid: str) -> None:
+        self._cache.invalidate(uid)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "claim_hits": self.claim_hits,
+            "fallbacks": self.fallbacks,
+            **{f"cache_{k}": v for k, v in self._cache.stats().items()},
+        }
+
+
+@lru_cache()
+def get_role_resolver() -> RoleResolver:
+    settings = get_settings()
+    return RoleResolver(
+        fetch_roles_from_firestore,
+        UserCache(maxsize=settings.role_cache_size, ttl=settings.role_cache_ttl),
+    )
@@ -0,0 +1,447 @@
+import asyncio
+import json
+import sqlite3
+import time
+from collections import Counter
+from concurrent.futures import Executor, ProcessPoolExecutor
+from pathlib import Path
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+)
+from urllib.parse import urldefrag, urljoin, urlsplit
+from urllib.robotparser import RobotFileParser
+
+from app.config import get_settings
+
+SKIPPED_EXTENSIONS = (".jpg", ".jpeg", ".png", ".gif", ".webp", ".svg", ".pdf", ".zip")
+# schema.org types that describe a bike on catalog pages
+ITEM_TYPES = {"Product", "Vehicle", "Motorcycle", "Car"}
+
+
+class Parsed(NamedTuple):
+    links: List[str]
+    items: List[Dict[str, Any]]
+
+
+def _json_ld_items(data: Any) -> Iterable[Dict[str, Any]]:
+    if isinstance(data, list):
+        for entry in data:
+            yield from _json_ld_items(entry)
+    elif isinstance(data, dict):
+        if "@graph" in data:
+            yield from _json_ld_items(data["@graph"])
+        types = data.get("@type")
+        types = set(types) if isinstance(types, list) else {types}
+        if types & ITEM_TYPES:
+            yield data
+
+
+def parse_page(url: str, html: str) -> Parsed:
+    """Links and schema.org JSON-LD bike items of a page.
+
+    Runs in the crawler's process pool, so it must stay a module-level
+    function of picklable arguments.
+    """
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+    links = []
+    for anchor in soup.find_all("a", href=True):
+        link = urldefrag(urljoin(url, anchor["href"].strip()))[0]
+        if link.startswith(("http://", "https://")):
+            links.append(link)
+    items = []
+    for script in soup.find_all("script", type="application/ld+json"):
+        try:
+            data = json.loads(script.string or "")
+        except ValueError:
+            continue
+        for item in _json_ld_items(data):
+            items.append({**item, "sourceUrl": url})
+    return Parsed(links=list(dict.fromkeys(links)), items=items)
+
+
+class FrontierEntry(NamedTuple):
+    url: str
+    host: str
+    depth: int
+    attempts: int
+    etag: Optional[str]
+    last_modified: Optional[str]
+
+
+class Frontier:
+    """URLs to crawl, kept in SQLite so an interrupted crawl resumes.
+
+    A URL is ``pending`` until fetched, then ``done`` (with the validators
+    for conditional re-fetches) or ``failed``. URLs being fetched stay
+    ``pending`` on disk, so a crash simply fetches them again.
+    """
+
+    def __init__(self, path: str = ":memory:"):
+        self._db = sqlite3.connect(path, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS urls (
+                url TEXT PRIMARY KEY,
+                host TEXT NOT NULL,
+                depth INTEGER NOT NULL,
+                state TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                not_before REAL NOT NULL DEFAULT 0,
+                etag TEXT,
+                last_modified TEXT,
+                status INTEGER,
+                error TEXT,
+                fetched_at REAL
+            )"""
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS urls_pending ON urls (state, depth)"
+        )
+
+    def add(self, urls: Iterable[str], depth: int = 0) -> int:
+        """Queue new URLs; ones already known are left as they are"""
+        before = self._db.total_changes
+        self._db.executemany(
+            "INSERT OR IGNORE INTO urls (url, host, depth) VALUES (?, ?, ?)",
+            [(url, urlsplit(url).netloc, depth) for url in urls],
+        )
+        return self._db.total_changes - before
+
+    def claim(self, busy_hosts: Set[str], claimed: Set[str]) -> Optional[FrontierEntry]:
+        """The shallowest due URL on a host with a free slot, not already claimed"""
+        hosts = ",".join("?" * len(busy_hosts))
+        urls = ",".join("?" * len(claimed))
+        rows = self._db.execute(
+            "SELECT url, host, depth, attempts, etag, last_modified FROM urls"
+            " WHERE state = 'pending' AND not_before <= ?"
+            f" AND host NOT IN ({hosts}) AND url NOT IN ({urls})"
+            " ORDER BY depth, rowid LIMIT 1",
+            (time.time(), *busy_hosts, *claimed),
+        ).fetchall()
+        return FrontierEntry(*rows[0]) if rows else None
+
+    def next_due(self) -> Optional[float]:
+        """When the earliest pending URL may be fetched"""
+        row = self._db.execute(
+            "SELECT MIN(not_before) FROM urls WHERE state = 'pending'"
+        ).fetchone()
+        return row[0]
+
+    def done(
+        self,
+        url: str,
+        status: int,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+    ) -> None:
+        # A 304 keeps the stored validators
+        self._db.execute(
+            "UPDATE urls SET state = 'done', status = ?, error = NULL,"
+            " etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified),"
+            " fetched_at = ? WHERE url = ?",
+            (status, etag, last_modified, time.time(), url),
+        )
+
+    def retry(self, url: str, error: str, delay: float, max_attempts: int) -> bool:
+        """Back off and requeue ``url``; False once it has used its attempts"""
+        attempts = self._db.execute(
+            "SELECT attempts FROM urls WHERE url = ?", (url,)
+        ).fetchone()[0]
+        failed = attempts + 1 >= max_attempts
+        self._db.execute(
+            "UPDATE urls SET attempts = attempts + 1, error = ?, not_before = ?,"
+            " state = ? WHERE url = ?",
+            (error, time.time() + delay, "failed" if failed else "pending", url),
+        )
+        return not failed
+
+    def skip(self, url: str, reason: str) -> None:
+        self._db.execute(
+            "UPDATE urls SET state = 'skipped', error = ? WHERE url = ?", (reason, url)
+        )
+
+    def requeue_done(self) -> int:
+        """Queue every fetched URL again; unchanged pages will answer 304"""
+        return self._db.execute(
+            "UPDATE urls SET state = 'pending', attempts = 0, not_before = 0"
+            " WHERE state = 'done'"
+        ).rowcount
+
+    def hosts(self) -> Set[str]:
+        return {row[0] for row in self._db.execute("SELECT DISTINCT host FROM urls")}
+
+    def counts(self) -> Dict[str, int]:
+        return dict(self._db.execute("SELECT state, COUNT(*) FROM urls GROUP BY state"))
+
+    def close(self) -> None:
+        self._db.close()
+
+
+class HostPolicy:
+    """Per-host politeness: concurrent fetches, spacing and robots.txt"""
+
+    __slots__ = ("active", "next_start", "delay", "robots")
+
+    def __init__(self, delay: float):
+        self.active = 0
+        self.next_start = 0.0
+        self.delay = delay
+        # Fetched once per host, by whichever fetch reaches the host first
+        self.robots: Optional[asyncio.Future] = None
+
+
+class Crawler:
+    """Crawls the frontier with one pooled aiohttp session.
+
+    At most ``concurrency`` fetches run overall and ``per_host`` per host,
+    and fetches to one host start at least ``delay`` seconds apart (or the
+    host's robots.txt Crawl-delay, if longer). Pages already fetched are
+    requested with If-None-Match / If-Modified-Since and a 304 skips them.
+    HTML is parsed by ``parser`` in ``executor`` (by default a pool of
+    ``parse_workers`` processes) so parsing never blocks the event loop.
+    Links on the seeds' hosts up to ``max_depth`` join the frontier; items
+    go to ``on_item``.
+    """
+
+    def __init__(
+        self,
+        frontier: Frontier,
+        on_item: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None,
+        parser: Callable[[str, str], Parsed] = parse_page,
+        executor: Optional[Executor] = None,
+        parse_workers: int = 2,
+        concurrency: int = 16,
+        per_host: int = 2,
+        delay: float = 1.0,
+        timeout: float = 20,
+        max_depth: int = 3,
+        max_pages: Optional[int] = None,
+        max_attempts: int = 3,
+        max_bytes: int = 5 * 1024 * 1024,
+        allowed_hosts: Optional[Set[str]] = None,
+        user_agent: str = "RiderCriticBot/1.0",
+        session=None,
+    ):
+        self.frontier = frontier
+        self.on_item = on_item
+        self.parser = parser
+        self.executor = executor
+        self.parse_workers = parse_workers
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.delay = delay
+        self.timeout = timeout
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.max_attempts = max_attempts
+        self.max_bytes = max_bytes
+        self.allowed_hosts = allowed_hosts
+        self.user_agent = user_agent
+        self._session = session
+        self._hosts: Dict[str, HostPolicy] = {}
+        self._claimed: Set[str] = set()
+        self._changed = asyncio.Event()
+        self.stats: Counter = Counter()
+
+    async def run(self, seeds: Iterable[str] = ()) -> Dict[str, int]:
+        """Crawl until the frontier is exhausted or ``max_pages`` were fetched"""
+        seeds = list(seeds)
+        self.frontier.add(seeds)
+        if self.allowed_hosts is None:
+            # A resumed crawl stays on the hosts it was seeded with
+            self.allowed_hosts = self.frontier.hosts()
+        own_session = self._session is None
+        own_executor = self.executor is None
+        if own_session:
+            self._session = self._open_session()
+        if own_executor:
+            self.executor = ProcessPoolExecutor(max_workers=self.parse_workers)
+        try:
+            await asyncio.gather(*(self._worker() for _ in range(self.concurrency)))
+        finally:
+            if own_session:
+                await self._session.close()
+                self._session = None
+            if own_executor:
+                self.executor.shutdown()
+                self.executor = None
+        return dict(self.stats)
+
+    def _open_session(self):
+        import aiohttp
+
+        connector = aiohttp.TCPConnector(
+            limit=self.concurrency,
+            limit_per_host=self.per_host,
+            ttl_dns_cache=300,
+        )
+        return aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            headers={"User-Agent": self.user_agent},
+        )
+
+    def _finished(self) -> bool:
+        fetched = self.stats["fetched"] + self.stats["not_modified"]
+        return self.max_pages is not None and fetched >= self.max_pages
+
+    async def _worker(self) -> None:
+        while not self._finished():
+            busy = {
+                host for host, p in self._hosts.items() if p.active >= self.per_host
+            }
+            entry = self.frontier.claim(busy, self._claimed)
+            if entry is None:
+                if not self._claimed and self.frontier.next_due() is None:
+                    self._changed.set()
+                    return
+                # Wait for a fetch to finish (and maybe add links) or a retry
+                self._changed.clear()
+                try:
+                    await asyncio.wait_for(self._changed.wait(), 0.05)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            self._claimed.add(entry.url)
+            policy = self._host(entry.host)
+            policy.active += 1
+            try:
+                await self._crawl(entry, policy)
+            finally:
+                policy.active -= 1
+                self._claimed.discard(entry.url)
+                self._changed.set()
+
+    def _host(self, host: str) -> HostPolicy:
+        policy = self._hosts.get(host)
+        if policy is None:
+            policy = self._hosts[host] = HostPolicy(self.delay)
+        return policy
+
+    async def _wait_turn(self, policy: HostPolicy) -> None:
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        start = max(now, policy.next_start)
+        # Reserve the slot before sleeping, so concurrent fetches queue up
+        policy.next_start = start + policy.delay
+        if start > now:
+            await asyncio.sleep(start - now)
+
+    async def _robots(self, entry: FrontierEntry, policy: HostPolicy):
+        if policy.robots is None:
+            url = f"{urlsplit(entry.url).scheme}://{entry.host}/robots.txt"
+            policy.robots = asyncio.ensure_future(self._fetch_robots(url, policy))
+        return await policy.robots
+
+    async def _fetch_robots(self, url: str, policy: HostPolicy) -> RobotFileParser:
+        # A missing or unreachable robots.txt allows everything
+        try:
+            async with self._session.get(url) as response:
+                text = await response.text() if response.status == 200 else ""
+        except Exception:
+            text = ""
+        robots = RobotFileParser()
+        robots.parse(text.splitlines())
+        crawl_delay = robots.crawl_delay(self.user_agent)
+        if crawl_delay:
+            policy.delay = max(policy.delay, float(crawl_delay))
+        return robots
+
+    async def _crawl(self, entry: FrontierEntry, policy: HostPolicy) -> None:
+        robots = await self._robots(entry, policy)
+        if not robots.can_fetch(self.user_agent, entry.url):
+            self.frontier.skip(entry.url, "robots.txt")
+            self.stats["robots_skipped"] += 1
+            return
+
+        headers = {}
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+        await self._wait_turn(policy)
+        try:
+            async with self._session.get(entry.url, headers=headers) as response:
+                if response.status == 304:
+                    self.frontier.done(entry.url, 304)
+                    self.stats["not_modified"] += 1
+                    return
+                if response.status == 429 or response.status >= 500:
+                    retry_after = response.headers.get("Retry-After", "")
+                    if retry_after.isdigit():
+                        policy.next_start += float(retry_after)
+                    self._retry(entry, f"HTTP {response.status}")
+                    return
+                content_type = response.headers.get("Content-Type", "")
+                if response.status != 200 or "html" not in content_type:
+                    self.frontier.done(entry.url, response.status)
+                    self.stats["ignored"] += 1
+                    return
+                body = await response.content.read(self.max_bytes + 1)
+                if len(body) > self.max_bytes:
+                    self.frontier.skip(entry.url, "too large")
+                    self.stats["too_large"] += 1
+                    return
+                html = body.decode(response.get_encoding(), errors="replace")
+                etag = response.headers.get("ETag")
+                last_modified = response.headers.get("Last-Modified")
+        except Exception as e:
+            self._retry(entry, f"{type(e).__name__}: {e}")
+            return
+
+        self.stats["fetched"] += 1
+        self.stats["bytes"] += len(body)
+        loop = asyncio.get_running_loop()
+        parsed = await loop.run_in_executor(self.executor, self.parser, entry.url, html)
+        if entry.depth < self.max_depth:
+            self.frontier.add(
+                (link for link in parsed.links if self._follow(link)), entry.depth + 1
+            )
+        for item in parsed.items:
+            self.stats["items"] += 1
+            if self.on_item is not None:
+                await self.on_item(item)
+        self.frontier.done(entry.url, 200, etag, last_modified)
+
+    def _retry(self, entry: FrontierEntry, error: str) -> None:
+        delay = self.delay * 2 ** (entry.attempts + 1)
+        if self.frontier.retry(entry.url, error, delay, self.max_attempts):
+            self.stats["retried"] += 1
+        else:
+            self.stats["failed"] += 1
+
+    def _follow(self, link: str) -> bool:
+        parts = urlsplit(link)
+        return parts.netloc in self.allowed_hosts and not parts.path.lower().endswith(
+            SKIPPED_EXTENSIONS
+        )
+
+
+def get_crawler(
+    frontier_path: Optional[str] = None,
+    on_item: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None,
+) -> Crawler:
+    settings = get_settings()
+    path = frontier_path or settings.scraper_frontier_path
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    return Crawler(
+        Frontier(path),
+        on_item=on_item,
+        parse_workers=settings.scraper_parse_workers,
+        concurrency=settings.scraper_concurrency,
+        per_host=settings.scraper_per_host,
+        delay=settings.scraper_delay,
+        timeout=settings.scraper_timeout,
+        max_depth=settings.scraper_max_depth,
+        user_agent=settings.scraper_user_agent,
+    )
@@ -0,0 +1,76 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterator
+
+from app.metrics import MetricFamily
+
+
+class SingleFlight:
+    """Collapses concurrent calls that share a key into one in-flight call.
+
+    The first caller starts the call; callers arriving while it runs await
+    the same result (or exception) instead of issuing their own. Nothing is
+    cached once the call completes.
+    """
+
+    def __init__(self, name: str = ""):
+        # Labels this instance's series on /metrics
+        self.name = name
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self.calls = 0
+        self.collapsed = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        future = self._calls.get(key)
+        if future is not None:
+            self.collapsed += 1
+        else:
+            self.calls += 1
+            future = asyncio.ensure_future(fn())
+            self._calls[key] = future
+            future.add_done_callback(lambda f: self._forget(key, f))
+        # Shielded so a cancelled caller does not cancel the shared call
+        return await asyncio.shield(future)
+
+    def forget(self, key: Hashable) -> None:
+        """Make later callers start a new call instead of joining the current one"""
+        self._calls.pop(key, None)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "calls": self.calls,
+            "collapsed": self.collapsed,
+            "in_flight": len(self._calls),
+        }
+
+    def collect(self) -> Iterator[MetricFamily]:
+        labels = {"name": self.name}
+        yield MetricFamily(
+            "singleflight_calls_total",
+            "counter",
+            "Calls started, and calls that joined one already in flight",
+            [
+                (
+                    "singleflight_calls_total",
+                    {**labels, "result": "started"},
+                    self.calls,
+                ),
+                (
+                    "singleflight_calls_total",
+                    {**labels, "result": "collapsed"},
+                    self.collapsed,
+                ),
+            ],
+        )
+        yield MetricFamily(
+            "singleflight_in_flight",
+            "gauge",
+            "Distinct calls currently in flight",
+            [("singleflight_in_flight", labels, len(self._calls))],
+        )
+
+    def _forget(self, key: Hashable, future: asyncio.Future) -> None:
+        if self._calls.get(key) is future:
+            del self._calls[key]
+        if not future.cancelled():
+            # Mark the exception retrieved even if every caller went away
+            future.exception()
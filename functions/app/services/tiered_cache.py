@@ -0,0 +1,413 @@
+import asyncio
+import json
+import pickle
+import time
+import uuid
+from collections import Counter, OrderedDict, defaultdict
+from datetime import datetime
+from functools import lru_cache, wraps
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Protocol,
+    Tuple,
+)
+
+from app.config import get_settings
+from app.metrics import MetricFamily, register_collector
+from app.services.generations import Generations
+from app.services.single_flight import SingleFlight
+
+MISSING = object()
+# First byte of every L2 value: a cached "not found" carries no payload
+_FOUND = b"\x01"
+_NOT_FOUND = b"\x00"
+
+
+class Serializer(Protocol):
+    def dumps(self, value: Any) -> bytes:
+        ...
+
+    def loads(self, data: bytes) -> Any:
+        ...
+
+
+class JsonSerializer:
+    """JSON with tagged datetimes, enough for Firestore documents"""
+
+    def dumps(self, value: Any) -> bytes:
+        return json.dumps(value, default=self._default, separators=(",", ":")).encode()
+
+    def loads(self, data: bytes) -> Any:
+        return json.loads(data, object_hook=self._object_hook)
+
+    @staticmethod
+    def _default(value: Any) -> Any:
+        if isinstance(value, datetime):
+            return {"$datetime": value.isoformat()}
+        raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+    @staticmethod
+    def _object_hook(value: Dict[str, Any]) -> Any:
+        if len(value) == 1 and "$datetime" in value:
+            return datetime.fromisoformat(value["$datetime"])
+        return value
+
+
+class PickleSerializer:
+    """Any picklable value; only for a Redis nothing untrusted can write to"""
+
+    def dumps(self, value: Any) -> bytes:
+        return pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def loads(self, data: bytes) -> Any:
+        return pickle.loads(data)
+
+
+class CachePolicy(NamedTuple):
+    ttl: float = 300
+    # In-process lifetime; bounds staleness if an invalidation message is lost
+    l1_ttl: float = 30
+    # How long a None result is remembered; 0 never caches None
+    negative_ttl: float = 0
+    serializer: Serializer = JsonSerializer()
+
+
+class TieredCache:
+    """Read-through cache with a per-process LRU (L1) in front of Redis (L2).
+
+    A miss in both tiers runs the loader once per key and fills both. Writes
+    call ``set`` or ``invalidate``, which update this process, Redis, and
+    publish the key so every other instance drops its L1 copy. Redis errors
+    and timeouts are counted and treated as misses, so without Redis (or
+    with no ``redis`` at all) it behaves as a plain LRU.
+    """
+
+    # Seconds before resubscribing after a lost connection; doubles up to 30
+    reconnect_delay = 0.5
+
+    def __init__(
+        self,
+        policies: Optional[Dict[str, CachePolicy]] = None,
+        redis=None,
+        l1_maxsize: int = 10000,
+        redis_timeout: float = 0.05,
+        prefix: str = "cache:",
+        channel: str = "cache:invalidate",
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._policies = dict(policies or {})
+        self._default_policy = CachePolicy()
+        self._redis = redis
+        self._l1_maxsize = l1_maxsize
+        self._redis_timeout = redis_timeout
+        self._prefix = prefix
+        self._channel = channel
+        self._clock = clock
+        self._l1: "OrderedDict[Tuple[str, str], Tuple[float, Any]]" = OrderedDict()
+        self._callbacks: Dict[str, List[Callable[[str], None]]] = defaultdict(list)
+        self._listener: Optional[asyncio.Task] = None
+        # Bumped by writes so loads of the key started earlier cannot undo them
+        self._generations = Generations()
+        self.instance_id = uuid.uuid4().hex
+        self.single_flight = SingleFlight()
+        self.lookups: Counter = Counter()
+        self.redis_errors = 0
+
+    def policy(self, namespace: str) -> CachePolicy:
+        return self._policies.get(namespace, self._default_policy)
+
+    def on_invalidate(self, namespace: str, callback: Callable[[str], None]) -> None:
+        """Call ``callback(key)`` when another instance invalidates a key"""
+        self._callbacks[namespace].append(callback)
+
+    async def get_or_load(
+        self,
+        namespace: str,
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        serializer: Optional[Serializer] = None,
+    ) -> Any:
+        self._ensure_listener()
+        value = self._l1_get(namespace, key)
+        if value is not MISSING:
+            self.lookups[(namespace, "l1")] += 1
+            return value
+        return await self.single_flight.do(
+            (namespace, key), lambda: self._load(namespace, key, loader, serializer)
+        )
+
+    async def set(
+        self,
+        namespace: str,
+        key: str,
+        value: Any,
+        serializer: Optional[Serializer] = None,
+    ) -> None:
+        self._generations.bump((namespace, key))
+        self.single_flight.forget((namespace, key))
+        self._l1_put(namespace, key, value)
+        await self._l2_set(namespace, key, value, serializer)
+        await self._publish(namespace, key)
+
+    async def invalidate(self, namespace: str, key: str) -> None:
+        self._generations.bump((namespace, key))
+        self.single_flight.forget((namespace, key))
+        self._l1.pop((namespace, key), None)
+        await self._redis_call("delete", self._l2_key(namespace, key))
+        await self._publish(namespace, key)
+
+    def clear(self) -> None:
+        """Drop every L1 entry; Redis is left as is"""
+        self._generations.bump_all()
+        self._l1.clear()
+
+    async def close(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            **{f"{ns}_{result}": count for (ns, result), count in self.lookups.items()},
+            "redis_errors": self.redis_errors,
+            "size": len(self._l1),
+            "maxsize": self._l1_maxsize,
+        }
+
+    def collect(self) -> Iterator[MetricFamily]:
+        yield MetricFamily(
+            "cache_lookups_total",
+            "counter",
+            "Cache lookups by namespace and the tier that answered (or miss)",
+            [
+                ("cache_lookups_total", {"namespace": ns, "result": result}, count)
+                for (ns, result), count in sorted(self.lookups.items())
+            ],
+        )
+        yield MetricFamily(
+            "cache_redis_errors_total",
+            "counter",
+            "Redis calls that failed or timed out",
+            [("cache_redis_errors_total", {}, self.redis_errors)],
+        )
+        yield MetricFamily(
+            "cache_l1_entries",
+            "gauge",
+            "Entries held in process memory",
+            [("cache_l1_entries", {}, len(self._l1))],
+        )
+
+    async def _load(
+        self,
+        namespace: str,
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        serializer: Optional[Serializer],
+    ) -> Any:
+        generation = self._generations.start((namespace, key))
+        try:
+            value = await self._l2_get(namespace, key, serializer)
+            if value is not MISSING:
+                self.lookups[(namespace, "l2")] += 1
+                if self._generations.current((namespace, key), generation):
+                    self._l1_put(namespace, key, value)
+                return value
+
+            self.lookups[(namespace, "miss")] += 1
+            value = await loader()
+            if self._generations.current((namespace, key), generation):
+                self._l1_put(namespace, key, value)
+                await self._l2_set(namespace, key, value, serializer)
+            return value
+        finally:
+            self._generations.finish((namespace, key))
+
+    def _cacheable_ttl(self, namespace: str, value: Any) -> float:
+        policy = self.policy(namespace)
+        return policy.negative_ttl if value is None else policy.ttl
+
+    def _l1_get(self, namespace: str, key: str) -> Any:
+        entry = self._l1.get((namespace, key))
+        if entry is None:
+            return MISSING
+        if entry[0] <= self._clock():
+            del self._l1[(namespace, key)]
+            return MISSING
+        self._l1.move_to_end((namespace, key))
+        return entry[1]
+
+    def _l1_put(self, namespace: str, key: str, value: Any) -> None:
+        ttl = min(self._cacheable_ttl(namespace, value), self.policy(namespace).l1_ttl)
+        if ttl <= 0:
+            self._l1.pop((namespace, key), None)
+            return
+        self._l1[(namespace, key)] = (self._clock() + ttl, value)
+        self._l1.move_to_end((namespace, key))
+        while len(self._l1) > self._l1_maxsize:
+            self._l1.popitem(last=False)
+
+    def _l2_key(self, namespace: str, key: str) -> str:
+        return f"{self._prefix}{namespace}:{key}"
+
+    async def _l2_get(
+        self, namespace: str, key: str, serializer: Optional[Serializer]
+    ) -> Any:
+        data = await self._redis_call("get", self._l2_key(namespace, key))
+        if not data:
+            return MISSING
+        if data[:1] == _NOT_FOUND:
+            return None
+        try:
+            return (serializer or self.policy(namespace).serializer).loads(data[1:])
+        except Exception:
+            self.redis_errors += 1
+            return MISSING
+
+    async def _l2_set(
+        self,
+        namespace: str,
+        key: str,
+        value: Any,
+        serializer: Optional[Serializer],
+    ) -> None:
+        ttl = self._cacheable_ttl(namespace, value)
+        if self._redis is None or ttl <= 0:
+            return
+        if value is None:
+            data = _NOT_FOUND
+        else:
+            try:
+                serializer = serializer or self.policy(namespace).serializer
+                data = _FOUND + serializer.dumps(value)
+            except Exception:
+                self.redis_errors += 1
+                return
+        await self._redis_call(
+            "set", self._l2_key(namespace, key), data, px=int(ttl * 1000)
+        )
+
+    async def _publish(self, namespace: str, key: str) -> None:
+        message = json.dumps({"i": self.instance_id, "n": namespace, "k": key})
+        await self._redis_call("publish", self._channel, message)
+
+    async def _redis_call(self, command: str, *args, **kwargs) -> Any:
+        if self._redis is None:
+            return None
+        try:
+            return await asyncio.wait_for(
+                getattr(self._redis, command)(*args, **kwargs), self._redis_timeout
+            )
+        except Exception:
+            self.redis_errors += 1
+            return None
+
+    def _ensure_listener(self) -> None:
+        if self._redis is not None and self._listener is None:
+            self._listener = asyncio.ensure_future(self._listen())
+
+    async def _listen(self) -> None:
+        delay = self.reconnect_delay
+        while True:
+            pubsub = self._redis.pubsub()
+            try:
+                await pubsub.subscribe(self._channel)
+                # Invalidations sent while unsubscribed were missed
+                self.clear()
+                delay = self.reconnect_delay
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        self._on_message(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.redis_errors += 1
+            finally:
+                try:
+                    await pubsub.reset()
+                except Exception:
+                    pass
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30)
+
+    def _on_message(self, data: bytes) -> None:
+        try:
+            message = json.loads(data)
+        except ValueError:
+            return
+        if message.get("i") == self.instance_id:
+            return
+        namespace, key = message.get("n"), message.get("k")
+        self._generations.bump((namespace, key))
+        self.single_flight.forget((namespace, key))
+        self._l1.pop((namespace, key), None)
+        for callback in self._callbacks.get(namespace, ()):
+            callback(key)
+
+
+def cached(
+    namespace: str,
+    key: Optional[Callable[..., str]] = None,
+    serializer: Optional[Serializer] = None,
+):
+    """Cache an async method's results in its instance's ``cache``.
+
+    ``key`` receives the method's arguments (without ``self``); by default
+    the positional arguments are joined with ``:``. Instances whose
+    ``cache`` is None call straight through.
+    """
+
+    def decorate(method):
+        @wraps(method)
+        async def wrapper(self, *args, **kwargs):
+            cache: Optional[TieredCache] = getattr(self, "cache", None)
+            if cache is None:
+                return await method(self, *args, **kwargs)
+            cache_key = key(*args, **kwargs) if key else ":".join(map(str, args))
+            return await cache.get_or_load(
+                namespace,
+                cache_key,
+                lambda: method(self, *args, **kwargs),
+                serializer=serializer,
+            )
+
+        return wrapper
+
+    return decorate
+
+
+@lru_cache()
+def get_tiered_cache() -> TieredCache:
+    settings = get_settings()
+    redis = None
+    if settings.cache_redis_url:
+        import redis.asyncio as redis_asyncio
+
+        redis = redis_asyncio.from_url(settings.cache_redis_url)
+    ttls = {"users": settings.user_cache_ttl, **settings.cache_ttls}
+    policies = {
+        namespace: CachePolicy(
+            ttl=ttl,
+            l1_ttl=settings.cache_l1_ttl,
+            negative_ttl=settings.cache_negative_ttls.get(namespace, 0),
+        )
+        for namespace, ttl in ttls.items()
+    }
+    cache = TieredCache(
+        policies,
+        redis=redis,
+        l1_maxsize=settings.cache_l1_size,
+        redis_timeout=settings.cache_redis_timeout,
+    )
+    register_collector(cache.collect)
+    return cache
@@ -0,0 +1,288 @@
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+from app.config import get_settings
+from app.firebase_init import get_auth
+from app.metrics import MetricFamily, register_collector
+from google.auth import transport
+
+_MAX_AGE = re.compile(r"max-age=(\d+)")
+_DEFAULT_MAX_AGE = 3600
+# Firebase ID tokens expire an hour after they are issued
+_MAX_TOKEN_LIFETIME = 3600
+_RETRY_DELAY = 60
+
+
+def _verify_id_token(token: str) -> Dict:
+    return get_auth().verify_id_token(token)
+
+
+class VerifiedTokenCache:
+    """Bounded LRU of verified ID token claims keyed by a SHA-256 token digest.
+
+    Each entry lives until the token's own ``exp`` claim, so a cached token is
+    never accepted for longer than Firebase itself would accept it. ``revoke``
+    drops a user's tokens and keeps any issued before it from coming back.
+    """
+
+    def __init__(
+        self,
+        verifier: Callable[[str], Dict] = _verify_id_token,
+        maxsize: int = 10000,
+        clock: Callable[[], float] = time.time,
+    ):
+        self._verifier = verifier
+        self._maxsize = maxsize
+        self._clock = clock
+        self._entries: "OrderedDict[bytes, Tuple[float, Dict]]" = OrderedDict()
+        # uid -> tokens issued before this time (in seconds) are refused
+        self._valid_after: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode("utf-8")).digest()
+
+    def get(self, token: str) -> Optional[Dict]:
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > self._clock():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return dict(entry[1])
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def peek(self, token: str) -> Optional[Dict]:
+        """Like ``get``, but leaves the hit/miss counts and LRU order alone"""
+        with self._lock:
+            entry = self._entries.get(self._key(token))
+            if entry is None or entry[0] <= self._clock():
+                return None
+            return dict(entry[1])
+
+    def put(self, token: str, claims: Dict) -> None:
+        expires_at = claims.get("exp")
+        if not isinstance(expires_at, (int, float)) or expires_at <= self._clock():
+            return
+        key = self._key(token)
+        with self._lock:
+            if self._is_revoked(claims):
+                return
+            self._entries[key] = (float(expires_at), dict(claims))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def verify(self, token: str) -> Dict:
+        claims = self.get(token)
+        if claims is None:
+            claims = self._verifier(token)
+            self.put(token, claims)
+        return claims
+
+    def revoke(self, uid: str) -> None:
+        """Drop ``uid``'s tokens; ones issued before now are refused from now on"""
+        # Like Firebase's tokensValidAfterTime, iat has one-second precision
+        valid_after = int(self._clock())
+        with self._lock:
+            for key, (_, claims) in list(self._entries.items()):
+                if claims.get("uid") == uid:
+                    del self._entries[key]
+            self._valid_after[uid] = valid_after
+            horizon = valid_after - _MAX_TOKEN_LIFETIME
+            for other, since in list(self._valid_after.items()):
+                if since < horizon:
+                    del self._valid_after[other]
+
+    def revoked(self, claims: Dict) -> bool:
+        """Whether ``claims`` were issued before their user's tokens were revoked"""
+        with self._lock:
+            return self._is_revoked(claims)
+
+    def _is_revoked(self, claims: Dict) -> bool:
+        valid_after = self._valid_after.get(claims.get("uid"))
+        return valid_after is not None and claims.get("iat", 0) < valid_after
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._entries),
+                "maxsize": self._maxsize,
+            }
+
+    def collect(self) -> Iterator[MetricFamily]:
+        stats = self.stats()
+        yield MetricFamily(
+            "token_cache_lookups_total",
+            "counter",
+            "Verified token cache lookups by result",
+            [
+                ("token_cache_lookups_total", {"result": "hit"}, stats["hits"]),
+                ("token_cache_lookups_total", {"result": "miss"}, stats["misses"]),
+            ],
+        )
+        yield MetricFamily(
+            "token_cache_evictions_total",
+            "counter",
+            "Verified tokens dropped to stay within the size limit",
+            [("token_cache_evictions_total", {}, stats["evictions"])],
+        )
+        yield MetricFamily(
+            "token_cache_entries",
+            "gauge",
+            "Verified tokens held in process memory",
+            [("token_cache_entries", {}, stats["size"])],
+        )
+
+
+class _CachedResponse(transport.Response):
+    def __init__(self, status: int, headers: Dict, data: bytes, expires_at: float):
+        self._status = status
+        self._headers = headers
+        self._data = data
+        self.expires_at = expires_at
+
+    @property
+    def status(self):
+        return self._status
+
+    @property
+    def headers(self):
+        return self._headers
+
+    @property
+    def data(self):
+        return self._data
+
+
+class SigningKeyStore(transport.Request):
+    """google-auth transport that keeps Google's public signing keys in memory.
+
+    Certificates are re-fetched on a background timer ``refresh_margin``
+    seconds before their ``Cache-Control`` max-age runs out, so token
+    verification does not wait on a key download once the store is warm.
+    """
+
+    def __init__(
+        self,
+        delegate: Optional[transport.Request] = None,
+        refresh_margin: int = 300,
+        timeout: int = 10,
+    ):
+        self._delegate = delegate
+        self._refresh_margin = refresh_margin
+        self._timeout = timeout
+        self._entries: Dict[str, _CachedResponse] = {}
+        self._timers: Dict[str, threading.Timer] = {}
+        self._lock = threading.Lock()
+        self.fetches = 0
+
+    def install(self, app=None) -> None:
+        """Route the Admin SDK's certificate fetches for ``app`` through this store."""
+        from firebase_admin import auth
+
+        # The SDK has no public hook for its certificate transport.
+        verifier = auth._get_client(app)._token_verifier
+        if verifier.request is not self:
+            self._delegate = verifier.request
+            verifier.request = self
+
+    def __call__(
+        self, url, method="GET", body=None, headers=None, timeout=None, **kwargs
+    ):
+        if method != "GET" or body is not None:
+            return self._get_delegate()(
+                url,
+                method=method,
+                body=body,
+                headers=headers,
+                timeout=timeout,
+                **kwargs
+            )
+        entry = self._entries.get(url)
+        if entry is not None and entry.expires_at > time.time():
+            return entry
+        return self._fetch(url)
+
+    def close(self) -> None:
+        with self._lock:
+            for timer in self._timers.values():
+                timer.cancel()
+            self._timers.clear()
+
+    def _get_delegate(self) -> transport.Request:
+        if self._delegate is None:
+            from google.auth.transport import requests as transport_requests
+
+            self._delegate = transport_requests.Request()
+        return self._delegate
+
+    def _fetch(self, url: str):
+        response = self._get_delegate()(url, method="GET", timeout=self._timeout)
+        if response.status != 200:
+            return response
+
+        match = _MAX_AGE.search(response.headers.get("cache-control", ""))
+        max_age = int(match.group(1)) if match else _DEFAULT_MAX_AGE
+        entry = _CachedResponse(
+            response.status,
+            dict(response.headers),
+            response.data,
+            time.time() + max_age,
+        )
+        with self._lock:
+            self._entries[url] = entry
+            self.fetches += 1
+        self._schedule_refresh(url, max(max_age - self._refresh_margin, 1))
+        return entry
+
+    def _refresh(self, url: str) -> None:
+        try:
+            self._fetch(url)
+        except Exception:
+            # Keep serving the current keys and try again shortly
+            self._schedule_refresh(url, _RETRY_DELAY)
+
+    def _schedule_refresh(self, url: str, delay: float) -> None:
+        timer = threading.Timer(delay, self._refresh, args=(url,))
+        timer.daemon = True
+        with self._lock:
+            previous = self._timers.pop(url, None)
+            if previous is not None:
+                previous.cancel()
+            self._timers[url] = timer
+        timer.start()
+
+
+@lru_cache()
+def get_token_cache() -> VerifiedTokenCache:
+    settings = get_settings()
+    cache = VerifiedTokenCache(maxsize=settings.token_cache_size)
+    register_collector(cache.collect)
+    return cache
+
+
+@lru_cache()
+def get_signing_key_store() -> SigningKeyStore:
+    settings = get_settings()
+    return SigningKeyStore(refresh_margin=settings.signing_key_refresh_margin)
@@ -0,0 +1,120 @@
+import asyncio
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, NamedTuple
+
+from app.config import get_settings
+from app.services.generations import Generations
+
+
+class _Entry(NamedTuple):
+    value: Any
+    fresh_until: float
+    stale_until: float
+
+
+class UserCache:
+    """Read-through LRU of mapped user responses keyed by uid.
+
+    Entries are served as-is for ``ttl`` seconds. Until ``stale_ttl`` they
+    are still returned immediately while one background task reloads them
+    (stale-while-revalidate). Writes must call ``put`` or ``invalidate``.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 10000,
+        ttl: float = 30,
+        stale_ttl: float = 300,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._stale_ttl = max(stale_ttl, ttl)
+        self._clock = clock
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._refreshing: Dict[str, asyncio.Task] = {}
+        # Bumped by writes so loads of the key started earlier cannot undo them
+        self._generations = Generations()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    async def get_or_load(self, uid: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        entry = self._entries.get(uid)
+        now = self._clock()
+        if entry is not None and now < entry.fresh_until:
+            self._entries.move_to_end(uid)
+            self.hits += 1
+            return entry.value
+        if entry is not None and now < entry.stale_until:
+            self._entries.move_to_end(uid)
+            self.stale_hits += 1
+            if uid not in self._refreshing:
+                self._refreshing[uid] = asyncio.ensure_future(
+                    self._refresh(uid, loader)
+                )
+            return entry.value
+
+        self.misses += 1
+        generation = self._generations.start(uid)
+        try:
+            value = await loader()
+            if self._generations.current(uid, generation):
+                self._store(uid, value)
+        finally:
+            self._generations.finish(uid)
+        return value
+
+    def put(self, uid: str, value: Any) -> None:
+        self._generations.bump(uid)
+        self._store(uid, value)
+
+    def invalidate(self, uid: str) -> None:
+        self._generations.bump(uid)
+        self._entries.pop(uid, None)
+
+    def clear(self) -> None:
+        self._generations.bump_all()
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "refreshing": len(self._refreshing),
+            "size": len(self._entries),
+            "maxsize": self._maxsize,
+        }
+
+    async def _refresh(self, uid: str, loader: Callable[[], Awaitable[Any]]) -> None:
+        generation = self._generations.start(uid)
+        try:
+            value = await loader()
+            if self._generations.current(uid, generation):
+                self._store(uid, value)
+        except Exception:
+            # Keep serving the stale entry until it expires
+            pass
+        finally:
+            self._generations.finish(uid)
+            self._refreshing.pop(uid, None)
+
+    def _store(self, uid: str, value: Any) -> None:
+        now = self._clock()
+        self._entries[uid] = _Entry(value, now + self._ttl, now + self._stale_ttl)
+        self._entries.move_to_end(uid)
+        while len(self._entries) > self._maxsize:
+            self._entries.popitem(last=False)
+
+
+@lru_cache()
+def get_user_cache() -> UserCache:
+    settings = get_settings()
+    return UserCache(
+        maxsize=settings.user_cache_size,
+        ttl=settings.user_cache_ttl,
+        stale_ttl=settings.user_cache_stale_ttl,
+    )
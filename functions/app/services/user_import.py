@@ -0,0 +1,259 @@
+"""Bulk account creation with ``auth.import_users``.
+
+Rows are validated one by one, then split into chunks of up to 1,000. Each
+chunk looks up which of its uids and emails are taken, since the backend
+would silently overwrite or duplicate them, and imports the rest in one
+Admin SDK call with the role claims already on every record. Chunks run in
+parallel, but one import never has more than ``concurrency`` SDK calls in
+flight, so sign-ins keep their share of the gateway.
+
+Imports run inside the request, so they are bounded in time: chunks that
+have not reached their import call ``deadline`` seconds in are reported as
+failed instead of started, and the report still comes back before the
+front end gives up on the request.
+"""
+
+import asyncio
+import secrets
+import time
+from functools import lru_cache
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from app.config import get_settings
+from app.models.user import PasswordHashConfig, UserImport
+from app.services.bulk_import import Row, validate_rows
+from app.services.firebase_service import FirebaseAuthService, get_firebase_service
+from app.services.roles import ROLE_PERMISSIONS, claims_for_roles
+from app.services.user_loader import MAX_BATCH_SIZE
+from fastapi import HTTPException
+
+# auth.import_users takes at most this many accounts per call
+MAX_IMPORT_BATCH_SIZE = 1000
+
+
+class UserImportError(ValueError):
+    pass
+
+
+class UserImportTooLargeError(UserImportError):
+    pass
+
+
+def new_uid() -> str:
+    """A random uid as long as the ones Firebase Auth assigns"""
+    return secrets.token_hex(14)
+
+
+class _Pending(NamedTuple):
+    index: int
+    record: Any
+    # Generated uids are never looked up
+    uid_given: bool
+
+
+class UserImportService:
+    def __init__(
+        self,
+        firebase: FirebaseAuthService,
+        chunk_size: int = MAX_IMPORT_BATCH_SIZE,
+        concurrency: int = 4,
+        max_rows: int = 10000,
+        timeout: float = 15.0,
+        deadline: float = 30.0,
+    ):
+        self.firebase = firebase
+        self.chunk_size = max(1, min(chunk_size, MAX_IMPORT_BATCH_SIZE))
+        self.concurrency = max(1, concurrency)
+        self.max_rows = max_rows
+        self.timeout = timeout
+        self.deadline = deadline
+
+    async def run(
+        self, users: List[Dict[str, Any]], hash: Optional[PasswordHashConfig] = None
+    ) -> Dict[str, Any]:
+        """Import ``users``; imported uids and row errors are reported by index"""
+        from firebase_admin import auth
+
+        if len(users) > self.max_rows:
+            raise UserImportTooLargeError(
+                f"At most {self.max_rows} users per import, got {len(users)}"
+            )
+        hash_alg = None
+        if hash is not None:
+            factory = getattr(auth.UserImportHash, hash.algorithm)
+            try:
+                hash_alg = factory(**hash.parameters())
+            except ValueError as e:
+                raise UserImportError(f"Invalid hash settings: {e}")
+
+        started = time.monotonic()
+        errors: Dict[int, Tuple[Optional[str], str]] = {}
+        pending = self._records(auth, users, errors)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        deadline = started + self.deadline
+        results = await asyncio.gather(
+            *(
+                self._import(
+                    pending[i : i + self.chunk_size],
+                    hash_alg,
+                    semaphore,
+                    deadline,
+                    errors,
+                )
+                for i in range(0, len(pending), self.chunk_size)
+            )
+        )
+        imported = sorted(pair for result in results for pair in result)
+        return {
+            "rows": len(users),
+            "imported": len(imported),
+            "failed": len(errors),
+            "users": [{"index": index, "uid": uid} for index, uid in imported],
+            "errors": [
+                {"index": index, "email": email, "error": error}
+                for index, (email, error) in sorted(errors.items())
+            ],
+            "seconds": round(time.monotonic() - started, 3),
+        }
+
+    def _records(
+        self,
+        auth,
+        users: List[Dict[str, Any]],
+        errors: Dict[int, Tuple[Optional[str], str]],
+    ) -> List[_Pending]:
+        rows = [Row(index + 1, 0, data) for index, data in enumerate(users)]
+        valid, invalid = validate_rows(UserImport, rows)
+        for row, error in invalid:
+            errors[row.number - 1] = (row.data.get("email"), error)
+
+        pending = []
+        uids: Set[str] = set()
+        emails: Set[str] = set()
+        for row, user in valid:
+            index = row.number - 1
+            unknown = [role for role in user.roles if role not in ROLE_PERMISSIONS]
+            if unknown:
+                errors[index] = (user.email, f"Unknown roles: {', '.join(unknown)}")
+                continue
+            if user.email.lower() in emails:
+                errors[index] = (user.email, "Duplicate email in this import")
+                continue
+            if user.uid in uids:
+                errors[index] = (user.email, "Duplicate uid in this import")
+                continue
+            try:
+                record = auth.ImportUserRecord(
+                    user.uid or new_uid(),
+                    email=user.email,
+                    email_verified=user.email_verified,
+                    display_name=user.display_name,
+                    photo_url=user.photo_url,
+                    disabled=user.disabled,
+                    custom_claims=claims_for_roles(user.roles),
+                    password_hash=user.password_hash,
+                    password_salt=user.password_salt,
+                )
+            except ValueError as e:
+                errors[index] = (user.email, str(e))
+                continue
+            emails.add(user.email.lower())
+            uids.add(record.uid)
+            pending.append(_Pending(index, record, user.uid is not None))
+        return pending
+
+    async def _taken(
+        self, chunk: List[_Pending], semaphore: asyncio.Semaphore
+    ) -> Tuple[Set[str], Set[str]]:
+        """The uids and emails in ``chunk`` that already have an account"""
+        keys = [("uid", p.record.uid) for p in chunk if p.uid_given]
+        keys.extend(("email", p.record.email) for p in chunk)
+
+        async def lookup(batch):
+            async with semaphore:
+                return await self.firebase.find_users(
+                    uids=[value for kind, value in batch if kind == "uid"],
+                    emails=[value for kind, value in batch if kind == "email"],
+                )
+
+        found = await asyncio.gather(
+            *(
+                lookup(keys[i : i + MAX_BATCH_SIZE])
+                for i in range(0, len(keys), MAX_BATCH_SIZE)
+            )
+        )
+        users = [user for batch in found for user in batch]
+        return (
+            {user.uid for user in users},
+            {user.email.lower() for user in users if user.email},
+        )
+
+    async def _import(
+        self,
+        chunk: List[_Pending],
+        hash_alg,
+        semaphore: asyncio.Semaphore,
+        deadline: float,
+        errors: Dict[int, Tuple[Optional[str], str]],
+    ) -> List[Tuple[int, str]]:
+        if time.monotonic() >= deadline:
+            return self._out_of_time(chunk, errors)
+        try:
+            uids, emails = await self._taken(chunk, semaphore)
+            free = []
+            for pending in chunk:
+                email = pending.record.email
+                if pending.uid_given and pending.record.uid in uids:
+                    errors[pending.index] = (email, "uid already exists")
+                elif email.lower() in emails:
+                    errors[pending.index] = (email, "Email already registered")
+                else:
+                    free.append(pending)
+            chunk = free
+            if not chunk:
+                return []
+            async with semaphore:
+                if time.monotonic() >= deadline:
+                    return self._out_of_time(chunk, errors)
+                result = await self.firebase.import_users(
+                    [pending.record for pending in chunk], hash_alg, self.timeout
+                )
+        except HTTPException as e:
+            # A timed out call may still have created some of these accounts;
+            # importing the rows again reports them as taken
+            for pending in chunk:
+                errors[pending.index] = (pending.record.email, e.detail)
+            return []
+
+        failed = {error.index: error.reason for error in result.errors}
+        imported = []
+        for position, pending in enumerate(chunk):
+            if position in failed:
+                errors[pending.index] = (pending.record.email, failed[position])
+            else:
+                imported.append((pending.index, pending.record.uid))
+        return imported
+
+    @staticmethod
+    def _out_of_time(
+        chunk: List[_Pending], errors: Dict[int, Tuple[Optional[str], str]]
+    ) -> List[Tuple[int, str]]:
+        for pending in chunk:
+            errors[pending.index] = (
+                pending.record.email,
+                "Not imported: the import ran out of time, retry this row",
+            )
+        return []
+
+
+@lru_cache()
+def get_user_import_service() -> UserImportService:
+    settings = get_settings()
+    return UserImportService(
+        get_firebase_service(),
+        chunk_size=settings.user_import_chunk_size,
+        concurrency=settings.user_import_concurrency,
+        max_rows=settings.user_import_max_rows,
+        timeout=settings.user_import_timeout,
+        deadline=settings.user_import_deadline,
+    )
@@ -0,0 +1,67 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+# Identifier limit of auth.get_users
+MAX_BATCH_SIZE = 100
+
+
+class UserLoader:
+    """Coalesces single-uid lookups into batched calls (DataLoader style).
+
+    Every ``load`` made before the event loop gets back to the scheduled
+    dispatch joins the same batch, and each uid is fetched at most once
+    per loader. Create one loader per request, or pass ``memoize=False``
+    for a long-lived loader that only batches concurrent lookups.
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[List[str]], Awaitable[Dict[str, Any]]],
+        max_batch_size: int = MAX_BATCH_SIZE,
+        memoize: bool = True,
+    ):
+        self._batch_fn = batch_fn
+        self._max_batch_size = max_batch_size
+        self._memoize = memoize
+        self._futures: Dict[str, asyncio.Future] = {}
+        self._queue: List[str] = []
+        self._tasks: Set[asyncio.Task] = set()
+        self.batches = 0
+
+    async def load(self, uid: str) -> Optional[Any]:
+        future = self._futures.get(uid)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self._futures[uid] = loop.create_future()
+            self._queue.append(uid)
+            if len(self._queue) == 1:
+                loop.call_soon(self._dispatch)
+        # Shielded so one cancelled caller does not fail the others
+        return await asyncio.shield(future)
+
+    async def load_many(self, uids: List[str]) -> List[Optional[Any]]:
+        return list(await asyncio.gather(*(self.load(uid) for uid in uids)))
+
+    def _dispatch(self) -> None:
+        queue, self._queue = self._queue, []
+        for i in range(0, len(queue), self._max_batch_size):
+            batch = queue[i : i + self._max_batch_size]
+            task = asyncio.ensure_future(self._run_batch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, uids: List[str]) -> None:
+        self.batches += 1
+        try:
+            results = await self._batch_fn(uids)
+        except Exception as e:
+            for uid in uids:
+                # Forget failures so a later load can retry
+                future = self._futures.pop(uid)
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for uid in uids:
+            future = self._futures[uid] if self._memoize else self._futures.pop(uid)
+            if not future.done():
+                future.set_result(results.get(uid))
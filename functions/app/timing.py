@@ -0,0 +1,167 @@
+import asyncio
+import random
+import time
+from contextvars import ContextVar
+from functools import wraps
+from typing import Callable, Dict, Optional
+
+from app.metrics import Histogram, register_collector
+from fastapi.routing import APIRoute
+
+PHASES = Histogram(
+    "http_request_phase_seconds",
+    "Time spent in each phase of sampled requests",
+    ("route", "method", "phase"),
+)
+register_collector(PHASES.collect)
+
+# Phase name -> seconds, for the request being handled; None if not sampled
+_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar(
+    "request_timings", default=None
+)
+
+
+class _Phase:
+    __slots__ = ("_name", "_timings", "_start")
+
+    def __init__(self, name: str, timings: Dict[str, float]):
+        self._name = name
+        self._timings = timings
+
+    def __enter__(self) -> None:
+        self._start = time.perf_counter()
+
+    def __exit__(self, *exc_info) -> None:
+        elapsed = time.perf_counter() - self._start
+        self._timings[self._name] = self._timings.get(self._name, 0.0) + elapsed
+
+
+class _NoPhase:
+    def __enter__(self) -> None:
+        pass
+
+    def __exit__(self, *exc_info) -> None:
+        pass
+
+
+_NO_PHASE = _NoPhase()
+
+
+def phase(name: str):
+    """Add the time spent in a ``with`` block to the current request's ``name``.
+
+    Repeated phases accumulate. Outside a sampled request it does nothing.
+    """
+    timings = _timings.get()
+    return _NO_PHASE if timings is None else _Phase(name, timings)
+
+
+def timed(name: str):
+    """Time every call of an async function as phase ``name``"""
+
+    def decorate(fn):
+        @wraps(fn)
+        async def wrapper(*args, **kwargs):
+            with phase(name):
+                return await fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+class TimedRoute(APIRoute):
+    """Route class that times the endpoint function as the ``handler`` phase"""
+
+    def get_route_handler(self) -> Callable:
+        call = self.dependant.call
+        if asyncio.iscoroutinefunction(call):
+            self.dependant.call = timed("handler")(call)
+        return super().get_route_handler()
+
+
+def server_timing(timings: Dict[str, float]) -> bytes:
+    return ", ".join(
+        f"{name};dur={seconds * 1000:.2f}" for name, seconds in timings.items()
+    ).encode("latin-1")
+
+
+class TimingMiddleware:
+    """Times a sample of requests phase by phase.
+
+    Sampled responses carry a ``Server-Timing`` header, with ``app`` as the
+    time to the first response byte. After the response, every phase plus
+    ``total`` is recorded in ``http_request_phase_seconds`` per route
+    template. Phases nest (``auth`` includes its ``admin_sdk`` call), so they
+    do not add up to the total.
+    """
+
+    def __init__(
+        self,
+        app,
+        sample_rate: Optional[float] = None,
+        histogram: Histogram = PHASES,
+        sample: Callable[[], float] = random.random,
+    ):
+        self.app = app
+        self._sample_rate = sample_rate
+        self._histogram = histogram
+        self._sample = sample
+        self._routes: Dict[Callable, str] = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._sampled():
+            await self.app(scope, receive, send)
+            return
+
+        timings: Dict[str, float] = {}
+        token = _timings.set(timings)
+        start = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                timings["app"] = time.perf_counter() - start
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", server_timing(timings)))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _timings.reset(token)
+            timings["total"] = time.perf_counter() - start
+            route = self._route(scope)
+            for name, seconds in list(timings.items()):
+                self._histogram.observe(seconds, route, scope["method"], name)
+
+    def _sampled(self) -> bool:
+        if self._sample_rate is None:
+            from app.config import get_settings
+
+            self._sample_rate = get_settings().timing_sample_rate
+        if self._sample_rate >= 1:
+            return True
+        return self._sample_rate > 0 and self._sample() < self._sample_rate
+
+    def _route(self, scope) -> str:
+        return route_template(scope, self._routes)
+
+
+def route_template(scope, cache: Dict[Callable, str]) -> str:
+    """The matched route's path template, which keeps label values bounded"""
+    endpoint = scope.get("endpoint")
+    if endpoint is None:
+        return "unmatched"
+    route = cache.get(endpoint)
+    if route is None:
+        route = next(
+            (
+                r.path
+                for r in scope["app"].routes
+                if getattr(r, "endpoint", None) is endpoint
+            ),
+            "unmatched",
+        )
+        cache[endpoint] = route
+    return route
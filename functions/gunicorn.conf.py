@@ -0,0 +1,30 @@
+"""Gunicorn settings for serving the API with several uvicorn workers.
+
+Usage (from functions/): gunicorn -c gunicorn.conf.py app.main:app
+
+With AI_PRELOAD=true the master loads the AI model before forking, so every
+worker starts with the weights already in memory and shares their pages
+copy-on-write instead of loading a private copy.
+"""
+
+import os
+import time
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8080')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "uvicorn.workers.UvicornWorker"
+# Import the app once in the master; workers inherit it
+preload_app = True
+
+
+def on_starting(server):
+    from app.config import get_settings
+
+    if get_settings().ai_preload:
+        from app.services.ai_service import preload_ai_model
+
+        started = time.perf_counter()
+        preload_ai_model()
+        server.log.info(
+            "Preloaded the AI model in %.1fs", time.perf_counter() - started
+        )
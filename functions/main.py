@@ -2,74 +2,42 @@
 # To get started, simply uncomment the below code or create your own.
 # Deploy with `firebase deploy`
 
-import os
+import asyncio
 
-import firebase_functions
 import uvicorn
 from dotenv import load_dotenv
-from fastapi import FastAPI, Request
-from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from firebase_functions import https_fn, tasks_fn
+from firebase_functions.options import MemoryOption, RateLimits, RetryConfig
 
 # Load environment variables
 load_dotenv()
 
-# Initialize FastAPI app
-app = FastAPI(
-    title="RiderCritic API",
-    description="API for RiderCritic application",
-    version="1.0.0",
-)
-
-# Configure CORS
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # In production, replace with specific origins
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-
-@app.get("/")
-async def root():
-    return {"app_name": "RiderCritic", "version": "1.0.0", "status": "healthy"}
+from app.asgi_bridge import ASGIBridge  # noqa: E402
+from app.main import app  # noqa: E402
+from app.services.bulk_import import get_import_service  # noqa: E402
 
-
-@app.get("/health")
-async def health_check():
-    return {"status": "healthy"}
+# One bridge per instance keeps the event loop and lifespan state warm
+bridge = ASGIBridge(app)
 
 
 # Firebase Functions HTTP trigger
-@firebase_functions.http_fn.on_request()
-def fastapi_app(
-    req: firebase_functions.http_fn.Request,
-) -> firebase_functions.http_fn.Response:
-    # Convert Firebase request to FastAPI request
-    scope = {
-        "type": "http",
-        "method": req.method,
-        "path": req.path,
-        "headers": dict(req.headers),
-        "query_string": req.query_string.encode(),
-        "client": (req.remote_addr, 0),
-        "server": (req.host, 80),
-    }
-
-    # Create FastAPI request
-    request = Request(scope=scope)
-    request._body = req.get_data()
-
-    # Get FastAPI response
-    response = app(request)
-
-    # Convert FastAPI response to Firebase response
-    return firebase_functions.http_fn.Response(
-        status_code=response.status_code,
-        headers=dict(response.headers),
-        body=response.body,
-    )
+@https_fn.on_request()
+def fastapi_app(req: https_fn.Request) -> https_fn.Response:
+    return bridge(req)
+
+
+# Bulk import jobs queued by /admin/import. A task that fails, or whose
+# instance goes away, is retried and carries on from the saved offset.
+@tasks_fn.on_task_dispatched(
+    retry_config=RetryConfig(max_attempts=5, min_backoff_seconds=60),
+    rate_limits=RateLimits(max_concurrent_dispatches=2),
+    timeout_sec=1800,
+    memory=MemoryOption.GB_1,
+)
+def import_worker(req: https_fn.CallableRequest) -> None:
+    job = get_import_service().run(req.data["jobId"])
+    # On the bridge's loop, with the same clients and caches as the API
+    asyncio.run_coroutine_threadsafe(job, bridge.loop).result()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,228 @@
+"""Firebase stand-ins for scripts/bench_load.py, with injected latency and errors.
+
+``install`` must run before ``app.main`` is imported: it replaces the Admin
+SDK and Firestore client getters in ``app.firebase_init``, so every service
+built afterwards talks to the fakes while the rest of the stack (gateway,
+caches, routers, middleware) is the real code.
+"""
+
+import asyncio
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List, NamedTuple
+
+ROOT = Path(__file__).resolve().parent.parent
+BRANDS = ["yamaha", "honda", "suzuki", "bajaj", "tvs", "hero", "runner", "lifan"]
+TYPES = ["commuter", "sport", "naked", "cruiser", "scooter"]
+
+# Settings the app requires; the values are never sent anywhere
+BENCH_ENV = {
+    "LAZY_INIT": "true",
+    "FIREBASE_PROJECT_ID": "bench",
+    "FIREBASE_API_KEY": "bench",
+    "FIREBASE_AUTH_DOMAIN": "bench.example.com",
+    "FIREBASE_STORAGE_BUCKET": "bench",
+}
+
+
+class InjectedError(RuntimeError):
+    pass
+
+
+class LatencyProfile(NamedTuple):
+    latency_ms: float = 0
+    jitter_ms: float = 0
+    error_rate: float = 0
+
+    def delay(self, rng: random.Random) -> float:
+        """Seconds to wait; raises InjectedError at ``error_rate``"""
+        if self.error_rate and rng.random() < self.error_rate:
+            raise InjectedError("injected backend failure")
+        if not self.latency_ms and not self.jitter_ms:
+            return 0.0
+        return max(0.0, rng.gauss(self.latency_ms, self.jitter_ms)) / 1000
+
+
+def token_for(uid: str) -> str:
+    return f"bench-token-{uid}"
+
+
+class FakeAdminAuth:
+    """The parts of ``firebase_admin.auth`` the services call.
+
+    Calls block the calling thread like the real SDK's HTTP round trips,
+    so the gateway's thread pool sees realistic occupancy.
+    """
+
+    def __init__(self, users: Dict[str, dict], profile: LatencyProfile, seed: int):
+        from firebase_admin import auth
+
+        self._auth = auth
+        self._users = users
+        self._profile = profile
+        self._rng = random.Random(seed)
+        self._emails = {data.get("email"): uid for uid, data in users.items()}
+        self.calls = 0
+        # Extra time an import_users call takes per account
+        self.import_ms_per_user = 0.0
+        self.UserNotFoundError = auth.UserNotFoundError
+        self.EmailAlreadyExistsError = auth.EmailAlreadyExistsError
+        self.UidIdentifier = auth.UidIdentifier
+        self.EmailIdentifier = auth.EmailIdentifier
+
+    def _round_trip(self) -> None:
+        self.calls += 1
+        delay = self._profile.delay(self._rng)
+        if delay:
+            time.sleep(delay)
+
+    def _record(self, uid: str):
+        if uid not in self._users:
+            raise self.UserNotFoundError(f"No user record found for {uid}")
+        return self._auth.UserRecord(self._users[uid])
+
+    def verify_id_token(self, token: str) -> dict:
+        self._round_trip()
+        uid = token.rpartition("-")[2]
+        if not token.startswith("bench-token-") or uid not in self._users:
+            raise ValueError("Invalid token")
+        return {"uid": uid, "roles": ["user"], "exp": time.time() + 3600}
+
+    def get_user(self, uid: str):
+        self._round_trip()
+        return self._record(uid)
+
+    def get_users(self, identifiers: list):
+        self._round_trip()
+        found, missing = [], []
+        for identifier in identifiers:
+            uid = getattr(identifier, "uid", None)
+            if uid is None:
+                uid = self._emails.get(identifier.email)
+            if uid in self._users:
+                found.append(self._record(uid))
+            else:
+                missing.append(identifier)
+        return self._auth.GetUsersResult(found, missing)
+
+    def get_user_by_email(self, email: str):
+        self._round_trip()
+        uid = email.partition("@")[0]
+        return self._record(uid)
+
+    def create_custom_token(self, uid: str) -> bytes:
+        self._round_trip()
+        return f"custom-{uid}".encode()
+
+    def create_user(self, email: str, password: str, **kwargs):
+        self._round_trip()
+        if email in self._emails:
+            raise self.EmailAlreadyExistsError("email exists", None, None)
+        uid = f"created-{len(self._users)}"
+        self._users[uid] = {"localId": uid, "email": email}
+        self._emails[email] = uid
+        return self._record(uid)
+
+    def import_users(self, users: list, hash_alg=None):
+        self._round_trip()
+        time.sleep(len(users) * self.import_ms_per_user / 1000)
+        for user in users:
+            self._users[user.uid] = user.to_dict()
+            self._emails[user.email] = user.uid
+        return self._auth.UserImportResult({}, len(users))
+
+
+class SlowFirestore:
+    """``rpc_hook`` for the test FakeFirestore that sleeps and fails on cue"""
+
+    def __init__(self, profile: LatencyProfile, seed: int):
+        self._profile = profile
+        self._rng = random.Random(seed)
+        self.calls = 0
+
+    async def __call__(self, kind: str) -> None:
+        self.calls += 1
+        delay = self._profile.delay(self._rng)
+        if delay:
+            await asyncio.sleep(delay)
+
+
+def seed_data(firestore, bikes: int, reviews_per_bike: int, users: int) -> dict:
+    rng = random.Random(7)
+    now = datetime.now(timezone.utc)
+    accounts = {
+        f"u{i:05d}": {
+            "localId": f"u{i:05d}",
+            "email": f"u{i:05d}@example.com",
+            "displayName": f"Rider {i}",
+            "emailVerified": True,
+        }
+        for i in range(users)
+    }
+    for i in range(bikes):
+        ratings = [rng.randint(1, 5) for _ in range(reviews_per_bike)]
+        bike_id = f"bike-{i:05d}"
+        firestore.data["bikes"][bike_id] = {
+            "name": f"Bike {i}",
+            "brandId": BRANDS[i % len(BRANDS)],
+            "typeId": TYPES[i % len(TYPES)],
+            "price": 100000 + rng.randint(0, 400) * 1000,
+            "modelYear": 2020 + i % 5,
+            "specs": {"engine": f"{100 + i % 300}cc"},
+            "ratingStats": {
+                "count": len(ratings),
+                "sum": sum(ratings),
+                "histogram": {str(s): ratings.count(s) for s in range(1, 6)},
+                "weightedSum": float(sum(ratings)),
+                "weightTotal": float(len(ratings)),
+            },
+            "createdAt": now,
+            "updatedAt": now,
+        }
+        for j, rating in enumerate(ratings):
+            firestore.data["reviews"][f"{bike_id}-r{j}"] = {
+                "bikeId": bike_id,
+                "brandId": BRANDS[i % len(BRANDS)],
+                "userId": f"u{rng.randrange(users):05d}",
+                "rating": rating,
+                "title": None,
+                "content": "Smooth ride, good mileage. " * 4,
+                "createdAt": now - timedelta(days=j),
+                "updatedAt": now - timedelta(days=j),
+            }
+    return accounts
+
+
+def install(
+    auth_profile: LatencyProfile,
+    firestore_profile: LatencyProfile,
+    bikes: int = 500,
+    reviews_per_bike: int = 20,
+    users: int = 1000,
+    rate_limit: bool = False,
+    seed: int = 1,
+) -> List[str]:
+    """Point the app at the fakes; returns the seeded user ids"""
+    for name, value in BENCH_ENV.items():
+        os.environ.setdefault(name, value)
+    os.environ["RATE_LIMIT_ENABLED"] = "true" if rate_limit else "false"
+    sys.path.insert(0, str(ROOT / "functions"))
+    sys.path.insert(0, str(ROOT / "tests"))
+
+    from app import firebase_init
+    from fakes import FakeFirestore
+
+    if "app.main" in sys.modules:
+        raise RuntimeError("install() must run before app.main is imported")
+
+    firestore = FakeFirestore()
+    firestore.rpc_hook = SlowFirestore(firestore_profile, seed)
+    accounts = seed_data(firestore, bikes, reviews_per_bike, users)
+    admin_auth = FakeAdminAuth(accounts, auth_profile, seed)
+    firebase_init.get_auth = lambda: admin_auth
+    firebase_init.get_firestore_client = lambda: firestore
+    return sorted(accounts)
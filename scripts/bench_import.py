@@ -0,0 +1,129 @@
+"""Bulk import throughput in rows/s per chunk size and commit concurrency.
+
+Generates --rows bike rows as CSV or NDJSON and imports them with
+ImportService into the in-memory Firestore and Storage stand-ins from
+tests/fakes.py. Firestore commits wait --commit-latency ms (plus
+--commit-jitter), like round trips to the real backend. Reports rows/s
+from the job document and the largest number of batches in flight. --dedup
+also runs every row through the near-duplicate index.
+
+Usage:
+  python scripts/bench_import.py [--rows 20000] [--format csv|ndjson]
+      [--chunk-sizes 100,500] [--concurrency 1,4,8]
+      [--commit-latency 40] [--commit-jitter 10] [--dedup] [--json]
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+ROOT = SCRIPTS_DIR.parent
+BRANDS = ["yamaha", "honda", "suzuki", "bajaj", "tvs", "hero", "runner", "lifan"]
+
+
+def make_upload(rows: int, format: str) -> bytes:
+    lines = []
+    if format == "csv":
+        lines.append("name,brand_id,price,model_year,specs.engine")
+    for i in range(rows):
+        row = {
+            "name": f"Bike {i} {BRANDS[i % len(BRANDS)].title()} {i * 7919 % 100003}",
+            "brand_id": BRANDS[i % len(BRANDS)],
+            "price": 100000 + i % 400 * 1000,
+            "model_year": 2020 + i % 5,
+            "specs.engine": f"{100 + i % 300}cc",
+        }
+        if format == "csv":
+            lines.append(",".join(str(value) for value in row.values()))
+        else:
+            row["specs"] = {"engine": row.pop("specs.engine")}
+            lines.append(json.dumps(row))
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+async def run(upload: bytes, chunk_size: int, concurrency: int, options) -> dict:
+    from app.services.bulk_import import ImportService
+    from app.services.near_duplicates import DuplicateDetector
+    from bench_backend import LatencyProfile, SlowFirestore
+    from fakes import FakeBucket, FakeFirestore
+
+    firestore = FakeFirestore()
+    slow = SlowFirestore(
+        LatencyProfile(options.commit_latency, options.commit_jitter), seed=1
+    )
+
+    async def commits_only(kind: str) -> None:
+        if kind == "commit":
+            await slow(kind)
+
+    firestore.rpc_hook = commits_only
+
+    async def body():
+        for start in range(0, len(upload), 64 * 1024):
+            yield upload[start : start + 64 * 1024]
+
+    async def no_queue(job_id: str) -> None:
+        pass
+
+    imports = ImportService(
+        firestore,
+        bucket=FakeBucket(),
+        queue=no_queue,
+        chunk_size=chunk_size,
+        concurrency=concurrency,
+        duplicates=DuplicateDetector(firestore) if options.dedup else None,
+    )
+    job = await imports.start("bikes", options.format, body())
+    # What the import worker function does with the queued task
+    await imports.run(job["id"])
+    job = await imports.get(job["id"])
+    if job["status"] != "succeeded":
+        raise RuntimeError(f"import {job['status']}: {job.get('error')}")
+    return {
+        "rows": job["rows"],
+        "imported": job["imported"],
+        "rows_per_second": job["rowsPerSecond"],
+        "batches": len(firestore.commits),
+        "max_in_flight": firestore.max_in_flight_batches,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--format", choices=("csv", "ndjson"), default="csv")
+    parser.add_argument("--chunk-sizes", default="100,500")
+    parser.add_argument("--concurrency", default="1,4,8")
+    parser.add_argument("--commit-latency", type=float, default=40, help="ms")
+    parser.add_argument("--commit-jitter", type=float, default=10, help="ms")
+    parser.add_argument("--dedup", action="store_true")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    options = parser.parse_args()
+    sys.path.insert(0, str(ROOT / "functions"))
+    sys.path.insert(0, str(ROOT / "tests"))
+    sys.path.insert(0, str(SCRIPTS_DIR))
+
+    upload = make_upload(options.rows, options.format)
+    results = {}
+    if not options.json:
+        header = ("chunk", "conc", "rows", "rows/s", "batches", "in flight")
+        print("{:>6} {:>5} {:>8} {:>10} {:>8} {:>10}".format(*header))
+    for chunk_size in (int(size) for size in options.chunk_sizes.split(",")):
+        for concurrency in (int(c) for c in options.concurrency.split(",")):
+            result = asyncio.run(run(upload, chunk_size, concurrency, options))
+            results[f"{chunk_size}x{concurrency}"] = result
+            if not options.json:
+                print(
+                    f"{chunk_size:>6} {concurrency:>5} {result['rows']:>8} "
+                    f"{result['rows_per_second']:>10.1f} {result['batches']:>8} "
+                    f"{result['max_in_flight']:>10}"
+                )
+    if options.json:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
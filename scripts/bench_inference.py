@@ -0,0 +1,145 @@
+"""Throughput and latency of the batching inference engine per max batch size.
+
+Closed-loop clients submit prompts to a BatchingEngine for each
+--batch-sizes value and report req/s, p50/p95/p99 latency and the mean
+batch actually formed. --repeat sends that share of prompts twice to show
+the prompt cache. Everything is local: --model tiny-t5 builds a random
+two-layer T5 (needs torch and transformers, no download), --model synthetic
+stands in with a model whose calls cost --base-ms plus --per-prompt-ms per
+prompt and release the GIL like torch does.
+
+Usage:
+  python scripts/bench_inference.py [--model synthetic|tiny-t5]
+      [--batch-sizes 1,4,8,16] [--concurrency 32] [--requests 256]
+      [--max-wait 10] [--max-new-tokens 32] [--repeat 0] [--no-quantize]
+      [--json]
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+FUNCTIONS_DIR = Path(__file__).resolve().parent.parent / "functions"
+
+
+class SyntheticGenerator:
+    name = "synthetic"
+
+    def __init__(self, base_ms: float, per_prompt_ms: float):
+        self.base = base_ms / 1000
+        self.per_prompt = per_prompt_ms / 1000
+
+    def generate(self, prompts: List[str], max_new_tokens: int) -> List[str]:
+        time.sleep(self.base + self.per_prompt * len(prompts))
+        return [prompt[::-1] for prompt in prompts]
+
+
+def make_prompts(count: int, repeat: float, seed: int) -> List[str]:
+    rng = random.Random(seed)
+    prompts: List[str] = []
+    for i in range(count):
+        if prompts and rng.random() < repeat:
+            prompts.append(rng.choice(prompts))
+        else:
+            prompts.append(f"Write a Bangla motorcycle review.\nBike: Bike {i}")
+    return prompts
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+async def run(model, batch_size: int, prompts: List[str], options) -> dict:
+    from app.services.inference import BatchingEngine
+    from app.services.tiered_cache import TieredCache
+
+    engine = BatchingEngine(
+        model,
+        max_batch_size=batch_size,
+        max_wait=options.max_wait / 1000,
+        max_queue=len(prompts),
+        cache=TieredCache(),
+    )
+    queue = list(reversed(prompts))
+    latencies: List[float] = []
+
+    async def client() -> None:
+        while queue:
+            prompt = queue.pop()
+            start = time.perf_counter()
+            await engine.generate(prompt, options.max_new_tokens)
+            latencies.append(time.perf_counter() - start)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(options.concurrency)))
+    elapsed = time.perf_counter() - started
+    await engine.close()
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "mean_batch": round(engine.generated / max(engine.batches, 1), 2),
+        "model_calls": engine.batches,
+        "cache_hits": len(latencies) - engine.generated,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--model", choices=("synthetic", "tiny-t5"), default="synthetic"
+    )
+    parser.add_argument("--batch-sizes", default="1,4,8,16")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=256)
+    parser.add_argument("--max-wait", type=float, default=10, help="ms")
+    parser.add_argument("--max-new-tokens", type=int, default=32)
+    parser.add_argument("--repeat", type=float, default=0, help="0..1")
+    parser.add_argument("--base-ms", type=float, default=40, help="synthetic")
+    parser.add_argument("--per-prompt-ms", type=float, default=5, help="synthetic")
+    parser.add_argument("--no-quantize", action="store_true", help="tiny-t5")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    options = parser.parse_args()
+    sys.path.insert(0, str(FUNCTIONS_DIR))
+
+    if options.model == "tiny-t5":
+        from app.services.ai_service import TransformersGenerator
+
+        model = TransformersGenerator.tiny(quantize=not options.no_quantize)
+        model.generate(["warm up"], options.max_new_tokens)
+    else:
+        model = SyntheticGenerator(options.base_ms, options.per_prompt_ms)
+    prompts = make_prompts(options.requests, options.repeat, options.seed)
+
+    results = {}
+    if not options.json:
+        header = ("batch", "requests", "req/s", "p50 ms", "p95 ms", "p99 ms")
+        print("{:>5} {:>8} {:>8} {:>8} {:>8} {:>8}".format(*header), end="")
+        print(" {:>10} {:>6}".format("mean batch", "hits"))
+    for batch_size in (int(size) for size in options.batch_sizes.split(",")):
+        result = asyncio.run(run(model, batch_size, prompts, options))
+        results[str(batch_size)] = result
+        if not options.json:
+            print(
+                f"{batch_size:>5} {result['requests']:>8} {result['rps']:>8.1f} "
+                f"{result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f} "
+                f"{result['p99_ms']:>8.2f} {result['mean_batch']:>10.2f} "
+                f"{result['cache_hits']:>6}"
+            )
+    if options.json:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
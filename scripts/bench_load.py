@@ -0,0 +1,356 @@
+"""Load-test the API against Firebase stand-ins with injected latency and errors.
+
+Drives app.main:app in-process (ASGI transport) and/or over a real uvicorn
+socket served from a child process. For every route and concurrency level it
+runs closed-loop clients for --duration seconds and reports req/s and
+p50/p95/p99 latency. Caches are warmed first, so numbers are steady state.
+
+Firestore is the in-memory test fake, so query-heavy routes also pay for its
+scans. Numbers depend on the machine: save a baseline and compare on the
+same one.
+
+Usage:
+  python scripts/bench_load.py [--mode inprocess|socket|both]
+      [--concurrency 1,8,32] [--duration 3] [--routes me,bike,search]
+      [--auth-latency 30] [--auth-jitter 10] [--auth-errors 0.01]
+      [--firestore-latency 8] [--firestore-jitter 3] [--firestore-errors 0]
+      [--save-baseline bench.json | --baseline bench.json [--tolerance 0.25]]
+      [--json]
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import random
+import socket
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+MODES = ("inprocess", "socket")
+
+
+class Request(NamedTuple):
+    method: str
+    path: str
+    headers: Optional[dict] = None
+    json: Optional[dict] = None
+    data: Optional[dict] = None
+
+
+def _auth(uid: str) -> dict:
+    from bench_backend import token_for
+
+    return {"Authorization": f"Bearer {token_for(uid)}"}
+
+
+def _bike(rng: random.Random, bikes: int) -> str:
+    return f"bike-{rng.randrange(bikes):05d}"
+
+
+# name -> builder(rng, uids, bikes) -> Request
+ROUTES: Dict[str, Callable[[random.Random, List[str], int], Request]] = {
+    "health": lambda rng, uids, bikes: Request("GET", "/health"),
+    "me": lambda rng, uids, bikes: Request(
+        "GET", "/users/me", headers=_auth(rng.choice(uids))
+    ),
+    "lookup": lambda rng, uids, bikes: Request(
+        "POST",
+        "/users/lookup",
+        headers=_auth(rng.choice(uids)),
+        json={"uids": rng.sample(uids, 25)},
+    ),
+    "bike": lambda rng, uids, bikes: Request("GET", f"/bikes/{_bike(rng, bikes)}"),
+    "bikes": lambda rng, uids, bikes: Request("GET", "/bikes/?limit=20"),
+    "search": lambda rng, uids, bikes: Request(
+        "GET",
+        f"/bikes/search?brand={rng.choice(['yamaha', 'honda'])}&sort=rating",
+    ),
+    "reviews": lambda rng, uids, bikes: Request(
+        "GET", f"/reviews/bikes/{_bike(rng, bikes)}?limit=20"
+    ),
+    "login": lambda rng, uids, bikes: Request(
+        "POST",
+        "/auth/token",
+        data={"username": f"{rng.choice(uids)}@example.com", "password": "x"},
+    ),
+}
+
+
+class Result(NamedTuple):
+    requests: int
+    errors: int
+    rps: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    statuses: Dict[int, int]
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+async def run_level(
+    client, build: Callable, concurrency: int, duration: float, seed: int
+) -> Result:
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    deadline = time.perf_counter() + duration
+
+    async def worker(rng: random.Random) -> None:
+        while time.perf_counter() < deadline:
+            request = build(rng)
+            start = time.perf_counter()
+            try:
+                response = await client.request(
+                    request.method,
+                    request.path,
+                    headers=request.headers,
+                    json=request.json,
+                    data=request.data,
+                )
+                status = response.status_code
+            except Exception:
+                status = 0
+            latencies.append(time.perf_counter() - start)
+            statuses[status] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(
+        *(worker(random.Random(seed * 1000 + i)) for i in range(concurrency))
+    )
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    errors = sum(n for status, n in statuses.items() if status == 0 or status >= 400)
+    return Result(
+        requests=len(latencies),
+        errors=errors,
+        rps=round(len(latencies) / elapsed, 1),
+        p50_ms=round(percentile(latencies, 0.50) * 1000, 2),
+        p95_ms=round(percentile(latencies, 0.95) * 1000, 2),
+        p99_ms=round(percentile(latencies, 0.99) * 1000, 2),
+        statuses=dict(statuses),
+    )
+
+
+async def sweep(client, options, uids: List[str]) -> Dict[str, Dict[str, dict]]:
+    results: Dict[str, Dict[str, dict]] = {}
+    for name in options.routes:
+        route = ROUTES[name]
+
+        def build(rng, route=route):
+            return route(rng, uids, options.bikes)
+
+        # Warm up lazy routers, the catalog index and the caches
+        warm = random.Random(0)
+        for _ in range(20):
+            request = build(warm)
+            await client.request(
+                request.method,
+                request.path,
+                headers=request.headers,
+                json=request.json,
+                data=request.data,
+            )
+        results[name] = {}
+        for concurrency in options.concurrency:
+            result = await run_level(
+                client, build, concurrency, options.duration, options.seed
+            )
+            results[name][str(concurrency)] = result._asdict()
+            if not options.json:
+                print_row(options.current_mode, name, concurrency, result)
+    return results
+
+
+def backend_kwargs(options) -> dict:
+    from bench_backend import LatencyProfile
+
+    return dict(
+        auth_profile=LatencyProfile(
+            options.auth_latency, options.auth_jitter, options.auth_errors
+        ),
+        firestore_profile=LatencyProfile(
+            options.firestore_latency,
+            options.firestore_jitter,
+            options.firestore_errors,
+        ),
+        bikes=options.bikes,
+        reviews_per_bike=options.reviews_per_bike,
+        users=options.users,
+        rate_limit=options.rate_limit,
+        seed=options.seed,
+    )
+
+
+async def run_inprocess(options, uids: List[str]) -> dict:
+    import httpx
+    from app.main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench", timeout=60
+    ) as client:
+        return await sweep(client, options, uids)
+
+
+def serve(port: int, options) -> None:
+    """Child process: the app behind uvicorn, talking to its own fakes"""
+    sys.path.insert(0, str(SCRIPTS_DIR))
+    from bench_backend import install
+
+    install(**backend_kwargs(options))
+    import uvicorn
+    from app.main import app
+
+    uvicorn.run(
+        app,
+        host="127.0.0.1",
+        port=port,
+        log_level="warning",
+        access_log=False,
+        lifespan="off",
+    )
+
+
+def free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def wait_for_port(port: int, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"uvicorn did not start listening on port {port}")
+
+
+async def run_socket(options, uids: List[str]) -> dict:
+    import httpx
+
+    port = free_port()
+    server = multiprocessing.get_context("spawn").Process(
+        target=serve, args=(port, options), daemon=True
+    )
+    server.start()
+    try:
+        wait_for_port(port)
+        limits = httpx.Limits(
+            max_connections=max(options.concurrency),
+            max_keepalive_connections=max(options.concurrency),
+        )
+        async with httpx.AsyncClient(
+            base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60
+        ) as client:
+            return await sweep(client, options, uids)
+    finally:
+        server.terminate()
+        server.join(10)
+
+
+def print_row(mode: str, route: str, concurrency: int, result: Result) -> None:
+    print(
+        f"{mode:>9} {route:>8} {concurrency:>5} {result.requests:>8} "
+        f"{result.rps:>9.1f} {result.p50_ms:>8.2f} {result.p95_ms:>8.2f} "
+        f"{result.p99_ms:>8.2f} {result.errors:>7}"
+    )
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> List[str]:
+    """Regressions beyond ``tolerance``: lower req/s or higher p95"""
+    regressions = []
+    for mode, routes in results.items():
+        for route, levels in routes.items():
+            for concurrency, current in levels.items():
+                before = baseline.get(mode, {}).get(route, {}).get(concurrency)
+                if before is None:
+                    continue
+                label = f"{mode} {route} c={concurrency}"
+                if current["rps"] < before["rps"] * (1 - tolerance):
+                    regressions.append(
+                        f"{label}: {current['rps']} req/s, baseline {before['rps']}"
+                    )
+                if current["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+                    regressions.append(
+                        f"{label}: p95 {current['p95_ms']} ms, "
+                        f"baseline {before['p95_ms']}"
+                    )
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mode", choices=MODES + ("both",), default="inprocess")
+    parser.add_argument("--concurrency", default="1,8,32")
+    parser.add_argument("--duration", type=float, default=3, help="seconds per level")
+    parser.add_argument("--routes", default=",".join(ROUTES))
+    parser.add_argument("--auth-latency", type=float, default=30, help="ms")
+    parser.add_argument("--auth-jitter", type=float, default=10, help="ms")
+    parser.add_argument("--auth-errors", type=float, default=0, help="0..1")
+    parser.add_argument("--firestore-latency", type=float, default=8, help="ms")
+    parser.add_argument("--firestore-jitter", type=float, default=3, help="ms")
+    parser.add_argument("--firestore-errors", type=float, default=0, help="0..1")
+    parser.add_argument("--bikes", type=int, default=500)
+    parser.add_argument("--reviews-per-bike", type=int, default=8)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--rate-limit", action="store_true")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--baseline", type=Path, help="fail on regressions vs this")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--save-baseline", type=Path)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    options = parser.parse_args(argv)
+    options.concurrency = [int(c) for c in options.concurrency.split(",")]
+    options.routes = options.routes.split(",")
+    unknown = set(options.routes) - set(ROUTES)
+    if unknown:
+        parser.error(f"unknown routes: {', '.join(sorted(unknown))}")
+    return options
+
+
+def main() -> None:
+    options = parse_args()
+    sys.path.insert(0, str(SCRIPTS_DIR))
+    from bench_backend import install
+
+    uids = install(**backend_kwargs(options))
+    modes = MODES if options.mode == "both" else (options.mode,)
+
+    if not options.json:
+        header = ("mode", "route", "conc", "requests", "req/s", "p50 ms")
+        print("{:>9} {:>8} {:>5} {:>8} {:>9} {:>8}".format(*header), end="")
+        print(" {:>8} {:>8} {:>7}".format("p95 ms", "p99 ms", "errors"))
+    results = {}
+    for mode in modes:
+        options.current_mode = mode
+        runner = run_inprocess if mode == "inprocess" else run_socket
+        results[mode] = asyncio.run(runner(options, uids))
+
+    if options.json:
+        print(json.dumps(results, indent=2))
+    if options.save_baseline:
+        options.save_baseline.write_text(json.dumps(results, indent=2) + "\n")
+    if options.baseline:
+        regressions = compare(
+            results, json.loads(options.baseline.read_text()), options.tolerance
+        )
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
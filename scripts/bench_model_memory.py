@@ -0,0 +1,172 @@
+"""Memory per worker and time to first inference for each model-loading mode.
+
+Forks --workers processes per mode, the way gunicorn does, and once all of
+them have run a first inference reports each one's RSS, PSS and USS (see
+app.metrics.process_memory) plus the total PSS, which is what the workers
+really cost together. Modes:
+
+  private  every worker loads the weights itself (from_pretrained)
+  mmap     every worker maps the safetensors file; pages are shared
+  preload  the parent loads once before forking; pages are shared
+           copy-on-write
+
+--model tiny-t5 saves a random T5 of --d-model/--layers as safetensors and
+loads it through TransformersGenerator (needs torch and transformers).
+--model synthetic needs neither: its "weights" are a --size-mb file that
+is read, mapped or inherited, and its "inference" touches every page.
+
+Usage:
+  python scripts/bench_model_memory.py [--model synthetic|tiny-t5]
+      [--modes private,mmap,preload] [--workers 4] [--size-mb 256]
+      [--d-model 512] [--layers 6] [--quantize] [--json]
+"""
+
+import argparse
+import json
+import mmap
+import multiprocessing
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+FUNCTIONS_DIR = Path(__file__).resolve().parent.parent / "functions"
+MODES = ("private", "mmap", "preload")
+PAGE = mmap.PAGESIZE
+
+
+class SyntheticWeights:
+    def __init__(self, path: Path, mode: str):
+        with open(path, "rb") as f:
+            if mode == "mmap":
+                self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+            else:
+                self.data = bytearray(f.read())
+
+    def generate(self, prompts: List[str], max_new_tokens: int) -> List[str]:
+        view = memoryview(self.data)
+        return [str(sum(view[::PAGE]))] * len(prompts)
+
+
+def write_synthetic(directory: Path, size_mb: int) -> Path:
+    path = directory / "weights.bin"
+    chunk = bytes(range(256)) * 4096
+    with open(path, "wb") as f:
+        for _ in range(size_mb):
+            f.write(chunk)
+    return path
+
+
+def write_tiny_t5(directory: Path, d_model: int, layers: int) -> Path:
+    from transformers import ByT5Tokenizer, T5Config, T5ForConditionalGeneration
+
+    config = T5Config(
+        vocab_size=384,
+        d_model=d_model,
+        d_kv=64,
+        d_ff=d_model * 4,
+        num_layers=layers,
+        num_heads=d_model // 64,
+        decoder_start_token_id=0,
+    )
+    T5ForConditionalGeneration(config).save_pretrained(
+        directory, safe_serialization=True
+    )
+    ByT5Tokenizer().save_pretrained(directory)
+    return directory
+
+
+def loader(options, path: Path, mode: str) -> Callable:
+    if options.model == "synthetic":
+        return lambda: SyntheticWeights(path, mode)
+    from app.services.ai_service import TransformersGenerator
+
+    weights = "mmap" if mode == "mmap" else "private"
+    return lambda: TransformersGenerator(
+        str(path), quantize=options.quantize, weights=weights
+    )
+
+
+def worker(load: Callable, preloaded, barrier, results) -> None:
+    from app.metrics import process_memory
+
+    start = time.perf_counter()
+    model = preloaded if preloaded is not None else load()
+    model.generate(["ভালো বাইক, smooth ride"], 8)
+    first_inference = time.perf_counter() - start
+    # Measure only once every worker holds its model, so sharing shows in PSS
+    barrier.wait()
+    results.put({"first_inference_s": round(first_inference, 3), **process_memory()})
+    barrier.wait()
+
+
+def run_mode(options, path: Path, mode: str) -> Dict:
+    context = multiprocessing.get_context("fork")
+    load = loader(options, path, mode)
+    preloaded = load() if mode == "preload" else None
+    barrier = context.Barrier(options.workers)
+    results = context.Queue()
+    processes = [
+        context.Process(target=worker, args=(load, preloaded, barrier, results))
+        for _ in range(options.workers)
+    ]
+    for process in processes:
+        process.start()
+    reports = [results.get(timeout=600) for _ in processes]
+    for process in processes:
+        process.join()
+    mb = 1024 * 1024
+    return {
+        "rss_mb": round(sum(r["rss"] for r in reports) / len(reports) / mb, 1),
+        "pss_mb": round(sum(r["pss"] for r in reports) / len(reports) / mb, 1),
+        "uss_mb": round(sum(r["uss"] for r in reports) / len(reports) / mb, 1),
+        "total_pss_mb": round(sum(r["pss"] for r in reports) / mb, 1),
+        "first_inference_s": round(
+            sum(r["first_inference_s"] for r in reports) / len(reports), 3
+        ),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--model", choices=("synthetic", "tiny-t5"), default="synthetic"
+    )
+    parser.add_argument("--modes", default=",".join(MODES))
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--size-mb", type=int, default=256, help="synthetic")
+    parser.add_argument("--d-model", type=int, default=512, help="tiny-t5")
+    parser.add_argument("--layers", type=int, default=6, help="tiny-t5")
+    parser.add_argument("--quantize", action="store_true", help="tiny-t5")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    options = parser.parse_args()
+    modes = options.modes.split(",")
+    unknown = set(modes) - set(MODES)
+    if unknown:
+        parser.error(f"unknown modes: {', '.join(sorted(unknown))}")
+    sys.path.insert(0, str(FUNCTIONS_DIR))
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        if options.model == "synthetic":
+            path = write_synthetic(Path(directory), options.size_mb)
+        else:
+            path = write_tiny_t5(Path(directory), options.d_model, options.layers)
+        if not options.json:
+            header = ("mode", "rss MB", "pss MB", "uss MB", "total pss", "1st inf s")
+            print("{:>8} {:>8} {:>8} {:>8} {:>10} {:>10}".format(*header))
+        for mode in modes:
+            result = results[mode] = run_mode(options, path, mode)
+            if not options.json:
+                print(
+                    f"{mode:>8} {result['rss_mb']:>8.1f} {result['pss_mb']:>8.1f} "
+                    f"{result['uss_mb']:>8.1f} {result['total_pss_mb']:>10.1f} "
+                    f"{result['first_inference_s']:>10.3f}"
+                )
+    if options.json:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
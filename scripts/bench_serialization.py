@@ -0,0 +1,131 @@
+"""Compare FastAPI's response_model serialization with ModelResponse.
+
+Both paths start from the same Firebase UserRecord-like objects and end
+with the JSON body bytes.
+
+Usage: python scripts/bench_serialization.py [--repeat 5] [--json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import List
+
+FUNCTIONS_DIR = Path(__file__).resolve().parent.parent / "functions"
+SIZES = (1, 1000)
+
+
+def make_records(count: int) -> list:
+    return [
+        SimpleNamespace(
+            uid=f"uid-{i:06d}",
+            email=f"rider{i}@example.com",
+            display_name=f"Rider {i}",
+            photo_url=f"https://example.com/photos/{i}.jpg",
+            email_verified=i % 2 == 0,
+            disabled=False,
+        )
+        for i in range(count)
+    ]
+
+
+def measure(fn, repeat: int) -> float:
+    """Best per-call time in microseconds"""
+    calls = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(calls):
+            fn()
+        if time.perf_counter() - start > 0.2:
+            break
+        calls *= 2
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(calls):
+            fn()
+        best = min(best, (time.perf_counter() - start) / calls)
+    return best * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    os.environ["LAZY_INIT"] = "true"
+    sys.path.insert(0, str(FUNCTIONS_DIR))
+
+    from app.models.user import UserResponse
+    from app.responses import ModelResponse
+    from fastapi.responses import JSONResponse
+    from fastapi.routing import serialize_response
+    from fastapi.utils import create_response_field
+
+    loop = asyncio.new_event_loop()
+    results = []
+    for size in SIZES:
+        records = make_records(size)
+        response_type = UserResponse if size == 1 else List[UserResponse]
+        field = create_response_field(
+            name="Response", type_=response_type, mode="serialization"
+        )
+
+        def validated(record):
+            return UserResponse(
+                uid=record.uid,
+                email=record.email,
+                display_name=record.display_name,
+                photo_url=record.photo_url,
+                email_verified=record.email_verified,
+                disabled=record.disabled,
+                roles=["user"],
+            )
+
+        def standard():
+            # Validate while building, again against response_model, then json
+            users = [validated(r) for r in records]
+            content = loop.run_until_complete(
+                serialize_response(
+                    field=field, response_content=users[0] if size == 1 else users
+                )
+            )
+            return JSONResponse(content).body
+
+        def fast():
+            users = [UserResponse.from_record(r, roles=["user"]) for r in records]
+            return ModelResponse(users[0] if size == 1 else users).body
+
+        assert json.loads(standard()) == json.loads(fast())
+        standard_us = measure(standard, args.repeat)
+        fast_us = measure(fast, args.repeat)
+        results.append(
+            {
+                "items": size,
+                "standard_us": round(standard_us, 1),
+                "fast_us": round(fast_us, 1),
+                "speedup": round(standard_us / fast_us, 2),
+            }
+        )
+    loop.close()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    header = ("items", "response_model (us)", "ModelResponse (us)", "speedup")
+    print("{:>6} {:>20} {:>20} {:>8}".format(*header))
+    for row in results:
+        print(
+            f"{row['items']:>6} {row['standard_us']:>20.1f} "
+            f"{row['fast_us']:>20.1f} {row['speedup']:>7.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Accounts/s of bulk user imports against per-user create_user calls.
+
+Creates --rows accounts with pre-hashed passwords through UserImportService
+(chunked auth.import_users plus the get_users lookups before each chunk) and
+--baseline-rows accounts with one FirebaseAuthService.create_user call each,
+as a migration script looping over /auth/register would. Both talk to the
+FakeAdminAuth from scripts/bench_backend.py, whose calls block a gateway
+thread for --latency ms (plus --jitter); an import_users call also takes
+--import-ms-per-user for every account in it.
+
+Usage:
+  python scripts/bench_user_import.py [--rows 20000] [--baseline-rows 200]
+      [--chunk-sizes 500,1000] [--concurrency 1,4] [--latency 60] [--jitter 10]
+      [--import-ms-per-user 0.2] [--json]
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import sys
+import time
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+ROOT = SCRIPTS_DIR.parent
+HASH = base64.b64encode(b"$2b$10$" + b"x" * 53).decode()
+
+
+def make_service(options):
+    from app import firebase_init
+    from bench_backend import FakeAdminAuth, LatencyProfile
+
+    admin_auth = FakeAdminAuth({}, LatencyProfile(options.latency, options.jitter), 1)
+    admin_auth.import_ms_per_user = options.import_ms_per_user
+    firebase_init.get_auth = lambda: admin_auth
+
+    from app.services import firebase_service
+    from app.services.admin_gateway import AdminSDKGateway
+    from app.services.roles import RoleResolver
+    from app.services.token_cache import VerifiedTokenCache
+    from app.services.user_cache import UserCache
+
+    firebase_service.get_auth = firebase_init.get_auth
+    firebase = firebase_service.FirebaseAuthService(
+        AdminSDKGateway(),
+        VerifiedTokenCache(),
+        UserCache(),
+        RoleResolver(None, UserCache()),
+    )
+    return firebase, admin_auth
+
+
+async def baseline(rows: int, options) -> dict:
+    firebase, admin_auth = make_service(options)
+    started = time.perf_counter()
+    for i in range(rows):
+        await firebase.create_user(email=f"rider{i}@example.com", password="secret")
+    seconds = time.perf_counter() - started
+    return {"accounts_per_second": rows / seconds, "calls": admin_auth.calls}
+
+
+async def run(rows: int, chunk_size: int, concurrency: int, options) -> dict:
+    from app.models.user import PasswordHashConfig
+    from app.services.user_import import UserImportService
+
+    firebase, admin_auth = make_service(options)
+    imports = UserImportService(firebase, chunk_size, concurrency)
+    users = [
+        {"email": f"rider{i}@example.com", "password_hash": HASH} for i in range(rows)
+    ]
+    started = time.perf_counter()
+    report = await imports.run(users, PasswordHashConfig(algorithm="bcrypt"))
+    seconds = time.perf_counter() - started
+    if report["failed"]:
+        raise RuntimeError(f"{report['failed']} rows failed: {report['errors'][0]}")
+    return {"accounts_per_second": rows / seconds, "calls": admin_auth.calls}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--baseline-rows", type=int, default=200)
+    parser.add_argument("--chunk-sizes", default="500,1000")
+    parser.add_argument("--concurrency", default="1,4")
+    parser.add_argument("--latency", type=float, default=60, help="ms")
+    parser.add_argument("--jitter", type=float, default=10, help="ms")
+    parser.add_argument("--import-ms-per-user", type=float, default=0.2)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    options = parser.parse_args()
+    sys.path.insert(0, str(ROOT / "functions"))
+    sys.path.insert(0, str(SCRIPTS_DIR))
+
+    results = {"create_user": asyncio.run(baseline(options.baseline_rows, options))}
+    for chunk_size in (int(size) for size in options.chunk_sizes.split(",")):
+        for concurrency in (int(c) for c in options.concurrency.split(",")):
+            result = asyncio.run(run(options.rows, chunk_size, concurrency, options))
+            results[f"{chunk_size}x{concurrency}"] = result
+    if options.json:
+        print(json.dumps(results, indent=2))
+        return
+    print("{:>12} {:>12} {:>8}".format("path", "accounts/s", "calls"))
+    for name, result in results.items():
+        print(f"{name:>12} {result['accounts_per_second']:>12.1f} {result['calls']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+"""Prebuild the OpenAPI schema so lazy instances never generate it at runtime.
+
+Usage: python scripts/build_openapi.py [output]
+"""
+
+import json
+import os
+import sys
+from pathlib import Path
+
+FUNCTIONS_DIR = Path(__file__).resolve().parent.parent / "functions"
+
+
+def main() -> None:
+    # Lazy mode skips Firebase initialization, which the build does not need
+    os.environ["LAZY_INIT"] = "true"
+    sys.path.insert(0, str(FUNCTIONS_DIR))
+
+    from app.main import OPENAPI_PATH, build_openapi_schema
+
+    output = Path(sys.argv[1]) if len(sys.argv) > 1 else OPENAPI_PATH
+    output.write_text(json.dumps(build_openapi_schema(), separators=(",", ":")))
+    print(f"Wrote OpenAPI schema to {output}")
+
+
+if __name__ == "__main__":
+    main()
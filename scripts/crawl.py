@@ -0,0 +1,54 @@
+"""Crawl catalog sites and write the bikes found as NDJSON.
+
+The frontier is kept in SQLite, so running again with the same --frontier
+resumes an interrupted crawl; --refresh re-fetches every page already
+crawled, and unchanged pages are skipped with conditional requests.
+
+Usage:
+  python scripts/crawl.py [seed_url ...] [--frontier path] [--refresh]
+      [--max-pages N] [--output bikes.ndjson]
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+FUNCTIONS_DIR = Path(__file__).resolve().parent.parent / "functions"
+
+
+async def crawl(options) -> None:
+    from app.services.scraper_service import get_crawler
+
+    with open(options.output, "a", encoding="utf-8") as output:
+
+        async def write_item(item: dict) -> None:
+            output.write(json.dumps(item, ensure_ascii=False) + "\n")
+
+        crawler = get_crawler(options.frontier, on_item=write_item)
+        crawler.max_pages = options.max_pages
+        if options.refresh:
+            print(f"Requeued {crawler.frontier.requeue_done()} pages")
+        try:
+            stats = await crawler.run(options.seeds)
+        finally:
+            counts = crawler.frontier.counts()
+            crawler.frontier.close()
+    print(json.dumps({"stats": stats, "frontier": counts}, indent=2))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("seeds", nargs="*")
+    parser.add_argument("--frontier", help="SQLite file; defaults to settings")
+    parser.add_argument("--refresh", action="store_true")
+    parser.add_argument("--max-pages", type=int)
+    parser.add_argument("--output", default="bikes.ndjson")
+    options = parser.parse_args()
+    sys.path.insert(0, str(FUNCTIONS_DIR))
+    asyncio.run(crawl(options))
+
+
+if __name__ == "__main__":
+    main()
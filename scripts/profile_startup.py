@@ -0,0 +1,88 @@
+"""Report per-module import time and time-to-first-response of the function.
+
+Each measurement runs in a fresh interpreter so it reflects a cold start.
+
+Usage: python scripts/profile_startup.py [--eager] [--path /health] [--top 25]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+FUNCTIONS_DIR = Path(__file__).resolve().parent.parent / "functions"
+
+FIRST_RESPONSE = """
+import json, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+from flask import Request
+from werkzeug.test import EnvironBuilder
+response = main.bridge(Request(EnvironBuilder(path={path!r}).get_environ()))
+done = time.perf_counter()
+print(json.dumps({{
+    "status": response.status_code,
+    "import_ms": (imported - start) * 1000,
+    "first_response_ms": (done - imported) * 1000,
+    "total_ms": (done - start) * 1000,
+}}))
+"""
+
+
+def run(code: str, env: dict, importtime: bool = False) -> subprocess.CompletedProcess:
+    command = [sys.executable]
+    if importtime:
+        command += ["-X", "importtime"]
+    return subprocess.run(
+        command + ["-c", code],
+        cwd=FUNCTIONS_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def parse_importtime(stderr: str) -> list:
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        modules.append((name.strip(), int(self_us), int(cumulative_us)))
+    return modules
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--eager", action="store_true", help="disable LAZY_INIT")
+    parser.add_argument("--path", default="/health", help="route to request")
+    parser.add_argument("--top", type=int, default=25, help="modules to list")
+    parser.add_argument("--json", action="store_true", help="print JSON")
+    args = parser.parse_args()
+
+    env = dict(os.environ, LAZY_INIT="false" if args.eager else "true")
+
+    modules = parse_importtime(run("import main", env, importtime=True).stderr)
+    timing = json.loads(run(FIRST_RESPONSE.format(path=args.path), env).stdout)
+    slowest = sorted(modules, key=lambda m: m[1], reverse=True)[: args.top]
+
+    if args.json:
+        print(json.dumps({"timing": timing, "modules": slowest}, indent=2))
+        return
+
+    print(f"{'module':<60} {'self ms':>10} {'cumul. ms':>10}")
+    for name, self_us, cumulative_us in slowest:
+        print(f"{name:<60} {self_us / 1000:>10.1f} {cumulative_us / 1000:>10.1f}")
+    print()
+    print(f"mode:               {'eager' if args.eager else 'lazy'}")
+    print(f"import main:        {timing['import_ms']:.1f} ms")
+    print(f"first response:     {timing['first_response_ms']:.1f} ms")
+    print(f"time to first byte: {timing['total_ms']:.1f} ms (HTTP {timing['status']})")
+
+
+if __name__ == "__main__":
+    main()
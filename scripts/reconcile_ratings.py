@@ -0,0 +1,32 @@
+"""Rebuild the materialized rating aggregates from the reviews collection.
+
+Usage: python scripts/reconcile_ratings.py [bike_id ...]
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+FUNCTIONS_DIR = Path(__file__).resolve().parent.parent / "functions"
+
+
+async def reconcile(bike_ids) -> None:
+    from app.services.ratings import get_review_service
+
+    reviews = get_review_service()
+    if bike_ids:
+        for bike_id in bike_ids:
+            stats = await reviews.reconcile(bike_id)
+            print(f"{bike_id}: {stats['count']} reviews")
+    else:
+        total = await reviews.reconcile_all()
+        print(f"Reconciled {total} bikes")
+
+
+def main() -> None:
+    sys.path.insert(0, str(FUNCTIONS_DIR))
+    asyncio.run(reconcile(sys.argv[1:]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,447 @@
+"""In-memory stand-ins for the Firestore, Storage and Redis clients used in tests"""
+
+import asyncio
+import copy
+import functools
+import io
+import uuid
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+from google.api_core.exceptions import NotFound
+from google.cloud.firestore_v1.field_path import parse_field_path
+from google.cloud.firestore_v1.transforms import Increment
+
+MAX_BATCH_WRITES = 500
+
+
+def _compare(a: Any, b: Any) -> int:
+    # None sorts first, like Firestore's null
+    if a is None or b is None:
+        return (a is not None) - (b is not None)
+    return (a > b) - (a < b)
+
+
+def _project(data: Dict, fields: Optional[List[str]]) -> Dict:
+    if fields is None:
+        return copy.deepcopy(data)
+    return {f: copy.deepcopy(data[f]) for f in fields if f in data}
+
+
+class FakeSnapshot:
+    def __init__(self, reference: "FakeDocumentReference", data: Optional[Dict]):
+        self.reference = reference
+        self.id = reference.id
+        self._data = data
+
+    @property
+    def exists(self) -> bool:
+        return self._data is not None
+
+    def get(self, field: str) -> Any:
+        return self._data[field]
+
+    def to_dict(self) -> Optional[Dict]:
+        return copy.deepcopy(self._data)
+
+
+class FakeDocumentReference:
+    def __init__(self, client: "FakeFirestore", collection: str, doc_id: str):
+        self._client = client
+        self.collection_name = collection
+        self.id = doc_id
+
+    @property
+    def path(self) -> str:
+        return f"{self.collection_name}/{self.id}"
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, FakeDocumentReference) and self.path == other.path
+
+    def __hash__(self) -> int:
+        return hash(self.path)
+
+    async def get(self, field_paths: Optional[List[str]] = None, **kwargs):
+        await self._client.rpc("get")
+        self._client.reads += 1
+        data = self._client.data[self.collection_name].get(self.id)
+        return FakeSnapshot(self, None if data is None else _project(data, field_paths))
+
+    async def set(self, data: Dict, merge: bool = False) -> None:
+        await self._client.rpc("commit")
+        self._client.apply("set", self, data, merge)
+
+    async def update(self, data: Dict) -> None:
+        await self._client.rpc("commit")
+        self._client.apply("update", self, data, True)
+
+
+class FakeQuery:
+    _OPS = {
+        "==": lambda a, b: a == b,
+        "!=": lambda a, b: a != b,
+        "<": lambda a, b: a is not None and a < b,
+        "<=": lambda a, b: a is not None and a <= b,
+        ">": lambda a, b: a is not None and a > b,
+        ">=": lambda a, b: a is not None and a >= b,
+        "in": lambda a, b: a in b,
+        "array_contains": lambda a, b: b in (a or []),
+    }
+
+    def __init__(self, client: "FakeFirestore", collection: str):
+        self._client = client
+        self._collection = collection
+        self._filters: List = []
+        self._orders: List = []
+        self._fields: Optional[List[str]] = None
+        self._start_after: Optional[List] = None
+        self._limit: Optional[int] = None
+
+    def _copy(self, **changes) -> "FakeQuery":
+        query = copy.copy(self)
+        for name, value in changes.items():
+            setattr(query, name, value)
+        return query
+
+    def document(self, doc_id: Optional[str] = None) -> FakeDocumentReference:
+        doc_id = doc_id or uuid.uuid4().hex[:20]
+        return FakeDocumentReference(self._client, self._collection, doc_id)
+
+    def where(self, field_path=None, op_string=None, value=None, *, filter=None):
+        if filter is not None:
+            field_path, op_string, value = (
+                filter.field_path,
+                filter.op_string,
+                filter.value,
+            )
+        return self._copy(_filters=self._filters + [(field_path, op_string, value)])
+
+    def order_by(self, field_path: str, direction: str = "ASCENDING"):
+        return self._copy(_orders=self._orders + [(field_path, direction)])
+
+    def select(self, field_paths: List[str]):
+        return self._copy(_fields=list(field_paths))
+
+    def start_after(self, values):
+        return self._copy(_start_after=list(values))
+
+    def limit(self, count: int):
+        return self._copy(_limit=count)
+
+    def _key(self, doc_id: str, data: Dict) -> List:
+        return [
+            doc_id if field == "__name__" else data.get(field)
+            for field, _ in self._orders
+        ]
+
+    def _compare_keys(self, a: List, b: List) -> int:
+        for (_, direction), x, y in zip(self._orders, a, b):
+            result = _compare(x, y)
+            if result:
+                return -result if direction == "DESCENDING" else result
+        return 0
+
+    def _matches(self) -> List:
+        rows = [
+            (doc_id, data)
+            for doc_id, data in self._client.data[self._collection].items()
+            if all(self._OPS[op](data.get(f), v) for f, op, v in self._filters)
+        ]
+        rows.sort(
+            key=functools.cmp_to_key(
+                lambda a, b: self._compare_keys(self._key(*a), self._key(*b))
+            )
+        )
+        if self._start_after is not None:
+            rows = [
+                row
+                for row in rows
+                if self._compare_keys(self._key(*row), self._start_after) > 0
+            ]
+        if self._limit is not None:
+            rows = rows[: self._limit]
+        return rows
+
+    async def stream(self, **kwargs):
+        await self._client.rpc("query")
+        self._client.queries += 1
+        for doc_id, data in self._matches():
+            self._client.reads += 1
+            yield FakeSnapshot(self.document(doc_id), _project(data, self._fields))
+
+    async def get(self, **kwargs) -> List[FakeSnapshot]:
+        return [snapshot async for snapshot in self.stream()]
+
+
+class FakeBatch:
+    def __init__(self, client: "FakeFirestore"):
+        self._client = client
+        self._operations: List = []
+
+    def set(self, ref, data: Dict, merge: bool = False):
+        self._operations.append(("set", ref, data, merge))
+
+    def update(self, ref, data: Dict):
+        self._operations.append(("update", ref, data, True))
+
+    def delete(self, ref):
+        self._operations.append(("delete", ref, None, False))
+
+    async def commit(self):
+        if len(self._operations) > MAX_BATCH_WRITES:
+            raise ValueError("maximum 500 writes allowed per request")
+        self._client.in_flight_batches += 1
+        self._client.max_in_flight_batches = max(
+            self._client.max_in_flight_batches, self._client.in_flight_batches
+        )
+        try:
+            await self._client.rpc("commit")
+            if self._client.commit_hook is not None:
+                await self._client.commit_hook(self._operations)
+            for kind, ref, data, merge in self._operations:
+                self._client.apply(kind, ref, data, merge)
+        finally:
+            self._client.in_flight_batches -= 1
+        self._client.commits.append(len(self._operations))
+        return []
+
+
+class FakeTransaction(FakeBatch):
+    """Applies its writes on commit; the private hooks are the ones
+    ``async_transactional`` drives"""
+
+    _id = b"fake-transaction"
+    _read_only = False
+    _max_attempts = 5
+
+    def _clean_up(self):
+        self._operations = []
+
+    async def _begin(self, retry_id=None):
+        pass
+
+    async def _commit(self):
+        return await self.commit()
+
+    async def _rollback(self):
+        self._operations = []
+
+
+def _apply_value(current: Any, value: Any) -> Any:
+    if isinstance(value, Increment):
+        return (current or 0) + value.value
+    if isinstance(value, dict):
+        merged = dict(current) if isinstance(current, dict) else {}
+        for key, item in value.items():
+            merged[key] = _apply_value(merged.get(key), item)
+        return merged
+    return copy.deepcopy(value)
+
+
+class FakeFirestore:
+    """Just enough of ``firestore_async.AsyncClient`` for the repositories.
+
+    ``rpc_hook``, if set, is awaited with the kind of every round trip
+    (``get``, ``query`` or ``commit``), e.g. to add latency or failures.
+    """
+
+    def __init__(self):
+        self.data: Dict[str, Dict[str, Dict]] = defaultdict(dict)
+        self.reads = 0
+        self.queries = 0
+        self.commits: List[int] = []
+        self.in_flight_batches = 0
+        self.max_in_flight_batches = 0
+        self.commit_hook = None
+        self.rpc_hook = None
+        self.transactions = 0
+
+    async def rpc(self, kind: str) -> None:
+        if self.rpc_hook is not None:
+            await self.rpc_hook(kind)
+
+    def collection(self, name: str) -> FakeQuery:
+        return FakeQuery(self, name)
+
+    def batch(self) -> FakeBatch:
+        return FakeBatch(self)
+
+    def transaction(self) -> FakeTransaction:
+        self.transactions += 1
+        return FakeTransaction(self)
+
+    async def get_all(self, references, field_paths=None, **kwargs):
+        for ref in references:
+            yield await ref.get(field_paths=field_paths)
+
+    def apply(self, kind: str, ref, data: Optional[Dict], merge: bool) -> None:
+        documents = self.data[ref.collection_name]
+        if kind == "delete":
+            documents.pop(ref.id, None)
+        elif kind == "update":
+            if ref.id not in documents:
+                raise KeyError(f"No document to update: {ref.path}")
+            document = documents[ref.id]
+            for path, value in data.items():
+                *parents, leaf = parse_field_path(path)
+                target = document
+                for name in parents:
+                    target = target.setdefault(name, {})
+                target[leaf] = _apply_value(target.get(leaf), value)
+        elif merge:
+            documents[ref.id] = _apply_value(documents.get(ref.id), data)
+        else:
+            documents[ref.id] = _apply_value(None, data)
+
+
+class FakeBlobWriter(io.BytesIO):
+    def __init__(self, bucket: "FakeBucket", name: str):
+        super().__init__()
+        self._bucket = bucket
+        self._name = name
+
+    def close(self) -> None:
+        if not self.closed:
+            self._bucket.blobs[self._name] = self.getvalue()
+        super().close()
+
+
+class FakeBlob:
+    def __init__(self, bucket: "FakeBucket", name: str):
+        self._bucket = bucket
+        self.name = name
+
+    def open(self, mode: str = "r", **kwargs):
+        if mode == "wb":
+            return FakeBlobWriter(self._bucket, self.name)
+        if not self.exists():
+            raise NotFound(f"No such object: {self.name}")
+        return io.BytesIO(self._bucket.blobs[self.name])
+
+    def exists(self) -> bool:
+        return self.name in self._bucket.blobs
+
+    def delete(self) -> None:
+        if self._bucket.blobs.pop(self.name, None) is None:
+            raise NotFound(f"No such object: {self.name}")
+
+
+class FakeBucket:
+    """A Cloud Storage bucket holding its objects' bytes in ``blobs``"""
+
+    def __init__(self):
+        self.blobs: Dict[str, bytes] = {}
+
+    def blob(self, name: str) -> FakeBlob:
+        return FakeBlob(self, name)
+
+
+class FakeScript:
+    def __init__(self, redis: "FakeRedis", source: str):
+        self._redis = redis
+        self.source = source
+
+    async def __call__(self, keys=(), args=(), client=None):
+        self._redis._check()
+        handler = self._redis.script_handlers[self.source]
+        return handler(self._redis, list(keys), list(args))
+
+
+class FakePubSub:
+    def __init__(self, redis: "FakeRedis"):
+        self._redis = redis
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self.channels: set = set()
+
+    async def subscribe(self, *channels: str) -> None:
+        self._redis._check()
+        for channel in channels:
+            self.channels.add(channel)
+            self._redis.subscribers[channel].add(self)
+            self._queue.put_nowait(
+                {"type": "subscribe", "channel": channel.encode(), "data": 1}
+            )
+
+    async def listen(self):
+        while True:
+            message = await self._queue.get()
+            if message is None:
+                raise ConnectionError("fake redis connection lost")
+            yield message
+
+    async def reset(self) -> None:
+        for channel in self.channels:
+            self._redis.subscribers[channel].discard(self)
+        self.channels.clear()
+
+
+class FakeRedis:
+    """In-memory stand-in for ``redis.asyncio.Redis``.
+
+    One instance plays the server, so every component sharing it sees the
+    same keys and pub/sub messages. Lua scripts cannot run here; tests
+    register a Python equivalent for each script source in
+    ``script_handlers``. Set ``fail`` to make every command raise.
+    """
+
+    def __init__(self, clock=None):
+        import time
+
+        self.clock = clock or time.time
+        self.values: Dict[str, Any] = {}
+        self.hashes: Dict[str, Dict[str, str]] = defaultdict(dict)
+        self.subscribers: Dict[str, set] = defaultdict(set)
+        self.script_handlers: Dict[str, Any] = {}
+        self.commands: List[str] = []
+        self.fail = False
+
+    def _check(self) -> None:
+        if self.fail:
+            raise ConnectionError("fake redis is down")
+
+    async def get(self, key: str) -> Optional[bytes]:
+        self._check()
+        self.commands.append("get")
+        value, expires_at = self.values.get(key, (None, None))
+        if expires_at is not None and expires_at <= self.clock():
+            del self.values[key]
+            return None
+        return value
+
+    async def set(self, key: str, value, ex=None, px=None) -> bool:
+        self._check()
+        self.commands.append("set")
+        if isinstance(value, str):
+            value = value.encode()
+        ttl = px / 1000 if px is not None else ex
+        self.values[key] = (value, None if ttl is None else self.clock() + ttl)
+        return True
+
+    async def delete(self, *keys: str) -> int:
+        self._check()
+        self.commands.append("delete")
+        return sum(self.values.pop(key, None) is not None for key in keys)
+
+    async def publish(self, channel: str, message) -> int:
+        self._check()
+        self.commands.append("publish")
+        if isinstance(message, str):
+            message = message.encode()
+        receivers = list(self.subscribers[channel])
+        for pubsub in receivers:
+            pubsub._queue.put_nowait(
+                {"type": "message", "channel": channel.encode(), "data": message}
+            )
+        return len(receivers)
+
+    def pubsub(self) -> FakePubSub:
+        return FakePubSub(self)
+
+    def drop_connections(self) -> None:
+        """Disconnect every subscriber, as a Redis restart would"""
+        for subscribers in self.subscribers.values():
+            for pubsub in subscribers:
+                pubsub._queue.put_nowait(None)
+
+    def register_script(self, source: str) -> FakeScript:
+        return FakeScript(self, source)
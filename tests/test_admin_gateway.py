@@ -0,0 +1,182 @@
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+from app.services.admin_gateway import (
+    AdminSDKGateway,
+    GatewayOverloadedError,
+    GatewayTimeoutError,
+)
+from app.services.firebase_service import FirebaseAuthService
+from app.services.roles import RoleResolver, claims_for_roles
+from app.services.tiered_cache import TieredCache
+from app.services.token_cache import VerifiedTokenCache
+from app.services.user_cache import UserCache
+from fakes import FakeRedis
+from fastapi import HTTPException
+from firebase_admin import auth
+
+
+def make_service(token_cache=None, cache=None):
+    return FirebaseAuthService(
+        AdminSDKGateway(),
+        token_cache or VerifiedTokenCache(),
+        UserCache(),
+        RoleResolver(None, UserCache()),
+        cache,
+    )
+
+
+@pytest.mark.asyncio
+async def test_run_executes_off_the_event_loop():
+    gateway = AdminSDKGateway(max_workers=2)
+    loop_thread = threading.get_ident()
+
+    worker_thread = await gateway.run(threading.get_ident)
+
+    assert worker_thread != loop_thread
+    assert gateway.stats()["completed"] == 1
+    gateway.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_run_rejects_when_queue_is_full():
+    gateway = AdminSDKGateway(max_workers=1, max_queue=0)
+    release = threading.Event()
+    task = asyncio.ensure_future(gateway.run(release.wait))
+    await asyncio.sleep(0.01)
+    with pytest.raises(GatewayOverloadedError):
+        await gateway.run(time.time)
+    release.set()
+    await task
+
+    assert gateway.stats()["rejected"] == 1
+    samples = {
+        name: value
+        for family in gateway.collect()
+        for name, labels, value in family.samples
+    }
+    assert samples["admin_sdk_rejected_total"] == 1
+    assert samples["admin_sdk_queued"] == 0
+    gateway.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_run_times_out_and_keeps_slot_until_call_finishes():
+    gateway = AdminSDKGateway(max_workers=1, max_queue=0, timeout=0.01)
+    release = threading.Event()
+
+    with pytest.raises(GatewayTimeoutError):
+        await gateway.run(release.wait)
+    with pytest.raises(GatewayOverloadedError):
+        await gateway.run(time.time)
+
+    release.set()
+    time.sleep(0.05)
+    assert gateway.stats()["timed_out"] == 1
+    assert gateway.stats()["queued"] == 0
+    gateway.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_service_maps_user_not_found_to_404():
+    service = make_service()
+
+    with patch(
+        "app.services.firebase_service.get_auth", return_value=auth
+    ), patch.object(
+        auth, "get_user", side_effect=auth.UserNotFoundError("missing")
+    ), pytest.raises(
+        HTTPException
+    ) as exc_info:
+        await service.get_user("missing")
+
+    assert exc_info.value.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_service_hides_unexpected_sdk_errors(caplog):
+    service = make_service()
+
+    with patch(
+        "app.services.firebase_service.get_auth", return_value=auth
+    ), patch.object(
+        auth, "get_user", side_effect=RuntimeError("project secret-project down")
+    ), pytest.raises(
+        HTTPException
+    ) as exc_info:
+        await service.get_user("u1")
+
+    assert exc_info.value.status_code == 500
+    assert exc_info.value.detail == "Internal error"
+    assert "secret-project" in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_service_verify_token_uses_cache():
+    cache = VerifiedTokenCache()
+    service = make_service(cache)
+    verify = MagicMock(return_value={"uid": "u1", "exp": time.time() + 60})
+
+    with patch(
+        "app.services.firebase_service.get_auth", return_value=auth
+    ), patch.object(auth, "verify_id_token", verify):
+        await service.verify_token("token")
+        claims = await service.verify_token("token")
+
+    assert claims["uid"] == "u1"
+    assert verify.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_role_changes_revoke_tokens_on_every_instance():
+    redis = FakeRedis()
+    admin = make_service(cache=TieredCache(redis=redis))
+    api = make_service(cache=TieredCache(redis=redis))
+    issued = int(time.time()) - 5
+    verify = MagicMock(return_value={"uid": "u1", "iat": issued, "exp": issued + 60})
+    revoke = MagicMock()
+
+    with patch(
+        "app.services.firebase_service.get_auth", return_value=auth
+    ), patch.object(auth, "verify_id_token", verify), patch.object(
+        auth, "set_custom_user_claims", MagicMock()
+    ), patch.object(
+        auth, "revoke_refresh_tokens", revoke
+    ):
+        await api.verify_token("token")
+        # Starts the invalidation listener, as any cached read does
+        await api.cache.get_or_load("ns", "k", lambda: asyncio.sleep(0))
+        await asyncio.sleep(0.01)
+
+        await admin.set_custom_claims("u1", claims_for_roles(["user"]))
+        await asyncio.sleep(0.01)
+
+        with pytest.raises(HTTPException) as exc_info:
+            await api.verify_token("token")
+    assert exc_info.value.status_code == 401
+    revoke.assert_called_once_with("u1")
+    await asyncio.gather(admin.cache.close(), api.cache.close())
+
+
+@pytest.mark.asyncio
+async def test_service_get_users_chunks_by_100():
+    service = make_service()
+    calls = []
+
+    def get_users(identifiers):
+        calls.append(len(identifiers))
+        return SimpleNamespace(
+            users=[SimpleNamespace(uid=i.uid) for i in identifiers], not_found=[]
+        )
+
+    with patch(
+        "app.services.firebase_service.get_auth", return_value=auth
+    ), patch.object(auth, "get_users", get_users):
+        users = await service.get_users([f"u{i}" for i in range(250)])
+
+    assert sorted(calls) == [50, 100, 100]
+    assert len(users) == 250
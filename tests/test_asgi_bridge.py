@@ -0,0 +1,132 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+from app.asgi_bridge import ASGIBridge
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import StreamingResponse
+from flask import Request as FlaskRequest
+from werkzeug.test import EnvironBuilder
+
+startups = []
+
+
+@asynccontextmanager
+async def lifespan(app):
+    startups.append(asyncio.get_running_loop())
+    yield
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+@app.post("/echo")
+async def echo(request: Request):
+    body = await request.body()
+    return {
+        "body": body.decode(),
+        "query": request.url.query,
+        "header": request.headers.get("x-test"),
+        "loop": id(asyncio.get_running_loop()),
+    }
+
+
+@app.get("/cookies")
+async def cookies():
+    response = Response("ok")
+    response.set_cookie("a", "1")
+    response.set_cookie("b", "2")
+    return response
+
+
+@app.get("/stream")
+async def stream():
+    async def chunks():
+        for i in range(3):
+            yield f"{i}\n"
+
+    return StreamingResponse(chunks(), media_type="application/x-ndjson")
+
+
+@app.get("/files/{name}")
+async def raw_path(request: Request, name: str):
+    return {"name": name, "raw_path": request.scope["raw_path"].decode()}
+
+
+@app.get("/slow")
+async def slow():
+    await asyncio.sleep(5)
+    return {}
+
+
+def make_request(path, method="GET", **kwargs):
+    return FlaskRequest(
+        EnvironBuilder(path=path, method=method, **kwargs).get_environ()
+    )
+
+
+@pytest.fixture
+def bridge():
+    bridge = ASGIBridge(app)
+    yield bridge
+    bridge.close()
+
+
+def test_bridge_passes_body_query_and_headers(bridge):
+    response = bridge(
+        make_request(
+            "/echo?page=2", method="POST", data=b"hello", headers={"X-Test": "yes"}
+        )
+    )
+
+    assert response.status_code == 200
+    assert response.get_json()["body"] == "hello"
+    assert response.get_json()["query"] == "page=2"
+    assert response.get_json()["header"] == "yes"
+
+
+def test_bridge_reuses_loop_and_runs_lifespan_once(bridge):
+    startups.clear()
+
+    first = bridge(make_request("/echo", method="POST")).get_json()
+    second = bridge(make_request("/echo", method="POST")).get_json()
+
+    assert first["loop"] == second["loop"]
+    assert len(startups) == 1
+
+
+def test_bridge_keeps_repeated_response_headers(bridge):
+    response = bridge(make_request("/cookies"))
+
+    assert len(response.headers.getlist("set-cookie")) == 2
+
+
+def test_bridge_streams_multi_part_bodies(bridge):
+    response = bridge(make_request("/stream"))
+
+    assert response.is_streamed
+    assert b"".join(response.response) == b"0\n1\n2\n"
+
+
+def test_bridge_returns_404_for_unknown_route(bridge):
+    assert bridge(make_request("/missing")).status_code == 404
+
+
+def test_bridge_passes_the_undecoded_path(bridge):
+    request = make_request("/files/a%20b")
+    request.environ["RAW_URI"] = "/files/a%20b?x=1"
+
+    assert bridge(request).get_json() == {
+        "name": "a b",
+        "raw_path": "/files/a%20b",
+    }
+
+
+def test_bridge_answers_504_when_the_app_does_not_respond():
+    bridge = ASGIBridge(app, response_timeout=0.1)
+    try:
+        response = bridge(make_request("/slow"))
+    finally:
+        bridge.close()
+
+    assert response.status_code == 504
@@ -0,0 +1,288 @@
+import asyncio
+import json
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from app.dependencies import get_current_user_id, get_current_user_roles
+from app.routers.admin import router as admin_router
+from app.services.bulk_import import (
+    FAILED,
+    MAX_REQUEST_BYTES,
+    RUNNING,
+    SUCCEEDED,
+    ImportJobConflictError,
+    ImportService,
+    ImportTooLargeError,
+    RowReader,
+    get_import_service,
+)
+from app.services.near_duplicates import DuplicateDetector
+from app.services.ratings import ReviewService
+from fakes import FakeBucket, FakeFirestore
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+BIKES_CSV = (
+    "name,brand_id,price,model_year,specs.engine,specs.abs\n"
+    'Yamaha FZS V3,yamaha,250000,2024,149cc,"single\nchannel"\n'
+    "\n"
+    "Honda Hornet 2.0,honda,-1,2023,184cc,\n"
+    "Suzuki Gixxer,suzuki,230000\n"
+)
+
+
+async def upload(*parts: bytes):
+    for part in parts:
+        yield part
+
+
+def write(tmp_path, text: str, name: str = "upload") -> str:
+    path = tmp_path / name
+    path.write_bytes(text.encode("utf-8"))
+    return str(path)
+
+
+def bike_rows(count: int) -> str:
+    lines = ["name,brand_id,price,specs.engine"]
+    lines.extend(
+        f"Bike {i},brand{i % 7},{100000 + i},{100 + i}cc" for i in range(count)
+    )
+    return "\n".join(lines) + "\n"
+
+
+class FakeQueue:
+    """Collects dispatched job ids; tests run them as the worker would"""
+
+    def __init__(self):
+        self.jobs = []
+
+    async def __call__(self, job_id: str) -> None:
+        self.jobs.append(job_id)
+
+
+def make_service(client=None, **kwargs) -> ImportService:
+    options = dict(bucket=FakeBucket(), queue=FakeQueue(), retry_delay=0)
+    options.update(kwargs)
+    return ImportService(client or FakeFirestore(), **options)
+
+
+def test_csv_rows_stream_from_any_offset(tmp_path):
+    path = write(tmp_path, BIKES_CSV)
+    reader = RowReader(open(path, "rb"), "csv")
+    first, second, third = reader.take(10)
+    reader.close()
+
+    assert first.data == {
+        "name": "Yamaha FZS V3",
+        "brand_id": "yamaha",
+        "price": "250000",
+        "model_year": "2024",
+        "specs": {"engine": "149cc", "abs": "single\nchannel"},
+    }
+    assert "specs" in second.data and "abs" not in second.data["specs"]
+    assert third.error == "Expected 6 columns, got 3"
+    assert [row.number for row in (first, second, third)] == [1, 2, 3]
+
+    resumed = RowReader(open(path, "rb"), "csv", offset=first.end, number=1)
+    assert resumed.take(10) == [second, third]
+    resumed.close()
+
+
+def test_ndjson_rows_report_bad_lines(tmp_path):
+    path = write(tmp_path, '{"name": "বাইক"}\nnot json\n[1]\n\n{"name": "x"}\n')
+    reader = RowReader(open(path, "rb"), "ndjson")
+    rows = reader.take(2) + reader.take(10)
+    reader.close()
+
+    assert rows[0].data == {"name": "বাইক"}
+    assert rows[1].error.startswith("Invalid JSON")
+    assert rows[2].error == "Expected an object"
+    assert rows[3].number == 4 and rows[3].end == os.path.getsize(path)
+
+
+@pytest.mark.asyncio
+async def test_bike_import_writes_valid_rows_in_bounded_batches():
+    client = FakeFirestore()
+
+    async def slow_commit(kind):
+        if kind == "commit":
+            await asyncio.sleep(0.01)
+
+    client.rpc_hook = slow_commit
+    imports = make_service(client, chunk_size=100, concurrency=3)
+    text = bike_rows(1000) + "Broken,brand0,free,1cc\n"
+
+    job = await imports.start("bikes", "csv", upload(text.encode()), user_id="admin")
+    assert imports.queue.jobs == [job["id"]]
+    await imports.run(job["id"])
+    job = await imports.get(job["id"])
+
+    assert job["status"] == SUCCEEDED
+    assert (job["rows"], job["imported"], job["failed"]) == (1001, 1000, 1)
+    assert job["errors"][0]["row"] == 1001
+    assert "price" in job["errors"][0]["error"]
+    assert job["offset"] == job["bytes"] and job["rowsPerSecond"] > 0
+    assert len(client.data["bikes"]) == 1000
+    assert client.max_in_flight_batches == 3
+    bike = next(iter(client.data["bikes"].values()))
+    assert bike["brandId"].startswith("brand") and bike["specs"]["engine"]
+    # The upload is removed once imported, and a repeated task does nothing
+    assert not imports.bucket.blobs
+    await imports.run(job["id"])
+    assert (await imports.get(job["id"]))["status"] == SUCCEEDED
+
+
+@pytest.mark.asyncio
+async def test_failed_imports_resume_from_the_last_committed_chunk():
+    client = FakeFirestore()
+    failing = {"on": False}
+
+    async def commit_hook(operations):
+        if failing["on"] and len(client.data["bikes"]) >= 300:
+            raise RuntimeError("backend unavailable")
+
+    client.commit_hook = commit_hook
+    imports = make_service(client, chunk_size=100, concurrency=1)
+    failing["on"] = True
+    job = await imports.start("bikes", "csv", upload(bike_rows(1000).encode()))
+    # Raised so the task queue retries it
+    with pytest.raises(RuntimeError):
+        await imports.run(job["id"])
+    failed = await imports.get(job["id"])
+
+    assert failed["status"] == FAILED
+    assert failed["error"] == "backend unavailable"
+    assert (failed["rows"], failed["imported"]) == (300, 300)
+
+    failing["on"] = False
+    await imports.resume(job["id"])
+    assert imports.queue.jobs == [job["id"], job["id"]]
+    await imports.run(job["id"])
+    done = await imports.get(job["id"])
+
+    assert done["status"] == SUCCEEDED
+    assert (done["rows"], done["imported"], done["failed"]) == (1000, 1000, 0)
+    assert len(client.data["bikes"]) == 1000
+    # Only the chunks after the checkpoint were written again
+    assert sum(client.commits) == 1000
+
+
+@pytest.mark.asyncio
+async def test_review_import_skips_duplicates_and_rebuilds_ratings():
+    client = FakeFirestore()
+    client.data["bikes"]["b1"] = {"name": "FZ", "brandId": "yamaha", "price": 1}
+    client.data["bikes"]["b2"] = {"name": "R15", "brandId": "yamaha", "price": 2}
+    content = "সিট আরামদায়ক, মাইলেজ ভালো, তবে পিছনের সাসপেনশন একটু শক্ত।"
+    rows = [
+        {"bike_id": "b1", "user_id": "u1", "rating": 5, "content": content},
+        {"bike_id": "b1", "user_id": "u2", "rating": 3, "content": "OK"},
+        {"bike_id": "b2", "user_id": "u3", "rating": 4, "content": content + "!"},
+        {"bike_id": "nope", "user_id": "u4", "rating": 4, "content": "?"},
+        {"bike_id": "b2", "user_id": "u5", "rating": 9, "content": "!"},
+    ]
+    imports = make_service(
+        client,
+        chunk_size=2,
+        duplicates=DuplicateDetector(client),
+        ratings=ReviewService(client),
+    )
+    text = "".join(json.dumps(row, ensure_ascii=False) + "\n" for row in rows)
+
+    job = await imports.start("reviews", "ndjson", upload(text.encode()))
+    await imports.run(job["id"])
+    job = await imports.get(job["id"])
+
+    assert job["status"] == SUCCEEDED
+    assert [error["row"] for error in job["errors"]] == [3, 4, 5]
+    assert job["errors"][0]["error"].startswith("Near-duplicate of ")
+    assert job["errors"][1]["error"] == "Bike not found"
+    assert client.data["bikes"]["b1"]["ratingStats"]["count"] == 2
+    assert client.data["bikes"]["b1"]["ratingStats"]["sum"] == 8
+    assert {r["brandId"] for r in client.data["reviews"].values()} == {"yamaha"}
+
+
+@pytest.mark.asyncio
+async def test_interrupted_imports_resume_on_another_instance():
+    client, bucket = FakeFirestore(), FakeBucket()
+    imports = make_service(client, bucket=bucket, chunk_size=100)
+    job = await imports.start("bikes", "csv", upload(bike_rows(250).encode()))
+    job_ref = client.collection("importJobs").document(job["id"])
+    other = make_service(client, bucket=bucket, chunk_size=100)
+    stale = datetime.now(timezone.utc) - timedelta(seconds=other.lease + 1)
+    # A queued job still has its task, however long it has waited
+    await job_ref.update({"updatedAt": stale})
+    with pytest.raises(ImportJobConflictError):
+        await other.resume(job["id"])
+
+    # The worker's instance went away after the first chunk
+    await job_ref.update({"status": RUNNING, "updatedAt": datetime.now(timezone.utc)})
+    with pytest.raises(ImportJobConflictError):
+        await other.resume(job["id"])
+
+    await job_ref.update({"updatedAt": stale})
+    await other.resume(job["id"])
+    await other.run(other.queue.jobs[0])
+
+    job = await other.get(job["id"])
+    assert (job["status"], job["imported"]) == (SUCCEEDED, 250)
+
+
+@pytest.mark.asyncio
+async def test_uploads_are_capped_at_the_request_limit():
+    imports = make_service(max_bytes=1 << 40)
+    assert imports.max_bytes == MAX_REQUEST_BYTES
+
+    imports = make_service(max_bytes=100)
+    with pytest.raises(ImportTooLargeError):
+        await imports.start("bikes", "csv", upload(bike_rows(10).encode()))
+    assert not imports.bucket.blobs and not imports.queue.jobs
+
+
+def test_import_routes():
+    client = FakeFirestore()
+    imports = make_service(client)
+
+    async def run_now(job_id: str) -> None:
+        asyncio.ensure_future(imports.run(job_id))
+
+    imports.queue = run_now
+    app = FastAPI()
+    app.include_router(admin_router, prefix="/admin")
+    app.dependency_overrides[get_import_service] = lambda: imports
+    app.dependency_overrides[get_current_user_id] = lambda: "admin-uid"
+    app.dependency_overrides[get_current_user_roles] = lambda: ["admin"]
+
+    with TestClient(app) as http:
+        response = http.post(
+            "/admin/import/bikes",
+            content=BIKES_CSV.encode(),
+            headers={"Content-Type": "text/csv; charset=utf-8"},
+        )
+        assert response.status_code == 202
+        job_id = response.json()["id"]
+        for _ in range(100):
+            job = http.get(f"/admin/import/status/{job_id}").json()
+            if job["status"] == SUCCEEDED:
+                break
+            time.sleep(0.01)
+        assert (job["imported"], job["failed"], job["created_by"]) == (
+            1,
+            2,
+            "admin-uid",
+        )
+        assert http.get("/admin/import/status").json()[0]["id"] == job_id
+        assert http.post(f"/admin/import/{job_id}/resume").status_code == 409
+        assert http.get("/admin/import/status/nope").status_code == 404
+        assert (
+            http.post(
+                "/admin/import/reviews",
+                content=b"{}",
+                headers={"Content-Type": "application/json"},
+            ).status_code
+            == 415
+        )
+
+        app.dependency_overrides[get_current_user_roles] = lambda: ["user"]
+        assert http.get("/admin/import/status").status_code == 403
@@ -0,0 +1,146 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from app.routers import bikes as bikes_router
+from app.services.catalog_index import BikeCatalog, CatalogIndex, get_bike_catalog
+from app.services.repositories import BikeRepository
+from fakes import FakeFirestore
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+BASE_TIME = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+BIKES = [
+    ("fz", "yamaha", "sport", 2000),
+    ("r15", "yamaha", "sport", 4500),
+    ("cbr", "honda", "sport", 4000),
+    ("shine", "honda", "commuter", 1000),
+    ("pulsar", "bajaj", "commuter", 1500),
+]
+
+
+def bike(bike_id, brand, bike_type, price, **extra):
+    return {
+        "id": bike_id,
+        "name": bike_id.upper(),
+        "brandId": brand,
+        "typeId": bike_type,
+        "price": price,
+        **extra,
+    }
+
+
+def build_index():
+    index = CatalogIndex()
+    for row in BIKES:
+        index.upsert(bike(*row))
+    return index
+
+
+def ids(result):
+    return [doc["id"] for doc in result.items]
+
+
+def test_filters_combine_brand_type_and_price():
+    index = build_index()
+
+    result = index.search(brands=["yamaha", "honda"], types=["sport"], max_price=4000)
+
+    assert ids(result) == ["fz", "cbr"]
+    assert result.total == 2
+
+
+def test_facet_counts_ignore_their_own_filter():
+    index = build_index()
+
+    result = index.search(brands=["honda"], min_price=1500)
+
+    assert result.facets["brand"] == {"yamaha": 2, "honda": 1, "bajaj": 1}
+    assert result.facets["type"] == {"sport": 1}
+
+
+def test_sorting_and_offset():
+    index = build_index()
+
+    assert ids(index.search(sort="price_desc", limit=2)) == ["r15", "cbr"]
+    assert ids(index.search(sort="name", offset=3)) == ["r15", "shine"]
+
+
+def test_updates_move_bikes_between_facets_and_reuse_slots():
+    index = build_index()
+
+    index.upsert(bike("fz", "honda", "commuter", 900))
+    index.remove("pulsar")
+    index.upsert(bike("apache", "tvs", "sport", 1800))
+
+    assert ids(index.search(brands=["honda"])) == ["fz", "shine", "cbr"]
+    assert index.search(brands=["bajaj"]).total == 0
+    assert ids(index.search(min_price=1800, max_price=1800)) == ["apache"]
+    assert len(index) == 5
+    assert len(index._docs) == 5
+
+
+def test_fingerprint_depends_only_on_the_indexed_bikes():
+    index = build_index()
+    other = CatalogIndex()
+    other.upsert(bike("apache", "tvs", "sport", 1800))
+    for row in reversed(BIKES):
+        other.upsert(bike(*row[:3], 1))
+        other.upsert(bike(*row))
+    other.remove("apache")
+
+    assert other.fingerprint == index.fingerprint
+    other.upsert(bike("fz", "yamaha", "sport", 2100))
+    assert other.fingerprint != index.fingerprint
+
+
+@pytest.mark.asyncio
+async def test_catalog_loads_once_then_syncs_only_changed_bikes():
+    client = FakeFirestore()
+    for i, row in enumerate(BIKES):
+        data = bike(*row, updatedAt=BASE_TIME + timedelta(minutes=i))
+        client.data["bikes"][data.pop("id")] = data
+    now = [0.0]
+    catalog = BikeCatalog(
+        BikeRepository(client), sync_interval=30, page_size=2, clock=lambda: now[0]
+    )
+
+    assert (await catalog.search()).total == 5
+    reads = client.reads
+    await catalog.search(brands=["honda"])
+    assert client.reads == reads
+
+    client.data["bikes"]["shine"].update(
+        price=5000, updatedAt=BASE_TIME + timedelta(hours=1)
+    )
+    client.data["bikes"]["pulsar"].update(
+        deleted=True, updatedAt=BASE_TIME + timedelta(hours=1)
+    )
+    now[0] = 60
+    await catalog.search()
+    await catalog._refreshing
+
+    result = await catalog.search(sort="price_desc")
+    assert ids(result)[0] == "shine"
+    assert result.total == 4
+    assert client.reads == reads + 2
+
+
+def test_search_route_uses_the_index():
+    client = FakeFirestore()
+    for row in BIKES:
+        data = bike(*row)
+        client.data["bikes"][data.pop("id")] = data
+    catalog = BikeCatalog(BikeRepository(client))
+    app = FastAPI()
+    app.include_router(bikes_router.router, prefix="/bikes")
+    app.dependency_overrides[get_bike_catalog] = lambda: catalog
+    http = TestClient(app)
+
+    body = http.get(
+        "/bikes/search", params={"brand": ["honda", "bajaj"], "sort": "price_asc"}
+    ).json()
+
+    assert [item["id"] for item in body["items"]] == ["shine", "pulsar", "cbr"]
+    assert body["facets"]["type"] == {"sport": 1, "commuter": 2}
+    assert http.get("/bikes/search", params={"sort": "random"}).status_code == 422
@@ -0,0 +1,107 @@
+import json
+
+import pytest
+from app.dependencies import get_current_user_roles
+from app.models.bike import BikeResponse
+from app.routers import bikes as bikes_router
+from app.routers import reviews as reviews_router
+from app.services.export import ndjson_rows
+from app.services.ratings import ReviewService
+from app.services.repositories import (
+    BikeRepository,
+    ReviewRepository,
+    get_bike_repository,
+    get_review_repository,
+)
+from fakes import FakeFirestore
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+
+def seed_bikes(client, count):
+    for i in range(count):
+        client.data["bikes"][f"b{i:04d}"] = {
+            "name": f"Bike {i}",
+            "brandId": "honda" if i % 2 else "yamaha",
+            "price": i,
+        }
+
+
+def make_app(client, roles=("admin",)):
+    app = FastAPI()
+    app.include_router(bikes_router.router, prefix="/bikes")
+    app.include_router(reviews_router.router, prefix="/reviews")
+    app.dependency_overrides[get_bike_repository] = lambda: BikeRepository(client)
+    app.dependency_overrides[get_review_repository] = lambda: ReviewRepository(client)
+    app.dependency_overrides[get_current_user_roles] = lambda: roles
+    return TestClient(app)
+
+
+def read_rows(response):
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_export_streams_every_bike_and_resumes_from_a_row_cursor():
+    client = FakeFirestore()
+    seed_bikes(client, 1200)
+    http = make_app(client)
+
+    response = http.get("/bikes/export")
+    rows = read_rows(response)
+
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert [row["id"] for row in rows] == sorted(client.data["bikes"])
+    assert client.queries == 3
+
+    resumed = read_rows(
+        http.get("/bikes/export", params={"cursor": rows[999]["cursor"]})
+    )
+    assert [row["id"] for row in resumed] == [row["id"] for row in rows[1000:]]
+
+
+def test_export_filters_by_brand_and_rejects_bad_cursors():
+    client = FakeFirestore()
+    seed_bikes(client, 10)
+    http = make_app(client)
+
+    rows = read_rows(http.get("/bikes/export", params={"brand_id": "honda"}))
+
+    assert {row["brand_id"] for row in rows} == {"honda"}
+    assert len(rows) == 5
+    assert http.get("/bikes/export", params={"cursor": "???"}).status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_stopping_the_stream_stops_paging():
+    client = FakeFirestore()
+    seed_bikes(client, 2000)
+    rows = await BikeRepository(client).scan(page_size=100)
+    stream = ndjson_rows(rows, BikeResponse.from_document, chunk_size=1)
+
+    for _ in range(150):
+        await stream.__anext__()
+    await stream.aclose()
+
+    assert client.queries == 2
+    assert client.reads <= 202
+
+
+@pytest.mark.asyncio
+async def test_reviews_export_by_brand():
+    client = FakeFirestore()
+    seed_bikes(client, 4)
+    service = ReviewService(client)
+    for bike_id in client.data["bikes"]:
+        await service.create("u1", bike_id, rating=4, content="ok")
+    http = make_app(client)
+
+    rows = read_rows(http.get("/reviews/export", params={"brand_id": "yamaha"}))
+
+    assert sorted(row["bike_id"] for row in rows) == ["b0000", "b0002"]
+
+
+def test_exports_need_the_export_permission():
+    http = make_app(FakeFirestore(), roles=["user"])
+
+    assert http.get("/bikes/export").status_code == 403
+    assert http.get("/reviews/export").status_code == 403
@@ -0,0 +1,158 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from app.routers import bikes as bikes_router
+from app.services.firestore_repository import (
+    InvalidCursorError,
+    decode_cursor,
+    encode_cursor,
+)
+from app.services.repositories import (
+    BikeRepository,
+    ReviewRepository,
+    get_bike_repository,
+)
+from fakes import FakeFirestore
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+BASE_TIME = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def seed_reviews(client, bike_id="b1", count=25):
+    for i in range(count):
+        client.data["reviews"][f"r{i:02d}"] = {
+            "bikeId": bike_id,
+            "userId": f"u{i}",
+            "rating": i % 5 + 1,
+            "content": "text " * 50,
+            "createdAt": BASE_TIME + timedelta(days=i % 3),
+        }
+    client.data["reviews"]["other"] = {"bikeId": "b2", "rating": 5, "userId": "x"}
+
+
+def test_cursor_round_trips_timestamps():
+    values = [4, BASE_TIME, "r01"]
+    assert decode_cursor(encode_cursor(values)) == values
+
+
+def test_invalid_cursor_is_rejected():
+    with pytest.raises(InvalidCursorError):
+        decode_cursor("not-a-cursor!")
+
+
+@pytest.mark.asyncio
+async def test_keyset_pages_cover_every_review_once_in_index_order():
+    client = FakeFirestore()
+    seed_reviews(client)
+    repository = ReviewRepository(client)
+
+    seen, cursor = [], None
+    while True:
+        page, cursor = await repository.list_for_bike("b1", limit=10, cursor=cursor)
+        seen.extend(page)
+        if cursor is None:
+            break
+
+    assert len(seen) == 25
+    assert len({doc["id"] for doc in seen}) == 25
+    keys = [(doc["rating"], doc["createdAt"]) for doc in seen]
+    assert keys == sorted(keys, reverse=True)
+    # Each page reads at most one document beyond its limit
+    assert client.reads == 25 + 2
+
+
+@pytest.mark.asyncio
+async def test_list_projection_keeps_order_fields():
+    client = FakeFirestore()
+    seed_reviews(client, count=3)
+    repository = ReviewRepository(client)
+
+    page, _ = await repository.list_for_bike("b1", fields=["userId"])
+
+    assert set(page[0]) == {"id", "userId", "rating", "createdAt"}
+
+
+@pytest.mark.asyncio
+async def test_cursor_from_another_query_is_rejected():
+    client = FakeFirestore()
+    repository = BikeRepository(client)
+    cursor = encode_cursor([5, BASE_TIME, "r01"])
+
+    with pytest.raises(InvalidCursorError):
+        await repository.list_by_price(cursor=cursor)
+
+
+@pytest.mark.asyncio
+async def test_get_many_reads_each_document_once():
+    client = FakeFirestore()
+    client.data["bikes"].update(
+        {"a": {"name": "A", "price": 1}, "b": {"name": "B", "price": 2}}
+    )
+    repository = BikeRepository(client)
+
+    found = await repository.get_many(["a", "b", "a", "missing"], fields=["name"])
+
+    assert found == {"a": {"id": "a", "name": "A"}, "b": {"id": "b", "name": "B"}}
+    assert client.reads == 3
+
+
+@pytest.mark.asyncio
+async def test_concurrent_gets_share_one_read():
+    client = FakeFirestore()
+    client.data["bikes"]["a"] = {"name": "A"}
+    repository = BikeRepository(client)
+
+    results = await asyncio.gather(*(repository.get("a") for _ in range(10)))
+
+    assert all(result == {"id": "a", "name": "A"} for result in results)
+    assert client.reads == 1
+
+
+@pytest.mark.asyncio
+async def test_batch_writer_chunks_and_bounds_concurrency():
+    client = FakeFirestore()
+
+    async def slow_commit(operations):
+        await asyncio.sleep(0.01)
+
+    client.commit_hook = slow_commit
+    repository = BikeRepository(client)
+
+    async with repository.writer(max_concurrency=2) as writer:
+        for i in range(1201):
+            writer.set(repository.document(f"b{i}"), {"price": i})
+
+    assert sorted(client.commits) == [201, 500, 500]
+    assert client.max_in_flight_batches == 2
+    assert writer.committed == 1201
+    assert len(client.data["bikes"]) == 1201
+
+
+def test_list_bikes_route_paginates_by_brand():
+    client = FakeFirestore()
+    for i in range(5):
+        client.data["bikes"][f"b{i}"] = {
+            "name": f"Bike {i}",
+            "brandId": "honda" if i % 2 else "yamaha",
+            "price": 1000 - i,
+            "specs": {"engine": "150cc"},
+        }
+    app = FastAPI()
+    app.include_router(bikes_router.router, prefix="/bikes")
+    app.dependency_overrides[get_bike_repository] = lambda: BikeRepository(client)
+    http = TestClient(app)
+
+    first = http.get("/bikes/", params={"brand_id": "yamaha", "limit": 2}).json()
+    second = http.get(
+        "/bikes/", params={"brand_id": "yamaha", "cursor": first["next_cursor"]}
+    ).json()
+
+    assert [bike["id"] for bike in first["items"]] == ["b4", "b2"]
+    assert first["items"][0]["specs"] is None
+    assert [bike["id"] for bike in second["items"]] == ["b0"]
+    assert second["next_cursor"] is None
+    assert http.get("/bikes/", params={"cursor": "%%%"}).status_code == 400
+    assert http.get("/bikes/b0").json()["specs"] == {"engine": "150cc"}
+    assert http.get("/bikes/nope").status_code == 404
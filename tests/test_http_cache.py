@@ -0,0 +1,116 @@
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+from app.dependencies import get_current_user_id, get_current_user_roles
+from app.http_cache import etag_for, etag_matches
+from app.routers import bikes as bikes_router
+from app.routers import users as users_router
+from app.services.catalog_index import BikeCatalog, get_bike_catalog
+from app.services.firebase_service import get_firebase_service
+from app.services.repositories import BikeRepository, get_bike_repository
+from app.services.user_cache import UserCache, get_user_cache
+from fakes import FakeFirestore
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+
+def test_etag_matching_follows_if_none_match_rules():
+    etag = etag_for({"a": 1})
+
+    assert etag.startswith('"') and etag == etag_for({"a": 1})
+    assert etag_matches(f'"other", W/{etag}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('"other"', etag)
+    assert not etag_matches(None, etag)
+
+
+def make_catalog_app(client):
+    app = FastAPI()
+    app.include_router(bikes_router.router, prefix="/bikes")
+    app.dependency_overrides[get_bike_repository] = lambda: BikeRepository(client)
+    catalog = BikeCatalog(BikeRepository(client))
+    app.dependency_overrides[get_bike_catalog] = lambda: catalog
+    return TestClient(app), catalog
+
+
+def test_bike_detail_revalidates_until_the_document_changes():
+    client = FakeFirestore()
+    client.data["bikes"]["fz"] = {"name": "FZ", "brandId": "yamaha", "price": 100}
+    http, _ = make_catalog_app(client)
+
+    first = http.get("/bikes/fz")
+    etag = first.headers["etag"]
+    assert "stale-while-revalidate" in first.headers["cache-control"]
+
+    again = http.get("/bikes/fz", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.content == b""
+    assert again.headers["etag"] == etag
+
+    client.data["bikes"]["fz"]["ratingStats"] = {"count": 1, "sum": 5}
+    changed = http.get("/bikes/fz", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.json()["rating"]["average"] == 5.0
+
+
+def test_search_etag_follows_catalog_content_and_query():
+    client = FakeFirestore()
+    client.data["bikes"]["fz"] = {"name": "FZ", "brandId": "yamaha", "price": 100}
+    http, catalog = make_catalog_app(client)
+
+    etag = http.get("/bikes/search", params={"brand": "yamaha"}).headers["etag"]
+    catalog.index.search = MagicMock(wraps=catalog.index.search)
+    revalidated = http.get(
+        "/bikes/search", params={"brand": "yamaha"}, headers={"If-None-Match": etag}
+    )
+    # A 304 does not run the search
+    catalog.index.search.assert_not_called()
+    other_query = http.get(
+        "/bikes/search", params={"brand": "honda"}, headers={"If-None-Match": etag}
+    )
+    catalog.apply({"id": "cbr", "name": "CBR", "brandId": "honda", "price": 200})
+    after_change = http.get(
+        "/bikes/search", params={"brand": "yamaha"}, headers={"If-None-Match": etag}
+    )
+
+    assert revalidated.status_code == 304
+    assert other_query.status_code == 200
+    assert after_change.status_code == 200
+
+
+def test_users_me_returns_304_from_the_cache_without_loading():
+    record = SimpleNamespace(
+        uid="u1",
+        email="rider@example.com",
+        display_name="Rider",
+        photo_url=None,
+        email_verified=True,
+        disabled=False,
+    )
+    calls = []
+
+    class Firebase:
+        async def get_user(self, uid):
+            calls.append(uid)
+            return record
+
+    app = FastAPI()
+    app.include_router(users_router.router, prefix="/users")
+    cache = UserCache()
+    app.dependency_overrides.update(
+        {
+            get_current_user_id: lambda: "u1",
+            get_current_user_roles: lambda: ["user"],
+            get_firebase_service: Firebase,
+            get_user_cache: lambda: cache,
+        }
+    )
+    http = TestClient(app)
+
+    first = http.get("/users/me")
+    second = http.get("/users/me", headers={"If-None-Match": first.headers["etag"]})
+
+    assert first.json()["email"] == "rider@example.com"
+    assert first.headers["cache-control"] == "private, no-cache"
+    assert second.status_code == 304
+    assert calls == ["u1"]
@@ -0,0 +1,218 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from app.dependencies import get_current_user_id
+from app.metrics import process_memory
+from app.routers.ai import router as ai_router
+from app.services.ai_service import LazyGenerator, get_ai_engine, mmap_safetensors
+from app.services.inference import (
+    BatchingEngine,
+    InferenceOverloadedError,
+    InferenceTimeoutError,
+)
+from app.services.repositories import (
+    BikeRepository,
+    ReviewRepository,
+    get_bike_repository,
+    get_review_repository,
+)
+from app.services.tiered_cache import TieredCache
+from fakes import FakeFirestore
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+
+class FakeModel:
+    name = "fake"
+
+    def __init__(self, fail=False):
+        self.batches = []
+        self.fail = fail
+        self.release = threading.Event()
+        self.release.set()
+
+    def generate(self, prompts, max_new_tokens):
+        self.release.wait(5)
+        self.batches.append((list(prompts), max_new_tokens))
+        if self.fail:
+            raise RuntimeError("model crashed")
+        return [f"{prompt}!" for prompt in prompts]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_prompts_share_batches():
+    model = FakeModel()
+    engine = BatchingEngine(model, max_batch_size=4, max_wait=0.05)
+
+    results = await asyncio.gather(*(engine.generate(f"p{i}", 16) for i in range(10)))
+
+    assert results == [f"p{i}!" for i in range(10)]
+    assert [len(prompts) for prompts, _ in model.batches] == [4, 4, 2]
+    await engine.close()
+
+
+@pytest.mark.asyncio
+async def test_a_lone_prompt_waits_at_most_max_wait():
+    model = FakeModel()
+    engine = BatchingEngine(model, max_batch_size=8, max_wait=0.01)
+
+    assert await asyncio.wait_for(engine.generate("alone", 16), 1) == "alone!"
+    assert model.batches == [(["alone"], 16)]
+    await engine.close()
+
+
+@pytest.mark.asyncio
+async def test_prompts_arriving_during_a_batch_form_the_next_one():
+    model = FakeModel()
+    model.release.clear()
+    engine = BatchingEngine(model, max_batch_size=8, max_wait=0)
+
+    first = asyncio.ensure_future(engine.generate("first", 16))
+    await asyncio.sleep(0.02)
+    rest = [asyncio.ensure_future(engine.generate(f"p{i}", 16)) for i in range(5)]
+    await asyncio.sleep(0.02)
+    model.release.set()
+    await asyncio.gather(first, *rest)
+
+    assert [len(prompts) for prompts, _ in model.batches] == [1, 5]
+    await engine.close()
+
+
+@pytest.mark.asyncio
+async def test_batches_only_mix_equal_token_budgets():
+    model = FakeModel()
+    engine = BatchingEngine(model, max_batch_size=8, max_wait=0.02)
+
+    await asyncio.gather(
+        engine.generate("a", 16), engine.generate("b", 64), engine.generate("c", 16)
+    )
+
+    assert sorted(model.batches) == [(["a", "c"], 16), (["b"], 64)]
+    await engine.close()
+
+
+@pytest.mark.asyncio
+async def test_repeated_prompts_are_generated_once():
+    model = FakeModel()
+    engine = BatchingEngine(model, max_wait=0.01, cache=TieredCache())
+
+    together = await asyncio.gather(*(engine.generate("same", 16) for _ in range(3)))
+    later = await engine.generate("same", 16)
+
+    assert together == ["same!"] * 3 and later == "same!"
+    assert model.batches == [(["same"], 16)]
+    await engine.close()
+
+
+@pytest.mark.asyncio
+async def test_full_queue_and_slow_batches_are_rejected():
+    model = FakeModel()
+    model.release.clear()
+    engine = BatchingEngine(model, max_batch_size=1, max_wait=0, max_queue=1)
+
+    running = asyncio.ensure_future(engine.generate("running", 16))
+    await asyncio.sleep(0.02)
+    engine.timeout = 0.05
+    queued = asyncio.ensure_future(engine.generate("queued", 16))
+    await asyncio.sleep(0)
+    with pytest.raises(InferenceOverloadedError):
+        await engine.generate("rejected", 16)
+
+    with pytest.raises(InferenceTimeoutError):
+        await queued
+    model.release.set()
+    assert await running == "running!"
+    assert engine.stats()["rejected"] == 1
+    await engine.close()
+
+
+@pytest.mark.asyncio
+async def test_model_errors_reach_every_prompt_in_the_batch():
+    engine = BatchingEngine(FakeModel(fail=True), max_wait=0.01)
+
+    results = await asyncio.gather(
+        engine.generate("a", 16), engine.generate("b", 16), return_exceptions=True
+    )
+
+    assert [str(e) for e in results] == ["model crashed", "model crashed"]
+    assert engine.stats()["failed"] == 2
+    await engine.close()
+
+
+def test_generate_endpoints_build_prompts_from_the_catalog():
+    client = FakeFirestore()
+    client.data["bikes"]["fz"] = {"name": "FZ", "brandId": "yamaha", "price": 100}
+    client.data["bikes"]["r15"] = {"name": "R15", "brandId": "yamaha", "price": 200}
+    model = FakeModel()
+    app = FastAPI()
+    app.include_router(ai_router, prefix="/ai")
+    app.dependency_overrides.update(
+        {
+            get_current_user_id: lambda: "u1",
+            get_bike_repository: lambda: BikeRepository(client),
+            get_review_repository: lambda: ReviewRepository(client),
+            get_ai_engine: lambda: BatchingEngine(model, max_wait=0),
+        }
+    )
+    http = TestClient(app)
+
+    review = http.post("/ai/generate/review", json={"bike_id": "fz", "rating": 4})
+    comparison = http.post(
+        "/ai/generate/comparison", json={"bike_ids": ["fz", "r15"], "language": "en"}
+    )
+    missing = http.post("/ai/generate/summary", json={"bike_id": "nope"})
+
+    assert review.status_code == 200
+    assert review.json()["model"] == "fake"
+    assert "Bike: FZ (yamaha, 100 BDT)" in review.json()["text"]
+    assert "Rating: 4/5" in review.json()["text"]
+    assert comparison.json()["text"].startswith("Compare these motorcycles in English")
+    assert missing.status_code == 404
+
+
+def test_lazy_generator_loads_once_on_first_use():
+    loads = []
+
+    def load():
+        loads.append(1)
+        return FakeModel()
+
+    model = LazyGenerator("fake", load)
+    assert not model.loaded
+
+    with ThreadPoolExecutor(4) as pool:
+        outputs = list(pool.map(lambda p: model.generate([p], 8), "abcd"))
+
+    assert outputs == [["a!"], ["b!"], ["c!"], ["d!"]]
+    assert loads == [1]
+    assert model.first_inference_seconds >= model.load_seconds >= 0
+    names = {family.name for family in model.collect()}
+    assert names == {"ai_model_load_seconds", "ai_first_inference_seconds"}
+
+
+def test_process_memory_splits_shared_pages():
+    memory = process_memory()
+    if not memory:
+        pytest.skip("needs /proc/self/smaps_rollup")
+    assert memory["rss"] >= memory["pss"] >= memory["uss"] > 0
+
+
+def test_mmap_safetensors_matches_the_saved_tensors(tmp_path):
+    torch = pytest.importorskip("torch")
+    safetensors_torch = pytest.importorskip("safetensors.torch")
+    tensors = {
+        "weight": torch.randn(4, 3),
+        "bias": torch.arange(5, dtype=torch.int64),
+        "scale": torch.tensor(2.0, dtype=torch.bfloat16),
+    }
+    path = tmp_path / "model.safetensors"
+    safetensors_torch.save_file(tensors, str(path))
+
+    mapped = mmap_safetensors(path)
+
+    assert set(mapped) == set(tensors)
+    for name, tensor in tensors.items():
+        assert mapped[name].dtype == tensor.dtype
+        assert torch.equal(mapped[name], tensor)
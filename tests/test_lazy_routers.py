@@ -0,0 +1,48 @@
+from app.lazy_routers import LazyRouterMiddleware, RouterSpec
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+
+def make_app():
+    app = FastAPI()
+    app.add_middleware(
+        LazyRouterMiddleware,
+        routers=[RouterSpec("app.routers.auth", "/auth", ["Authentication"])],
+    )
+
+    @app.get("/health")
+    async def health_check():
+        return {"status": "healthy"}
+
+    return app
+
+
+def route_paths(app):
+    return {route.path for route in app.routes}
+
+
+def test_router_is_not_loaded_before_first_matching_request():
+    app = make_app()
+    client = TestClient(app)
+
+    assert client.get("/health").status_code == 200
+    assert "/auth/token" not in route_paths(app)
+
+
+def test_router_is_loaded_on_first_matching_request():
+    app = make_app()
+    client = TestClient(app)
+
+    # 405 proves the route exists without running its dependencies
+    response = client.get("/auth/token")
+
+    assert response.status_code == 405
+    assert "/auth/token" in route_paths(app)
+
+
+def test_prefix_match_requires_path_boundary():
+    spec = RouterSpec("app.routers.auth", "/auth", [])
+
+    assert spec.matches("/auth")
+    assert spec.matches("/auth/token")
+    assert not spec.matches("/authors")
@@ -0,0 +1,224 @@
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from app.services import near_duplicates
+from app.services.near_duplicates import (
+    BIKES,
+    REVIEWS,
+    DuplicateDetector,
+    NearDuplicateIndex,
+    normalize,
+)
+from app.services.ratings import ReviewService
+from fakes import FakeFirestore
+from fastapi import HTTPException
+
+REVIEW = (
+    "বাইকটির মাইলেজ শহরে ৪৫ কিমি, হাইওয়েতে আরও বেশি। সিট আরামদায়ক, "
+    "তবে পিছনের সাসপেনশন একটু শক্ত। Overall a smooth and reliable commuter."
+)
+
+
+def words(rng: random.Random, count: int) -> str:
+    vocabulary = ["engine", "mileage", "brake", "seat", "ride", "price", "torque"]
+    return " ".join(
+        rng.choice(vocabulary) + str(rng.randrange(500)) for _ in range(count)
+    )
+
+
+def test_normalize_folds_case_digits_and_punctuation():
+    assert normalize("  Yamaha FZ-S  V3, ৪৫ কি.মি!! ") == "yamaha fz s v3 45 কি মি"
+    # Zero-width joiners vanish; vowel signs and the hasanta stay
+    assert normalize("র‍্যাব") == "র্যাব"
+
+
+def test_near_duplicates_are_found_and_unrelated_texts_are_not():
+    index = NearDuplicateIndex()
+    index.add("original", REVIEW)
+    index.add("other", "Terrible brakes and the dealer never answered my calls.")
+
+    edited = REVIEW.replace("৪৫", "45").replace("smooth", "Smooth!!") + " 👍"
+    assert [match.key for match in index.query(edited)] == ["original"]
+    assert index.query(REVIEW)[0].similarity == 1.0
+    assert index.query("Great bike, would buy again") == []
+    assert index.query(REVIEW, exclude="original") == []
+
+
+def test_queries_only_compare_bucket_candidates(monkeypatch):
+    rng = random.Random(7)
+    index = NearDuplicateIndex()
+    for i in range(2000):
+        index.add(str(i), words(rng, 30))
+    compared = []
+    real_similarity = near_duplicates.similarity
+
+    def counting(a, b):
+        compared.append(1)
+        return real_similarity(a, b)
+
+    monkeypatch.setattr(near_duplicates, "similarity", counting)
+    target = index.query(words(random.Random(7), 30))
+
+    assert target[0].key == "0"
+    assert len(compared) < 50
+
+
+def test_the_log_survives_restarts(tmp_path):
+    path = str(tmp_path / "reviews.minhash")
+    index = NearDuplicateIndex(path=path)
+    index.add("a", REVIEW)
+    index.add("b", "Terrible brakes and the dealer never answered my calls.")
+    index.add("c", "Fuel gauge broke after a month, otherwise fine.")
+    index.remove("b")
+    index.set_checkpoint(1700000000.5)
+    index.close()
+    # A crash halfway through a record loses only that record
+    with open(path, "ab") as f:
+        f.write(b"\x01\x05\x00ab")
+
+    reopened = NearDuplicateIndex(path=path)
+
+    assert len(reopened) == 2 and "b" not in reopened
+    assert reopened.query(REVIEW)[0].key == "a"
+    assert reopened.checkpoint == 1700000000.5
+    # A second process sees the entries but leaves the log to its writer
+    reader = NearDuplicateIndex(path=path)
+    reader.add("d", "Only in memory")
+    reopened.close()
+    assert "d" not in NearDuplicateIndex(path=path)
+    with pytest.raises(ValueError):
+        NearDuplicateIndex(num_perm=128, bands=16, path=path)
+
+
+def test_the_log_works_without_fcntl(tmp_path, monkeypatch):
+    monkeypatch.setattr(near_duplicates, "fcntl", None)
+    path = str(tmp_path / "reviews.minhash")
+    index = NearDuplicateIndex(path=path)
+    index.add("a", REVIEW)
+    index.close()
+
+    assert "a" in NearDuplicateIndex(path=path)
+
+
+def make_service(**kwargs):
+    client = FakeFirestore()
+    client.data["bikes"]["b1"] = {"name": "FZ", "brandId": "yamaha", "price": 100}
+    client.data["bikes"]["b2"] = {"name": "R15", "brandId": "yamaha", "price": 200}
+    detector = DuplicateDetector(client, **kwargs)
+    return client, detector, ReviewService(client, duplicates=detector)
+
+
+@pytest.mark.asyncio
+async def test_near_duplicate_reviews_are_rejected_before_writing():
+    client, detector, reviews = make_service()
+    first = await reviews.create("u1", "b1", rating=5, content=REVIEW)
+
+    with pytest.raises(HTTPException) as exc_info:
+        await reviews.create("u2", "b2", rating=5, content=REVIEW + " Recommended.")
+    assert exc_info.value.status_code == 409
+    assert first["id"] in exc_info.value.detail
+    assert len(client.data["reviews"]) == 1
+
+    # Short reviews repeat legitimately
+    await reviews.create("u2", "b1", rating=4, content="ভালো বাইক")
+    await reviews.create("u3", "b1", rating=4, content="ভালো বাইক")
+
+    await reviews.delete(first["id"], "u1")
+    await reviews.create("u2", "b2", rating=5, content=REVIEW)
+    assert len(client.data["reviews"]) == 3
+
+
+@pytest.mark.asyncio
+async def test_failed_writes_release_their_reservation():
+    client, detector, reviews = make_service()
+
+    with pytest.raises(HTTPException):
+        await reviews.create("u1", "missing", rating=5, content=REVIEW)
+    review = await reviews.create("u1", "b1", rating=5, content=REVIEW)
+
+    assert (await detector.index(REVIEWS)).query(REVIEW)[0].key == review["id"]
+
+
+@pytest.mark.asyncio
+async def test_indexes_load_from_firestore_and_catch_up_from_their_checkpoint(
+    tmp_path,
+):
+    client = FakeFirestore()
+    then = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    client.data["bikes"]["b1"] = {
+        "name": "Yamaha FZS V3 ABS",
+        "brandId": "yamaha",
+        "modelYear": 2024,
+        "specs": {"engine": "149cc", "abs": "single channel"},
+        "updatedAt": then,
+    }
+    # Bikes without updatedAt are still indexed by the first load
+    client.data["bikes"]["b2"] = {"name": "Suzuki Gixxer SF", "brandId": "suzuki"}
+    detector = DuplicateDetector(client, directory=str(tmp_path))
+    scraped = {
+        "name": "Yamaha FZ-S V3 ABS",
+        "brandId": "yamaha",
+        "modelYear": 2024,
+        "specs": {"engine": "149cc", "abs": "Single Channel"},
+    }
+    gixxer = {"name": "suzuki gixxer sf", "brandId": "suzuki"}
+    assert [m.key for m in await detector.find(BIKES, scraped)] == ["b1"]
+    assert [m.key for m in await detector.find(BIKES, gixxer)] == ["b2"]
+    detector.close()
+
+    client.data["bikes"]["b3"] = {
+        "name": "Honda Hornet 2.0",
+        "brandId": "honda",
+        "updatedAt": then + timedelta(days=1),
+    }
+    client.data["bikes"]["b1"]["deleted"] = True
+    client.data["bikes"]["b1"]["updatedAt"] = then + timedelta(days=1)
+    client.reads = 0
+    restarted = DuplicateDetector(client, directory=str(tmp_path))
+    hornet = {"name": "Honda Hornet 2.0", "brandId": "honda"}
+
+    assert await restarted.find(BIKES, scraped) == []
+    assert [m.key for m in await restarted.find(BIKES, hornet)] == ["b3"]
+    # Only the changed bikes were read again
+    assert client.reads == 2
+
+
+@pytest.mark.asyncio
+async def test_writes_pass_while_the_index_loads_in_the_background():
+    client, detector, reviews = make_service(background_load=True)
+    client.data["reviews"]["old"] = {"bikeId": "b1", "userId": "u0", "content": REVIEW}
+
+    # Nothing to check against yet: the write goes through unchecked
+    first = await reviews.create("u1", "b2", rating=5, content=REVIEW)
+    assert await detector.find(REVIEWS, {"content": REVIEW}) == []
+    await reviews.delete(first["id"], "u1")
+
+    index = await detector.index(REVIEWS)
+    assert [m.key for m in index.query(REVIEW)] == ["old"]
+    with pytest.raises(HTTPException):
+        await reviews.create("u2", "b2", rating=5, content=REVIEW + " Recommended.")
+
+
+@pytest.mark.asyncio
+async def test_hard_deletes_on_other_instances_are_pruned(tmp_path):
+    client, detector, reviews = make_service()
+    now = [0.0]
+    other = DuplicateDetector(
+        client, directory=str(tmp_path), rebuild_interval=600, clock=lambda: now[0]
+    )
+    review = await reviews.create("u1", "b1", rating=5, content=REVIEW)
+    await other.add(REVIEWS, review["id"], {"content": REVIEW})
+
+    await reviews.delete(review["id"], "u1")
+    assert [m.key for m in await other.find(REVIEWS, {"content": REVIEW})]
+
+    now[0] = 600
+    await other.index(REVIEWS)
+    await other._syncing[REVIEWS]
+    assert await other.find(REVIEWS, {"content": REVIEW}) == []
+    other.close()
+    # The rewritten log no longer holds the deleted review either
+    assert review["id"] not in NearDuplicateIndex(
+        shingle_size=5, path=str(tmp_path / "reviews.minhash")
+    )
@@ -0,0 +1,133 @@
+import asyncio
+import time
+
+from app.dependencies import get_current_user_roles
+from app.profiling import (
+    AWAIT_FRAME,
+    ProfileStore,
+    ProfilingMiddleware,
+    get_profile_store,
+)
+from app.rate_limit import bearer_token
+from app.routers.admin import router as admin_router
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+
+def spin(seconds: float) -> None:
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+async def is_admin(scope) -> bool:
+    return bearer_token(scope) == "admin-token"
+
+
+def make_app(store, sample_rate=0.0, max_concurrent=4):
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: str):
+        await asyncio.sleep(0.05)
+        spin(0.05)
+        return {"id": item_id}
+
+    app.add_middleware(
+        ProfilingMiddleware,
+        sample_rate=sample_rate,
+        interval=0.002,
+        max_concurrent=max_concurrent,
+        store=store,
+        admin_resolver=is_admin,
+    )
+    return TestClient(app)
+
+
+def parse(text: str) -> dict:
+    stacks = {}
+    for line in text.splitlines():
+        stack, _, count = line.rpartition(" ")
+        stacks[stack] = int(count)
+    return stacks
+
+
+def test_admins_get_the_profile_inline():
+    store = ProfileStore()
+    http = make_app(store)
+
+    response = http.get(
+        "/items/fz",
+        headers={"X-Profile": "inline", "Authorization": "Bearer admin-token"},
+    )
+
+    assert response.headers["x-profile-status"] == "200"
+    assert response.headers["content-type"].startswith("text/plain")
+    stacks = parse(response.text)
+    root = "GET /items/{item_id};"
+    assert all(stack.startswith(root) for stack in stacks)
+    # Both the sleep (awaited) and the busy loop (on CPU) are attributed
+    awaited = sum(n for s, n in stacks.items() if s.endswith(AWAIT_FRAME))
+    on_cpu = sum(n for s, n in stacks.items() if "spin (tests/test_profiling.py)" in s)
+    assert awaited >= 5 and on_cpu >= 5
+    assert any("get_item" in s and s.endswith(AWAIT_FRAME) for s in stacks)
+    assert store.summary()[0]["requests"] == 1
+
+
+def test_profile_header_is_ignored_for_other_users():
+    store = ProfileStore()
+    http = make_app(store)
+
+    response = http.get(
+        "/items/fz", headers={"X-Profile": "1", "Authorization": "Bearer user-token"}
+    )
+
+    assert response.json() == {"id": "fz"}
+    assert "x-profile-id" not in response.headers
+    assert store.summary() == []
+
+
+def test_sampled_profiles_are_summed_per_route(tmp_path):
+    store = ProfileStore(directory=str(tmp_path))
+    http = make_app(store, sample_rate=1.0)
+
+    first = http.get("/items/a")
+    http.get("/items/b")
+
+    assert first.json() == {"id": "a"}
+    (summary,) = store.summary()
+    assert summary["route"] == "GET /items/{item_id}"
+    assert summary["requests"] == 2 and summary["samples"] >= 20
+    assert sum(parse(store.folded()).values()) == summary["samples"]
+    saved = tmp_path / f"{first.headers['x-profile-id']}.folded"
+    assert parse(saved.read_text())
+
+
+def test_profiles_are_capped_by_concurrency():
+    store = ProfileStore()
+    http = make_app(store, sample_rate=1.0, max_concurrent=0)
+
+    http.get("/items/a")
+
+    assert store.summary() == []
+
+
+def test_admin_routes_serve_the_aggregates():
+    store = ProfileStore()
+    make_app(store, sample_rate=1.0).get("/items/a")
+    app = FastAPI()
+    app.include_router(admin_router, prefix="/admin")
+    app.dependency_overrides[get_profile_store] = lambda: store
+    http = TestClient(app)
+
+    app.dependency_overrides[get_current_user_roles] = lambda: ["user"]
+    assert http.get("/admin/profiles").status_code == 403
+
+    app.dependency_overrides[get_current_user_roles] = lambda: ["admin"]
+    assert http.get("/admin/profiles").json()[0]["requests"] == 1
+    folded = http.get(
+        "/admin/profiles/folded", params={"route": "GET /items/{item_id}"}
+    )
+    assert folded.text == store.folded()
+    assert http.delete("/admin/profiles").status_code == 204
+    assert store.summary() == []
@@ -0,0 +1,182 @@
+import pytest
+from app.metrics import register_collector, render
+from app.rate_limit import RateLimitMiddleware, RateLimitRule
+from app.services.rate_limiter import (
+    TOKEN_BUCKET_SCRIPT,
+    LocalTokenBuckets,
+    RateLimit,
+    RateLimiter,
+    RedisTokenBuckets,
+)
+from fakes import FakeRedis
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+
+def token_bucket_script(redis, keys, args):
+    """Python twin of TOKEN_BUCKET_SCRIPT over the fake's hashes"""
+    rate, burst, cost = (float(arg) for arg in args)
+    now = redis.clock()
+    state = redis.hashes[keys[0]]
+    tokens = float(state.get("tokens", burst))
+    updated = float(state.get("ts", now))
+    tokens = min(burst, tokens + max(0, now - updated) * rate)
+    retry_after = 0.0
+    if tokens >= cost:
+        tokens -= cost
+    else:
+        retry_after = (cost - tokens) / rate
+    state.update(tokens=str(tokens), ts=str(now))
+    return str(retry_after)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_local_bucket_refills_at_rate():
+    clock = Clock()
+    buckets = LocalTokenBuckets(clock=clock)
+    limit = RateLimit(rate=1, burst=2)
+
+    assert buckets.take("k", limit) == 0
+    assert buckets.take("k", limit) == 0
+    assert buckets.take("k", limit) == pytest.approx(1.0)
+    clock.now += 0.5
+    assert buckets.take("k", limit) == pytest.approx(0.5)
+    clock.now += 0.5
+    assert buckets.take("k", limit) == 0
+
+
+def test_local_buckets_are_bounded():
+    buckets = LocalTokenBuckets(maxsize=3)
+    for i in range(10):
+        buckets.take(f"ip-{i}", RateLimit(1, 1))
+    assert len(buckets) == 3
+
+
+def make_redis(clock):
+    redis = FakeRedis(clock=clock)
+    redis.script_handlers[TOKEN_BUCKET_SCRIPT] = token_bucket_script
+    return redis
+
+
+@pytest.mark.asyncio
+async def test_shared_buckets_limit_across_instances():
+    clock = Clock()
+    redis = make_redis(clock)
+    limit = RateLimit(rate=0.1, burst=4)
+    instances = [
+        RateLimiter(LocalTokenBuckets(clock=clock), RedisTokenBuckets(redis))
+        for _ in range(2)
+    ]
+
+    results = [
+        await instances[i % 2].check([("login", "login:1.2.3.4", limit)])
+        for i in range(6)
+    ]
+
+    assert results[:4] == [0, 0, 0, 0]
+    assert results[4] == pytest.approx(10)
+    assert instances[0].decisions[("login", "limited", "shared")] == 1
+
+
+@pytest.mark.asyncio
+async def test_local_fast_path_skips_redis_and_redis_outage_fails_open():
+    clock = Clock()
+    redis = make_redis(clock)
+    limiter = RateLimiter(LocalTokenBuckets(clock=clock), RedisTokenBuckets(redis))
+    limit = RateLimit(rate=0.1, burst=1)
+
+    assert await limiter.check([("r", "r:k", limit)]) == 0
+    redis.fail = True
+    assert await limiter.check([("r", "r:k", limit)]) > 0
+    assert limiter.backend_errors == 0
+    assert await limiter.check([("r", "r:other", limit)]) == 0
+    assert limiter.backend_errors == 1
+
+
+def make_app(limiter, uid_resolver=lambda scope: None, forwarded_hops=0):
+    app = FastAPI()
+
+    @app.post("/auth/token")
+    async def token():
+        return {"ok": True}
+
+    @app.get("/bikes/")
+    async def bikes():
+        return []
+
+    app.add_middleware(
+        RateLimitMiddleware,
+        rules=[
+            RateLimitRule("auth-ip", "/auth", "ip", RateLimit.per_minute(2)),
+            RateLimitRule("user", "/", "uid", RateLimit(rate=0.01, burst=1)),
+        ],
+        limiter=limiter,
+        uid_resolver=uid_resolver,
+        forwarded_hops=forwarded_hops,
+        enabled=True,
+    )
+    return TestClient(app)
+
+
+def test_middleware_returns_429_with_retry_after_per_ip():
+    http = make_app(RateLimiter(LocalTokenBuckets()), forwarded_hops=1)
+
+    def login(ip):
+        return http.post("/auth/token", headers={"X-Forwarded-For": f"9.9.9.9, {ip}"})
+
+    assert [login("1.1.1.1").status_code for _ in range(3)] == [200, 200, 429]
+    limited = login("1.1.1.1")
+    assert limited.json() == {"detail": "Too many requests"}
+    assert 1 <= int(limited.headers["retry-after"]) <= 30
+    assert login("2.2.2.2").status_code == 200
+    assert http.get("/bikes/").status_code == 200
+
+
+def test_ip_rules_are_skipped_behind_an_unconfigured_front_end(monkeypatch):
+    monkeypatch.setenv("K_SERVICE", "app")
+    http = make_app(RateLimiter(LocalTokenBuckets()))
+    assert [http.post("/auth/token").status_code for _ in range(3)] == [200] * 3
+
+    http = make_app(RateLimiter(LocalTokenBuckets()), forwarded_hops=2)
+
+    def login(ip):
+        return http.post("/auth/token", headers={"X-Forwarded-For": f"{ip}, 9.9.9.9"})
+
+    assert [login("1.1.1.1").status_code for _ in range(3)] == [200, 200, 429]
+    assert login("2.2.2.2").status_code == 200
+
+
+def test_middleware_limits_per_uid():
+    http = make_app(
+        RateLimiter(LocalTokenBuckets()),
+        uid_resolver=lambda scope: scope["query_string"].decode() or None,
+    )
+
+    assert http.get("/bikes/?alice").status_code == 200
+    assert http.get("/bikes/?alice").status_code == 429
+    assert http.get("/bikes/?bob").status_code == 200
+    # Anonymous requests are left to the per-IP rules
+    assert http.get("/bikes/").status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_limiter_metrics_render_in_prometheus_format():
+    limiter = RateLimiter(LocalTokenBuckets())
+    register_collector(limiter.collect)
+    await limiter.check([("auth-ip", "auth-ip:1.1.1.1", RateLimit(1, 1))])
+
+    text = render()
+
+    assert "# TYPE ratelimit_decisions_total counter" in text
+    assert (
+        'ratelimit_decisions_total{rule="auth-ip",result="allowed",backend=""} 1'
+        in text
+    )
+    assert "ratelimit_local_buckets 1" in text
@@ -0,0 +1,106 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from app.models.bike import BikeResponse, RatingSummary
+from app.services.ratings import ReviewService, recency_weight
+from app.services.repositories import BikeRepository
+from fakes import FakeFirestore
+from fastapi import HTTPException
+
+
+def make_service():
+    client = FakeFirestore()
+    client.data["bikes"]["b1"] = {"name": "FZ", "brandId": "yamaha", "price": 100}
+    return client, ReviewService(client, half_life_days=365)
+
+
+def summary(client, bike_id="b1") -> RatingSummary:
+    return RatingSummary.from_stats(client.data["bikes"][bike_id].get("ratingStats"))
+
+
+def test_recency_weight_halves_every_half_life():
+    now = datetime(2025, 6, 1, tzinfo=timezone.utc)
+    older = now - timedelta(days=365)
+    assert recency_weight(now, 365) == pytest.approx(2 * recency_weight(older, 365))
+
+
+@pytest.mark.asyncio
+async def test_writes_keep_the_aggregate_in_step():
+    client, reviews = make_service()
+
+    first = await reviews.create("u1", "b1", rating=5, content="Great")
+    await reviews.create("u2", "b1", rating=3, content="Fine")
+    assert summary(client).count == 2
+    assert summary(client).average == 4.0
+    assert summary(client).histogram == {1: 0, 2: 0, 3: 1, 4: 0, 5: 1}
+
+    await reviews.update(first["id"], "u1", {"rating": 1})
+    assert summary(client).average == 2.0
+    assert summary(client).histogram == {1: 1, 2: 0, 3: 1, 4: 0, 5: 0}
+    assert summary(client).recency_score == pytest.approx(2.0, abs=0.01)
+
+    await reviews.delete(first["id"], "u1")
+    assert summary(client).count == 1
+    assert summary(client).histogram[1] == 0
+    assert client.transactions == 4
+
+
+@pytest.mark.asyncio
+async def test_review_for_unknown_bike_is_rejected():
+    client, reviews = make_service()
+
+    with pytest.raises(HTTPException) as exc_info:
+        await reviews.create("u1", "nope", rating=5, content="?")
+
+    assert exc_info.value.status_code == 404
+    assert client.data["reviews"] == {}
+
+
+@pytest.mark.asyncio
+async def test_only_author_or_moderator_can_change_a_review():
+    client, reviews = make_service()
+    review = await reviews.create("u1", "b1", rating=4, content="Good")
+
+    with pytest.raises(HTTPException) as exc_info:
+        await reviews.update(review["id"], "u2", {"rating": 1})
+    assert exc_info.value.status_code == 403
+    with pytest.raises(HTTPException):
+        await reviews.delete(review["id"], "u2")
+
+    await reviews.delete(review["id"], "mod", moderator=True)
+    assert summary(client).count == 0
+
+
+@pytest.mark.asyncio
+async def test_reconcile_rebuilds_a_drifted_aggregate():
+    client, reviews = make_service()
+    for rating in (5, 4, 4):
+        await reviews.create("u1", "b1", rating=rating, content="...")
+    expected = client.data["bikes"]["b1"]["ratingStats"]
+    client.data["bikes"]["b1"]["ratingStats"] = {"count": 99, "sum": 1}
+
+    await reviews.reconcile_all(page_size=1)
+
+    rebuilt = client.data["bikes"]["b1"]["ratingStats"]
+    assert rebuilt["count"] == 3
+    assert rebuilt["sum"] == 13
+    assert rebuilt["histogram"] == {"1": 0, "2": 0, "3": 0, "4": 2, "5": 1}
+    assert rebuilt["weightedSum"] == pytest.approx(expected["weightedSum"])
+
+
+@pytest.mark.asyncio
+async def test_bike_listing_reads_the_aggregate_from_the_bike_document():
+    client, reviews = make_service()
+    await reviews.create("u1", "b1", rating=5, content="Great")
+    client.reads = 0
+
+    page, _ = await BikeRepository(client).list_by_price(
+        fields=["name", "brandId", "price", "ratingStats"]
+    )
+
+    assert BikeResponse.from_document(page[0]).rating.average == 5.0
+    assert client.reads == 1
+
+
+def test_summary_without_reviews():
+    assert RatingSummary.from_stats(None) == RatingSummary()
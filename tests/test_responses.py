@@ -0,0 +1,60 @@
+import json
+from types import SimpleNamespace
+
+from app.models.user import UserProfile, UserResponse
+from app.responses import ModelResponse
+from fastapi import FastAPI, Response
+from fastapi.testclient import TestClient
+
+
+def make_record(i=0, email="rider@example.com"):
+    return SimpleNamespace(
+        uid=f"u{i}",
+        email=email,
+        display_name=f"Rider {i}",
+        photo_url=None,
+        email_verified=True,
+        disabled=False,
+    )
+
+
+def test_model_response_matches_response_model_output():
+    app = FastAPI()
+    users = [UserResponse.from_record(make_record(i)) for i in range(3)]
+
+    @app.get("/standard", response_model=list[UserResponse])
+    async def standard():
+        return users
+
+    @app.get("/fast", response_model=list[UserResponse])
+    async def fast():
+        return ModelResponse(users)
+
+    http = TestClient(app)
+
+    assert http.get("/fast").json() == http.get("/standard").json()
+    assert http.get("/fast").headers["content-type"] == "application/json"
+
+
+def test_model_response_keeps_headers_from_injected_response():
+    app = FastAPI()
+
+    @app.get("/me", response_model=UserProfile)
+    async def me(response: Response):
+        response.headers["ETag"] = '"abc"'
+        return ModelResponse(
+            UserProfile.from_record(make_record()), status_code=201, response=response
+        )
+
+    result = TestClient(app).get("/me")
+
+    assert result.status_code == 201
+    assert result.headers["etag"] == '"abc"'
+    assert result.json() == {"uid": "u0", "display_name": "Rider 0", "photo_url": None}
+
+
+def test_empty_list_and_trusted_records():
+    assert ModelResponse([]).body == b"[]"
+    # Phone-only accounts have no email; trusted records are not re-validated
+    user = UserResponse.from_record(make_record(email=None), roles=["admin"])
+    assert json.loads(ModelResponse(user).body)["roles"] == ["admin"]
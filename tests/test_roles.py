@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+from app.dependencies import get_current_user_claims, require_roles
+from app.services.roles import (
+    RoleResolver,
+    claims_for_roles,
+    get_role_resolver,
+    permissions_for,
+    roles_from_claims,
+)
+from app.services.user_cache import UserCache
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+
+class FetchRoles:
+    def __init__(self, roles):
+        self.roles = roles
+        self.calls = []
+
+    async def __call__(self, uids):
+        self.calls.append(list(uids))
+        return {uid: self.roles[uid] for uid in uids if uid in self.roles}
+
+
+def test_roles_from_claims():
+    assert roles_from_claims({"roles": ["moderator"]}) == ["moderator"]
+    assert roles_from_claims({"admin": True}) == ["admin", "user"]
+    assert roles_from_claims({"admin": False}) == ["user"]
+    assert roles_from_claims({"uid": "u1"}) is None
+
+
+def test_claims_for_roles_keeps_admin_flag():
+    assert claims_for_roles(["admin", "user", "admin"]) == {
+        "roles": ["admin", "user"],
+        "admin": True,
+    }
+
+
+def test_permissions_for_roles():
+    assert "catalog:write" in permissions_for(["admin"])
+    assert "catalog:write" not in permissions_for(["user", "moderator"])
+
+
+@pytest.mark.asyncio
+async def test_claims_are_used_without_lookup():
+    fetch = FetchRoles({})
+    resolver = RoleResolver(fetch, UserCache())
+
+    assert await resolver.resolve({"uid": "u1", "roles": ["admin"]}) == ["admin"]
+    assert fetch.calls == []
+
+
+@pytest.mark.asyncio
+async def test_missing_claims_fall_back_to_batched_cached_lookup():
+    fetch = FetchRoles({"u1": ["admin"]})
+    resolver = RoleResolver(fetch, UserCache())
+
+    roles = await asyncio.gather(
+        resolver.resolve({"uid": "u1"}), resolver.resolve({"uid": "u2"})
+    )
+    await resolver.resolve({"uid": "u1"})
+
+    assert roles == [["admin"], ["user"]]
+    assert fetch.calls == [["u1", "u2"]]
+
+
+@pytest.mark.asyncio
+async def test_set_refreshes_cached_roles():
+    fetch = FetchRoles({"u1": ["user"]})
+    resolver = RoleResolver(fetch, UserCache())
+    await resolver.resolve({"uid": "u1"})
+
+    resolver.set("u1", ["moderator"])
+
+    assert await resolver.resolve({"uid": "u1"}) == ["moderator"]
+
+
+def make_client(claims):
+    app = FastAPI()
+
+    @app.get("/admin-only")
+    async def admin_only(roles=Depends(require_roles("admin"))):
+        return {"roles": roles}
+
+    app.dependency_overrides[get_current_user_claims] = lambda: claims
+    app.dependency_overrides[get_role_resolver] = lambda: RoleResolver(
+        FetchRoles({}), UserCache()
+    )
+    return TestClient(app)
+
+
+def test_require_roles_allows_admin_claim():
+    response = make_client({"uid": "u1", "admin": True}).get("/admin-only")
+
+    assert response.status_code == 200
+
+
+def test_require_roles_rejects_other_users():
+    response = make_client({"uid": "u1", "roles": ["user"]}).get("/admin-only")
+
+    assert response.status_code == 403
+    assert response.json()["detail"] == "Admin access required"
@@ -0,0 +1,199 @@
+import asyncio
+import json
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pytest
+from aiohttp import web
+from app.services.scraper_service import Crawler, Frontier, parse_page
+
+
+def bike_page(name: str, links=()) -> str:
+    item = {"@context": "https://schema.org", "@type": "Motorcycle", "name": name}
+    anchors = "".join(f'<a href="{link}">{link}</a>' for link in links)
+    return (
+        f'<html><head><script type="application/ld+json">{json.dumps(item)}'
+        f"</script></head><body>{anchors}</body></html>"
+    )
+
+
+class FixtureSite:
+    """A local catalog site that answers conditional requests and counts hits"""
+
+    def __init__(self, pages, robots="", latency=0.0, failures=None):
+        self.pages = dict(pages)
+        self.robots = robots
+        self.latency = latency
+        # path -> how many times to answer 503 before serving it
+        self.failures = Counter(failures or {})
+        self.hits: Counter = Counter()
+        self.conditional: Counter = Counter()
+        self.starts = []
+        self.active = 0
+        self.max_active = 0
+
+    async def handle(self, request: web.Request) -> web.Response:
+        path = request.path
+        if path == "/robots.txt":
+            return web.Response(text=self.robots)
+        self.hits[path] += 1
+        self.starts.append(time.monotonic())
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self.active -= 1
+        if self.failures[path] > 0:
+            self.failures[path] -= 1
+            return web.Response(status=503)
+        if path not in self.pages:
+            return web.Response(status=404)
+        etag = f'"{hash(self.pages[path]) & 0xFFFF:x}"'
+        if request.headers.get("If-None-Match") == etag:
+            self.conditional[path] += 1
+            return web.Response(status=304, headers={"ETag": etag})
+        return web.Response(
+            text=self.pages[path], content_type="text/html", headers={"ETag": etag}
+        )
+
+    async def __aenter__(self):
+        app = web.Application()
+        app.router.add_route("GET", "/{tail:.*}", self.handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}"
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self._runner.cleanup()
+
+
+CATALOG = {
+    "/": bike_page("Home", ["/bikes/fz", "/bikes/r15", "/private/x", "/logo.png"]),
+    "/bikes/fz": bike_page("Yamaha FZ", ["/", "/bikes/gixxer#specs"]),
+    "/bikes/r15": bike_page("Yamaha R15"),
+    "/bikes/gixxer": bike_page("Suzuki Gixxer", ["https://elsewhere.example/"]),
+    "/private/x": bike_page("Hidden"),
+}
+
+
+def crawler(frontier, items=None, **kwargs):
+    async def collect(item):
+        items.append(item)
+
+    options = dict(executor=ThreadPoolExecutor(2), delay=0, concurrency=8)
+    options.update(kwargs)
+    return Crawler(frontier, on_item=collect if items is not None else None, **options)
+
+
+@pytest.mark.asyncio
+async def test_crawl_follows_links_on_the_site_and_collects_items():
+    items = []
+    async with FixtureSite(
+        CATALOG, robots="User-agent: *\nDisallow: /private/"
+    ) as site:
+        stats = await crawler(Frontier(), items).run([site.url + "/"])
+
+    assert sorted(item["name"] for item in items) == [
+        "Home",
+        "Suzuki Gixxer",
+        "Yamaha FZ",
+        "Yamaha R15",
+    ]
+    assert items[0]["sourceUrl"] == site.url + "/"
+    # Fragments collapse into one URL; images, other hosts and robots are skipped
+    assert set(site.hits) == {"/", "/bikes/fz", "/bikes/r15", "/bikes/gixxer"}
+    assert max(site.hits.values()) == 1
+    assert stats["robots_skipped"] == 1
+
+
+@pytest.mark.asyncio
+async def test_unchanged_pages_are_skipped_with_conditional_requests():
+    frontier = Frontier()
+    async with FixtureSite(CATALOG) as site:
+        await crawler(frontier).run([site.url + "/"])
+        frontier.requeue_done()
+        site.pages["/bikes/r15"] = bike_page("Yamaha R15 V4")
+        items = []
+        stats = await crawler(frontier, items).run()
+
+    assert stats["not_modified"] == 4 and stats["fetched"] == 1
+    assert [item["name"] for item in items] == ["Yamaha R15 V4"]
+    assert site.conditional["/bikes/fz"] == 1
+
+
+@pytest.mark.asyncio
+async def test_interrupted_crawls_resume_from_the_frontier_file(tmp_path):
+    path = str(tmp_path / "frontier.sqlite3")
+    async with FixtureSite(CATALOG) as site:
+        first = crawler(Frontier(path), concurrency=1, max_pages=2)
+        await first.run([site.url + "/"])
+        first.frontier.close()
+
+        resumed = Frontier(path)
+        stats = await crawler(resumed).run()
+
+    assert stats["fetched"] == 3
+    assert max(site.hits.values()) == 1
+    assert resumed.counts() == {"done": 5}
+
+
+@pytest.mark.asyncio
+async def test_fetches_per_host_are_bounded_and_spaced():
+    pages = {"/": bike_page("Home", [f"/bikes/{i}" for i in range(8)])}
+    pages.update({f"/bikes/{i}": bike_page(f"Bike {i}") for i in range(8)})
+    async with FixtureSite(pages, latency=0.05) as site:
+        await crawler(Frontier(), per_host=2).run([site.url + "/"])
+    assert site.max_active == 2
+
+    async with FixtureSite(pages) as site:
+        await crawler(Frontier(), per_host=4, delay=0.02).run([site.url + "/"])
+    gaps = [b - a for a, b in zip(site.starts, site.starts[1:])]
+    assert min(gaps) >= 0.01
+
+
+@pytest.mark.asyncio
+async def test_server_errors_are_retried_then_given_up():
+    pages = {
+        "/": bike_page("Home", ["/flaky", "/down"]),
+        "/flaky": bike_page("Flaky"),
+        "/down": bike_page("Down"),
+    }
+    frontier = Frontier()
+    async with FixtureSite(pages, failures={"/flaky": 1, "/down": 10}) as site:
+        stats = await crawler(frontier, max_attempts=3).run([site.url + "/"])
+
+    assert site.hits["/flaky"] == 2 and site.hits["/down"] == 3
+    assert stats["failed"] == 1
+    assert frontier.counts() == {"done": 2, "failed": 1}
+
+
+@pytest.mark.asyncio
+async def test_pages_can_be_parsed_in_a_process_pool():
+    items = []
+    with ProcessPoolExecutor(1) as pool:
+        async with FixtureSite(CATALOG) as site:
+            await crawler(Frontier(), items, executor=pool, max_depth=0).run(
+                [site.url + "/bikes/r15"]
+            )
+
+    assert [item["name"] for item in items] == ["Yamaha R15"]
+
+
+def test_parse_page_reads_json_ld_graphs():
+    html = (
+        '<script type="application/ld+json">{"@graph": [{"@type": "WebPage"},'
+        ' {"@type": ["Product", "Motorcycle"], "name": "পালসার"}]}</script>'
+        '<script type="application/ld+json">not json</script>'
+        '<a href="/a">a</a><a href="/a#x">again</a><a href="mailto:x@y">mail</a>'
+    )
+
+    parsed = parse_page("https://bikes.example/list", html)
+
+    assert parsed.links == ["https://bikes.example/a"]
+    assert [item["name"] for item in parsed.items] == ["পালসার"]
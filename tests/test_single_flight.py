@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+from app.services.single_flight import SingleFlight
+
+
+class SlowCall:
+    def __init__(self, result="value"):
+        self.calls = 0
+        self.release = asyncio.Event()
+        self.result = result
+
+    async def __call__(self):
+        self.calls += 1
+        await self.release.wait()
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+
+@pytest.mark.asyncio
+async def test_concurrent_callers_share_one_call():
+    flight = SingleFlight("auth")
+    call = SlowCall()
+
+    tasks = [asyncio.ensure_future(flight.do("key", call)) for _ in range(10)]
+    await asyncio.sleep(0)
+    call.release.set()
+
+    assert await asyncio.gather(*tasks) == ["value"] * 10
+    assert call.calls == 1
+    assert flight.stats() == {"calls": 1, "collapsed": 9, "in_flight": 0}
+    samples = {
+        labels["result"]: value for _, labels, value in next(flight.collect()).samples
+    }
+    assert samples == {"started": 1, "collapsed": 9}
+
+
+@pytest.mark.asyncio
+async def test_different_keys_do_not_collapse():
+    flight = SingleFlight()
+    call = SlowCall()
+    call.release.set()
+
+    await asyncio.gather(flight.do("a", call), flight.do("b", call))
+
+    assert call.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_exception_reaches_every_caller_and_is_not_kept():
+    flight = SingleFlight()
+    call = SlowCall(RuntimeError("boom"))
+
+    tasks = [asyncio.ensure_future(flight.do("key", call)) for _ in range(3)]
+    await asyncio.sleep(0)
+    call.release.set()
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert flight.stats()["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_does_not_cancel_shared_call():
+    flight = SingleFlight()
+    call = SlowCall()
+
+    first = asyncio.ensure_future(flight.do("key", call))
+    second = asyncio.ensure_future(flight.do("key", call))
+    await asyncio.sleep(0)
+    first.cancel()
+    call.release.set()
+
+    assert await second == "value"
+
+
+@pytest.mark.asyncio
+async def test_forget_starts_a_new_call():
+    flight = SingleFlight()
+    old = SlowCall("old")
+    new = SlowCall("new")
+    new.release.set()
+
+    pending = asyncio.ensure_future(flight.do("key", old))
+    await asyncio.sleep(0)
+    flight.forget("key")
+
+    assert await flight.do("key", new) == "new"
+    old.release.set()
+    assert await pending == "old"
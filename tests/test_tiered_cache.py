@@ -0,0 +1,250 @@
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+from app.services.firebase_service import UserRecordSerializer
+from app.services.ratings import ReviewService
+from app.services.repositories import BikeRepository
+from app.services.tiered_cache import (
+    CachePolicy,
+    JsonSerializer,
+    PickleSerializer,
+    TieredCache,
+    cached,
+)
+from fakes import FakeFirestore, FakeRedis
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class Loader:
+    def __init__(self, value="v"):
+        self.value = value
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        return self.value
+
+
+async def settle():
+    # Let the pub/sub listeners run
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def make_caches(redis, count=2, clock=None, **policy):
+    policies = {"ns": CachePolicy(**policy)}
+    return [
+        TieredCache(policies, redis=redis, clock=clock or FakeClock())
+        for _ in range(count)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_l1_then_l2_then_loader():
+    redis = FakeRedis()
+    first, second = make_caches(redis)
+    loader = Loader({"name": "FZ"})
+
+    assert await first.get_or_load("ns", "k", loader) == {"name": "FZ"}
+    assert await first.get_or_load("ns", "k", loader) == {"name": "FZ"}
+    # A fresh instance finds the entry in Redis instead of reloading it
+    assert await second.get_or_load("ns", "k", loader) == {"name": "FZ"}
+
+    assert loader.calls == 1
+    assert first.lookups == {("ns", "miss"): 1, ("ns", "l1"): 1}
+    assert second.lookups == {("ns", "l2"): 1}
+    await asyncio.gather(first.close(), second.close())
+
+
+@pytest.mark.asyncio
+async def test_l1_entries_expire_after_l1_ttl():
+    clock = FakeClock()
+    (cache,) = make_caches(None, count=1, clock=clock, ttl=300, l1_ttl=10)
+    loader = Loader()
+
+    await cache.get_or_load("ns", "k", loader)
+    clock.now += 11
+    await cache.get_or_load("ns", "k", loader)
+
+    assert loader.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_none_is_cached_only_with_a_negative_ttl():
+    redis = FakeRedis()
+    (negative,) = make_caches(redis, count=1, negative_ttl=30)
+    loader = Loader(None)
+
+    assert await negative.get_or_load("ns", "gone", loader) is None
+    assert await negative.get_or_load("ns", "gone", loader) is None
+    assert loader.calls == 1
+    assert redis.values["cache:ns:gone"][0] == b"\x00"
+
+    (plain,) = make_caches(FakeRedis(), count=1)
+    await plain.get_or_load("ns", "gone", loader)
+    await plain.get_or_load("ns", "gone", loader)
+    assert loader.calls == 3
+    await asyncio.gather(negative.close(), plain.close())
+
+
+@pytest.mark.asyncio
+async def test_invalidate_reaches_every_instance():
+    redis = FakeRedis()
+    writer, reader = make_caches(redis)
+    forgotten = []
+    reader.on_invalidate("ns", forgotten.append)
+    loader = Loader("old")
+
+    await writer.get_or_load("ns", "k", loader)
+    await reader.get_or_load("ns", "k", loader)
+    await settle()
+
+    loader.value = "new"
+    await writer.invalidate("ns", "k")
+    await settle()
+
+    assert await reader.get_or_load("ns", "k", loader) == "new"
+    assert forgotten == ["k"]
+    assert loader.calls == 2
+
+    await writer.set("ns", "k", "newest")
+    await settle()
+    assert await reader.get_or_load("ns", "k", loader) == "newest"
+    assert reader.lookups[("ns", "l2")] == 2
+    await asyncio.gather(writer.close(), reader.close())
+
+
+@pytest.mark.asyncio
+async def test_reconnect_drops_l1_entries_that_may_have_missed_invalidations():
+    redis = FakeRedis()
+    (cache,) = make_caches(redis, count=1)
+    cache.reconnect_delay = 0
+    loader = Loader()
+    await cache.get_or_load("ns", "k", loader)
+    await settle()
+
+    redis.drop_connections()
+    await settle()
+    redis.values.clear()
+    await cache.get_or_load("ns", "k", loader)
+
+    assert cache.redis_errors == 1
+    assert loader.calls == 2
+    await cache.close()
+
+
+@pytest.mark.asyncio
+async def test_writes_only_discard_loads_of_the_same_key():
+    cache = TieredCache({"ns": CachePolicy()}, clock=FakeClock())
+    release = asyncio.Event()
+
+    async def slow_loader():
+        await release.wait()
+        return "loaded"
+
+    first = asyncio.ensure_future(cache.get_or_load("ns", "a", slow_loader))
+    second = asyncio.ensure_future(cache.get_or_load("ns", "b", slow_loader))
+    await settle()
+    await cache.invalidate("ns", "b")
+    release.set()
+    await asyncio.gather(first, second)
+
+    loader = Loader()
+    assert await cache.get_or_load("ns", "a", loader) == "loaded"
+    assert await cache.get_or_load("ns", "b", loader) == "v"
+    assert loader.calls == 1
+    assert len(cache._generations) == 0
+
+
+@pytest.mark.asyncio
+async def test_redis_outage_falls_back_to_the_loader():
+    redis = FakeRedis()
+    redis.fail = True
+    (cache,) = make_caches(redis, count=1)
+    loader = Loader()
+
+    assert await cache.get_or_load("ns", "k", loader) == "v"
+    await cache.invalidate("ns", "k")
+    assert await cache.get_or_load("ns", "k", loader) == "v"
+
+    assert loader.calls == 2
+    assert cache.redis_errors >= 4
+    await cache.close()
+
+
+def test_serializers_round_trip():
+    document = {
+        "name": "FZ",
+        "updatedAt": datetime(2025, 1, 2, 3, 4, tzinfo=timezone.utc),
+        "ratingStats": {"count": 1, "histogram": {"5": 1}},
+    }
+
+    assert JsonSerializer().loads(JsonSerializer().dumps(document)) == document
+    assert PickleSerializer().loads(PickleSerializer().dumps(document)) == document
+
+
+def test_user_record_serializer_drops_password_hashes():
+    from firebase_admin.auth import UserRecord
+
+    record = UserRecord(
+        {"localId": "u1", "email": "a@example.com", "passwordHash": "x", "salt": "y"}
+    )
+    data = UserRecordSerializer().dumps(record)
+    restored = UserRecordSerializer().loads(data)
+
+    assert b"passwordHash" not in data and b"salt" not in data
+    assert (restored.uid, restored.email) == ("u1", "a@example.com")
+
+
+class Catalog:
+    def __init__(self, cache):
+        self.cache = cache
+        self.calls = []
+
+    @cached("bikes", key=lambda bike_id, fields=(): bike_id)
+    async def get(self, bike_id, fields=()):
+        self.calls.append(bike_id)
+        return {"id": bike_id}
+
+
+@pytest.mark.asyncio
+async def test_decorator_caches_per_instance_cache():
+    cached_catalog = Catalog(TieredCache())
+    uncached_catalog = Catalog(None)
+
+    for catalog in (cached_catalog, uncached_catalog):
+        await catalog.get("fz")
+        await catalog.get("fz", fields=["name"])
+
+    assert cached_catalog.calls == ["fz"]
+    assert uncached_catalog.calls == ["fz", "fz"]
+    assert Catalog.get.__name__ == "get"
+
+
+@pytest.mark.asyncio
+async def test_review_writes_invalidate_cached_bikes_on_other_instances():
+    client, redis = FakeFirestore(), FakeRedis()
+    client.data["bikes"]["b1"] = {"name": "FZ", "brandId": "yamaha", "price": 100}
+    api, worker = make_caches(redis)
+    bikes = BikeRepository(client, cache=api)
+    reviews = ReviewService(client, cache=worker)
+
+    assert (await bikes.get_detail("b1"))["name"] == "FZ"
+    assert await bikes.get_detail("missing") is None
+    await bikes.get_detail("b1")
+    await settle()
+    assert client.reads == 2
+
+    await reviews.create("u1", "b1", rating=4, content="Good")
+    await settle()
+
+    assert (await bikes.get_detail("b1"))["ratingStats"]["count"] == 1
+    await asyncio.gather(api.close(), worker.close())
@@ -0,0 +1,105 @@
+import asyncio
+
+from app.metrics import Histogram
+from app.responses import ModelResponse
+from app.timing import TimedRoute, TimingMiddleware, phase, server_timing, timed
+from fastapi import APIRouter, Depends, FastAPI
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+
+
+class Item(BaseModel):
+    id: str
+
+
+async def current_user() -> str:
+    with phase("auth"):
+        await asyncio.sleep(0.002)
+    return "u1"
+
+
+@timed("firestore")
+async def load(item_id: str) -> Item:
+    await asyncio.sleep(0.002)
+    return Item(id=item_id)
+
+
+def make_app(sample_rate=1.0):
+    router = APIRouter(route_class=TimedRoute)
+
+    @router.get("/items/{item_id}", response_model=Item)
+    async def get_item(item_id: str, user: str = Depends(current_user)):
+        item = await load(item_id)
+        return ModelResponse(await load(item.id))
+
+    app = FastAPI()
+    app.include_router(router)
+    histogram = Histogram("phase_seconds", "test", ("route", "method", "phase"))
+    app.add_middleware(TimingMiddleware, sample_rate=sample_rate, histogram=histogram)
+    return TestClient(app), histogram
+
+
+def parse(header: str) -> dict:
+    entries = (entry.split(";dur=") for entry in header.split(", "))
+    return {name: float(ms) for name, ms in entries}
+
+
+def test_server_timing_breaks_down_the_request():
+    http, histogram = make_app()
+
+    response = http.get("/items/fz")
+
+    timings = parse(response.headers["server-timing"])
+    assert response.json() == {"id": "fz"}
+    assert set(timings) == {"auth", "firestore", "handler", "encode", "app"}
+    # Both loads accumulate into one phase, nested inside the handler
+    assert timings["firestore"] >= 4
+    assert timings["handler"] >= timings["firestore"]
+    assert timings["app"] >= timings["handler"] + timings["auth"]
+
+
+def test_phases_are_recorded_per_route_template():
+    http, histogram = make_app()
+    http.get("/items/a")
+    http.get("/items/b")
+    http.get("/missing")
+
+    (family,) = histogram.collect()
+    counts = {
+        (labels["route"], labels["phase"]): value
+        for name, labels, value in family.samples
+        if name == "phase_seconds_count"
+    }
+    assert counts[("/items/{item_id}", "total")] == 2
+    assert counts[("/items/{item_id}", "firestore")] == 2
+    assert counts[("unmatched", "total")] == 1
+
+
+def test_unsampled_requests_are_not_timed():
+    http, histogram = make_app(sample_rate=0)
+
+    response = http.get("/items/fz")
+
+    assert "server-timing" not in response.headers
+    assert list(histogram.collect())[0].samples == []
+
+
+def test_phase_outside_a_request_is_a_no_op():
+    with phase("firestore"):
+        pass
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("latency_seconds", "test", ("route",), buckets=(0.1, 1))
+    for value in (0.05, 0.1, 0.5, 3):
+        histogram.observe(value, "/x")
+
+    (family,) = histogram.collect()
+    samples = {
+        (name, labels.get("le")): value for name, labels, value in family.samples
+    }
+    assert samples[("latency_seconds_bucket", "0.1")] == 2
+    assert samples[("latency_seconds_bucket", "1.0")] == 3
+    assert samples[("latency_seconds_bucket", "+Inf")] == 4
+    assert samples[("latency_seconds_sum", None)] == 3.65
+    assert server_timing({"auth": 0.0012}) == b"auth;dur=1.20"
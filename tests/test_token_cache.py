@@ -0,0 +1,142 @@
+from unittest.mock import MagicMock
+
+from app.services.token_cache import SigningKeyStore, VerifiedTokenCache
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def make_cache(maxsize=10, clock=None):
+    verifier = MagicMock(side_effect=lambda token: {"uid": token, "exp": 2000})
+    return verifier, VerifiedTokenCache(
+        verifier=verifier, maxsize=maxsize, clock=clock or FakeClock()
+    )
+
+
+def test_verify_reuses_cached_claims():
+    verifier, cache = make_cache()
+
+    assert cache.verify("token-a")["uid"] == "token-a"
+    assert cache.verify("token-a")["uid"] == "token-a"
+
+    assert verifier.call_count == 1
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_entry_expires_at_token_exp():
+    clock = FakeClock()
+    verifier, cache = make_cache(clock=clock)
+
+    cache.verify("token-a")
+    clock.now = 2000
+    cache.verify("token-a")
+
+    assert verifier.call_count == 2
+
+
+def test_expired_claims_are_not_cached():
+    verifier = MagicMock(return_value={"uid": "u1", "exp": 500})
+    cache = VerifiedTokenCache(verifier=verifier, clock=FakeClock())
+
+    cache.verify("token-a")
+    cache.verify("token-a")
+
+    assert verifier.call_count == 2
+    assert cache.stats()["size"] == 0
+
+
+def test_cache_is_bounded_lru():
+    verifier, cache = make_cache(maxsize=2)
+
+    cache.verify("token-a")
+    cache.verify("token-b")
+    cache.verify("token-a")
+    cache.verify("token-c")
+
+    assert cache.stats()["size"] == 2
+    assert cache.stats()["evictions"] == 1
+    assert cache.get("token-a") is not None
+    assert cache.get("token-b") is None
+
+
+def test_peek_does_not_count_lookups():
+    verifier, cache = make_cache()
+    cache.verify("token-a")
+    before = cache.stats()
+
+    assert cache.peek("token-a")["uid"]
+    assert cache.peek("token-b") is None
+    assert cache.stats() == before
+
+
+def test_revoke_drops_a_users_tokens_and_refuses_older_ones():
+    clock = FakeClock()
+    cache = VerifiedTokenCache(verifier=MagicMock(), clock=clock)
+    old = {"uid": "u1", "iat": 900, "exp": 2000}
+    cache.put("old", old)
+    cache.put("other", {"uid": "u2", "iat": 900, "exp": 2000})
+
+    cache.revoke("u1")
+    cache.put("old", old)
+
+    assert cache.get("old") is None and cache.revoked(old)
+    assert cache.get("other") is not None
+    # Tokens issued after the revocation are accepted again
+    clock.now = 1001
+    assert not cache.revoked({"uid": "u1", "iat": 1001, "exp": 2000})
+
+
+def test_cache_metrics():
+    verifier, cache = make_cache()
+    cache.verify("token-a")
+    cache.verify("token-a")
+
+    samples = {
+        (name, tuple(labels.items())): value
+        for family in cache.collect()
+        for name, labels, value in family.samples
+    }
+
+    assert samples[("token_cache_lookups_total", (("result", "hit"),))] == 1
+    assert samples[("token_cache_lookups_total", (("result", "miss"),))] == 1
+    assert samples[("token_cache_entries", ())] == 1
+
+
+def test_verification_errors_are_not_cached():
+    verifier = MagicMock(side_effect=ValueError("bad token"))
+    cache = VerifiedTokenCache(verifier=verifier)
+
+    for _ in range(2):
+        try:
+            cache.verify("token-a")
+        except ValueError:
+            pass
+
+    assert verifier.call_count == 2
+    assert cache.stats()["size"] == 0
+
+
+def test_signing_key_store_serves_keys_from_memory():
+    response = MagicMock(
+        status=200,
+        headers={"cache-control": "public, max-age=19000"},
+        data=b'{"kid": "cert"}',
+    )
+    delegate = MagicMock(return_value=response)
+    store = SigningKeyStore(delegate=delegate)
+
+    try:
+        first = store("https://example.com/certs")
+        second = store("https://example.com/certs")
+    finally:
+        store.close()
+
+    assert delegate.call_count == 1
+    assert first.data == second.data == b'{"kid": "cert"}'
+    assert store.fetches == 1
@@ -0,0 +1,130 @@
+import asyncio
+
+import pytest
+from app.services.user_cache import UserCache
+
+
+class FakeClock:
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class Loader:
+    def __init__(self):
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        return f"value-{self.calls}"
+
+
+@pytest.mark.asyncio
+async def test_fresh_entry_is_served_without_loading():
+    cache = UserCache(ttl=30, clock=FakeClock())
+    loader = Loader()
+
+    assert await cache.get_or_load("u1", loader) == "value-1"
+    assert await cache.get_or_load("u1", loader) == "value-1"
+
+    assert loader.calls == 1
+    assert cache.stats()["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_stale_entry_is_served_while_refreshing():
+    clock = FakeClock()
+    cache = UserCache(ttl=30, stale_ttl=300, clock=clock)
+    loader = Loader()
+    await cache.get_or_load("u1", loader)
+
+    clock.now = 60
+    assert await cache.get_or_load("u1", loader) == "value-1"
+    await asyncio.sleep(0)
+
+    assert loader.calls == 2
+    assert await cache.get_or_load("u1", loader) == "value-2"
+    assert cache.stats()["stale_hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_expired_entry_is_reloaded():
+    clock = FakeClock()
+    cache = UserCache(ttl=30, stale_ttl=300, clock=clock)
+    loader = Loader()
+    await cache.get_or_load("u1", loader)
+
+    clock.now = 301
+
+    assert await cache.get_or_load("u1", loader) == "value-2"
+
+
+@pytest.mark.asyncio
+async def test_invalidate_and_put():
+    cache = UserCache(clock=FakeClock())
+    loader = Loader()
+    await cache.get_or_load("u1", loader)
+
+    cache.invalidate("u1")
+    assert await cache.get_or_load("u1", loader) == "value-2"
+
+    cache.put("u1", "written")
+    assert await cache.get_or_load("u1", loader) == "written"
+
+
+@pytest.mark.asyncio
+async def test_load_started_before_write_does_not_overwrite_it():
+    cache = UserCache(clock=FakeClock())
+    started = asyncio.Event()
+    release = asyncio.Event()
+
+    async def slow_loader():
+        started.set()
+        await release.wait()
+        return "old"
+
+    task = asyncio.ensure_future(cache.get_or_load("u1", slow_loader))
+    await started.wait()
+    cache.put("u1", "new")
+    release.set()
+    await task
+
+    assert await cache.get_or_load("u1", Loader()) == "new"
+
+
+@pytest.mark.asyncio
+async def test_writes_to_other_uids_keep_a_load_in_flight():
+    cache = UserCache(clock=FakeClock())
+    started = asyncio.Event()
+    release = asyncio.Event()
+
+    async def slow_loader():
+        started.set()
+        await release.wait()
+        return "loaded"
+
+    task = asyncio.ensure_future(cache.get_or_load("u1", slow_loader))
+    await started.wait()
+    cache.put("u2", "new")
+    cache.invalidate("u3")
+    release.set()
+    await task
+
+    loader = Loader()
+    assert await cache.get_or_load("u1", loader) == "loaded"
+    assert loader.calls == 0
+    # Nothing is tracked once no load is in flight
+    assert len(cache._generations) == 0
+
+
+@pytest.mark.asyncio
+async def test_cache_is_bounded_lru():
+    cache = UserCache(maxsize=2, clock=FakeClock())
+
+    for uid in ("u1", "u2", "u3"):
+        cache.put(uid, uid)
+
+    assert cache.stats()["size"] == 2
+    assert await cache.get_or_load("u1", Loader()) == "value-1"
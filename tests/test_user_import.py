@@ -0,0 +1,202 @@
+import base64
+import json
+import threading
+import time
+
+import pytest
+from app.dependencies import get_current_user_roles
+from app.models.user import PasswordHashConfig
+from app.routers.admin import router as admin_router
+from app.services import firebase_service
+from app.services.admin_gateway import AdminSDKGateway
+from app.services.firebase_service import FirebaseAuthService
+from app.services.roles import RoleResolver
+from app.services.token_cache import VerifiedTokenCache
+from app.services.user_cache import UserCache
+from app.services.user_import import UserImportService, get_user_import_service
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from firebase_admin import auth
+
+HASH = base64.b64encode(b"$2b$10$abcdefghijklmnopqrstuv").decode()
+
+
+class FakeAccounts:
+    """``get_users`` and ``import_users`` over a dict of account data"""
+
+    def __init__(self, latency: float = 0):
+        self.accounts = {}
+        self.latency = latency
+        self.imports = []
+        self.rejected = set()
+        self.down = False
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def get_users(self, identifiers):
+        assert len(identifiers) <= 100
+        uids = {i.uid for i in identifiers if isinstance(i, auth.UidIdentifier)}
+        emails = {i.email for i in identifiers if isinstance(i, auth.EmailIdentifier)}
+        found = [
+            auth.UserRecord(data)
+            for data in self.accounts.values()
+            if data["localId"] in uids or data.get("email") in emails
+        ]
+        return auth.GetUsersResult(found, [])
+
+    def import_users(self, records, hash_alg=None):
+        assert len(records) <= 1000
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.latency)
+            if self.down:
+                raise RuntimeError("backend unavailable")
+            self.imports.append((len(records), hash_alg))
+            errors = []
+            for index, record in enumerate(records):
+                if record.email in self.rejected:
+                    errors.append({"index": index, "message": "invalid email"})
+                else:
+                    self.accounts[record.uid] = record.to_dict()
+            return auth.UserImportResult({"error": errors}, len(records))
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+@pytest.fixture
+def accounts(monkeypatch):
+    fake = FakeAccounts()
+    monkeypatch.setattr(firebase_service, "get_auth", lambda: auth)
+    monkeypatch.setattr(auth, "get_users", fake.get_users)
+    monkeypatch.setattr(auth, "import_users", fake.import_users)
+    return fake
+
+
+def make_service(**kwargs) -> UserImportService:
+    firebase = FirebaseAuthService(
+        AdminSDKGateway(),
+        VerifiedTokenCache(),
+        UserCache(),
+        RoleResolver(None, UserCache()),
+    )
+    return UserImportService(firebase, **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_import_creates_accounts_with_roles_in_parallel_chunks(accounts):
+    accounts.latency = 0.02
+    imports = make_service(concurrency=2)
+    users = [
+        {"email": f"rider{i}@example.com", "password_hash": HASH, "roles": ["user"]}
+        for i in range(2500)
+    ]
+    users[7]["roles"] = ["moderator", "user"]
+    users[8]["uid"] = "partner-8"
+
+    report = await imports.run(users, PasswordHashConfig(algorithm="bcrypt"))
+
+    assert (report["rows"], report["imported"], report["failed"]) == (2500, 2500, 0)
+    assert [size for size, _ in accounts.imports] == [1000, 1000, 500]
+    assert all(hash_alg is not None for _, hash_alg in accounts.imports)
+    assert accounts.max_in_flight == 2
+    uids = [user["uid"] for user in report["users"]]
+    assert [user["index"] for user in report["users"]] == list(range(2500))
+    assert uids[8] == "partner-8" and len(set(uids)) == 2500
+    moderator = accounts.accounts[uids[7]]
+    assert json.loads(moderator["customAttributes"]) == {
+        "roles": ["moderator", "user"],
+        "admin": False,
+    }
+    assert base64.b64decode(moderator["passwordHash"]).startswith(b"$2b$")
+
+
+@pytest.mark.asyncio
+async def test_failed_rows_are_reported_by_index(accounts):
+    accounts.accounts["taken"] = {"localId": "taken", "email": "old@example.com"}
+    accounts.rejected.add("bounced@example.com")
+    imports = make_service(chunk_size=3)
+    users = [
+        {"email": "new@example.com"},
+        {"email": "not an email"},
+        {"email": "NEW@example.com"},
+        {"email": "old@example.com"},
+        {"email": "someone@example.com", "uid": "taken"},
+        {"email": "boss@example.com", "roles": ["owner"]},
+        {"email": "bounced@example.com"},
+        {"email": "fine@example.com", "photo_url": "not a url"},
+    ]
+
+    report = await imports.run(users)
+
+    assert report["imported"] == 1 and report["users"][0]["index"] == 0
+    errors = {error["index"]: error["error"] for error in report["errors"]}
+    assert errors[1].startswith("email: ")
+    assert errors[2] == "Duplicate email in this import"
+    assert errors[3] == "Email already registered"
+    assert errors[4] == "uid already exists"
+    assert errors[5] == "Unknown roles: owner"
+    assert errors[6] == "invalid email"
+    assert errors[7].startswith("Malformed photo URL")
+    # The existing account was neither overwritten nor duplicated
+    assert accounts.accounts["taken"]["email"] == "old@example.com"
+
+    accounts.down = True
+    report = await imports.run([{"email": f"u{i}@example.com"} for i in range(5)])
+    assert report["failed"] == 5
+    assert {error["error"] for error in report["errors"]} == {"Internal error"}
+
+
+@pytest.mark.asyncio
+async def test_chunks_past_the_deadline_are_reported_not_started(accounts):
+    accounts.latency = 0.05
+    imports = make_service(chunk_size=2, concurrency=1, deadline=0.03)
+
+    report = await imports.run([{"email": f"u{i}@example.com"} for i in range(6)])
+
+    assert report["imported"] == 2 and report["failed"] == 4
+    assert len(accounts.imports) == 1
+    assert all("ran out of time" in error["error"] for error in report["errors"])
+
+
+def test_import_users_route(accounts):
+    imports = make_service()
+    app = FastAPI()
+    app.include_router(admin_router, prefix="/admin")
+    app.dependency_overrides[get_user_import_service] = lambda: imports
+    app.dependency_overrides[get_current_user_roles] = lambda: ["admin"]
+
+    with TestClient(app) as http:
+        response = http.post(
+            "/admin/import/users",
+            json={
+                "users": [
+                    {"email": "a@example.com", "password_hash": HASH},
+                    {"email": "b@example.com", "roles": []},
+                ],
+                "hash": {"algorithm": "bcrypt"},
+            },
+        )
+        assert response.status_code == 200
+        report = response.json()
+        assert (report["imported"], report["failed"]) == (1, 1)
+        assert report["errors"][0]["email"] == "b@example.com"
+
+        hashed = {"users": [{"email": "c@example.com", "password_hash": HASH}]}
+        assert http.post("/admin/import/users", json=hashed).status_code == 422
+        hashed["hash"] = {"algorithm": "scrypt", "key": HASH, "rounds": 99}
+        assert http.post("/admin/import/users", json=hashed).status_code == 422
+        hashed["hash"]["memory_cost"] = 14
+        response = http.post("/admin/import/users", json=hashed)
+        assert response.status_code == 400
+        assert "rounds" in response.json()["detail"]
+
+        imports.max_rows = 1
+        users = {"users": [{"email": "d@example.com"}, {"email": "e@example.com"}]}
+        assert http.post("/admin/import/users", json=users).status_code == 413
+
+        app.dependency_overrides[get_current_user_roles] = lambda: ["user"]
+        assert http.post("/admin/import/users", json=users).status_code == 403
@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+from app.services.user_loader import UserLoader
+
+
+class BatchFn:
+    def __init__(self, known=None):
+        self.calls = []
+        self.known = known
+
+    async def __call__(self, uids):
+        self.calls.append(list(uids))
+        return {
+            uid: f"user-{uid}" for uid in uids if not self.known or uid in self.known
+        }
+
+
+@pytest.mark.asyncio
+async def test_concurrent_loads_are_coalesced_into_one_batch():
+    batch_fn = BatchFn()
+    loader = UserLoader(batch_fn)
+
+    results = await asyncio.gather(*(loader.load(f"u{i}") for i in range(50)))
+
+    assert results == [f"user-u{i}" for i in range(50)]
+    assert len(batch_fn.calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_batches_are_split_at_max_batch_size():
+    batch_fn = BatchFn()
+    loader = UserLoader(batch_fn, max_batch_size=100)
+
+    await loader.load_many([f"u{i}" for i in range(150)])
+
+    assert [len(call) for call in batch_fn.calls] == [100, 50]
+
+
+@pytest.mark.asyncio
+async def test_each_uid_is_fetched_once_and_missing_uids_are_none():
+    batch_fn = BatchFn(known={"u1"})
+    loader = UserLoader(batch_fn)
+
+    assert await loader.load_many(["u1", "u1", "u2"]) == ["user-u1", "user-u1", None]
+    assert await loader.load("u1") == "user-u1"
+    assert batch_fn.calls == [["u1", "u2"]]
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_can_be_retried():
+    calls = []
+
+    async def flaky(uids):
+        calls.append(uids)
+        if len(calls) == 1:
+            raise RuntimeError("backend down")
+        return {uid: uid for uid in uids}
+
+    loader = UserLoader(flaky)
+
+    with pytest.raises(RuntimeError):
+        await loader.load("u1")
+    assert await loader.load("u1") == "u1"